@@ -8,28 +8,64 @@ like dynamic content loading, tree navigation, and source code analysis.
 """
 # pylint: enable=line-too-long
 
+import asyncio
+import contextlib
+import hashlib
+import html
 import json
+from pathlib import Path
 from pprint import pformat
 import sys
 import webbrowser
 import threading
 import time
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
+from urllib.parse import quote
 from fastcore.foundation import *   # pylint: disable=wildcard-import, unused-wildcard-import
 from starlette.applications import Starlette
-from starlette.routing import Route, Mount
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.routing import BaseRoute, Route, Mount
 from starlette.staticfiles import StaticFiles
 from starlette.requests import Request
-from starlette.responses import HTMLResponse
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 import uvicorn
 from common.configuration import Configuration
 from common.logging_utils import LoggingUtils
 from call_tracer.renderers.renderer import RendererObject
-from source_analyzer.main import SourceCodeAnalyzer
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    # brotli-asgi is optional; responses are gzip-compressed without it
+    BrotliMiddleware = None
+from call_tracer.renderers.node_analysis import (
+    AnalysisPrefetcher,
+    NodeAnalysisCache,
+    analyze_node,
+    within_source_root,
+)
+from source_analyzer.analyzer_session import AnalyzerSession
+from source_analyzer.progress import (
+    PROGRESS_PHASE_MODEL_INVOKED,
+    PROGRESS_PHASE_QUEUED,
+    PROGRESS_PHASE_TOKENS_STREAMED,
+)
 
 
 STATIC_FILES_LOCATION = "call_tracer/renderers/fasthtml_renderer/static"
 
+# Streamed model text is coalesced so the browser receives at most one event per interval
+TOKEN_EVENT_INTERVAL_SECONDS = 0.25
+
+SSE_EVENT_PHASE = "phase"
+SSE_EVENT_TOKENS = "tokens"
+SSE_EVENT_MARKDOWN = "markdown"
+SSE_EVENT_ERROR = "error"
+SSE_EVENT_DONE = "done"
+
+# Server-sent events must reach the browser as they are produced, so they are never compressed
+STREAM_PATH_PATTERN = r"/node/[^/]+/stream$"
+
 _logger = LoggingUtils().get_class_logger(class_name="fasthtml_renderer")
 
 async def generate_node_content(node: Dict[str, Any]) -> str:
@@ -53,13 +89,109 @@ async def generate_node_content(node: Dict[str, Any]) -> str:
 
     _logger.debug(__name__,f"generate_node_content node: {pformat(node)}")
     # Generate detailed markdown content
-    _logger.debug(__name__,f"call process_file with '{node.get('file_path')}")
-    details = SourceCodeAnalyzer().process_file(
-        input_source_path=node.get("file_path"),function_name=node.get('qualified_name', None))
-    _logger.debug(__name__,f"call process_file finished details len: {len(details)}")
+    details, _, _ = await asyncio.get_running_loop().run_in_executor(None, analyze_node, node)
     return details
 
 
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    # pylint: disable=line-too-long
+    """
+    Format a server-sent event.
+
+    Args:
+        event: The event name the browser listens for.
+        data: The event payload, serialized as JSON on a single data line.
+
+    Returns:
+        str: The event in text/event-stream wire format.
+    """
+    # pylint: enable=line-too-long
+
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def compute_page_etag(data: Dict[str, Any], prefetch_enabled: bool) -> str:
+    # pylint: disable=line-too-long
+    """
+    Compute the strong entity tag of the page rendered for a trace.
+
+    The page only changes with the trace data and the prefetch setting.
+
+    Args:
+        data: The call trace data.
+        prefetch_enabled: Whether the page asks the server to prefetch expanded subtrees.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    # pylint: enable=line-too-long
+
+    page_digest = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8"))
+    page_digest.update(str(prefetch_enabled).encode("utf-8"))
+    return f'"{page_digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # pylint: disable=line-too-long
+    """
+    Check whether the If-None-Match header of a request matches an entity tag.
+
+    Args:
+        request: The incoming HTTP request.
+        etag: The quoted entity tag of the current representation.
+
+    Returns:
+        bool: True if the client already holds the current representation.
+    """
+    # pylint: enable=line-too-long
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in [candidate.removeprefix("W/") for candidate in candidates]
+
+
+class CachingStaticFiles(StaticFiles):
+    # pylint: disable=line-too-long
+    """
+    StaticFiles that adds a Cache-Control header to every file response.
+
+    Starlette already answers conditional requests for static files from their ETag and
+    Last-Modified headers; the max-age lets browsers skip even those requests.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, *args, max_age: int = 3600, **kwargs):
+        # pylint: disable=line-too-long
+        """
+        Initialize the static files application.
+
+        Args:
+            *args: Positional arguments passed to StaticFiles.
+            max_age: Seconds a browser may reuse a static file without revalidating it.
+            **kwargs: Keyword arguments passed to StaticFiles.
+        """
+        # pylint: enable=line-too-long
+
+        super().__init__(*args, **kwargs)
+        self._max_age = max_age
+
+    def file_response(self, *args, **kwargs) -> Response:
+        # pylint: disable=line-too-long
+        """
+        Build the file response and add the Cache-Control header.
+
+        Returns:
+            Response: The file response, or a 304 response if the client's copy is current.
+        """
+        # pylint: enable=line-too-long
+
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = f"public, max-age={self._max_age}"
+        return response
+
+
 class FastHtmlRenderer(RendererObject):
     # pylint: disable=line-too-long
     """
@@ -98,22 +230,246 @@ class FastHtmlRenderer(RendererObject):
 
         super().__init__(configuration=configuration, data=data)
 
+        self._analysis_cache = NodeAnalysisCache()
+
+        # Node file paths come from the trace, so with a source root only the files under it are analyzed
+        self._source_root: Path | None = self._configured_source_root()
+
+        # Read now: setting up the AnalyzerSession reloads the shared configuration
+        self._prefetch_enabled: bool = self._config.bool_value(
+            key_path="renderer.configuration.prefetch.enabled", default_value="false")
+        self._prefetch_max_workers: int = self._config.int_value(
+            key_path="renderer.configuration.prefetch.max_workers", expected_min=1, default_value=1)
+        self._prefetch_token_budget: int = self._config.int_value(
+            key_path="renderer.configuration.prefetch.token_budget", expected_min=0, default_value=0)
+        self._prefetch_max_batch_functions: int = self._config.int_value(
+            key_path="renderer.configuration.prefetch.max_batch_functions", expected_min=1, default_value=6)
+        self._prefetcher: AnalysisPrefetcher | None = None
+        _logger.debug(
+            f"prefetch enabled: {self._prefetch_enabled}, "
+            f"max_workers: {self._prefetch_max_workers}, "
+            f"token_budget: {self._prefetch_token_budget}, "
+            f"max_batch_functions: {self._prefetch_max_batch_functions}, "
+            f"source_root: {self._source_root}"
+        )
+
+        self._compression_minimum_size: int = self._config.int_value(
+            key_path="renderer.configuration.compression.minimum_size", expected_min=0, default_value=500)
+        self._static_max_age: int = self._config.int_value(
+            key_path="renderer.configuration.static.max_age", expected_min=0, default_value=3600)
+
+        self._page_etag = compute_page_etag(self.data, self._prefetch_enabled)
+
         # Create the Starlette app
         _logger.debug(f"renderer.configuration.starlette.debug: {self._config.bool_value(key_path="renderer.configuration.starlette.debug")}")
         self.app = Starlette(
             debug=self._config.bool_value(key_path="renderer.configuration.starlette.debug"),
-            routes=[
-                Route("/", self.index),
-                Route("/node/{node_id}", self.get_node_details),
-                Route("/node/{node_id}/content", self.get_node_content),
-                Mount(
-                    "/static",
-                    StaticFiles(directory=STATIC_FILES_LOCATION),
-                    name="static",
-                ),
-            ],
+            lifespan=self._lifespan,
+            middleware=[self._compression_middleware()],
+            routes=self._routes(),
         )
 
+    def _routes(self) -> List[BaseRoute]:
+        # pylint: disable=line-too-long
+        """
+        Build the routes of the application: the trace routes at the root and the static files.
+
+        Returns:
+            List[BaseRoute]: The application routes.
+        """
+        # pylint: enable=line-too-long
+
+        return self._trace_routes() + [self._static_files_mount()]
+
+    def _trace_routes(self) -> List[BaseRoute]:
+        # pylint: disable=line-too-long
+        """
+        Build the routes that serve a single trace: its page and the node endpoints.
+
+        Returns:
+            List[BaseRoute]: The trace routes, relative to where the trace is served.
+        """
+        # pylint: enable=line-too-long
+
+        return [
+            Route("/", self.index),
+            Route("/node/{node_id}", self.get_node_details),
+            Route("/node/{node_id}/content", self.get_node_content),
+            Route("/node/{node_id}/stream", self.stream_node_content),
+            Route("/node/{node_id}/prefetch", self.prefetch_node_children, methods=["POST"]),
+        ]
+
+    def _static_files_mount(self) -> Mount:
+        # pylint: disable=line-too-long
+        """
+        Build the mount serving the static files.
+
+        Returns:
+            Mount: The static files mount.
+        """
+        # pylint: enable=line-too-long
+
+        return Mount(
+            "/static",
+            CachingStaticFiles(directory=STATIC_FILES_LOCATION, max_age=self._static_max_age),
+            name="static",
+        )
+
+    async def _resolve_trace(
+            self, request: Request) -> Optional[Tuple[Dict[str, Any], str]]:   # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Get the trace a request refers to.
+
+        This renderer serves a single trace; subclasses serving several traces select one from the
+        request path.
+
+        Args:
+            request: The incoming HTTP request.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: The trace data and the entity tag of its page,
+                                                  or None if the trace does not exist.
+        """
+        # pylint: enable=line-too-long
+
+        return self.data, self._page_etag
+
+    def _base_url(self, request: Request) -> str:   # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Get the URL prefix under which the trace of a request is served.
+
+        Args:
+            request: The incoming HTTP request.
+
+        Returns:
+            str: The URL prefix, without a trailing slash.
+        """
+        # pylint: enable=line-too-long
+
+        return ""
+
+    def _configured_source_root(self) -> Path | None:
+        # pylint: disable=line-too-long
+        """
+        Get the directory whose files may be analyzed from renderer.configuration.source_root.
+
+        The trace rendered is the user's own, so by default any of its files may be analyzed.
+
+        Returns:
+            Path | None: The resolved source root, or None if any file may be analyzed.
+        """
+        # pylint: enable=line-too-long
+
+        source_root = self._config.str_value(key_path="renderer.configuration.source_root", default_value="")
+        return Path(source_root).resolve() if source_root else None
+
+    def _analyzable(self, node: Dict[str, Any]) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether the source file of a node may be analyzed.
+
+        Args:
+            node: The node to check.
+
+        Returns:
+            bool: True if the node has a file path and, with a source root, the file is under it.
+        """
+        # pylint: enable=line-too-long
+
+        if not node.get("file_path"):
+            return False
+        return self._source_root is None or within_source_root(node, self._source_root)
+
+    async def _resolve_node(self, request: Request) -> Optional[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Get the node a request refers to by its node_id path parameter.
+
+        Args:
+            request: The incoming HTTP request.
+
+        Returns:
+            Optional[Dict[str, Any]]: The node, or None if the trace or the node does not exist.
+        """
+        # pylint: enable=line-too-long
+
+        trace = await self._resolve_trace(request)
+        if trace is None:
+            return None
+        return self.find_node_by_id(trace[0], request.path_params["node_id"])
+
+    def _compression_middleware(self) -> Middleware:
+        # pylint: disable=line-too-long
+        """
+        Select the response compression middleware.
+
+        Brotli is used when the optional brotli-asgi package is installed, falling back to gzip for
+        clients that do not accept it. Without the package, responses are gzip-compressed.
+
+        Returns:
+            Middleware: The compression middleware.
+        """
+        # pylint: enable=line-too-long
+
+        if BrotliMiddleware is not None:
+            _logger.debug("Using brotli response compression")
+            return Middleware(
+                BrotliMiddleware,
+                minimum_size=self._compression_minimum_size,
+                gzip_fallback=True,
+                excluded_handlers=[STREAM_PATH_PATTERN],
+            )
+        _logger.debug("Using gzip response compression")
+        return Middleware(GZipMiddleware, minimum_size=self._compression_minimum_size)
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(self, app: Starlette) -> AsyncIterator[None]:   # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Set up the analyzer session and start the background prefetcher, if enabled, for the lifetime
+        of the application.
+
+        The session is set up before the first request so that no request pays for loading the
+        configuration and building the model. The root node and its direct children are queued right
+        away since they are what users click first.
+
+        Args:
+            app: The Starlette application (unused but required by Starlette).
+        """
+        # pylint: enable=line-too-long
+
+        await asyncio.to_thread(AnalyzerSession)
+        if self._prefetch_enabled:
+            self._prefetcher = AnalysisPrefetcher(
+                cache=self._analysis_cache,
+                max_workers=self._prefetch_max_workers,
+                token_budget=self._prefetch_token_budget,
+                max_batch_size=self._prefetch_max_batch_functions,
+                source_root=self._source_root,
+            )
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._prefetcher.enqueue, self._initial_prefetch_nodes())
+        try:
+            yield
+        finally:
+            if self._prefetcher is not None:
+                self._prefetcher.shutdown()
+                self._prefetcher = None
+
+    def _initial_prefetch_nodes(self) -> List[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Get the nodes queued for prefetching when the application starts.
+
+        Returns:
+            List[Dict[str, Any]]: The root node followed by its direct children.
+        """
+        # pylint: enable=line-too-long
+
+        return [self.data] + self.data.get("calls", [])
+
     def run(self, host="127.0.0.1", port=8000, open_browser=False):
         # pylint: disable=line-too-long
         """
@@ -178,7 +534,7 @@ class FastHtmlRenderer(RendererObject):
         # Run the Uvicorn server
         uvicorn.run(self.app, host=host, port=port)
 
-    async def index(self, request: Request) -> HTMLResponse:    # pylint: disable=unused-argument
+    async def index(self, request: Request) -> Response:
         # pylint: disable=line-too-long
         """
         Render the main index page with the tree view.
@@ -187,16 +543,28 @@ class FastHtmlRenderer(RendererObject):
         HTML structure with the interactive call tree, popup overlay, and all
         necessary JavaScript for dynamic functionality.
 
+        The page carries a strong ETag derived from the trace data, so a reload with an unchanged
+        trace is answered with 304 Not Modified instead of the full page.
+
         Args:
-            request: The incoming HTTP request (unused but required by Starlette).
+            request: The incoming HTTP request.
 
         Returns:
-            HTMLResponse: The rendered HTML page containing the complete visualization
-                         interface with tree view and interactive elements.
+            Response: The rendered HTML page containing the complete visualization
+                      interface with tree view and interactive elements, or a 304 response.
         """
         # pylint: enable=line-too-long
 
-        return HTMLResponse(self.render_page())
+        trace = await self._resolve_trace(request)
+        if trace is None:
+            return HTMLResponse("<p>Trace not found</p>", status_code=404)
+
+        data, page_etag = trace
+        headers = {"ETag": page_etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, page_etag):
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(
+            self.render_page(data=data, base_url=self._base_url(request)), headers=headers)
 
     async def get_node_details(self, request: Request) -> HTMLResponse:
         # pylint: disable=line-too-long
@@ -217,15 +585,15 @@ class FastHtmlRenderer(RendererObject):
         # pylint: enable=line-too-long
 
         node_id = request.path_params["node_id"]
-        node = self.find_node_by_id(self.data, node_id)
+        node = await self._resolve_node(request)
 
         if not node:
             return HTMLResponse("<p>Node not found</p>")
 
         # Return the form with loading state
-        return HTMLResponse(self.generate_node_details(node_id))
+        return HTMLResponse(self.generate_node_details(node_id, base_url=self._base_url(request)))
 
-    async def get_node_content(self, request: Request) -> HTMLResponse:
+    async def get_node_content(self, request: Request) -> Response:
         # pylint: disable=line-too-long
         """
         Fetch the detailed content for a node using the source code analyzer.
@@ -234,24 +602,174 @@ class FastHtmlRenderer(RendererObject):
         and returns the generated markdown content. It's called asynchronously
         after the initial node details form is displayed.
 
+        Cached analyses carry their analysis cache key as ETag and must be revalidated, so the
+        browser reuses its copy until the source file changes. Failed analyses are not cacheable.
+
+        Args:
+            request: The incoming HTTP request containing the node_id path parameter.
+
+        Returns:
+            Response: HTML content with the analyzed node details in markdown format,
+                      a 304 response if the client's copy is current,
+                      or an error message with 404 status if the node is not found
+                      or 403 status if its source file is outside the source root.
+        """
+        # pylint: enable=line-too-long
+
+        node = await self._resolve_node(request)
+
+        if not node:
+            return HTMLResponse("<p>Node not found</p>", status_code=404)
+        if node.get("file_path") and not self._analyzable(node):
+            return HTMLResponse("<p>Source file outside the source root</p>", status_code=403)
+
+        loop = asyncio.get_running_loop()
+        cache_key = await loop.run_in_executor(None, self._analysis_cache.key_for, node)
+        etag = f'"{cache_key}"'
+        cached_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if self._analysis_cache.get(cache_key) is not None and etag_matches(request, etag):
+            return Response(status_code=304, headers=cached_headers)
+
+        content = await loop.run_in_executor(
+            None, self._analysis_cache.get_or_compute, node, lambda: analyze_node(node))
+        if self._analysis_cache.get(cache_key) is None:
+            return HTMLResponse(content, headers={"Cache-Control": "no-store"})
+        return HTMLResponse(content, headers=cached_headers)
+
+    async def prefetch_node_children(self, request: Request) -> Response:
+        # pylint: disable=line-too-long
+        """
+        Queue the direct children of a node for background analysis.
+
+        Called by the browser when the subtree of a node is expanded. Does nothing when
+        prefetching is disabled.
+
         Args:
             request: The incoming HTTP request containing the node_id path parameter.
 
         Returns:
-            HTMLResponse: HTML content with the analyzed node details in markdown format,
-                         or an error message with 404 status if the node is not found.
+            Response: An empty 202 response, or 404 if the node is not found.
         """
         # pylint: enable=line-too-long
 
         node_id = request.path_params["node_id"]
-        node = self.find_node_by_id(self.data, node_id)
+        node = await self._resolve_node(request)
+
+        if not node:
+            return Response(status_code=404)
+
+        if self._prefetcher is not None:
+            queued = await asyncio.get_running_loop().run_in_executor(
+                None, self._prefetcher.enqueue, node.get("calls", []))
+            _logger.debug(f"Queued {queued} prefetch job(s) for children of '{node_id}'")
+        return Response(status_code=202)
+
+    async def stream_node_content(self, request: Request) -> StreamingResponse | HTMLResponse:
+        # pylint: disable=line-too-long
+        """
+        Stream the analysis of a node to the browser as server-sent events.
+
+        The analysis runs on a worker thread. Phase changes (queued, prompt built, model invoked,
+        formatted) are sent as "phase" events, and streamed model text is sent as coalesced "tokens"
+        events. As often as the tokens, the completion received so far is formatted and sent as a
+        "markdown" event marked partial. The finished markdown is sent as a final "markdown" event
+        followed by "done". Every model attempt sends a "model invoked" phase with its attempt number,
+        after which its response streams from the start.
+
+        Args:
+            request: The incoming HTTP request containing the node_id path parameter.
+
+        Returns:
+            StreamingResponse: A text/event-stream response, or an HTMLResponse with 404 status
+                               if the node is not found or 403 status if its source file is
+                               outside the source root.
+        """
+        # pylint: enable=line-too-long
+
+        node = await self._resolve_node(request)
 
         if not node:
             return HTMLResponse("<p>Node not found</p>", status_code=404)
+        if node.get("file_path") and not self._analyzable(node):
+            return HTMLResponse("<p>Source file outside the source root</p>", status_code=403)
+
+        return StreamingResponse(
+            self._node_content_events(node),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    async def _node_content_events(self, node: Dict[str, Any]) -> AsyncIterator[str]:
+        # pylint: disable=line-too-long
+        """
+        Run the analysis of a node on a worker thread and yield its progress as server-sent events.
 
-        # Generate the content using the separate method
-        content = await generate_node_content(node)
-        return HTMLResponse(content)
+        Args:
+            node: The node whose source code is analyzed.
+
+        Yields:
+            str: Server-sent events in wire format.
+        """
+        # pylint: enable=line-too-long
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        pending_text = []
+        format_markdown: Callable[[], Optional[str]] | None = None
+        last_token_event = 0.0
+
+        def publish(event: str, data: Dict[str, Any]) -> None:
+            loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+        def flush_tokens() -> None:
+            nonlocal format_markdown, last_token_event
+            if pending_text:
+                publish(SSE_EVENT_TOKENS, {"text": "".join(pending_text)})
+                pending_text.clear()
+            # Only the latest partial completion is formatted, as often as the tokens are sent
+            markdown = format_markdown() if format_markdown is not None else None
+            format_markdown = None
+            if markdown:
+                publish(SSE_EVENT_MARKDOWN, {"markdown": markdown, "partial": True})
+            last_token_event = time.monotonic()
+
+        def on_progress(phase: str, details: Dict[str, Any]) -> None:
+            nonlocal format_markdown
+            if phase == PROGRESS_PHASE_TOKENS_STREAMED:
+                pending_text.append(details.get("text", ""))
+                format_markdown = details.get("format_markdown", format_markdown)
+                if time.monotonic() - last_token_event >= TOKEN_EVENT_INTERVAL_SECONDS:
+                    flush_tokens()
+                return
+            data = {"phase": phase}
+            if phase == PROGRESS_PHASE_MODEL_INVOKED:
+                # A retried request starts its response over; the browser clears its preview
+                pending_text.clear()
+                data["attempt"] = details.get("attempt", 1)
+            format_markdown = None
+            flush_tokens()
+            publish(SSE_EVENT_PHASE, data)
+
+        def analyze() -> None:
+            try:
+                content = self._analysis_cache.get_or_compute(
+                    node, lambda: analyze_node(node, on_progress))
+                flush_tokens()
+                publish(SSE_EVENT_MARKDOWN, {"markdown": content or "", "partial": False})
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                _logger.error(f"Streaming analysis failed: {str(e)}", exc_info=True)
+                publish(SSE_EVENT_ERROR, {"message": str(e)})
+            finally:
+                publish(SSE_EVENT_DONE, {})
+
+        yield format_sse_event(SSE_EVENT_PHASE, {"phase": PROGRESS_PHASE_QUEUED})
+        # The analysis cannot be interrupted; it runs to completion even if the browser goes away
+        loop.run_in_executor(None, analyze)
+        while True:
+            event, data = await events.get()
+            yield format_sse_event(event, data)
+            if event == SSE_EVENT_DONE:
+                break
 
     def find_node_by_id(
         self, node: Dict[str, Any], node_id: str
@@ -286,24 +804,27 @@ class FastHtmlRenderer(RendererObject):
 
         return None
 
-    def generate_node_details(self, node_id: str) -> str:
+    def generate_node_details(self, node_id: str, base_url: str = "") -> str:
         # pylint: disable=line-too-long
         """
         Generate HTML form for node details with loading state.
 
         This method creates the initial HTML structure for displaying node details
         in the popup overlay. It includes a loading indicator and JavaScript code
-        that immediately fetches the actual content asynchronously.
+        that immediately subscribes to the node's server-sent event stream, showing
+        each analysis phase and the analysis as markdown as it arrives.
 
         Args:
             node_id: The unique identifier of the node to generate details for.
+            base_url: The URL prefix under which the trace is served. Defaults to "".
 
         Returns:
-            str: HTML content with loading indicator, content placeholder, and
-                 JavaScript for asynchronous content fetching and markdown rendering.
+            str: HTML content with loading indicator, content placeholder, stream preview,
+                 and JavaScript for consuming the event stream and rendering markdown.
         """
         # pylint: enable=line-too-long
 
+        stream_url = json.dumps(f"{base_url}/node/{quote(str(node_id), safe='')}/stream")
         return f"""
         <div id="loading-indicator">
             <p>Loading node details... Please be patient as this could take some time.</p>
@@ -311,34 +832,85 @@ class FastHtmlRenderer(RendererObject):
         </div>
 
         <div id="node-content" style="display: none;"></div>
+        <pre id="node-stream-preview" class="stream-preview" style="display: none;"></pre>
 
         <script>
-            // Immediately start fetching the content
-            fetch('/node/{node_id}/content')
-                .then(response => {{
-                    if (!response.ok) {{
-                        throw new Error('Network response was not ok');
+            (function() {{
+                const phaseLabels = {{
+                    queued: 'Queued for analysis...',
+                    prompt_built: 'Prompt built, contacting the model...',
+                    model_invoked: 'Model invoked, waiting for the first tokens...',
+                    tokens_streamed: 'Receiving the analysis...',
+                    formatted: 'Formatting the analysis...'
+                }};
+                const loadingIndicator = document.getElementById('loading-indicator');
+                const preview = document.getElementById('node-stream-preview');
+                const contentElement = document.getElementById('node-content');
+                const source = new EventSource({stream_url});
+
+                let finished = false;
+                let partialMarkdown = false;
+
+                function setStatus(text) {{
+                    loadingIndicator.querySelector('p').textContent = text;
+                }}
+
+                source.addEventListener('phase', function(e) {{
+                    const data = JSON.parse(e.data);
+                    const phase = data.phase;
+                    setStatus(data.attempt > 1
+                        ? 'Retrying the model (attempt ' + data.attempt + ')...'
+                        : phaseLabels[phase] || phase);
+                    if (phase === 'model_invoked') {{
+                        // Every attempt streams its response from the start
+                        partialMarkdown = false;
+                        preview.textContent = '';
+                        preview.style.display = 'none';
+                        contentElement.innerHTML = '';
+                        contentElement.style.display = 'none';
                     }}
-                    return response.text();
-                }})
-                .then(content => {{
-                    // Hide loading indicator
-                    document.getElementById('loading-indicator').style.display = 'none';
-
-                    // Show and populate content with parsed markdown
-                    const contentElement = document.getElementById('node-content');
-                    contentElement.innerHTML = marked.parse(content);
+                }});
+
+                source.addEventListener('tokens', function(e) {{
+                    setStatus(phaseLabels.tokens_streamed);
+                    preview.textContent += JSON.parse(e.data).text;
+                    if (!partialMarkdown) {{
+                        preview.style.display = 'block';
+                        preview.scrollTop = preview.scrollHeight;
+                    }}
+                }});
+
+                source.addEventListener('markdown', function(e) {{
+                    const data = JSON.parse(e.data);
+                    partialMarkdown = data.partial;
+                    finished = !data.partial;
+                    if (finished) {{
+                        loadingIndicator.style.display = 'none';
+                    }}
+                    preview.style.display = 'none';
+                    contentElement.innerHTML = marked.parse(data.markdown);
                     contentElement.style.display = 'block';
-                }})
-                .catch(error => {{
-                    console.error('Error fetching content:', error);
-                    document.getElementById('loading-indicator').innerHTML =
-                        '<p>Error loading content. Please try again.</p>';
                 }});
+
+                source.addEventListener('error', function(e) {{
+                    // Also fired by the browser when the connection drops; never let it reconnect,
+                    // since reconnecting would start the analysis over again
+                    source.close();
+                    if (!finished) {{
+                        const message = e.data ? JSON.parse(e.data).message : 'Network error';
+                        console.error('Error streaming content:', message);
+                        loadingIndicator.innerHTML = '<p>Error loading content. Please try again.</p>';
+                    }}
+                }});
+
+                source.addEventListener('done', function() {{
+                    source.close();
+                }});
+            }})();
         </script>
         """
 
-    def render_tree_node(self, node: Dict[str, Any], level: int = 0) -> str:
+    def render_tree_node(self, node: Dict[str, Any], level: int = 0, base_url: str = "") -> str:
         # pylint: disable=line-too-long
         """
         Render a single node in the tree as HTML.
@@ -350,6 +922,7 @@ class FastHtmlRenderer(RendererObject):
         Args:
             node: The node data dictionary containing id, name, type, file_path, and calls.
             level: The nesting level of the node in the tree. Defaults to 0.
+            base_url: The URL prefix under which the trace is served. Defaults to "".
 
         Returns:
             str: HTML representation of the node and its children, including proper
@@ -357,24 +930,25 @@ class FastHtmlRenderer(RendererObject):
         """
         # pylint: enable=line-too-long
 
-        node_id = node.get("id", "")
-        name = node.get("name", "Unknown")
-        node_type = node.get("type", "Unknown")
-        file_path = node.get("file_path", "")
+        # Trace data may come from an upload, so every field is escaped
+        node_url = html.escape(f"{base_url}/node/{quote(str(node.get('id', '')), safe='')}")
+        name = html.escape(str(node.get("name", "Unknown")))
+        node_type = html.escape(str(node.get("type", "Unknown")))
+        file_path = html.escape(str(node.get("file_path") or ""))
 
-        # Determine if node is selectable (has file_path)
-        is_selectable = bool(file_path)
+        # Determine if node is selectable (has a file_path, under the source root if there is one)
+        is_selectable = self._analyzable(node)
         selectable_class = "selectable" if is_selectable else ""
 
         # Only add the htmx attributes if the node is selectable
         htmx_attrs = (
-            f'hx-get="/node/{node_id}" hx-target="#popup-content" hx-swap="innerHTML" '
+            f'hx-get="{node_url}" hx-target="#popup-content" hx-swap="innerHTML" '
             'hx-trigger="click" onclick="showPopup()"'
             if is_selectable
             else ""
         )
 
-        html = f"""
+        node_html = f"""
         <li>
             <div class="node {selectable_class}" {htmx_attrs}>
                 <span class="function-name">{name}</span>
@@ -386,24 +960,30 @@ class FastHtmlRenderer(RendererObject):
         # If the node has calls, make them collapsible
         calls = node.get("calls", [])
         if calls:
-            html += f"""
-            <details>
+            # Expanding a subtree asks the server to prefetch the analyses of its children
+            prefetch_attrs = (
+                f'hx-post="{node_url}/prefetch" hx-trigger="toggle once" hx-swap="none"'
+                if self._prefetch_enabled
+                else ""
+            )
+            node_html += f"""
+            <details {prefetch_attrs}>
                 <summary>Calls ({len(calls)})</summary>
                 <ul>
             """
 
             for call in calls:
-                html += self.render_tree_node(call, level + 1)
+                node_html += self.render_tree_node(call, level + 1, base_url=base_url)
 
-            html += """
+            node_html += """
                 </ul>
             </details>
             """
 
-        html += "</li>"
-        return html
+        node_html += "</li>"
+        return node_html
 
-    def render_page(self) -> str:
+    def render_page(self, data: Optional[Dict[str, Any]] = None, base_url: str = "") -> str:
         # pylint: disable=line-too-long
         """
         Render the full HTML page with the tree structure.
@@ -412,6 +992,10 @@ class FastHtmlRenderer(RendererObject):
         including the page structure, CSS and JavaScript imports, the interactive
         tree view, popup overlay, and all necessary client-side functionality.
 
+        Args:
+            data: The call trace data to render. Defaults to the renderer's data.
+            base_url: The URL prefix under which the trace is served. Defaults to "".
+
         Returns:
             str: Complete HTML document string for the visualization page,
                  including head section, body with tree container, popup overlay,
@@ -438,7 +1022,7 @@ class FastHtmlRenderer(RendererObject):
                     <h2>Function Call Tree</h2>
                     <div class="tree">
                         <ul>
-                            {self.render_tree_node(self.data)}
+                            {self.render_tree_node(self.data if data is None else data, base_url=base_url)}
                         </ul>
                     </div>
                 </div>
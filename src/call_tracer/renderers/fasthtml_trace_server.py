@@ -0,0 +1,481 @@
+# pylint: disable=line-too-long
+"""
+A long-running FastHTML server for browsing many call traces.
+
+The FastHtmlRenderer serves the single trace it was created with, so looking at another trace means
+restarting the server. The FastHtmlTraceServer instead serves every trace file in a directory under
+/trace/{trace_id}/, loading each trace when it is first requested and keeping only the most recently
+used traces in memory. New traces are added without a restart by posting their JSON to /traces.
+"""
+# pylint: enable=line-too-long
+
+import asyncio
+import hmac
+import html
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, Response
+from starlette.routing import BaseRoute, Mount, Route
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from call_tracer.renderers.fasthtml_renderer import FastHtmlRenderer, compute_page_etag
+
+TRACE_FILE_SUFFIX = ".json"
+
+# Trace ids become file names and URL path segments
+TRACE_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,127}$")
+
+
+class TraceStore:
+    # pylint: disable=line-too-long
+    """
+    A directory of trace files with lazy loading and least-recently-used eviction.
+
+    Each trace is stored as {trace_id}.json in the traces directory. A trace is parsed the first
+    time it is requested; at most max_loaded_traces parsed traces are kept in memory, and the least
+    recently used one is dropped when another is loaded.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, traces_directory: str, max_loaded_traces: int, prefetch_enabled: bool):
+        # pylint: disable=line-too-long
+        """
+        Initialize the store.
+
+        Args:
+            traces_directory: The directory holding the trace files. Created if missing.
+            max_loaded_traces: The maximum number of parsed traces kept in memory.
+            prefetch_enabled: Whether pages ask the server to prefetch, which is part of their entity tag.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._traces_directory = Path(traces_directory)
+        self._traces_directory.mkdir(parents=True, exist_ok=True)
+        self._max_loaded_traces = max(1, max_loaded_traces)
+        self._prefetch_enabled = prefetch_enabled
+        self._lock = threading.Lock()
+        self._loaded: OrderedDict[str, Tuple[Dict[str, Any], str]] = OrderedDict()
+
+    def _trace_path(self, trace_id: str) -> Path:
+        # pylint: disable=line-too-long
+        """
+        Get the path of the file holding a trace.
+
+        Args:
+            trace_id: The trace id.
+
+        Returns:
+            Path: The trace file path.
+        """
+        # pylint: enable=line-too-long
+
+        return self._traces_directory / f"{trace_id}{TRACE_FILE_SUFFIX}"
+
+    def trace_ids(self) -> List[str]:
+        # pylint: disable=line-too-long
+        """
+        List the ids of the traces in the traces directory.
+
+        Returns:
+            List[str]: The trace ids, sorted.
+        """
+        # pylint: enable=line-too-long
+
+        return sorted(
+            path.stem
+            for path in self._traces_directory.glob(f"*{TRACE_FILE_SUFFIX}")
+            if TRACE_ID_PATTERN.match(path.stem)
+        )
+
+    def get(self, trace_id: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        # pylint: disable=line-too-long
+        """
+        Get a trace, loading it from its file if it is not in memory.
+
+        Args:
+            trace_id: The trace id.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: The trace data and the entity tag of its page,
+                                                  or None if there is no such trace.
+        """
+        # pylint: enable=line-too-long
+
+        if not TRACE_ID_PATTERN.match(trace_id):
+            return None
+
+        with self._lock:
+            if trace_id in self._loaded:
+                self._loaded.move_to_end(trace_id)
+                return self._loaded[trace_id]
+
+        trace_path = self._trace_path(trace_id)
+        if not trace_path.is_file():
+            return None
+        self._logger.debug(f"Loading trace '{trace_id}' from '{trace_path}'")
+        try:
+            with open(trace_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            self._logger.error(f"Cannot load trace '{trace_id}': {str(e)}")
+            return None
+        return self._remember(trace_id, data)
+
+    def add(self, trace_id: str, data: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Save a trace to the traces directory, replacing any trace with the same id.
+
+        Args:
+            trace_id: The trace id. Must match TRACE_ID_PATTERN.
+            data: The call trace data.
+
+        Raises:
+            ValueError: If the trace id is invalid.
+        """
+        # pylint: enable=line-too-long
+
+        if not TRACE_ID_PATTERN.match(trace_id):
+            raise ValueError(f"Invalid trace id '{trace_id}'")
+
+        trace_path = self._trace_path(trace_id)
+        temporary_path = trace_path.with_suffix(f"{TRACE_FILE_SUFFIX}.tmp")
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temporary_path, trace_path)
+        self._logger.debug(f"Saved trace '{trace_id}' to '{trace_path}'")
+        self._remember(trace_id, data)
+
+    def _remember(self, trace_id: str, data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        # pylint: disable=line-too-long
+        """
+        Keep a parsed trace in memory, evicting the least recently used traces over the limit.
+
+        Args:
+            trace_id: The trace id.
+            data: The call trace data.
+
+        Returns:
+            Tuple[Dict[str, Any], str]: The trace data and the entity tag of its page.
+        """
+        # pylint: enable=line-too-long
+
+        trace = (data, compute_page_etag(data, self._prefetch_enabled))
+        with self._lock:
+            self._loaded[trace_id] = trace
+            self._loaded.move_to_end(trace_id)
+            while len(self._loaded) > self._max_loaded_traces:
+                evicted_id, _ = self._loaded.popitem(last=False)
+                self._logger.debug(f"Evicted trace '{evicted_id}' from memory")
+        return trace
+
+
+class FastHtmlTraceServer(FastHtmlRenderer):
+    # pylint: disable=line-too-long
+    """
+    A FastHTML server that serves every trace in a directory.
+
+    Each trace is served under /trace/{trace_id}/ with the same page and node endpoints as the
+    FastHtmlRenderer. The root page lists the available traces, and POST /traces?trace_id=... with
+    a JSON body adds a trace. Node analyses are cached by source content, so they are shared
+    between traces.
+    """
+    # pylint: enable=line-too-long
+
+    _instance = None
+
+    def __init__(
+        self, configuration: Configuration, data: Dict[str, Any] = None,
+        traces_directory: str | None = None,
+    ):
+        # pylint: disable=line-too-long
+        """
+        Initialize the trace server.
+
+        Args:
+            configuration: Configuration object containing renderer settings, including the
+                          renderer.configuration.trace_server section.
+            data: Unused; traces are read from the traces directory. Defaults to None.
+            traces_directory: Overrides the configured traces directory. Defaults to None.
+        """
+        # pylint: enable=line-too-long
+
+        # Read before the application, and its routes, are created by the base class
+        self._traces_directory: str = traces_directory or configuration.str_value(
+            key_path="renderer.configuration.trace_server.traces_directory", default_value="traces")
+        self._max_loaded_traces: int = configuration.int_value(
+            key_path="renderer.configuration.trace_server.max_loaded_traces", expected_min=1, default_value=8)
+        self._max_upload_bytes: int = configuration.int_value(
+            key_path="renderer.configuration.trace_server.max_upload_bytes", expected_min=1, default_value=50_000_000)
+        self._upload_token: str = configuration.str_value(
+            key_path="renderer.configuration.trace_server.upload_token", default_value="")
+        self._trace_store: TraceStore | None = None
+
+        super().__init__(configuration=configuration, data=data or {})
+
+        self._trace_store = TraceStore(
+            traces_directory=self._traces_directory,
+            max_loaded_traces=self._max_loaded_traces,
+            prefetch_enabled=self._prefetch_enabled,
+        )
+        self._logger.debug(
+            f"traces_directory: {self._traces_directory}, "
+            f"max_loaded_traces: {self._max_loaded_traces}"
+        )
+
+    def _routes(self) -> List[BaseRoute]:
+        # pylint: disable=line-too-long
+        """
+        Build the routes of the application: the trace list, the upload endpoint, the trace routes
+        under /trace/{trace_id} and the static files.
+
+        Returns:
+            List[BaseRoute]: The application routes.
+        """
+        # pylint: enable=line-too-long
+
+        return [
+            Route("/", self.list_traces),
+            Route("/traces", self.upload_trace, methods=["POST"]),
+            Mount("/trace/{trace_id}", routes=self._trace_routes()),
+            self._static_files_mount(),
+        ]
+
+    async def _resolve_trace(self, request: Request) -> Optional[Tuple[Dict[str, Any], str]]:
+        # pylint: disable=line-too-long
+        """
+        Get the trace selected by the trace_id path parameter, loading it if needed.
+
+        Args:
+            request: The incoming HTTP request.
+
+        Returns:
+            Optional[Tuple[Dict[str, Any], str]]: The trace data and the entity tag of its page,
+                                                  or None if there is no such trace.
+        """
+        # pylint: enable=line-too-long
+
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._trace_store.get, request.path_params["trace_id"])
+
+    def _base_url(self, request: Request) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the URL prefix under which the trace of a request is served.
+
+        Args:
+            request: The incoming HTTP request.
+
+        Returns:
+            str: /trace/{trace_id}
+        """
+        # pylint: enable=line-too-long
+
+        return f"/trace/{request.path_params['trace_id']}"
+
+    def _configured_source_root(self) -> Path | None:
+        # pylint: disable=line-too-long
+        """
+        Get the directory whose files may be analyzed from renderer.configuration.trace_server.source_root.
+
+        Traces may be uploaded by anyone who can reach the server, so by default only the files under
+        the working directory are analyzed; an empty source root allows any file.
+
+        Returns:
+            Path | None: The resolved source root, or None if any file may be analyzed.
+        """
+        # pylint: enable=line-too-long
+
+        source_root = self._config.str_value(
+            key_path="renderer.configuration.trace_server.source_root", default_value=".")
+        return Path(source_root).resolve() if source_root else None
+
+    def _initial_prefetch_nodes(self) -> List[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Get the nodes queued for prefetching when the server starts.
+
+        No trace is open at startup; the root and direct children of a trace are queued when its
+        page is first served instead.
+
+        Returns:
+            List[Dict[str, Any]]: An empty list.
+        """
+        # pylint: enable=line-too-long
+
+        return []
+
+    async def index(self, request: Request) -> Response:
+        # pylint: disable=line-too-long
+        """
+        Render the page of a trace, queuing its root and direct children for prefetching.
+
+        Args:
+            request: The incoming HTTP request containing the trace_id path parameter.
+
+        Returns:
+            Response: The rendered page, a 304 response, or a 404 response if there is no such trace.
+        """
+        # pylint: enable=line-too-long
+
+        trace = await self._resolve_trace(request)
+        if trace is not None and self._prefetcher is not None:
+            data = trace[0]
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._prefetcher.enqueue, [data] + data.get("calls", []))
+        return await super().index(request)
+
+    async def list_traces(self, request: Request) -> HTMLResponse:    # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Render the list of available traces.
+
+        Args:
+            request: The incoming HTTP request (unused but required by Starlette).
+
+        Returns:
+            HTMLResponse: A page linking to every trace in the traces directory.
+        """
+        # pylint: enable=line-too-long
+
+        trace_ids = await asyncio.get_running_loop().run_in_executor(None, self._trace_store.trace_ids)
+        items = "".join(
+            f'<li><a href="/trace/{html.escape(trace_id)}/">{html.escape(trace_id)}</a></li>'
+            for trace_id in trace_ids
+        )
+        return HTMLResponse(f"""
+        <!DOCTYPE html>
+        <html lang="en">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>Call Tracer Visualizer</title>
+            <link rel="stylesheet" href="/static/styles.css">
+        </head>
+        <body>
+            <h1>Call Tracer Visualizer</h1>
+            <div class="container">
+                <h2>Traces</h2>
+                <ul>{items or '<li>No traces yet</li>'}</ul>
+                <p>Add a trace with <code>POST /traces?trace_id=NAME</code> and the trace JSON as an application/json body.</p>
+            </div>
+        </body>
+        </html>
+        """, headers={"Cache-Control": "no-cache"})
+
+    async def upload_trace(self, request: Request) -> JSONResponse:
+        # pylint: disable=line-too-long
+        """
+        Add a trace from the JSON request body.
+
+        The trace id is taken from the trace_id query parameter, or from the id of the root node if
+        the parameter is missing. A trace with the same id is replaced.
+
+        Traces name the source files the server analyzes, so uploads must be authorized: with the
+        upload_token configured, by an "Authorization: Bearer" header carrying it, and otherwise by
+        coming from the server's own origin. The application/json content type also keeps browsers
+        from posting traces from other sites as plain forms.
+
+        Args:
+            request: The incoming HTTP request with the trace JSON as its body.
+
+        Returns:
+            JSONResponse: The trace id and URL with status 201, or an error message with status
+                          400 for invalid input, 403 for an unauthorized upload, 413 for a body over
+                          max_upload_bytes or 415 for a body that is not application/json.
+        """
+        # pylint: enable=line-too-long
+
+        if not self._upload_authorized(request):
+            return JSONResponse({"error": "Upload not authorized"}, status_code=403)
+
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        if content_type != "application/json":
+            return JSONResponse({"error": "The trace must be sent as application/json"}, status_code=415)
+
+        content_length = request.headers.get("content-length")
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > self._max_upload_bytes:
+            return JSONResponse({"error": "Trace too large"}, status_code=413)
+
+        body = await request.body()
+        if len(body) > self._max_upload_bytes:
+            return JSONResponse({"error": "Trace too large"}, status_code=413)
+
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            return JSONResponse({"error": f"Invalid JSON: {str(e)}"}, status_code=400)
+        if not isinstance(data, dict):
+            return JSONResponse({"error": "The trace must be a JSON object"}, status_code=400)
+
+        trace_id = request.query_params.get("trace_id") or str(data.get("id", ""))
+        if not TRACE_ID_PATTERN.match(trace_id):
+            return JSONResponse({"error": f"Invalid trace id '{trace_id}'"}, status_code=400)
+
+        await asyncio.get_running_loop().run_in_executor(None, self._trace_store.add, trace_id, data)
+        self._logger.info(f"Added trace '{trace_id}'")
+        return JSONResponse(
+            {"trace_id": trace_id, "url": f"/trace/{trace_id}/"}, status_code=201)
+
+    def _upload_authorized(self, request: Request) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check that an upload carries the configured upload token, or comes from the server's own origin
+        if no token is configured.
+
+        Args:
+            request: The incoming upload request.
+
+        Returns:
+            bool: True if the upload may be accepted.
+        """
+        # pylint: enable=line-too-long
+
+        if self._upload_token:
+            authorization = request.headers.get("authorization", "")
+            return hmac.compare_digest(authorization.encode(), f"Bearer {self._upload_token}".encode())
+
+        # Browsers send the origin of cross-site requests; clients such as curl send none
+        if request.headers.get("sec-fetch-site", "same-origin") not in ("same-origin", "none"):
+            return False
+        origin = request.headers.get("origin")
+        return origin is None or origin == f"{request.url.scheme}://{request.url.netloc}"
+
+    def render(self):
+        # pylint: disable=line-too-long
+        """
+        Start the trace server and open a browser on the trace list.
+        """
+        # pylint: enable=line-too-long
+
+        self.run(open_browser=True)
+
+
+def main():
+    # pylint: disable=line-too-long
+    """
+    Main entry point for running the trace server as a standalone application.
+
+    An optional first command-line argument overrides the configured traces directory.
+    """
+    # pylint: enable=line-too-long
+
+    main_configuration = Configuration(config_file_path="call_tracer/config.yaml")
+    server = FastHtmlTraceServer(
+        configuration=main_configuration,
+        traces_directory=sys.argv[1] if len(sys.argv) > 1 else None,
+    )
+    server.run(open_browser=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,503 @@
+# pylint: disable=line-too-long
+"""
+Node analysis caching and background prefetching for the interactive renderers.
+
+This module runs the source code analysis of call trace nodes on behalf of a renderer. Completed
+analyses are kept in a NodeAnalysisCache keyed by the content of the node's source file and its
+qualified name, so an edited file is analyzed again while an unchanged one is served from memory.
+The cache also deduplicates in-flight work: a request for a node that is already being analyzed
+waits for that analysis instead of starting another one.
+
+Analyses run on the process-wide AnalyzerSession, which gives each concurrent request an analyzer of
+its own, so user requests and prefetch workers are analyzed in parallel.
+
+The AnalysisPrefetcher warms the cache in the background with a bounded number of worker threads
+and stops queuing new work once a token budget has been spent. Functions of the same file are
+prefetched in batches analyzed with a single model request.
+
+Node file paths come from the trace, which may have been uploaded, so renderers only analyze the
+files under a configured source root.
+"""
+# pylint: enable=line-too-long
+
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from common.logging_utils import LoggingUtils
+from source_analyzer.analyzer_session import AnalyzerSession
+from source_analyzer.progress import ProgressCallback
+from source_analyzer.token_budget import TokenBudget
+
+_logger = LoggingUtils().get_class_logger(class_name="node_analysis")
+
+
+def within_source_root(node: Dict[str, Any], source_root: Path) -> bool:
+    # pylint: disable=line-too-long
+    """
+    Check whether the source file of a node is under the source root.
+
+    Args:
+        node: The node whose file_path is checked.
+        source_root: The resolved directory whose files may be analyzed.
+
+    Returns:
+        bool: True if the node has a file path that resolves to a path under source_root.
+    """
+    # pylint: enable=line-too-long
+
+    file_path = node.get("file_path")
+    if not file_path:
+        return False
+    try:
+        return Path(file_path).resolve().is_relative_to(source_root)
+    except (OSError, TypeError, ValueError):
+        return False
+
+
+def analyze_node(
+        node: Dict[str, Any], progress_callback: ProgressCallback | None = None,
+        token_budget: TokenBudget | None = None
+) -> Tuple[Optional[str], int, bool]:
+    # pylint: disable=line-too-long
+    """
+    Analyze the source code of a node.
+
+    Args:
+        node: A dictionary containing node information, including file_path and
+              optionally qualified_name for the specific function to analyze.
+        progress_callback: Receives (phase, details) for every analysis phase. Defaults to None.
+        token_budget: The budget the tokens of the request are reserved against. Defaults to None, for a
+                      budget of its own.
+
+    Returns:
+        Tuple[Optional[str], int, bool]: The markdown content, the number of tokens used and
+                                         whether the analysis succeeded.
+    """
+    # pylint: enable=line-too-long
+
+    _logger.debug(__name__, f"call process_file with '{node.get('file_path')}'")
+    result = AnalyzerSession().analyze_file(
+        input_source_path=node.get("file_path"),
+        function_name=node.get("qualified_name", None),
+        progress_callback=progress_callback,
+        token_budget=token_budget,
+    )
+    _logger.debug(__name__, f"call process_file finished tokens: {result.tokens}, succeeded: {result.succeeded}")
+    return result.content, result.tokens, result.succeeded
+
+
+def analyze_file_nodes(
+        nodes: List[Dict[str, Any]], progress_callback: ProgressCallback | None = None,
+        token_budget: TokenBudget | None = None
+) -> Tuple[Dict[str, str], int, bool]:
+    # pylint: disable=line-too-long
+    """
+    Analyze the functions of several nodes of the same source file with one model request.
+
+    Args:
+        nodes: Nodes sharing a file_path, each with the qualified_name of the function to analyze.
+        progress_callback: Receives (phase, details) for every analysis phase. Defaults to None.
+        token_budget: The budget the tokens of the request are reserved against. Defaults to None, for a
+                      budget of its own.
+
+    Returns:
+        Tuple[Dict[str, str], int, bool]: The markdown content of each qualified name, the number of
+                                          tokens used and whether the analysis succeeded.
+    """
+    # pylint: enable=line-too-long
+
+    file_path = nodes[0].get("file_path")
+    function_names = [node.get("qualified_name") for node in nodes]
+    _logger.debug(__name__, f"call process_functions with '{file_path}' for {function_names}")
+    result = AnalyzerSession().analyze_functions(
+        input_source_path=file_path,
+        function_names=function_names,
+        progress_callback=progress_callback,
+        token_budget=token_budget,
+    )
+    _logger.debug(__name__, f"call process_functions finished tokens: {result.tokens}, succeeded: {result.succeeded}")
+    return result.content, result.tokens, result.succeeded
+
+
+class NodeAnalysisCache:
+    # pylint: disable=line-too-long
+    """
+    A thread-safe in-memory cache of node analyses with in-flight deduplication.
+
+    Entries are keyed by a hash of the node's source file content and its qualified name. Only
+    successful analyses are kept; failures are returned to the caller that requested them and
+    retried on the next request.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self):
+        # pylint: disable=line-too-long
+        """
+        Initialize an empty cache.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._lock = threading.Lock()
+        self._results: Dict[str, str] = {}
+        self._pending: Dict[str, Future] = {}
+
+    def key_for(self, node: Dict[str, Any]) -> Optional[str]:
+        # pylint: disable=line-too-long
+        """
+        Compute the cache key of a node.
+
+        Args:
+            node: The node whose source file and qualified name make up the key.
+
+        Returns:
+            Optional[str]: The key, or None if the node has no readable source file.
+        """
+        # pylint: enable=line-too-long
+
+        file_path = node.get("file_path")
+        if not file_path:
+            return None
+        try:
+            with open(file_path, "rb") as f:
+                digest = hashlib.sha256(f.read())
+        except OSError as e:
+            self._logger.debug(f"Cannot read '{file_path}' for the cache key: {str(e)}")
+            return None
+        digest.update(b"\0")
+        digest.update(str(node.get("qualified_name", "")).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        # pylint: disable=line-too-long
+        """
+        Get a cached analysis.
+
+        Args:
+            key: The cache key returned by key_for.
+
+        Returns:
+            Optional[str]: The cached markdown content, or None if it is not cached.
+        """
+        # pylint: enable=line-too-long
+
+        if key is None:
+            return None
+        with self._lock:
+            return self._results.get(key)
+
+    def is_known(self, key: Optional[str]) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether an analysis is cached or in progress.
+
+        Args:
+            key: The cache key returned by key_for.
+
+        Returns:
+            bool: True if the analysis is cached or currently being computed.
+        """
+        # pylint: enable=line-too-long
+
+        if key is None:
+            return False
+        with self._lock:
+            return key in self._results or key in self._pending
+
+    def get_or_compute(
+            self, node: Dict[str, Any],
+            compute: Callable[[], Tuple[Optional[str], int, bool]]) -> Optional[str]:
+        # pylint: disable=line-too-long
+        """
+        Get the analysis of a node, computing it if it is neither cached nor in progress.
+
+        If another thread is already analyzing the same node, this call blocks until that analysis
+        finishes and returns its result.
+
+        Args:
+            node: The node to analyze.
+            compute: Performs the analysis and returns the analyze_node result tuple.
+
+        Returns:
+            Optional[str]: The markdown content of the analysis.
+        """
+        # pylint: enable=line-too-long
+
+        key = self.key_for(node)
+        if key is None:
+            return compute()[0]
+
+        with self._lock:
+            if key in self._results:
+                self._logger.debug(f"Analysis cache hit for '{node.get('id')}'")
+                return self._results[key]
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+
+        if not owner:
+            self._logger.debug(f"Waiting for in-flight analysis of '{node.get('id')}'")
+            return future.result()
+
+        try:
+            details, _, succeeded = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            if succeeded:
+                self._results[key] = details
+            del self._pending[key]
+        future.set_result(details)
+        return details
+
+    def get_or_compute_batch(
+            self, nodes: List[Dict[str, Any]],
+            compute: Callable[[List[Dict[str, Any]]], Tuple[Dict[str, str], int, bool]]
+    ) -> List[Optional[str]]:
+        # pylint: disable=line-too-long
+        """
+        Get the analyses of several nodes of the same file, computing the missing ones together.
+
+        Nodes that are cached are served from the cache and nodes already being analyzed are waited
+        for; the others are passed to one compute call, whose results seed the cache for each node.
+
+        Args:
+            nodes: The nodes to analyze, all with the same file_path.
+            compute: Analyzes a list of nodes and returns the analyze_file_nodes result tuple.
+
+        Returns:
+            List[Optional[str]]: The markdown content of each node, in the order of nodes.
+        """
+        # pylint: enable=line-too-long
+
+        keys = [self.key_for(node) for node in nodes]
+        results: List[Optional[str]] = [None] * len(nodes)
+        waiting: Dict[int, Future] = {}
+        owned: Dict[int, Future] = {}
+        with self._lock:
+            for index, key in enumerate(keys):
+                if key is None:
+                    continue
+                if key in self._results:
+                    results[index] = self._results[key]
+                elif key in self._pending:
+                    waiting[index] = self._pending[key]
+                else:
+                    owned[index] = self._pending[key] = Future()
+
+        if owned:
+            self._logger.debug(f"Analyze {len(owned)} of {len(nodes)} nodes with one request")
+            try:
+                details, _, succeeded = compute([nodes[index] for index in owned])
+            except BaseException as e:
+                with self._lock:
+                    for index in owned:
+                        del self._pending[keys[index]]
+                for future in owned.values():
+                    future.set_exception(e)
+                raise
+
+            with self._lock:
+                for index in owned:
+                    results[index] = details.get(nodes[index].get("qualified_name"))
+                    if succeeded and results[index] is not None:
+                        self._results[keys[index]] = results[index]
+                    del self._pending[keys[index]]
+            for index, future in owned.items():
+                future.set_result(results[index])
+
+        for index, future in waiting.items():
+            results[index] = future.result()
+        return results
+
+
+class AnalysisPrefetcher:
+    # pylint: disable=line-too-long
+    """
+    Warm a NodeAnalysisCache in the background.
+
+    Nodes are analyzed on a bounded thread pool. Functions of the same source file are grouped into
+    batches of up to max_batch_size nodes, each analyzed with one model request. Like the analyses of a
+    run, every prefetch request reserves its estimated prompt and completion tokens against the token
+    budget before it is sent, so concurrent workers cannot overspend it; a request that no longer fits
+    is skipped without invoking the model. Once the budget is spent no further nodes are queued and
+    queued nodes that have not started are skipped.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, cache: NodeAnalysisCache, max_workers: int, token_budget: int, max_batch_size: int = 1,
+            source_root: Optional[Path] = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize the prefetcher.
+
+        Args:
+            cache: The cache that receives the prefetched analyses.
+            max_workers: The maximum number of analyses queued concurrently.
+            token_budget: The maximum number of tokens prefetching may spend. 0 means unlimited.
+            max_batch_size: The maximum number of functions of a file analyzed with one request. 1 disables batching.
+            source_root: The resolved directory whose files may be prefetched. Defaults to None, allowing any file.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._cache = cache
+        self._token_budget = TokenBudget(max_tokens=token_budget) if token_budget > 0 else None
+        self._max_batch_size = max(1, max_batch_size)
+        self._source_root = source_root
+        self._tokens_spent = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers), thread_name_prefix="analysis-prefetch")
+
+    @property
+    def tokens_spent(self) -> int:
+        # pylint: disable=line-too-long
+        """
+        Get the number of tokens spent by prefetched analyses.
+
+        Returns:
+            int: The tokens spent so far.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            return self._tokens_spent
+
+    def budget_exhausted(self) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether the token budget has been spent.
+
+        Returns:
+            bool: True if no more analyses may be prefetched.
+        """
+        # pylint: enable=line-too-long
+
+        return self._token_budget is not None and self._token_budget.remaining <= 0
+
+    def enqueue(self, nodes: Iterable[Dict[str, Any]]) -> int:
+        # pylint: disable=line-too-long
+        """
+        Queue the selectable nodes that are neither cached nor in progress for analysis.
+
+        Nodes are selectable if they have a file path, under the source root if there is one.
+
+        Args:
+            nodes: The candidate nodes.
+
+        Returns:
+            int: The number of nodes queued.
+        """
+        # pylint: enable=line-too-long
+
+        queued = 0
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        for node in nodes:
+            if not node.get("file_path"):
+                continue
+            if self._source_root is not None and not within_source_root(node, self._source_root):
+                continue
+            if self.budget_exhausted():
+                self._logger.info(f"Prefetch token budget of {self._token_budget.max_tokens} spent")
+                break
+            if self._cache.is_known(self._cache.key_for(node)):
+                continue
+            queued += 1
+            if self._max_batch_size <= 1 or not node.get("qualified_name"):
+                self._logger.debug(f"Queue prefetch of '{node.get('id')}'")
+                self._executor.submit(self._prefetch, node)
+                continue
+            batch = batches.setdefault(node["file_path"], [])
+            batch.append(node)
+            if len(batch) == self._max_batch_size:
+                self._submit_batch(batches.pop(node["file_path"]))
+
+        for batch in batches.values():
+            self._submit_batch(batch)
+        return queued
+
+    def _submit_batch(self, batch: List[Dict[str, Any]]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Queue a batch of nodes of the same file, or a single node on its own.
+
+        Args:
+            batch: The nodes to analyze together.
+        """
+        # pylint: enable=line-too-long
+
+        if len(batch) == 1:
+            self._logger.debug(f"Queue prefetch of '{batch[0].get('id')}'")
+            self._executor.submit(self._prefetch, batch[0])
+            return
+        self._logger.debug(f"Queue batch prefetch of {[node.get('id') for node in batch]}")
+        self._executor.submit(self._prefetch_batch, batch)
+
+    def _prefetch(self, node: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze a node into the cache unless the token budget has been spent in the meantime.
+
+        Args:
+            node: The node to analyze.
+        """
+        # pylint: enable=line-too-long
+
+        if self.budget_exhausted():
+            return
+
+        def compute() -> Tuple[Optional[str], int, bool]:
+            result = analyze_node(node, token_budget=self._token_budget)
+            with self._lock:
+                self._tokens_spent += result[1]
+            return result
+
+        try:
+            self._cache.get_or_compute(node, compute)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._logger.warning(f"Prefetch of '{node.get('id')}' failed: {str(e)}")
+
+    def _prefetch_batch(self, batch: List[Dict[str, Any]]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze the functions of a batch of nodes of the same file into the cache with one request,
+        unless the token budget has been spent in the meantime.
+
+        Args:
+            batch: The nodes to analyze.
+        """
+        # pylint: enable=line-too-long
+
+        if self.budget_exhausted():
+            return
+
+        def compute(nodes: List[Dict[str, Any]]) -> Tuple[Dict[str, str], int, bool]:
+            result = analyze_file_nodes(nodes, token_budget=self._token_budget)
+            with self._lock:
+                self._tokens_spent += result[1]
+            return result
+
+        try:
+            self._cache.get_or_compute_batch(batch, compute)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._logger.warning(
+                f"Batch prefetch of {[node.get('id') for node in batch]} failed: {str(e)}")
+
+    def shutdown(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Stop the worker threads, dropping queued analyses that have not started.
+        """
+        # pylint: enable=line-too-long
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -20,14 +20,193 @@ Example:
 """
 # pylint: enable=line-too-long
 
+import hashlib
 import sys
 import json
-from typing import Dict, Any
+import os
+from typing import Dict, Any, List, Optional
 import streamlit as st
 from call_tracer.renderers.renderer import RendererObject
 from common.configuration import Configuration
 
 
+class TraceIndex:
+    # pylint: disable=line-too-long
+    """
+    A flattened, read-only view of a call trace built once per trace.
+
+    Two trace layouts are supported: the hierarchical tree produced by the call tracer, where each
+    node holds its children in "calls", and a mapping of node ids to nodes whose "calls" refer to
+    other entries of the mapping by id.
+
+    Attributes:
+        roots (List[str]): The ids of the top-level nodes, in display order.
+        nodes (Dict[str, Dict[str, Any]]): Every node by id.
+        children (Dict[str, List[str]]): The ids of the children of every node that has calls.
+        labels (Dict[str, str]): The label displayed in the tree for every node.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, data: Dict[str, Any]):
+        # pylint: disable=line-too-long
+        """
+        Build the index of a call trace.
+
+        Args:
+            data (Dict[str, Any]): The call trace in either supported layout.
+        """
+        # pylint: enable=line-too-long
+
+        self.roots: List[str] = []
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.children: Dict[str, List[str]] = {}
+        self.labels: Dict[str, str] = {}
+
+        if "id" in data:
+            self._index_tree(data)
+        else:
+            self._index_mapping(data)
+
+    def _index_tree(self, root: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Index a hierarchical call tree without recursion, so deep traces cannot exhaust the stack.
+
+        Args:
+            root (Dict[str, Any]): The root node of the tree.
+        """
+        # pylint: enable=line-too-long
+
+        self.roots.append(root["id"])
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            node_id = node.get("id")
+            self.nodes[node_id] = node
+            self.labels[node_id] = node.get("qualified_name") or node.get("name", "Unknown")
+            if "calls" in node:
+                self.children[node_id] = [call.get("id") for call in node["calls"]]
+                pending.extend(node["calls"])
+
+    def _index_mapping(self, data: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Index a mapping of node ids to nodes.
+
+        Args:
+            data (Dict[str, Any]): The mapping; every entry is displayed as a top-level node.
+        """
+        # pylint: enable=line-too-long
+
+        for key, value in data.items():
+            self.roots.append(key)
+            self.nodes[key] = value
+            self.labels[key] = key
+            if "calls" in value:
+                self.children[key] = [call.get("id") for call in value["calls"]]
+                for call in value["calls"]:
+                    call_id = call.get("id")
+                    if call_id not in data:
+                        self.nodes[call_id] = call
+                        self.labels[call_id] = call.get("qualified_name", "Unknown")
+
+    def node_details(self, node_id: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Format the details of a node as markdown.
+
+        Args:
+            node_id (str): The ID of the node.
+
+        Returns:
+            str: Formatted markdown string containing the node details, or an error message
+                 if the node is not found.
+        """
+        # pylint: enable=line-too-long
+
+        node = self.nodes.get(node_id)
+        if node is None:
+            return f"# No details found for node: {node_id}"
+
+        details = [
+            f"# {self.labels[node_id]}\n",
+            f"**ID:** {node.get('id', node_id)}\n",
+            f"**Name:** {node.get('name', 'N/A')}\n",
+            f"**File Path:** {node.get('file_path', 'N/A')}\n",
+            f"**Line Number:** {node.get('lineno', 'N/A')}\n",
+            f"**Column Offset:** {node.get('col_offset', 'N/A')}\n",
+        ]
+
+        if "object" in node:
+            details.append(f"**Object:** {node.get('object', 'N/A')}\n")
+
+        if "not_found" in node:
+            details.append(f"**Not Found:** {node.get('not_found')}\n")
+
+        if "is_self_attribute" in node:
+            details.append(f"**Is Self Attribute:** {node.get('is_self_attribute')}\n")
+
+        return "\n".join(details)
+
+
+@st.cache_resource(show_spinner=False)
+def load_trace_file(json_file_path: str, modified_time: float) -> Dict[str, Any]:  # pylint: disable=unused-argument
+    # pylint: disable=line-too-long
+    """
+    Load and parse a trace file once per process instead of on every script rerun.
+
+    Args:
+        json_file_path (str): Path to the JSON file containing the function call data.
+        modified_time (float): The file's modification time; a changed file is loaded again.
+
+    Returns:
+        Dict[str, Any]: The parsed trace, shared by all sessions. It must not be modified.
+    """
+    # pylint: enable=line-too-long
+
+    with open(json_file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@st.cache_resource(show_spinner=False)
+def build_trace_index(trace_key: str, _data: Dict[str, Any]) -> TraceIndex:    # pylint: disable=unused-argument
+    # pylint: disable=line-too-long
+    """
+    Build the index of a trace once per trace instead of on every script rerun.
+
+    The trace itself is not hashed by Streamlit; it is identified by trace_key.
+
+    Args:
+        trace_key (str): Identifies the trace and its version.
+        _data (Dict[str, Any]): The call trace.
+
+    Returns:
+        TraceIndex: The index, shared by all sessions.
+    """
+    # pylint: enable=line-too-long
+
+    return TraceIndex(_data)
+
+
+@st.cache_data(show_spinner=False)
+def get_node_details_markdown(trace_key: str, node_id: str, _index: TraceIndex) -> str:    # pylint: disable=unused-argument
+    # pylint: disable=line-too-long
+    """
+    Format the details of a node once per trace and node.
+
+    Args:
+        trace_key (str): Identifies the trace and its version.
+        node_id (str): The ID of the node.
+        _index (TraceIndex): The index of the trace.
+
+    Returns:
+        str: The node details as markdown.
+    """
+    # pylint: enable=line-too-long
+
+    return _index.node_details(node_id)
+
+
 class StreamlitRenderer(RendererObject):
     # pylint: disable=line-too-long
     """
@@ -41,13 +220,20 @@ class StreamlitRenderer(RendererObject):
     user experience across interactions. It creates a two-column layout with the call tree on the
     left and node details on the right.
 
+    Streamlit reruns the script on every interaction, so the trace index and node details are
+    cached across reruns, and the tree and details are rendered in a fragment: a click reruns only
+    the fragment, and only expanded nodes are rendered.
+
     Attributes:
         json_file_path (str): Path to the JSON file containing the function call data.
         data (Dict[str, Any]): The loaded JSON data representing the function call tree.
     """
     # pylint: enable=line-too-long
 
-    def __init__(self, configuration: Configuration, data: Dict[str, Any]):
+    def __init__(
+        self, configuration: Configuration, data: Dict[str, Any],
+        json_file_path: Optional[str] = None,
+    ):
         # pylint: disable=line-too-long
         """
         Initialize the StreamlitRenderer with configuration and data.
@@ -58,13 +244,16 @@ class StreamlitRenderer(RendererObject):
         Args:
             configuration (Configuration): Configuration object containing renderer settings.
             data (Dict[str, Any]): The function call data to be rendered as a tree structure.
+            json_file_path (Optional[str]): Path to a JSON file to load the data from instead. Defaults to None.
         """
         # pylint: enable=line-too-long
 
         super().__init__(configuration=configuration, data=data)
 
-        self.json_file_path = None
+        self.json_file_path = json_file_path
         self.data = self._load_json()
+        self._trace_key = self._compute_trace_key()
+        self._index = build_trace_index(self._trace_key, self.data)
 
         # Initialize session state for selected node if it doesn't exist
         if "selected_node" not in st.session_state:
@@ -74,8 +263,8 @@ class StreamlitRenderer(RendererObject):
         if "expanded_nodes" not in st.session_state:
             st.session_state.expanded_nodes = set()
             # Default to expand the first level
-            for key in self.data.keys():
-                st.session_state.expanded_nodes.add(key)
+            for node_id in self._index.roots:
+                st.session_state.expanded_nodes.add(node_id)
 
     def _load_json(self) -> Dict[str, Any]:
         # pylint: disable=line-too-long
@@ -96,15 +285,43 @@ class StreamlitRenderer(RendererObject):
         # pylint: enable=line-too-long
 
         if self.json_file_path is None:
-            return {}
+            return self.data or {}
 
         try:
-            with open(self.json_file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
+            return load_trace_file(self.json_file_path, os.path.getmtime(self.json_file_path))
         except Exception as e:  # pylint: disable=broad-exception-caught
             st.error(f"Error loading JSON file: {e}")
             return {}
 
+    def _compute_trace_key(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute the key identifying the trace and its version in the Streamlit caches.
+
+        A trace loaded from a file is identified by its path and modification time, which is cheap
+        enough for every rerun. Data passed in directly is identified by a hash of its content,
+        computed once per session: the hash is kept in the session state with the data it was
+        computed from, and reused for as long as reruns pass that same data.
+
+        Returns:
+            str: The trace key.
+        """
+        # pylint: enable=line-too-long
+
+        if self.json_file_path is not None:
+            try:
+                return f"{os.path.abspath(self.json_file_path)}:{os.path.getmtime(self.json_file_path)}"
+            except OSError:
+                pass
+
+        hashed = st.session_state.get("hashed_trace")
+        if hashed is not None and hashed[0] is self.data:
+            return hashed[1]
+        trace_key = hashlib.sha256(
+            json.dumps(self.data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        st.session_state.hashed_trace = (self.data, trace_key)
+        return trace_key
+
     def toggle_node(self, node_id: str):
         # pylint: disable=line-too-long
         """
@@ -143,9 +360,7 @@ class StreamlitRenderer(RendererObject):
         """
         Get detailed information about a specific node.
 
-        This function searches for the node in the data structure and returns formatted details
-        about the node if found. It handles both root-level nodes and nested call nodes,
-        extracting relevant information such as file paths, line numbers, and function names.
+        The node is looked up in the trace index and its markdown is cached per trace and node.
 
         Args:
             node_id (str): The ID of the node to get details for.
@@ -156,100 +371,53 @@ class StreamlitRenderer(RendererObject):
         """
         # pylint: enable=line-too-long
 
-        # Find the node in the data
-        for key, value in self.data.items():
-            if key == node_id:
-                return (
-                    f"# {key}\n\n**File Path:** {value.get('file_path', 'N/A')}"
-                    "\n\n**Name:** {value.get('name', 'N/A')}"
-                )
-
-            # Check in calls list
-            if "calls" in value:
-                for call in value["calls"]:
-                    if call.get("id") == node_id:
-                        details = [
-                            f"# {call.get('qualified_name', 'Unknown')}\n",
-                            f"**ID:** {call.get('id', 'N/A')}\n",
-                            f"**Line Number:** {call.get('lineno', 'N/A')}\n",
-                            f"**Column Offset:** {call.get('col_offset', 'N/A')}\n",
-                        ]
-
-                        if "object" in call:
-                            details.append(f"**Object:** {call.get('object', 'N/A')}\n")
-
-                        if "not_found" in call:
-                            details.append(f"**Not Found:** {call.get('not_found')}\n")
-
-                        if "is_self_attribute" in call:
-                            details.append(
-                                f"**Is Self Attribute:** {call.get('is_self_attribute')}\n"
-                            )
+        return get_node_details_markdown(self._trace_key, node_id, self._index)
 
-                        return "".join(details)
-
-        return f"# No details found for node: {node_id}"
-
-    def _render_tree_node(self, key: str, value: Dict[str, Any], level: int = 0):
+    def _render_tree_node(self, node_id: str, level: int = 0):
         # pylint: disable=line-too-long
         """
-        Render a tree node and its children recursively.
+        Render a tree node and, if it is expanded, its children.
 
         This function creates the UI elements for each node in the tree, including buttons for
         expanding/collapsing nodes and selecting nodes to view details. It handles both parent
         nodes (with children) and leaf nodes differently, providing appropriate expand/collapse
-        functionality only for parent nodes.
+        functionality only for parent nodes. The buttons update the session state in callbacks,
+        before the fragment reruns, so a single click is enough.
 
         Args:
-            key (str): The key or name of the node.
-            value (Dict[str, Any]): The data associated with the node.
+            node_id (str): The ID of the node.
             level (int, optional): The indentation level of the node. Defaults to 0.
         """
         # pylint: enable=line-too-long
 
         indent = "  " * level
+        label = self._index.labels.get(node_id, node_id)
 
-        # For the root node
-        if "calls" in value:
-            col1, col2, col3 = st.columns([0.7, 0.15, 0.15])
+        # For nodes with calls
+        if node_id in self._index.children:
+            col1, col2 = st.columns([0.8, 0.2])
             with col1:
-                if st.button(
-                    f"{indent}📁 {key}", key=f"node_{key}", help="Click to view details"
-                ):
-                    self.select_node(key)
+                st.button(
+                    f"{indent}📁 {label}", key=f"node_{node_id}", help="Click to view details",
+                    on_click=self.select_node, args=(node_id,),
+                )
 
+            expanded = node_id in st.session_state.expanded_nodes
             with col2:
-                if st.button("Expand", key=f"expand_{key}"):
-                    st.session_state.expanded_nodes.add(key)
-
-            with col3:
-                if st.button("Collapse", key=f"collapse_{key}"):
-                    if key in st.session_state.expanded_nodes:
-                        st.session_state.expanded_nodes.remove(key)
+                st.button(
+                    "Collapse" if expanded else "Expand", key=f"toggle_{node_id}",
+                    on_click=self.toggle_node, args=(node_id,),
+                )
 
-            if key in st.session_state.expanded_nodes:
-                for call in value["calls"]:
-                    call_id = call.get("id")
-                    qualified_name = call.get("qualified_name")
-
-                    # Check if this call_id exists as a key in the data
-                    if call_id in self.data:
-                        self._render_tree_node(
-                            qualified_name, self.data[call_id], level + 1
-                        )
-                    else:
-                        if st.button(
-                            f"{indent}  📄 {qualified_name}",
-                            key=f"node_{call_id}",
-                            help="Click to view details",
-                        ):
-                            self.select_node(call_id)
+            if expanded:
+                for call_id in self._index.children[node_id]:
+                    self._render_tree_node(call_id, level + 1)
         else:
             # For leaf nodes
-            if st.button(
-                f"{indent}📄 {key}", key=f"node_{key}", help="Click to view details"
-            ):
-                self.select_node(key)
+            st.button(
+                f"{indent}📄 {label}", key=f"node_{node_id}", help="Click to view details",
+                on_click=self.select_node, args=(node_id,),
+            )
 
     def _create_menu(self):
         # pylint: disable=line-too-long
@@ -267,22 +435,17 @@ class StreamlitRenderer(RendererObject):
             if st.sidebar.button("Close"):
                 st.stop()
 
-    def render(self):
+    @st.fragment
+    def _render_explorer(self):
         # pylint: disable=line-too-long
         """
-        Main rendering function for the Streamlit app.
+        Render the function call tree and the node details panel.
 
-        This function sets up the overall layout of the application, including the title, menu,
-        function call tree, and node details panel. It creates a two-column layout where the left
-        column displays the interactive tree and the right column shows details of the selected node.
+        This is a Streamlit fragment: expanding, collapsing or selecting a node reruns only this
+        function, not the whole script.
         """
         # pylint: enable=line-too-long
 
-        st.title("Python Method Call Tree Viewer")
-
-        # Create the menu
-        self._create_menu()
-
         # Split the screen into two columns
         col1, col2 = st.columns([0.4, 0.6])
 
@@ -291,8 +454,8 @@ class StreamlitRenderer(RendererObject):
             # Create a container with scrollbar for the tree
             tree_container = st.container()
             with tree_container:
-                for key, value in self.data.items():
-                    self._render_tree_node(key, value)
+                for node_id in self._index.roots:
+                    self._render_tree_node(node_id)
 
         with col2:
             st.subheader("Node Details")
@@ -304,6 +467,24 @@ class StreamlitRenderer(RendererObject):
             else:
                 st.info("Select a node to view details")
 
+    def render(self):
+        # pylint: disable=line-too-long
+        """
+        Main rendering function for the Streamlit app.
+
+        This function sets up the overall layout of the application, including the title, menu,
+        function call tree, and node details panel. It creates a two-column layout where the left
+        column displays the interactive tree and the right column shows details of the selected node.
+        """
+        # pylint: enable=line-too-long
+
+        st.title("Python Method Call Tree Viewer")
+
+        # Create the menu
+        self._create_menu()
+
+        self._render_explorer()
+
 
 # pylint: disable=line-too-long
 def main():
@@ -324,7 +505,9 @@ def main():
         st.stop()
 
     main_json_file_path = sys.argv[1]
-    app = StreamlitRenderer(main_json_file_path)
+    main_configuration = Configuration(config_file_path="call_tracer/config.yaml")
+    app = StreamlitRenderer(
+        configuration=main_configuration, data={}, json_file_path=main_json_file_path)
     app.render()
 
 if __name__ == "__main__":
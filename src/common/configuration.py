@@ -73,7 +73,9 @@ class Configuration:
 
         self._path_utils = PathUtils()
         self._yaml_utils = YamlUtils()
-        self._config_content: Configuration = None
+        # the instance is shared, so the content in use is only replaced once the file is loaded
+        if not hasattr(self, "_config_content"):
+            self._config_content: Configuration = None
         self.safe_load_config(config_file_path)
 
     def __str__(self):
@@ -157,18 +159,20 @@ class Configuration:
                     f"File {file_path} does not have a .yaml or .yml extension"
                 )
 
-            self._config_content = self._yaml_utils.parse(file_path)
+            config_content = self._yaml_utils.parse(file_path)
 
             # Check if content is None or not a dictionary
-            if self._config_content is None:
+            if config_content is None:
                 raise ValueError(
                     f"The file {file_path} contains no valid YAML content"
                 )
-            if not isinstance(self._config_content, dict):
+            if not isinstance(config_content, dict):
                 raise TypeError(
                     f"The file {file_path} must contain a YAML dictionary/object"
                 )
 
+            self._config_content = config_content
+
 
         except PermissionError as pe:
             raise PermissionError(
@@ -11,6 +11,7 @@ Key Features:
     - JSON deserialization from strings
     - Code block extraction from markdown-formatted text
     - JSON block extraction with fallback handling
+    - Single-pass decoding of the JSON in model responses, fenced or not
     - Singleton pattern implementation for consistent instance management
     - Comprehensive logging integration
 
@@ -35,8 +36,16 @@ Usage Example:
 import json
 import re
 from datetime import datetime
+from typing import Any, Iterator, Tuple
 from common.logging_utils import LoggingUtils
 
+CODE_FENCE = "```"
+JSON_FENCE = CODE_FENCE + "json"
+JSON_START_CHARACTERS = ("{", "[")
+
+_WHITESPACE = re.compile(r"\s*")
+_JSON_DECODER = json.JSONDecoder()
+
 
 class JsonUtils:
     # pylint: disable=line-too-long
@@ -62,6 +71,7 @@ class JsonUtils:
         handle_datetime_serialization(obj): Converts datetime objects to ISO format
         extract_code_blocks(text, block_type): Extracts code blocks of specified type
         extract_json(text): Extracts JSON blocks from text
+        decode_json_response(text): Decodes the first JSON value of a model response
 
     Example:
         >>> json_utils = JsonUtils()  # Creates or returns existing instance
@@ -222,32 +232,127 @@ class JsonUtils:
         """
         Extract the first JSON block from the given input text.
 
-        This method finds and extracts the first JSON code block from the input text.
-        JSON blocks are expected to be formatted in markdown style with triple backticks and 'json' identifier.
+        This method finds and extracts the first JSON value of the input text, preferably from a code block
+        formatted in markdown style with triple backticks and 'json' identifier, as scanned by decode_json_response.
 
         Args:
             text (str): The input text containing JSON code blocks.
 
         Returns:
             list | str: The extracted JSON block as a string, or an empty JSON object string "{}" if no JSON blocks are found.
+
+        Raises:
+            json.JSONDecodeError: If the text has a closed JSON code block but no JSON value can be decoded.
         """
         # pylint: enable=line-too-long
 
         self._logger.debug(__class__.__name__, "start extract_json")
-        json_blocks = self.extract_code_blocks(text, "json")
-        if json_blocks:
-            self._logger.debug(
-                __class__, f"type(json_blocks): {type(json_blocks)}"
-            )
-            self._logger.debug(
-                __class__,
-                f"extract_json json_blocks: "
-                f"{json_blocks[0] if isinstance(json_blocks, list) else json_blocks}",
-                enable_pformat=False,
-            )
+        scanned = self._scan_json(text)
+        if scanned is not None:
+            _, start, end = scanned
             self._logger.debug(__class__.__name__, "end extract_json")
-            return json_blocks[0] if isinstance(json_blocks, list) else json_blocks
+            return text[start:end]
         self._logger.warning(__class__.__name__, "No json blocks found")
         self._logger.debug(__class__.__name__, "end extract_json empty")
 
         return "{}"
+
+    def decode_json_response(self, text: str) -> Any:
+        # pylint: disable=line-too-long
+        """
+        Decode the first JSON value of a model response in a single pass over the text.
+
+        The value is decoded in place, straight after its "```json" fence, so the text is neither matched
+        by a regular expression nor copied, and whatever follows the value, such as the closing fence
+        or trailing prose, is ignored. A response without a decodable fenced value is searched for an
+        unfenced JSON object or array instead.
+
+        Args:
+            text (str): The model response
+
+        Returns:
+            Any: The decoded value, or an empty dictionary if the response holds no JSON value
+
+        Raises:
+            json.JSONDecodeError: If the response has a closed JSON code block but no JSON value can be decoded.
+
+        Example:
+            >>> JsonUtils().decode_json_response('Here it is:\n```json\n{"a": 1}\n```\nAnything else?')
+            {'a': 1}
+        """
+        # pylint: enable=line-too-long
+
+        scanned = self._scan_json(text)
+        if scanned is None:
+            self._logger.warning(__class__.__name__, "No json blocks found")
+            return {}
+        return scanned[0]
+
+    def _scan_json(self, text: str) -> Tuple[Any, int, int] | None:
+        # pylint: disable=line-too-long
+        """
+        Find and decode the first JSON value of a text: the value of the first JSON code block, or else the first unfenced object or array of objects.
+
+        Args:
+            text (str): The text to scan
+
+        Returns:
+            Tuple[Any, int, int] | None: The decoded value and its start and end offsets in the text, or None if there is none or the code block is cut off before its closing fence
+
+        Raises:
+            json.JSONDecodeError: If the text has a closed JSON code block but no JSON value can be decoded.
+        """
+        # pylint: enable=line-too-long
+
+        fence = text.find(JSON_FENCE)
+        if fence >= 0:
+            start = _WHITESPACE.match(text, fence + len(JSON_FENCE)).end()
+            try:
+                value, end = _JSON_DECODER.raw_decode(text, start)
+            except json.JSONDecodeError:
+                # A code block cut off before its closing fence, as when the model stops at its token limit,
+                # holds no JSON value, so that the caller can act on the stop reason. A closed block that
+                # does not decode is invalid. Neither is searched for fragments.
+                if text.find(CODE_FENCE, start) < 0:
+                    return None
+                raise
+            return value, start, end
+
+        # Unfenced, only an object or an array of objects is taken for the response, not "[1]" in prose.
+        # Starts inside a value that failed to decode are skipped, so that each character is decoded once.
+        resume = 0
+        for start in self._json_starts(text):
+            if start < resume:
+                continue
+            try:
+                value, end = _JSON_DECODER.raw_decode(text, start)
+            except json.JSONDecodeError as jde:
+                resume = jde.pos
+                continue
+            if isinstance(value, dict) or (isinstance(value, list) and value and isinstance(value[0], dict)):
+                return value, start, end
+            resume = end
+        return None
+
+    def _json_starts(self, text: str) -> Iterator[int]:
+        # pylint: disable=line-too-long
+        """
+        Find, in order, the characters of a text that may start a JSON object or array.
+
+        Args:
+            text (str): The text to search
+
+        Yields:
+            int: The offset of each "{" and "["
+        """
+        # pylint: enable=line-too-long
+
+        # the next offset of each start character, found again only once it has been yielded
+        starts = {character: text.find(character) for character in JSON_START_CHARACTERS}
+        while True:
+            found = [(index, character) for character, index in starts.items() if index >= 0]
+            if not found:
+                return
+            index, character = min(found)
+            yield index
+            starts[character] = text.find(character, index + 1)
@@ -0,0 +1,221 @@
+# pylint: disable=line-too-long
+"""
+Partial JSON Parser Module
+
+This module provides an incremental parser for JSON text that arrives in fragments, such as a model
+response streamed token by token. After each fragment the parser returns the value of the JSON
+received so far: open objects and arrays are closed, a string value being received is cut where the
+text ends, and a key or number that is not complete yet is left out.
+
+Classes:
+    PartialJsonParser: Incremental parser returning the value of incomplete JSON text
+
+Usage Example:
+    >>> from common.partial_json_parser import PartialJsonParser
+    >>> parser = PartialJsonParser()
+    >>> parser.feed('Here is the analysis: {"summary": "Trace the')
+    {'summary': 'Trace the'}
+    >>> parser.feed(' retries", "priorities": [{"prio')
+    {'summary': 'Trace the retries', 'priorities': [{}]}
+"""
+# pylint: enable=line-too-long
+
+import json
+from typing import Any, List
+from common.logging_utils import LoggingUtils
+
+
+class _Frame:
+    # pylint: disable=line-too-long
+    """
+    An object or array that has been opened but not closed yet.
+
+    Attributes:
+        closer (str): The character closing the frame
+        expecting_value (bool): For an object, True between a key's colon and the end of its value
+    """
+    # pylint: enable=line-too-long
+
+    __slots__ = ("closer", "expecting_value")
+
+    def __init__(self, closer: str):
+        self.closer = closer
+        self.expecting_value = False
+
+
+class PartialJsonParser:
+    # pylint: disable=line-too-long
+    """
+    An incremental parser for JSON text received in fragments.
+
+    Text before the first "{" or "[", such as a sentence or a markdown code fence, is skipped, and so is
+    text after the top-level value is closed. Every character is scanned once: the parser remembers the
+    last position where the text received so far is a complete JSON prefix, and only parses the text
+    again when that position moves.
+
+    Like RateLimiter, PartialJsonParser is not a singleton: each stream needs its own parser.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self):
+        # pylint: disable=line-too-long
+        """
+        Initialize a parser that has not received any text.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._text: List[str] = []
+        self._json: List[str] = []
+        self._stack: List[_Frame] = []
+        self._started = False
+        self._finished = False
+        self._in_string = False
+        self._escape_start = -1
+        self._safe_end = 0
+        self._safe_closers = ""
+        self._parsed_source = None
+        self._value = None
+
+    @property
+    def text(self) -> str:
+        """ All the text received so far. """
+        return "".join(self._text)
+
+    @property
+    def value(self) -> Any:
+        """ The value of the JSON received so far, or None if no JSON value has started. """
+        return self._value
+
+    @property
+    def finished(self) -> bool:
+        """ True once the top-level JSON value has been closed. """
+        return self._finished
+
+    def feed(self, fragment: str) -> Any:
+        # pylint: disable=line-too-long
+        """
+        Add a fragment of text and return the value of the JSON received so far.
+
+        Args:
+            fragment (str): The next fragment of text.
+
+        Returns:
+            Any: The value of the JSON received so far, or None if no JSON value has started.
+        """
+        # pylint: enable=line-too-long
+
+        self._text.append(fragment)
+        if self._finished:
+            return self._value
+
+        for char in fragment:
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+            self._scan(char)
+            if self._finished:
+                break
+
+        source = self._source()
+        if source is not None and source != self._parsed_source:
+            try:
+                self._value = json.loads(source)
+                self._parsed_source = source
+            except json.JSONDecodeError as e:
+                self._logger.debug(f"Cannot parse partial JSON: {str(e)}")
+        return self._value
+
+    def _scan(self, char: str) -> None:
+        # pylint: disable=line-too-long
+        """
+        Add a character of the JSON value, updating the open frames and the last complete prefix.
+
+        Args:
+            char (str): The character.
+        """
+        # pylint: enable=line-too-long
+
+        self._json.append(char)
+        position = len(self._json)
+
+        if self._in_string:
+            if self._escape_start >= 0:
+                # A \uXXXX escape is complete after its four hexadecimal digits
+                if self._json[self._escape_start + 1] != "u" or position - self._escape_start == 6:
+                    self._escape_start = -1
+            elif char == "\\":
+                self._escape_start = position - 1
+            elif char == '"':
+                self._in_string = False
+                if self._in_value():
+                    self._mark_safe(position)
+            return
+
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            if self._stack and self._stack[-1].closer == "}":
+                self._stack[-1].expecting_value = True
+            self._stack.append(_Frame("}" if char == "{" else "]"))
+            self._mark_safe(position)
+        elif char in "}]":
+            self._stack.pop()
+            if self._stack and self._stack[-1].closer == "}":
+                self._stack[-1].expecting_value = False
+            self._mark_safe(position)
+            if not self._stack:
+                self._finished = True
+        elif char == ",":
+            self._mark_safe(position - 1)
+            if self._stack and self._stack[-1].closer == "}":
+                self._stack[-1].expecting_value = False
+        elif char == ":":
+            self._stack[-1].expecting_value = True
+
+    def _in_value(self) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether the current position is in a value rather than an object key.
+
+        Returns:
+            bool: True inside an array or after an object key's colon.
+        """
+        # pylint: enable=line-too-long
+
+        return bool(self._stack) and (self._stack[-1].closer == "]" or self._stack[-1].expecting_value)
+
+    def _mark_safe(self, position: int) -> None:
+        # pylint: disable=line-too-long
+        """
+        Remember a position where the JSON received so far is complete once the open frames are closed.
+
+        Args:
+            position (int): The length of the complete prefix.
+        """
+        # pylint: enable=line-too-long
+
+        self._safe_end = position
+        self._safe_closers = "".join(frame.closer for frame in reversed(self._stack))
+
+    def _source(self) -> str | None:
+        # pylint: disable=line-too-long
+        """
+        Build a complete JSON document from the JSON received so far.
+
+        A string value being received is closed where the text ends, leaving out an escape sequence
+        that is not complete yet. Otherwise the text is cut at the last complete prefix.
+
+        Returns:
+            str | None: The JSON document, or None if no JSON value has started.
+        """
+        # pylint: enable=line-too-long
+
+        if not self._started:
+            return None
+        if self._in_string and self._in_value():
+            end = self._escape_start if self._escape_start >= 0 else len(self._json)
+            closers = "".join(frame.closer for frame in reversed(self._stack))
+            return "".join(self._json[:end]) + '"' + closers
+        return "".join(self._json[:self._safe_end]) + self._safe_closers
@@ -0,0 +1,111 @@
+# pylint: disable=line-too-long
+"""
+Rate Limiter Module
+
+This module provides a thread-safe token bucket rate limiter used to keep concurrent callers of a
+rate-limited service, such as a model endpoint, under a configured number of requests per minute.
+
+Classes:
+    RateLimiter: Token bucket limiter that blocks callers until a request is allowed
+
+Usage Example:
+    >>> from common.rate_limiter import RateLimiter
+    >>> rate_limiter = RateLimiter(requests_per_minute=30)
+    >>> rate_limiter.acquire()  # blocks until a request is allowed
+"""
+# pylint: enable=line-too-long
+
+import threading
+import time
+from common.logging_utils import LoggingUtils
+
+
+class RateLimiter:
+    # pylint: disable=line-too-long
+    """
+    A thread-safe token bucket rate limiter.
+
+    The bucket holds up to `burst` tokens and is refilled continuously at requests_per_minute / 60
+    tokens per second. Each request takes one token; when the bucket is empty, acquire() blocks until
+    a token has been refilled.
+
+    Unlike most classes in this package, RateLimiter is not a singleton: every independently limited
+    resource needs its own bucket.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, requests_per_minute: int, burst: int = 1):
+        # pylint: disable=line-too-long
+        """
+        Initialize the rate limiter with a full bucket.
+
+        Args:
+            requests_per_minute (int): The sustained number of requests allowed per minute. Must be positive.
+            burst (int, optional): The number of requests that may be made back to back. Defaults to 1.
+
+        Raises:
+            ValueError: If requests_per_minute or burst is not positive.
+        """
+        # pylint: enable=line-too-long
+
+        if requests_per_minute <= 0:
+            raise ValueError(f"requests_per_minute must be positive, got {requests_per_minute}")
+        if burst <= 0:
+            raise ValueError(f"burst must be positive, got {burst}")
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._tokens_per_second = requests_per_minute / 60.0
+        self._capacity = float(burst)
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Add the tokens accumulated since the last refill. Must be called with the lock held.
+        """
+        # pylint: enable=line-too-long
+
+        now = time.monotonic()
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._last_refill) * self._tokens_per_second)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        # pylint: disable=line-too-long
+        """
+        Take one token from the bucket, blocking until one is available.
+
+        Returns:
+            float: The number of seconds the caller waited.
+        """
+        # pylint: enable=line-too-long
+
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    if waited > 0:
+                        self._logger.debug(f"Rate limited for {waited:.2f} seconds")
+                    return waited
+                delay = (1.0 - self._tokens) / self._tokens_per_second
+            time.sleep(delay)
+            waited += delay
+
+    def drain(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Empty the bucket, so every caller waits for a refill before its next request.
+
+        Called when the limited service reports throttling: the configured rate was too high for the
+        moment, and the requests that other callers are about to make would be throttled as well.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            self._refill()
+            self._tokens = 0.0
+            self._logger.debug("Rate limiter drained")
@@ -0,0 +1,120 @@
+# pylint: disable=line-too-long
+"""
+Retry Policy Module
+
+This module provides a retry policy with exponential backoff and full jitter. Throttling failures and
+transient failures are counted against separate budgets, so a throttled service can be given more
+patience than a failing one without retrying broken requests for as long.
+
+Classes:
+    RetryPolicy: Counts the failures of an operation and computes the delay before its next attempt
+
+Usage Example:
+    >>> from common.retry_policy import RetryPolicy
+    >>> retry_policy = RetryPolicy(max_tries=3, max_throttled_tries=8, base_delay=1, max_delay=30)
+    >>> while retry_policy.attempts_left:
+    ...     try:
+    ...         call_service()
+    ...         break
+    ...     except ServiceError as e:
+    ...         delay = retry_policy.record_failure(throttled=e.throttled)
+    ...         if delay is None:
+    ...             raise
+    ...         time.sleep(delay)
+"""
+# pylint: enable=line-too-long
+
+import random
+from common.logging_utils import LoggingUtils
+
+
+class RetryPolicy:
+    # pylint: disable=line-too-long
+    """
+    Exponential backoff with full jitter and separate budgets for throttling and transient failures.
+
+    After the n-th failure of a kind, the delay is drawn uniformly between 0 and
+    min(max_delay, base_delay * 2 ** (n - 1)). Drawing from the whole interval spreads out callers that
+    failed at the same moment, such as concurrent workers throttled together, instead of having them
+    retry in lockstep.
+
+    Like RateLimiter, RetryPolicy is not a singleton: it counts the failures of one operation, so each
+    operation needs its own policy.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, max_tries: int, max_throttled_tries: int, base_delay: float, max_delay: float,
+            rng: random.Random | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize a retry policy for an operation that has not been attempted yet.
+
+        Args:
+            max_tries (int): The number of attempts allowed while the failures are transient
+            max_throttled_tries (int): The number of attempts allowed while the failures are throttling
+            base_delay (float): The upper bound in seconds of the delay after the first failure of a kind
+            max_delay (float): The upper bound in seconds of any delay
+            rng (random.Random | None, optional): The source of the jitter. Defaults to the random module.
+
+        Raises:
+            ValueError: If a number of tries or a delay is negative.
+        """
+        # pylint: enable=line-too-long
+
+        if max_tries < 0 or max_throttled_tries < 0:
+            raise ValueError(
+                f"tries must not be negative, got {max_tries} and {max_throttled_tries}")
+        if base_delay < 0 or max_delay < 0:
+            raise ValueError(f"delays must not be negative, got {base_delay} and {max_delay}")
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._max_tries = max_tries
+        self._max_throttled_tries = max_throttled_tries
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._rng = rng if rng is not None else random
+        self._failures = 0
+        self._throttled_failures = 0
+
+    @property
+    def attempt(self) -> int:
+        """ The number of the next attempt, starting at 1. """
+        return self._failures + self._throttled_failures + 1
+
+    @property
+    def attempts_left(self) -> bool:
+        """ True while neither budget has been spent. """
+        return self._failures < self._max_tries and self._throttled_failures < self._max_throttled_tries
+
+    def record_failure(self, throttled: bool = False) -> float | None:
+        # pylint: disable=line-too-long
+        """
+        Count a failed attempt and compute the delay before the next one.
+
+        Args:
+            throttled (bool, optional): Whether the attempt was rejected by throttling. Defaults to False.
+
+        Returns:
+            float | None: The number of seconds to wait before the next attempt, or None if the budget of
+                          the failure's kind is spent.
+        """
+        # pylint: enable=line-too-long
+
+        if throttled:
+            self._throttled_failures += 1
+            failures = self._throttled_failures
+        else:
+            self._failures += 1
+            failures = self._failures
+
+        if not self.attempts_left:
+            self._logger.debug(
+                f"Retry budget spent after {self._failures} transient and "
+                f"{self._throttled_failures} throttling failures")
+            return None
+
+        ceiling = min(self._max_delay, self._base_delay * 2 ** (failures - 1))
+        delay = self._rng.uniform(0, ceiling)
+        self._logger.debug(f"Retry delay {delay:.2f} of at most {ceiling:.2f} seconds")
+        return delay
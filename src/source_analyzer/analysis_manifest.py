@@ -0,0 +1,218 @@
+# pylint: disable=line-too-long
+"""
+A manifest of the files a directory analysis has already analyzed.
+
+Daily runs over a mostly unchanged repository send the same files to the model again and again. The
+AnalysisManifest records, for each analyzed file, a hash of its content, a hash of the settings that
+determine its analysis, the formatted output and the completion and variables it was formatted from, so
+that a later run analyzes only the files whose content or settings changed and displays the stored output
+of the others.
+
+The manifest is a JSON file, loaded when the run starts and saved when it ends.
+
+Classes:
+    AnalysisManifest: The content hash, settings hash and formatted output of each analyzed file
+"""
+# pylint: enable=line-too-long
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+from common.logging_utils import LoggingUtils
+
+MANIFEST_VERSION = 1
+
+
+class AnalysisManifest:
+    # pylint: disable=line-too-long
+    """
+    The content hash, settings hash and formatted output of each analyzed file, keyed by absolute path.
+
+    Like ResponseCache, AnalysisManifest is not a singleton: each manifest file has its own instance.
+    Its methods may be called from several threads.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, manifest_path: str):
+        # pylint: disable=line-too-long
+        """
+        Load the manifest, starting an empty one if the file does not exist or cannot be read.
+
+        Args:
+            manifest_path (str): The JSON manifest file. Parent directories are created when it is saved.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._manifest_path = Path(manifest_path)
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._changed = False
+
+        if self._manifest_path.exists():
+            try:
+                manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+                if manifest.get("version") == MANIFEST_VERSION:
+                    self._files = manifest["files"]
+                else:
+                    self._logger.warning(
+                        f"Ignoring analysis manifest '{manifest_path}' of version {manifest.get('version')}")
+            except (OSError, ValueError, KeyError) as e:
+                self._logger.warning(f"Ignoring unreadable analysis manifest '{manifest_path}': {str(e)}")
+        self._logger.debug(f"Loaded {len(self._files)} entries from '{manifest_path}'")
+
+    @staticmethod
+    def content_hash(source_code: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute the content hash of a file.
+
+        Args:
+            source_code (str): The content of the file
+
+        Returns:
+            str: The hex SHA-256 digest of the content
+        """
+        # pylint: enable=line-too-long
+
+        return hashlib.sha256(source_code.encode("utf-8")).hexdigest()
+
+    def get(self, file_path: str, content_hash: str, settings_hash: str) -> str | None:
+        # pylint: disable=line-too-long
+        """
+        Get the stored output of a file, if it was analyzed with the same content and settings.
+
+        Args:
+            file_path (str): The path of the file
+            content_hash (str): The content hash of the file, as returned by content_hash
+            settings_hash (str): The hash of the settings the file would be analyzed with
+
+        Returns:
+            str | None: The stored output, or None if the file must be analyzed
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            entry = self._files.get(self._key(file_path))
+        if entry is None or entry["content_hash"] != content_hash or entry["settings_hash"] != settings_hash:
+            return None
+        return entry["output"]
+
+    def completion_json(self, file_path: str) -> Dict[str, Any] | None:
+        # pylint: disable=line-too-long
+        """
+        Get the stored completion of a file, which get has found current.
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            Dict[str, Any] | None: The stored completion, or None if the file has no entry or was stored without its completion
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            entry = self._files.get(self._key(file_path))
+        return None if entry is None else entry.get("completion_json")
+
+    def formatter_inputs(self, file_path: str) -> Dict[str, Any] | None:
+        # pylint: disable=line-too-long
+        """
+        Get the stored formatter variables of a file, the model and token usage its completion was formatted with.
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            Dict[str, Any] | None: The stored variables, or None if the file has no entry or was stored without them
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            entry = self._files.get(self._key(file_path))
+        return None if entry is None else entry.get("formatter_inputs")
+
+    def put(
+            self, file_path: str, content_hash: str, settings_hash: str, output: str,
+            completion_json: Dict[str, Any] | None = None, formatter_inputs: Dict[str, Any] | None = None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Store the output of a file.
+
+        Args:
+            file_path (str): The path of the file
+            content_hash (str): The content hash of the analyzed content
+            settings_hash (str): The hash of the settings the file was analyzed with
+            output (str): The formatted output
+            completion_json (Dict[str, Any] | None, optional): The completion the output was formatted from. Defaults to None.
+            formatter_inputs (Dict[str, Any] | None, optional): The variables the completion was formatted with. Defaults to None.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            self._files[self._key(file_path)] = {
+                "content_hash": content_hash,
+                "settings_hash": settings_hash,
+                "output": output,
+                "completion_json": completion_json,
+                "formatter_inputs": formatter_inputs,
+                "analyzed_at": time.time(),
+            }
+            self._changed = True
+
+    def retain(self, directory: str, file_paths: List[str]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Drop the entries of the files of a directory that are not among the given files, such as deleted files.
+
+        Args:
+            directory (str): The analyzed directory
+            file_paths (List[str]): The files found in the directory
+        """
+        # pylint: enable=line-too-long
+
+        prefix = self._key(directory) + os.sep
+        kept = {self._key(file_path) for file_path in file_paths}
+        with self._lock:
+            stale = [key for key in self._files if key.startswith(prefix) and key not in kept]
+            for key in stale:
+                del self._files[key]
+            self._changed = self._changed or bool(stale)
+        self._logger.debug(f"Dropped {len(stale)} stale entries")
+
+    def save(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Save the manifest if it changed, replacing the file atomically.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            if not self._changed:
+                return
+            self._manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary_path = self._manifest_path.with_name(f"{self._manifest_path.name}.{os.getpid()}.tmp")
+            temporary_path.write_text(
+                json.dumps({"version": MANIFEST_VERSION, "files": self._files}), encoding="utf-8")
+            os.replace(temporary_path, self._manifest_path)
+            self._changed = False
+            self._logger.debug(f"Saved {len(self._files)} entries to '{self._manifest_path}'")
+
+    def _key(self, file_path: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the manifest key of a path.
+
+        Args:
+            file_path (str): The path
+
+        Returns:
+            str: The absolute path
+        """
+        # pylint: enable=line-too-long
+
+        return os.path.abspath(file_path)
@@ -0,0 +1,257 @@
+# pylint: disable=line-too-long
+"""
+A long-lived source code analysis session shared by the requests of a process.
+
+Creating a SourceCodeAnalyzer loads source_analyzer/config.yaml into the shared Configuration and
+builds a model and a formatter through their factories. A server analyzing nodes on request should
+not pay that cost on every request, and cannot share one analyzer between concurrent requests since
+an analyzer keeps the state of the analysis in progress.
+
+The AnalyzerSession is set up once per process and keeps a bounded pool of isolated analyzers, each
+used by one request at a time. The state of a request is returned to its caller in an AnalysisResult
+rather than left on the analyzer. A server has no end of run, so the token budget of
+budget.max_run_tokens applies to each request, or to a batch of requests sharing one budget.
+
+Classes:
+    AnalysisResult: The content, token usage and error of one analysis request
+    AnalyzerSession: Process-wide pool of analyzers that is safe to share across concurrent requests
+"""
+# pylint: enable=line-too-long
+
+import contextlib
+import threading
+from typing import Any, Dict, Iterator, List
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from common.rate_limiter import RateLimiter
+from source_analyzer.progress import ProgressCallback
+from source_analyzer.response_cache import RESPONSE_CACHE_USE
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.token_budget import TokenBudget
+
+
+class AnalysisResult:
+    # pylint: disable=line-too-long
+    """
+    The outcome of one analysis request.
+
+    Attributes:
+        content (Any): The formatted analysis: a string for a file or function, a dictionary keyed by
+                       function name for several functions, or None if the file is empty
+        total_tokens (Dict[str, int]): The prompt and completion tokens used by the request
+        error (str | None): The error message, or None if the analysis succeeded
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, content: Any, total_tokens: Dict[str, int], error: str | None):
+        self.content = content
+        self.total_tokens = total_tokens
+        self.error = error
+
+    @property
+    def tokens(self) -> int:
+        """ The total number of tokens used by the request. """
+        return sum(self.total_tokens.values())
+
+    @property
+    def succeeded(self) -> bool:
+        """ True if the analysis produced content without error. """
+        return self.content is not None and self.error is None
+
+    def __repr__(self):
+        return (
+            f"AnalysisResult(content={self.content!r}, total_tokens={self.total_tokens!r}, "
+            f"error={self.error!r})"
+        )
+
+
+class AnalyzerSession:
+    # pylint: disable=line-too-long
+    """
+    A process-wide source code analysis session.
+
+    The first construction loads the configuration and creates the rate limiter and a first analyzer;
+    later constructions return the same session. Each request checks an isolated analyzer out of the
+    pool for its duration, so concurrent requests never share analysis state. The pool grows with the
+    number of concurrent requests up to concurrency.max_session_analyzers; past that, requests wait
+    for an analyzer to be returned.
+
+    Example:
+        >>> result = AnalyzerSession().analyze_file("common/rate_limiter.py", "RateLimiter.acquire")
+        >>> print(result.content if result.succeeded else result.error)
+    """
+    # pylint: enable=line-too-long
+
+    _instance = None
+    _initialized = False
+    _lock = threading.Lock()
+
+    def __new__(cls, *args, **kwargs) -> 'AnalyzerSession': # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Creates and returns the singleton instance of the class.
+
+        Args:
+            cls (type): The class being instantiated.
+            *args: Variable length argument list (unused).
+            **kwargs: Arbitrary keyword arguments (unused).
+
+        Returns:
+            AnalyzerSession: The singleton instance of the class.
+        """
+        # pylint: enable=line-too-long
+
+        with cls._lock:
+            if not cls._instance:
+                cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self, response_cache_mode: str = RESPONSE_CACHE_USE) -> None:
+        # pylint: disable=line-too-long
+        """
+        Set up the session on first construction.
+
+        Args:
+            response_cache_mode (str, optional): The response cache mode of the pooled analyzers. Only the
+                first construction uses it. Defaults to RESPONSE_CACHE_USE.
+        """
+        # pylint: enable=line-too-long
+
+        with AnalyzerSession._lock:
+            if AnalyzerSession._initialized:
+                return
+
+            self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+            config = Configuration("source_analyzer/config.yaml")
+
+            self._rate_limiter: RateLimiter | None = None
+            requests_per_minute = config.int_value("concurrency.requests_per_minute", 0, None, 0)
+            if requests_per_minute > 0:
+                self._rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+            self._max_request_tokens = config.int_value("budget.max_run_tokens", 0, None, 0)
+            self._max_pool_size = config.int_value("concurrency.max_session_analyzers", 1, None, 8)
+
+            self._response_cache_mode = response_cache_mode
+            self._pool_lock = threading.Lock()
+            self._analyzer_returned = threading.Condition(self._pool_lock)
+            self._idle_analyzers: List[SourceCodeAnalyzer] = [self._create_analyzer()]
+            self._pool_size = 1
+            self._logger.debug(f"response_cache_mode: {response_cache_mode}")
+            self._logger.debug(f"max_pool_size: {self._max_pool_size}")
+
+            AnalyzerSession._initialized = True
+
+    @property
+    def pool_size(self) -> int:
+        """ The number of analyzers created by the session. """
+        with self._pool_lock:
+            return self._pool_size
+
+    def analyze_file(
+            self, input_source_path: str, function_name: str = None,
+            progress_callback: ProgressCallback | None = None,
+            token_budget: TokenBudget | None = None) -> AnalysisResult:
+        # pylint: disable=line-too-long
+        """
+        Analyze a file, or one function of it.
+
+        Args:
+            input_source_path (str): Path to the Python source file to analyze
+            function_name (str, optional): The function or method to analyze. Defaults to None, analyzing all of them.
+            progress_callback (ProgressCallback | None, optional): Receives (phase, details) for every analysis phase. Defaults to None.
+            token_budget (TokenBudget | None, optional): Limits the tokens of the request; pass one budget to several requests to limit them as a batch. Defaults to a budget of budget.max_run_tokens for this request alone, if set.
+
+        Returns:
+            AnalysisResult: The formatted analysis as content, or None if the file is empty
+        """
+        # pylint: enable=line-too-long
+
+        with self._checkout(token_budget) as analyzer:
+            content = analyzer.process_file(
+                input_source_path=input_source_path,
+                function_name=function_name,
+                progress_callback=progress_callback,
+            )
+            return AnalysisResult(
+                content=content, total_tokens=analyzer.total_tokens, error=analyzer.last_error)
+
+    def analyze_functions(
+            self, input_source_path: str, function_names: List[str],
+            progress_callback: ProgressCallback | None = None,
+            token_budget: TokenBudget | None = None) -> AnalysisResult:
+        # pylint: disable=line-too-long
+        """
+        Analyze several functions of a file with one model request.
+
+        Args:
+            input_source_path (str): Path to the Python source file containing the functions
+            function_names (List[str]): The functions or methods to analyze
+            progress_callback (ProgressCallback | None, optional): Receives (phase, details) for every analysis phase. Defaults to None.
+            token_budget (TokenBudget | None, optional): Limits the tokens of the request; pass one budget to several requests to limit them as a batch. Defaults to a budget of budget.max_run_tokens for this request alone, if set.
+
+        Returns:
+            AnalysisResult: The formatted analysis of each function as content, keyed by function name
+        """
+        # pylint: enable=line-too-long
+
+        with self._checkout(token_budget) as analyzer:
+            content = analyzer.process_functions(
+                input_source_path=input_source_path,
+                function_names=function_names,
+                progress_callback=progress_callback,
+            )
+            return AnalysisResult(
+                content=content, total_tokens=analyzer.total_tokens, error=analyzer.last_error)
+
+    @contextlib.contextmanager
+    def _checkout(self, token_budget: TokenBudget | None) -> Iterator[SourceCodeAnalyzer]:
+        # pylint: disable=line-too-long
+        """
+        Take an idle analyzer out of the pool for the duration of a request, creating one if none is idle
+        and the pool is not full, or else waiting for one to be returned.
+
+        Args:
+            token_budget (TokenBudget | None): The budget of the request, or None for a budget of its own
+
+        Yields:
+            SourceCodeAnalyzer: An analyzer used by no other request
+        """
+        # pylint: enable=line-too-long
+
+        with self._analyzer_returned:
+            self._analyzer_returned.wait_for(
+                lambda: self._idle_analyzers or self._pool_size < self._max_pool_size)
+            analyzer = self._idle_analyzers.pop() if self._idle_analyzers else None
+            if analyzer is None:
+                self._pool_size += 1
+                self._logger.debug(f"pool_size: {self._pool_size}")
+        try:
+            if analyzer is None:
+                analyzer = self._create_analyzer()
+            if token_budget is None and self._max_request_tokens > 0:
+                token_budget = TokenBudget(max_tokens=self._max_request_tokens)
+            analyzer.token_budget = token_budget
+            yield analyzer
+        finally:
+            with self._analyzer_returned:
+                if analyzer is not None:
+                    self._idle_analyzers.append(analyzer)
+                else:
+                    self._pool_size -= 1
+                self._analyzer_returned.notify()
+
+    def _create_analyzer(self) -> SourceCodeAnalyzer:
+        # pylint: disable=line-too-long
+        """
+        Create a pooled analyzer sharing the session's rate limiter.
+
+        Returns:
+            SourceCodeAnalyzer: An isolated analyzer
+        """
+        # pylint: enable=line-too-long
+
+        return SourceCodeAnalyzer(
+            isolated=True,
+            rate_limiter=self._rate_limiter,
+            response_cache_mode=self._response_cache_mode,
+        )
@@ -0,0 +1,209 @@
+# pylint: disable=line-too-long
+"""
+Run many source code analyses concurrently from asyncio code.
+
+The AsyncSourceCodeAnalyzer fans analyses out as coroutines, bounding the number in flight with a
+semaphore. The models have no asynchronous interface, since boto3 has no asynchronous client, so this
+is a bridge to threads: each analysis runs the synchronous SourceCodeAnalyzer pipeline on a thread of
+the analyzer's own pool, so chunking, progress reporting, the response cache and the token budget
+behave as in process_file without blocking the event loop. Every analysis in flight uses an isolated
+SourceCodeAnalyzer from a pool, since an analyzer keeps the state of the analysis in progress, and all
+of them share one rate limiter and token budget.
+
+Classes:
+    AsyncSourceCodeAnalyzer: Concurrent analysis of files and functions from asyncio code
+"""
+# pylint: enable=line-too-long
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from common.rate_limiter import RateLimiter
+from source_analyzer.response_cache import RESPONSE_CACHE_USE
+from source_analyzer.progress import ProgressCallback
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.token_budget import TokenBudget
+
+
+class AsyncSourceCodeAnalyzer:
+    # pylint: disable=line-too-long
+    """
+    Analyze many files or functions concurrently from asyncio code.
+
+    At most max_concurrency analyses are in flight at a time; the others wait on a semaphore. Pooled
+    analyzers are created on first use and reused, so a run of hundreds of analyses creates at most
+    max_concurrency of them.
+
+    Like RateLimiter, AsyncSourceCodeAnalyzer is not a singleton: each run has its own pool. Call close
+    when done with it to stop the threads of the pool.
+
+    Example:
+        >>> analyzer = AsyncSourceCodeAnalyzer(max_concurrency=16)
+        >>> results = asyncio.run(analyzer.process_files(["a.py", "b.py"]))
+        >>> analyzer.close()
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, max_concurrency: int | None = None, rate_limiter: RateLimiter | None = None,
+            response_cache_mode: str = RESPONSE_CACHE_USE, token_budget: TokenBudget | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize an analyzer with an empty pool.
+
+        Args:
+            max_concurrency (int | None, optional): The maximum number of analyses in flight. Defaults to
+                concurrency.max_async_tasks.
+            rate_limiter (RateLimiter | None, optional): Limits the model requests of all analyses. Defaults
+                to a limiter built from concurrency.requests_per_minute, if set.
+            response_cache_mode (str, optional): The response cache mode of the pooled analyzers. Defaults to
+                RESPONSE_CACHE_USE.
+            token_budget (TokenBudget | None, optional): Limits the tokens of all analyses. Defaults to a
+                budget built from budget.max_run_tokens, if set.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        config = Configuration("source_analyzer/config.yaml")
+
+        if max_concurrency is None:
+            max_concurrency = config.int_value("concurrency.max_async_tasks", 1, None, 32)
+        if rate_limiter is None:
+            requests_per_minute = config.int_value("concurrency.requests_per_minute", 0, None, 0)
+            if requests_per_minute > 0:
+                rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+        if token_budget is None:
+            max_run_tokens = config.int_value("budget.max_run_tokens", 0, None, 0)
+            if max_run_tokens > 0:
+                token_budget = TokenBudget(max_tokens=max_run_tokens)
+
+        self._max_concurrency = max(1, max_concurrency)
+        self._rate_limiter = rate_limiter
+        self._response_cache_mode = response_cache_mode
+        self._token_budget = token_budget
+        self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._max_concurrency, thread_name_prefix="async_source_analyzer")
+        self._idle_analyzers: List[SourceCodeAnalyzer] = []
+        self._total_tokens: Dict[str, int] = {"prompt": 0, "completion": 0}
+        self._logger.debug(f"max_concurrency: {self._max_concurrency}")
+
+    @property
+    def max_concurrency(self) -> int:
+        """ The maximum number of analyses in flight. """
+        return self._max_concurrency
+
+    @property
+    def total_tokens(self) -> Dict[str, int]:
+        """ The prompt and completion tokens used by all analyses so far. """
+        return dict(self._total_tokens)
+
+    async def process_file(
+            self, input_source_path: str, function_name: str = None,
+            progress_callback: ProgressCallback | None = None) -> str | None:
+        # pylint: disable=line-too-long
+        """
+        Analyze a file, or one function of it, once a slot is free.
+
+        Args:
+            input_source_path (str): Path to the Python source file to analyze
+            function_name (str, optional): The function or method to analyze. Defaults to None, analyzing all of them.
+            progress_callback (ProgressCallback | None, optional): Receives the progress of the analysis as in
+                SourceCodeAnalyzer.process_file. It is called from a thread of the pool. Defaults to None.
+
+        Returns:
+            str | None: The formatted analysis results, None if the file is empty, or the error message if
+                        processing fails.
+        """
+        # pylint: enable=line-too-long
+
+        async with self._semaphore:
+            analyzer = self._idle_analyzers.pop() if self._idle_analyzers else self._create_analyzer()
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self._executor, partial(
+                    analyzer.process_file, input_source_path, function_name=function_name,
+                    progress_callback=progress_callback))
+                # the token counts are those of the last analysis, left over if this file was not analyzed
+                if result is not None and analyzer.last_error is None:
+                    for key, value in analyzer.total_tokens.items():
+                        self._total_tokens[key] += value
+                return result
+            finally:
+                self._idle_analyzers.append(analyzer)
+
+    async def process_files(self, source_paths: List[str]) -> List[str | None]:
+        # pylint: disable=line-too-long
+        """
+        Analyze files concurrently.
+
+        Args:
+            source_paths (List[str]): Paths to the Python source files to analyze
+
+        Returns:
+            List[str | None]: The result of each file, as returned by process_file, in the order of source_paths.
+        """
+        # pylint: enable=line-too-long
+
+        return list(await asyncio.gather(*(self.process_file(path) for path in source_paths)))
+
+    async def process_functions(self, input_source_path: str, function_names: List[str]) -> Dict[str, str | None]:
+        # pylint: disable=line-too-long
+        """
+        Analyze functions of a file concurrently, each with its own model request.
+
+        Args:
+            input_source_path (str): Path to the Python source file containing the functions
+            function_names (List[str]): The functions or methods to analyze
+
+        Returns:
+            Dict[str, str | None]: The result of each function, as returned by process_file, keyed by function name.
+        """
+        # pylint: enable=line-too-long
+
+        results = await asyncio.gather(
+            *(self.process_file(input_source_path, function_name=name) for name in function_names))
+        return dict(zip(function_names, results))
+
+    async def process_directory(self, source_path: str) -> Dict[str, str | None]:
+        # pylint: disable=line-too-long
+        """
+        Analyze the Python files of a directory and its subdirectories concurrently.
+
+        Args:
+            source_path (str): Path to the directory to process
+
+        Returns:
+            Dict[str, str | None]: The result of each file, as returned by process_file, in sorted path order.
+        """
+        # pylint: enable=line-too-long
+
+        if not self._idle_analyzers:
+            self._idle_analyzers.append(self._create_analyzer())
+        source_paths = self._idle_analyzers[-1].find_python_files(source_path)
+        self._logger.debug(f"python files: {len(source_paths)}")
+        return dict(zip(source_paths, await self.process_files(source_paths)))
+
+    def _create_analyzer(self) -> SourceCodeAnalyzer:
+        # pylint: disable=line-too-long
+        """
+        Create a pooled analyzer sharing the rate limiter and token budget.
+
+        Returns:
+            SourceCodeAnalyzer: An isolated analyzer
+        """
+        # pylint: enable=line-too-long
+
+        return SourceCodeAnalyzer(
+            isolated=True,
+            rate_limiter=self._rate_limiter,
+            response_cache_mode=self._response_cache_mode,
+            token_budget=self._token_budget,
+        )
+
+    def close(self) -> None:
+        """ Stop the threads of the pool once the analyses in flight are done. """
+
+        self._executor.shutdown(wait=True)
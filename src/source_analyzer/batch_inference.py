@@ -0,0 +1,424 @@
+# pylint: disable=line-too-long
+"""
+Bedrock batch inference for whole-repository analysis.
+
+Analyzing a repository prompt by prompt pays for interactive latency that nightly runs do not need.
+A batch run instead writes the prompts process_directory would send to a JSONL batch input, submits
+it as one Bedrock batch inference job, and later ingests the JSONL output of the job through the
+model's response parsing and the configured formatter.
+
+Submitting writes a manifest next to the batch input, recording the job and which records belong to
+which file; ingesting reads the manifest back, so the two steps can run in different processes.
+
+Classes:
+    BatchJobRunner: Runs batch inference jobs; the interface of the runners below
+    BedrockBatchJobRunner: Runs batch inference jobs on Bedrock, exchanging records through S3
+    LocalBatchJobRunner: Runs batch inference jobs in process with a response function, for tests
+    BatchAnalysis: Submits the analysis of a directory as a batch job and ingests its results
+"""
+# pylint: enable=line-too-long
+
+import json
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+import boto3
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from common.path_utils import PathUtils
+from source_analyzer.models.model import ModelResult, ModelUtils
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.token_budget import TokenBudgetExceededException
+
+BATCH_INPUT_FILE_NAME = "records.jsonl"
+BATCH_OUTPUT_FILE_NAME = "records.jsonl.out"
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Job states after which the output of the records that succeeded can be downloaded
+BATCH_JOB_COMPLETED_STATUSES = ("Completed", "PartiallyCompleted")
+BATCH_JOB_FAILED_STATUSES = ("Failed", "Stopped", "Expired")
+
+
+class BatchJobRunner(ABC):
+    # pylint: disable=line-too-long
+    """
+    Runs batch inference jobs over JSONL records of the form {"recordId": ..., "modelInput": ...}.
+
+    The output of a job has a line per record, echoing the record with either its "modelOutput" or an
+    "error" object.
+    """
+    # pylint: enable=line-too-long
+
+    @abstractmethod
+    def submit(self, job_name: str, model_id: str, input_path: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Submit a batch inference job.
+
+        Args:
+            job_name (str): The unique name of the job
+            model_id (str): The model answering the records
+            input_path (str): The local JSONL batch input
+
+        Returns:
+            str: The identifier of the job
+        """
+        # pylint: enable=line-too-long
+
+    @abstractmethod
+    def status(self, job_id: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the status of a batch inference job.
+
+        Args:
+            job_id (str): The identifier returned by submit
+
+        Returns:
+            str: The Bedrock job status, such as "InProgress" or one of BATCH_JOB_COMPLETED_STATUSES
+        """
+        # pylint: enable=line-too-long
+
+    @abstractmethod
+    def download_output(self, job_id: str, job_name: str, output_path: str) -> None:
+        # pylint: disable=line-too-long
+        """
+        Download the JSONL output of a completed batch inference job.
+
+        Args:
+            job_id (str): The identifier returned by submit
+            job_name (str): The name the job was submitted with
+            output_path (str): The local file to write the output to
+        """
+        # pylint: enable=line-too-long
+
+
+class BedrockBatchJobRunner(BatchJobRunner):
+    # pylint: disable=line-too-long
+    """
+    Runs batch inference jobs on Bedrock.
+
+    The batch input is uploaded to <batch.s3_uri>/<job name>/input/ and Bedrock writes the output of
+    the job to <batch.s3_uri>/<job name>/output/<job id>/. Bedrock assumes batch.role_arn to read and
+    write these locations.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, configuration: Configuration, region_name: str):
+        # pylint: disable=line-too-long
+        """
+        Initialize the runner from the batch section of the configuration.
+
+        Args:
+            configuration (Configuration): The configuration holding batch.s3_uri and batch.role_arn
+            region_name (str): The AWS region running the jobs
+
+        Raises:
+            ValueError: If batch.s3_uri or batch.role_arn is not configured
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._s3_uri = configuration.str_value("batch.s3_uri", "").rstrip("/")
+        self._role_arn = configuration.str_value("batch.role_arn", "")
+        if not self._s3_uri.startswith("s3://"):
+            raise ValueError(f"Invalid batch.s3_uri '{self._s3_uri}'; expected s3://bucket/prefix")
+        if not self._role_arn:
+            raise ValueError("batch.role_arn is required to run Bedrock batch inference jobs")
+
+        session = boto3.session.Session()
+        self._bedrock = session.client("bedrock", region_name=region_name)
+        self._s3 = session.client("s3", region_name=region_name)
+
+    def submit(self, job_name: str, model_id: str, input_path: str) -> str:
+        input_uri = f"{self._s3_uri}/{job_name}/input/{BATCH_INPUT_FILE_NAME}"
+        bucket, key = self._split_s3_uri(input_uri)
+        self._s3.upload_file(input_path, bucket, key)
+        self._logger.debug(f"Uploaded '{input_path}' to {input_uri}")
+
+        response = self._bedrock.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self._role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": input_uri, "s3InputFormat": "JSONL"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"{self._s3_uri}/{job_name}/output/"}},
+        )
+        self._logger.debug(f"Created model invocation job {response['jobArn']}")
+        return response["jobArn"]
+
+    def status(self, job_id: str) -> str:
+        return self._bedrock.get_model_invocation_job(jobIdentifier=job_id)["status"]
+
+    def download_output(self, job_id: str, job_name: str, output_path: str) -> None:
+        # Bedrock names the output folder after the last part of the job ARN
+        output_uri = (
+            f"{self._s3_uri}/{job_name}/output/{job_id.rsplit('/', 1)[-1]}/{BATCH_OUTPUT_FILE_NAME}")
+        bucket, key = self._split_s3_uri(output_uri)
+        self._s3.download_file(bucket, key, output_path)
+        self._logger.debug(f"Downloaded {output_uri} to '{output_path}'")
+
+    def _split_s3_uri(self, uri: str) -> Tuple[str, str]:
+        # pylint: disable=line-too-long
+        """
+        Split an s3:// URI into its bucket and key.
+
+        Args:
+            uri (str): The URI
+
+        Returns:
+            Tuple[str, str]: The bucket and the key
+        """
+        # pylint: enable=line-too-long
+
+        bucket, _, key = uri.removeprefix("s3://").partition("/")
+        return bucket, key
+
+
+class LocalBatchJobRunner(BatchJobRunner):
+    # pylint: disable=line-too-long
+    """
+    Runs batch inference jobs in process, answering each record with a response function.
+
+    Jobs complete as soon as they are submitted. A record whose response function raises an exception
+    is output with an "error" object, as Bedrock outputs records it cannot process.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, respond: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        # pylint: disable=line-too-long
+        """
+        Initialize the runner.
+
+        Args:
+            respond (Callable[[Dict[str, Any]], Dict[str, Any]]): Returns the model output of a record's model input
+        """
+        # pylint: enable=line-too-long
+
+        self._respond = respond
+        self._outputs: Dict[str, List[Dict[str, Any]]] = {}
+
+    def submit(self, job_name: str, model_id: str, input_path: str) -> str:
+        job_id = f"local/{job_name}"
+        outputs = []
+        with open(input_path, "r", encoding="utf-8") as input_file:
+            for line in input_file:
+                record = json.loads(line)
+                try:
+                    record["modelOutput"] = self._respond(record["modelInput"])
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    record["error"] = {"errorCode": 400, "errorMessage": str(e)}
+                outputs.append(record)
+        self._outputs[job_id] = outputs
+        return job_id
+
+    def status(self, job_id: str) -> str:
+        return "Completed" if job_id in self._outputs else "Submitted"
+
+    def download_output(self, job_id: str, job_name: str, output_path: str) -> None:
+        with open(output_path, "w", encoding="utf-8") as output_file:
+            for record in self._outputs[job_id]:
+                output_file.write(json.dumps(record) + "\n")
+
+
+class BatchAnalysis:
+    # pylint: disable=line-too-long
+    """
+    Analyzes the Python files of a directory with one batch inference job.
+
+    Example:
+        >>> batch_analysis = BatchAnalysis(SourceCodeAnalyzer())
+        >>> manifest_path = batch_analysis.submit("src")
+        >>> # later, possibly from another process
+        >>> results = batch_analysis.ingest(manifest_path)
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, analyzer: SourceCodeAnalyzer, runner: BatchJobRunner | None = None,
+            batch_path: str | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize a batch analysis.
+
+        Args:
+            analyzer (SourceCodeAnalyzer): Builds the prompts and formats the results
+            runner (BatchJobRunner | None, optional): Runs the jobs. Defaults to a BedrockBatchJobRunner in aws.region.
+            batch_path (str | None, optional): The directory holding the files of each job. Defaults to batch.path.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._analyzer = analyzer
+        self._path_utils = PathUtils()
+        self._config = Configuration("source_analyzer/config.yaml")
+        if runner is None:
+            runner = BedrockBatchJobRunner(
+                configuration=self._config,
+                region_name=ModelUtils(configuration=self._config).region_name,
+            )
+        self._runner = runner
+        if batch_path is None:
+            batch_path = self._config.str_value("batch.path", ".cache/source_analyzer/batch")
+        self._batch_path = Path(batch_path)
+
+    def submit(self, source_path: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Write the prompts of the Python files of a directory to a batch input and submit it as a job.
+
+        Files are planned as process_directory would analyze them, including chunking and the file token
+        budget; files over the budget are skipped.
+
+        Args:
+            source_path (str): Path to the directory to analyze
+
+        Returns:
+            str: The path of the manifest of the job, to pass to ingest
+
+        Raises:
+            ValueError: If the directory has no Python file to analyze
+        """
+        # pylint: enable=line-too-long
+
+        self._logger.trace("start submit")
+        job_name = f"source-analyzer-{time.strftime('%Y%m%d-%H%M%S')}"
+        job_path = self._batch_path / job_name
+        job_path.mkdir(parents=True, exist_ok=True)
+        input_path = job_path / BATCH_INPUT_FILE_NAME
+
+        files = []
+        skipped = []
+        record_count = 0
+        model = self._analyzer.model
+        with open(input_path, "w", encoding="utf-8") as input_file:
+            for file_path in self._analyzer.find_python_files(source_path):
+                try:
+                    source_code = self._path_utils.get_ascii_file_contents(source_path=file_path)
+                    prompts = self._analyzer.build_file_prompts(source_code) if source_code else []
+                except TokenBudgetExceededException as tbe:
+                    self._logger.warning(f"Skipping '{file_path}': {str(tbe)}")
+                    skipped.append(file_path)
+                    continue
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self._logger.error(f"Failed to load source file '{file_path}': {str(e)}")
+                    skipped.append(file_path)
+                    continue
+                if not prompts:
+                    continue
+                record_ids = []
+                for prompt in prompts:
+                    # Bedrock record identifiers are 11 alphanumeric characters
+                    record_id = f"REC{record_count:08d}"
+                    record_count += 1
+                    record_ids.append(record_id)
+                    input_file.write(json.dumps({
+                        "recordId": record_id, "modelInput": model.batch_model_input(prompt),
+                    }) + "\n")
+                files.append({"path": file_path, "record_ids": record_ids, "prompts": prompts})
+
+        if record_count == 0:
+            raise ValueError(f"No Python source to analyze in '{source_path}'")
+
+        print(f"Submitting batch job '{job_name}': {record_count} records for {len(files)} files")
+        job_id = self._runner.submit(job_name=job_name, model_id=model.model_id, input_path=str(input_path))
+
+        manifest_path = job_path / MANIFEST_FILE_NAME
+        manifest_path.write_text(json.dumps({
+            "job_name": job_name,
+            "job_id": job_id,
+            "model_id": model.model_id,
+            "source_path": source_path,
+            "files": files,
+            "skipped": skipped,
+        }, indent=2), encoding="utf-8")
+        print(f"Submitted batch job {job_id}; ingest its results with '{manifest_path}'")
+        self._logger.trace("end submit")
+        return str(manifest_path)
+
+    def ingest(self, manifest_path: str) -> Dict[str, str] | None:
+        # pylint: disable=line-too-long
+        """
+        Download the output of a submitted job and format the analysis of each file.
+
+        Args:
+            manifest_path (str): The path returned by submit
+
+        Returns:
+            Dict[str, str] | None: The formatted analysis, or error message, of each file keyed by path in
+                                   sorted path order, or None if the job has not completed yet
+
+        Raises:
+            ValueError: If the job failed, or was submitted for another model than the configured one
+        """
+        # pylint: enable=line-too-long
+
+        self._logger.trace("start ingest")
+        manifest = json.loads(Path(manifest_path).read_text(encoding="utf-8"))
+        model = self._analyzer.model
+        if manifest["model_id"] != model.model_id:
+            raise ValueError(
+                f"Batch job {manifest['job_id']} was run by {manifest['model_id']}, "
+                f"not the configured {model.model_id}")
+
+        status = self._runner.status(manifest["job_id"])
+        print(f"Batch job {manifest['job_id']} status: {status}")
+        if status in BATCH_JOB_FAILED_STATUSES:
+            raise ValueError(f"Batch job {manifest['job_id']} ended with status {status}")
+        if status not in BATCH_JOB_COMPLETED_STATUSES:
+            self._logger.trace("end ingest (not completed)")
+            return None
+
+        output_path = Path(manifest_path).parent / BATCH_OUTPUT_FILE_NAME
+        self._runner.download_output(manifest["job_id"], manifest["job_name"], str(output_path))
+        records: Dict[str, Dict[str, Any]] = {}
+        with open(output_path, "r", encoding="utf-8") as output_file:
+            for line in output_file:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["recordId"]] = record
+
+        results = {}
+        for file in sorted(manifest["files"], key=lambda file: file["path"]):
+            try:
+                file_results = [
+                    self._record_result(records.get(record_id), record_id)
+                    for record_id in file["record_ids"]
+                ]
+            except ValueError as ve:
+                e_msg = f"Failed to analyze source code: {str(ve)}"
+                self._logger.error(e_msg)
+                results[file["path"]] = f"# {e_msg}"
+                continue
+            results[file["path"]] = self._analyzer.process_batch_results(
+                file["path"], file["prompts"], file_results)
+        self._logger.trace("end ingest")
+        return results
+
+    def _record_result(self, record: Dict[str, Any] | None, record_id: str) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Get the model result of a record of the job output.
+
+        Args:
+            record (Dict[str, Any] | None): The output record, or None if the job did not output it
+            record_id (str): The identifier of the record
+
+        Returns:
+            ModelResult: The result parsed from the record's model output
+
+        Raises:
+            ValueError: If the record is missing, failed or cannot be parsed
+        """
+        # pylint: enable=line-too-long
+
+        if record is None:
+            raise ValueError(f"Batch record {record_id} is missing from the job output")
+        if "modelOutput" not in record:
+            error = record.get("error") or {}
+            raise ValueError(
+                f"Batch record {record_id} failed ({error.get('errorCode')}): {error.get('errorMessage')}")
+        try:
+            return self._analyzer.model.batch_result(record["modelOutput"])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            raise ValueError(f"Cannot parse the output of batch record {record_id}: {str(e)}") from e
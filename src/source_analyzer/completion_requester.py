@@ -0,0 +1,457 @@
+# pylint: disable=line-too-long
+"""
+Completion requests of source code analyses.
+
+A completion request sends one prompt to the model, retrying transient failures, and validates the
+result. The response cache, the run token budget and the rate limiter shared by concurrent analyzers
+are applied around each request.
+
+Classes:
+    CompletionRequester: Sends prompts to a model on behalf of one analyzer
+"""
+# pylint: enable=line-too-long
+
+import time
+from pprint import pformat
+from typing import Tuple
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from common.rate_limiter import RateLimiter
+from common.retry_policy import RetryPolicy
+from source_analyzer.models.model import (
+    EXCEPTION_LEVEL_ERROR,
+    EXCEPTION_LEVEL_WARN,
+    ModelContextWindowExceededException,
+    ModelException,
+    ModelMaxTokenLimitException,
+    ModelObject,
+    ModelResult,
+    ModelThrottlingException,
+)
+from source_analyzer.progress import (
+    PROGRESS_PHASE_MODEL_INVOKED,
+    PROGRESS_PHASE_TOKENS_STREAMED,
+    ProgressCallback,
+    report_progress,
+)
+from source_analyzer.response_cache import (
+    RESPONSE_CACHE_BYPASS,
+    RESPONSE_CACHE_MODES,
+    RESPONSE_CACHE_USE,
+    ResponseCache,
+)
+from source_analyzer.token_budget import TokenBudget
+
+
+class CompletionRequester:
+    # pylint: disable=line-too-long
+    """
+    Sends prompts to a model, with retries, response caching, rate limiting and a run token budget.
+
+    A requester keeps no state of the requests it sends, besides the response cache, so it can be
+    used by one analysis after another.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, configuration: Configuration, model: ModelObject, rate_limiter: RateLimiter | None = None,
+            response_cache_mode: str = RESPONSE_CACHE_USE, token_budget: TokenBudget | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize a requester.
+
+        Args:
+            configuration (Configuration): The concurrency, response cache and budget settings
+            model (ModelObject): The model the prompts are sent to
+            rate_limiter (RateLimiter | None, optional): Limits the model requests; shared by concurrent
+                analyzers. Defaults to a limiter built from concurrency.requests_per_minute, if set.
+            response_cache_mode (str, optional): RESPONSE_CACHE_USE reads and writes the response cache,
+                RESPONSE_CACHE_REFRESH only writes it and RESPONSE_CACHE_BYPASS ignores it. Defaults to
+                RESPONSE_CACHE_USE.
+            token_budget (TokenBudget | None, optional): Limits the tokens of the run; shared by concurrent
+                analyzers. Defaults to a budget built from budget.max_run_tokens, if set.
+
+        Raises:
+            ValueError: If response_cache_mode is not one of the RESPONSE_CACHE_* modes
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._config = configuration
+        self._model = model
+
+        if rate_limiter is None:
+            requests_per_minute = self._config.int_value(
+                "concurrency.requests_per_minute", 0, None, 0)
+            if requests_per_minute > 0:
+                rate_limiter = RateLimiter(requests_per_minute=requests_per_minute)
+        self._rate_limiter: RateLimiter | None = rate_limiter
+
+        if response_cache_mode not in RESPONSE_CACHE_MODES:
+            raise ValueError(f"Invalid response cache mode '{response_cache_mode}'")
+        self._response_cache_mode = response_cache_mode
+        self._response_cache: ResponseCache | None = None
+        if response_cache_mode != RESPONSE_CACHE_BYPASS and self._config.bool_value(
+                "response_cache.enabled", "false"):
+            self._response_cache = ResponseCache(
+                database_path=self._config.str_value(
+                    "response_cache.path", ".cache/source_analyzer/responses.sqlite3"),
+                ttl_seconds=self._config.int_value("response_cache.ttl_seconds", 0, None, 0),
+                max_size_bytes=self._config.int_value("response_cache.max_size_bytes", 0, None, 0),
+            )
+
+        if token_budget is None:
+            max_run_tokens = self._config.int_value("budget.max_run_tokens", 0, None, 0)
+            if max_run_tokens > 0:
+                token_budget = TokenBudget(max_tokens=max_run_tokens)
+        self._token_budget: TokenBudget | None = token_budget
+
+    @property
+    def rate_limiter(self) -> RateLimiter | None:
+        """ The limiter of the model requests, or None if they are unlimited. """
+        return self._rate_limiter
+
+    @property
+    def response_cache_mode(self) -> str:
+        """ How the response cache is used: one of the RESPONSE_CACHE_* modes. """
+        return self._response_cache_mode
+
+    @property
+    def token_budget(self) -> TokenBudget | None:
+        """ The budget the prompts are reserved against, or None if the tokens are unlimited. """
+        return self._token_budget
+
+    @token_budget.setter
+    def token_budget(self, value: TokenBudget | None):
+        self._token_budget = value
+
+    def cache_key(self, prompt: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute the response cache key of a prompt for the current model settings.
+
+        Args:
+            prompt (str): The prompt to send to the AI model
+
+        Returns:
+            str: The cache key
+        """
+        # pylint: enable=line-too-long
+        return ResponseCache.make_key(
+            model_id=self._model.model_id,
+            temperature=self._model.temperature,
+            model_custom=self._config.items().get("ai_model", {}).get("custom", {}),
+            tracing_priorities=self._config.list_value("tracing_priorities", []),
+            clarifications=self._config.list_value("clarifications", []),
+            prompt=prompt,
+        )
+
+    def expected_completion_tokens(self) -> int:
+        # pylint: disable=line-too-long
+        """
+        Get the number of completion tokens budgeted for each prompt before the model has answered.
+
+        Returns:
+            int: The configured budget.expected_completion_tokens
+        """
+        # pylint: enable=line-too-long
+        return self._config.int_value("budget.expected_completion_tokens", 0, None, 2000)
+
+    def request(self, prompt: str, progress_callback: ProgressCallback | None = None) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Get the completion of a prompt, from the response cache or the model, retrying failed attempts.
+
+        Retries back off exponentially with full jitter (see RetryPolicy). Throttled attempts are counted
+        against ai_model.max_throttled_llm_tries and other failures against ai_model.max_llm_tries.
+
+        When a progress callback is supplied, the model is asked to stream its response and each
+        received text fragment is reported as a PROGRESS_PHASE_TOKENS_STREAMED event, along with the
+        completion JSON parsed from the response so far as "partial_json". Every attempt is preceded
+        by a PROGRESS_PHASE_MODEL_INVOKED event with its number, after which the response streams
+        from the start again.
+
+        Args:
+            prompt (str): The prompt to send to the AI model
+            progress_callback (ProgressCallback | None, optional): Receives phase updates. Defaults to None.
+
+        Returns:
+            ModelResult: The validated result of the request
+
+        Raises:
+            ModelContextWindowExceededException: If the prompt is estimated to exceed the model context window
+            TokenBudgetExceededException: If the prompt does not fit in the remaining run token budget
+            ModelException: If all retry attempts fail or if a token limit exception occurs
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start request")
+        cache_key, result, reserved_tokens = self._begin(prompt)
+        from_cache = result is not None
+
+        try:
+            retry_policy = self._create_retry_policy()
+            while result is None and retry_policy.attempts_left:
+                print(
+                    f"Get completion attempt: (attempt {retry_policy.attempt})",
+                )
+
+                report_progress(
+                    progress_callback, PROGRESS_PHASE_MODEL_INVOKED,
+                    attempt=retry_policy.attempt, max_attempts=self._model.max_llm_tries,
+                )
+                if self._rate_limiter is not None:
+                    self._rate_limiter.acquire()
+                try:
+                    result = self._generate_text(prompt, progress_callback)
+                except ModelException as me:    # pylint: disable=broad-exception-caught
+                    delay = self._handle_attempt_exception(me, retry_policy)
+                    print(f"Retrying in {delay:.1f} seconds...",)
+                    time.sleep(delay)
+        except Exception:
+            if reserved_tokens:
+                self._token_budget.settle(reserved_tokens, 0)
+            raise
+
+        result = self._end(cache_key, result, from_cache, reserved_tokens)
+        self._logger.trace("end request")
+        return result
+
+    def record(self, prompt: str, result: ModelResult) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Validate and cache the result of a prompt that was answered without this requester, as by a batch inference job.
+
+        Args:
+            prompt (str): The prompt that was answered
+            result (ModelResult): The result of the prompt
+
+        Returns:
+            ModelResult: The validated result
+
+        Raises:
+            ModelMaxTokenLimitException: If the model stopped at its completion token limit
+            ModelException: If the model stopped for any other invalid reason
+        """
+        # pylint: enable=line-too-long
+        cache_key = self.cache_key(prompt) if self._response_cache is not None else None
+        return self._end(cache_key, result, False, 0)
+
+    def _load_cached_response(self, cache_key: str | None) -> ModelResult | None:
+        # pylint: disable=line-too-long
+        """
+        Load the model result of a cached response, if there is one and the cache may be read.
+
+        Args:
+            cache_key (str | None): The response cache key, or None if the cache is not used
+
+        Returns:
+            ModelResult | None: The cached result, or None if the response must be requested from the model
+        """
+        # pylint: enable=line-too-long
+        if cache_key is None or self._response_cache_mode != RESPONSE_CACHE_USE:
+            return None
+
+        cached = self._response_cache.get(cache_key)
+        if cached is None:
+            self._logger.debug(f"Response cache miss {cache_key[:12]}")
+            return None
+
+        self._logger.debug(f"Response cache hit {cache_key[:12]}")
+        return ModelResult.from_cache_entry(cached)
+
+    def _generate_text(self, prompt: str, progress_callback: ProgressCallback | None) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Make one completion attempt, streaming the response to the progress callback if there is one.
+
+        Args:
+            prompt (str): The prompt to send to the AI model
+            progress_callback (ProgressCallback | None): Receives a PROGRESS_PHASE_TOKENS_STREAMED event for each received text fragment
+
+        Returns:
+            ModelResult: The result of the request
+
+        Raises:
+            ModelException: If the request fails, or the streamed response ends without a final result
+        """
+        # pylint: enable=line-too-long
+        if progress_callback is None:
+            return self._model.generate_text(prompt=prompt)
+
+        result = None
+        for update in self._model.generate_text_stream(prompt=prompt):
+            report_progress(
+                progress_callback, PROGRESS_PHASE_TOKENS_STREAMED,
+                text=update.text, partial_json=update.partial_json)
+            if update.result is not None:
+                result = update.result
+        if result is None:
+            # A cut-off stream is retried like any other failed request
+            raise ModelException(
+                f"Stream from model '{self._model.model_name}' ended without a final result",
+                EXCEPTION_LEVEL_WARN,
+            )
+        return result
+
+    def _begin(self, prompt: str) -> Tuple[str | None, ModelResult | None, int]:
+        # pylint: disable=line-too-long
+        """
+        Prepare a completion request: look up the response cache and, if the response is not cached,
+        check the context window and reserve the estimated tokens against the run token budget.
+
+        Args:
+            prompt (str): The prompt to send to the AI model
+
+        Returns:
+            Tuple[str | None, ModelResult | None, int]: The response cache key, the cached result if the
+                                                        response was loaded from the cache, and the tokens
+                                                        reserved against the run token budget
+
+        Raises:
+            ModelContextWindowExceededException: If the prompt is estimated to exceed the model context window
+            TokenBudgetExceededException: If the prompt does not fit in the remaining run token budget
+        """
+        # pylint: enable=line-too-long
+        self._logger.debug(f"prompt:\n{prompt}")
+        self._logger.debug(
+            f"max_llm_tries: {self._model.max_llm_tries}, "
+            f"retry_delay: {self._model.retry_delay}, "
+            f"temperature: {self._model.temperature}",
+        )
+
+        cache_key = self.cache_key(prompt) if self._response_cache is not None else None
+        cached_result = self._load_cached_response(cache_key)
+        from_cache = cached_result is not None
+
+        # A prompt that does not fit the context window fails on every attempt, so it is not sent
+        if not from_cache:
+            estimated_prompt_tokens = self._model.estimate_tokens(prompt)
+            if estimated_prompt_tokens > self._model.context_window_tokens:
+                raise ModelContextWindowExceededException(
+                    context_window_tokens=self._model.context_window_tokens,
+                    prompt_tokens=estimated_prompt_tokens,
+                )
+
+        reserved_tokens = 0
+        if self._token_budget is not None and not from_cache:
+            reserved_tokens = estimated_prompt_tokens + self.expected_completion_tokens()
+            self._token_budget.reserve(reserved_tokens)
+
+        return cache_key, cached_result, reserved_tokens
+
+    def _create_retry_policy(self) -> RetryPolicy:
+        # pylint: disable=line-too-long
+        """
+        Create the retry policy of a completion request from the model's retry settings.
+
+        Returns:
+            RetryPolicy: A policy allowing max_llm_tries attempts for transient failures and
+                         max_throttled_llm_tries for throttling, backing off from retry_delay up to max_retry_delay
+        """
+        # pylint: enable=line-too-long
+        return RetryPolicy(
+            max_tries=self._model.max_llm_tries,
+            max_throttled_tries=self._model.max_throttled_llm_tries,
+            base_delay=self._model.retry_delay,
+            max_delay=self._model.max_retry_delay,
+        )
+
+    def _handle_attempt_exception(self, me: ModelException, retry_policy: RetryPolicy) -> float:
+        # pylint: disable=line-too-long
+        """
+        Log a failed completion attempt and compute the delay before the next one, re-raising the
+        exception if it must not be retried.
+
+        A throttled attempt also drains the shared rate limiter, so that the other workers wait for a
+        refill instead of sending requests that would be throttled as well.
+
+        Args:
+            me (ModelException): The exception raised by the model
+            retry_policy (RetryPolicy): The retry policy of the completion request
+
+        Returns:
+            float: The number of seconds to wait before the next attempt
+
+        Raises:
+            ModelException: If the exception has the error level or the retry budget is spent
+        """
+        # pylint: enable=line-too-long
+        self._logger.error(
+            f"Cannot generate text from model '{self._model.model_name}'."
+            f"Reason: {me}",
+        )
+        self._logger.debug(f"ModelException level: {me.level}")
+        if me.level == EXCEPTION_LEVEL_ERROR:
+            raise me # pylint: disable=broad-exception-raised)
+
+        throttled = isinstance(me, ModelThrottlingException)
+        if throttled and self._rate_limiter is not None:
+            self._rate_limiter.drain()
+        delay = retry_policy.record_failure(throttled=throttled)
+        if delay is None:
+            raise me # pylint: disable=broad-exception-raised)
+        return delay
+
+    def _end(
+            self, cache_key: str | None, result: ModelResult | None, from_cache: bool,
+            reserved_tokens: int) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Complete a completion request: settle the token reservation, validate the stop reason and cache the
+        response.
+
+        Args:
+            cache_key (str | None): The response cache key returned by _begin
+            result (ModelResult | None): The result of the request, or None if no attempt was made
+            from_cache (bool): Whether the response was loaded from the cache
+            reserved_tokens (int): The tokens reserved against the run token budget
+
+        Returns:
+            ModelResult: The result
+
+        Raises:
+            ModelMaxTokenLimitException: If the model stopped at its completion token limit
+            ModelException: If no attempt was made or the model stopped for any other invalid reason
+        """
+        # pylint: enable=line-too-long
+        if reserved_tokens:
+            self._token_budget.settle(reserved_tokens, result.total_tokens if result is not None else 0)
+
+        if result is None:
+            raise ModelException(
+                f"No completion attempt allowed by max_llm_tries ({self._model.max_llm_tries})",
+                EXCEPTION_LEVEL_ERROR,
+            )
+
+        print("LLM response received from cache" if from_cache else "LLM response received")
+        self._logger.debug(
+            f"LLM Prompt Tokens: {result.prompt_tokens}, "
+            f"LLM Completion Tokens: {result.completion_tokens}, "
+            f"Stopped Reason: {result.stopped_reason}",
+        )
+
+        if result.stopped_reason in self._model.stop_max_tokens_reasons:
+            raise ModelMaxTokenLimitException(
+                max_token_limit=self._model.max_completion_tokens,
+                prompt_tokens=result.prompt_tokens,
+                completion_tokens=result.completion_tokens,
+            )
+
+        if result.stopped_reason not in self._model.stop_valid_reasons:
+            self._logger.warning(
+                f"Invalid stop reason '{result.stopped_reason}'",
+            )
+            raise ModelException(
+                f"Invalid stop reason '{result.stopped_reason}'",
+                EXCEPTION_LEVEL_ERROR,
+            )
+
+        if cache_key is not None and not from_cache:
+            self._response_cache.put(cache_key, result.to_cache_entry())
+
+        self._logger.debug("tokens:")
+        self._logger.debug(pformat({
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+        }))
+        return result
@@ -0,0 +1,152 @@
+# pylint: disable=line-too-long
+"""
+Operations on the completion JSON models return for a source code analysis.
+
+A completion has an "overall_analysis_summary" and a list of "priorities", each holding the
+"critical_locations" the model found for it. Analyses of several chunks are merged into one
+completion, an analysis of several functions is split into one completion per function, and the
+locations of the analyzed functions are marked as included.
+
+Classes:
+    CompletionUtils: A utility class merging, splitting and marking completions
+"""
+# pylint: enable=line-too-long
+
+from typing import Any, Dict, List
+from common.logging_utils import LoggingUtils
+
+
+class CompletionUtils:
+    # pylint: disable=line-too-long
+    """
+    A utility class for the completion JSON of source code analyses.
+
+    Completions may be shared with the response cache or another analysis, so they are never modified;
+    every method returns new dictionaries.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self):
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+
+    def included_locations_marked(
+            self, completion_json: Dict[str, Any], function_names: List[str]) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Get a copy of a completion whose critical locations are marked as included if they belong to the analyzed functions.
+
+        Args:
+            completion_json (Dict[str, Any]): The completion, left unchanged
+            function_names (List[str]): The functions or methods analyzed; empty for all of them
+
+        Returns:
+            Dict[str, Any]: The marked copy of the completion
+        """
+        # pylint: enable=line-too-long
+        priorities = []
+        for priority in completion_json.get("priorities") or []:
+            self._logger.debug(f"priority: {priority}")
+            locations_key = "critical_locations" if "critical_locations" in priority else "locations"
+            locations = []
+            for location in priority.get(locations_key) or []:
+                self._logger.debug(f"location: {location}")
+                include = any(self.matches_function(location.get("function_name"), function_name)
+                              for function_name in function_names or [None])
+                if include:
+                    self._logger.debug("function_name matches")
+                locations.append(dict(location, include=include))
+            priorities.append(dict(priority, **{locations_key: locations}))
+        return dict(completion_json, priorities=priorities)
+
+    def matches_function(self, reported_name: str | None, function_name: str | None) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether a function name reported by the model names a requested function.
+
+        The model and the call tracer do not always qualify names the same way, so "Class.method" matches
+        "method" and "module.Class.method", but not "other_method".
+
+        Args:
+            reported_name (str | None): The function_name of a critical location
+            function_name (str | None): The requested function or method; None when analyzing all of them
+
+        Returns:
+            bool: True if the names match
+        """
+        # pylint: enable=line-too-long
+        if reported_name == function_name:
+            return True
+        if reported_name is None or function_name is None:
+            return False
+        return reported_name.endswith(f".{function_name}") or function_name.endswith(f".{reported_name}")
+
+    def merge_completions(self, completions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Merge the completions of several chunks into one.
+
+        The summaries are joined, and the critical locations of each priority are concatenated in
+        chunk order. Priorities keep the order in which they first appear.
+
+        Args:
+            completions (List[Dict[str, Any]]): The completion JSON of each chunk, in source order
+
+        Returns:
+            Dict[str, Any]: The merged completion JSON
+        """
+        # pylint: enable=line-too-long
+        summaries = [
+            str(completion["overall_analysis_summary"])
+            for completion in completions if completion.get("overall_analysis_summary")
+        ]
+        priorities: Dict[str, Dict[str, Any]] = {}
+        for completion in completions:
+            for priority in completion.get("priorities") or []:
+                name = priority.get("priority")
+                merged = priorities.setdefault(name, {"priority": name, "critical_locations": []})
+                merged["critical_locations"].extend(
+                    priority.get("critical_locations") or priority.get("locations") or [])
+        return {
+            "overall_analysis_summary": "\n\n".join(summaries),
+            "priorities": list(priorities.values()),
+        }
+
+    def split_completion(
+            self, completion_json: Dict[str, Any], function_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Split the completion of a multi-function analysis into one completion per function.
+
+        Each completion keeps the priorities of the function's critical locations. Its summary is the one
+        the model gave for the function under "function_summaries", or the overall summary if none was given.
+
+        Args:
+            completion_json (Dict[str, Any]): The completion JSON of the analysis
+            function_names (List[str]): The analyzed functions or methods
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The completion JSON of each function, keyed by function name
+        """
+        # pylint: enable=line-too-long
+        function_summaries = completion_json.get("function_summaries")
+        if not isinstance(function_summaries, dict):
+            function_summaries = {}
+
+        completions: Dict[str, Dict[str, Any]] = {}
+        for function_name in function_names:
+            summary = next(
+                (str(summary) for name, summary in function_summaries.items()
+                 if self.matches_function(name, function_name)),
+                completion_json.get("overall_analysis_summary", ""),
+            )
+            priorities = []
+            for priority in completion_json.get("priorities") or []:
+                locations = [
+                    dict(location, include=True)
+                    for location in priority.get("critical_locations") or priority.get("locations") or []
+                    if self.matches_function(location.get("function_name"), function_name)
+                ]
+                if locations:
+                    priorities.append({"priority": priority.get("priority"), "critical_locations": locations})
+            completions[function_name] = {"overall_analysis_summary": summary, "priorities": priorities}
+        return completions
@@ -0,0 +1,444 @@
+# pylint: disable=line-too-long
+"""
+Analysis of all Python files of a directory.
+
+The files of a directory are analyzed in sorted path order, concurrently when concurrency.max_workers
+is greater than 1. Files whose content and analysis settings are unchanged since their output was
+recorded in the incremental manifest are not sent to the model; their stored output is used instead.
+The results of each file are displayed or written, and added to the repository report and records.
+
+Classes:
+    StoredAnalyses: The analyses of the files of a directory recorded in the incremental manifest
+    DirectoryAnalysis: Analyzes the Python files of a directory with a SourceCodeAnalyzer
+"""
+# pylint: enable=line-too-long
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Tuple
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from common.path_utils import PathUtils
+from source_analyzer.analysis_manifest import AnalysisManifest
+from source_analyzer.formatters.records_formatter import RecordsFormatter
+from source_analyzer.formatters.repository_report_formatter import RepositoryReportFormatter
+from source_analyzer.output_writer import OutputWriter
+
+if TYPE_CHECKING:
+    from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+
+# The path, the formatted results or error message, the error message or None if it succeeded, and the
+# completion and formatter variables of an analyzed file, or None if it failed or is empty
+FileAnalysis = Tuple[str, str | Iterator[str] | None, str | None, Dict[str, Any] | None, Dict[str, Any] | None]
+
+
+class StoredAnalyses:
+    # pylint: disable=line-too-long
+    """
+    The analyses of the files of a directory recorded in the incremental manifest.
+
+    A file's stored analysis is current if its content and the analysis settings are unchanged since it
+    was recorded. It is not used for a full analysis, nor if a report or records need the completion of
+    the file and it was recorded without one.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, manifest_path: str, settings_hash: str):
+        # pylint: disable=line-too-long
+        """
+        Load the manifest.
+
+        Args:
+            manifest_path (str): The JSON manifest file
+            settings_hash (str): The hash of the settings the files are analyzed with
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._manifest = AnalysisManifest(manifest_path=manifest_path)
+        self._settings_hash = settings_hash
+        self._content_hashes: Dict[str, str] = {}
+        self._current: Dict[str, Tuple[str, Dict[str, Any] | None]] = {}
+
+    def load(self, source_path: str, source_paths: List[str], full: bool, completion_required: bool) -> None:
+        # pylint: disable=line-too-long
+        """
+        Hash the files of a directory and find those whose stored analysis is current.
+
+        Args:
+            source_path (str): Path to the analyzed directory, whose files missing from source_paths are forgotten
+            source_paths (List[str]): The paths of the Python files of the directory
+            full (bool): Whether every file is analyzed again, so no stored analysis is current
+            completion_required (bool): Whether a stored analysis recorded without its completion is out of date
+        """
+        # pylint: enable=line-too-long
+        self._manifest.retain(source_path, source_paths)
+        for file_path in source_paths:
+            try:
+                self._content_hashes[file_path] = AnalysisManifest.content_hash(
+                    PathUtils().get_ascii_file_contents(source_path=file_path))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._logger.warning(f"Cannot hash '{file_path}': {str(e)}")
+                continue
+            if full:
+                continue
+            output = self._manifest.get(file_path, self._content_hashes[file_path], self._settings_hash)
+            completion_json = self._manifest.completion_json(file_path) if output is not None else None
+            if output is not None and (not completion_required or completion_json is not None):
+                self._current[file_path] = output, completion_json
+        print(f"Reusing the stored analysis of {len(self._current)} unchanged files")
+
+    def get(self, file_path: str) -> Tuple[str, Dict[str, Any] | None, Dict[str, Any] | None] | None:
+        # pylint: disable=line-too-long
+        """
+        Get the current stored analysis of a file.
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            Tuple[str, Dict[str, Any] | None, Dict[str, Any] | None] | None: The formatted output, completion and
+                formatter variables of the file, or None if it must be analyzed
+        """
+        # pylint: enable=line-too-long
+        if file_path not in self._current:
+            return None
+        output, completion_json = self._current[file_path]
+        return output, completion_json, self._manifest.formatter_inputs(file_path)
+
+    def recordable(self, file_path: str) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether the analysis of a file can be recorded, which requires that its content was hashed.
+
+        Args:
+            file_path (str): The path of the file
+
+        Returns:
+            bool: True if put records the analysis of the file
+        """
+        # pylint: enable=line-too-long
+        return file_path in self._content_hashes
+
+    def put(
+            self, file_path: str, output: str, completion_json: Dict[str, Any] | None,
+            formatter_inputs: Dict[str, Any] | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Record the analysis of a file, if it is recordable.
+
+        Args:
+            file_path (str): The path of the file
+            output (str): The formatted output
+            completion_json (Dict[str, Any] | None): The completion the output was formatted from
+            formatter_inputs (Dict[str, Any] | None): The variables the completion was formatted with
+        """
+        # pylint: enable=line-too-long
+        if self.recordable(file_path):
+            self._manifest.put(
+                file_path, self._content_hashes[file_path], self._settings_hash, output, completion_json,
+                formatter_inputs)
+
+    def save(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Save the manifest.
+        """
+        # pylint: enable=line-too-long
+        self._manifest.save()
+
+
+class DirectoryAnalysis:
+    # pylint: disable=line-too-long
+    """
+    Analyzes the Python files of a directory for SourceCodeAnalyzer.process_directory.
+
+    Recursively walks through the directory structure, identifying Python files and processing
+    each one for trace point analysis. Files are processed in sorted path order.
+
+    When concurrency.max_workers is greater than 1, files are analyzed concurrently by that many
+    isolated analyzers sharing one rate limiter, and the results are still displayed in sorted
+    path order.
+
+    When incremental.enabled is set, the content hash, settings hash and formatted output of each
+    analyzed file are recorded in the incremental.manifest_path manifest. Files whose content and
+    analysis settings are unchanged since they were recorded are not sent to the model; their stored
+    output is displayed instead.
+
+    Before any file is analyzed, the projected number of requests, tokens and cost of the run is
+    displayed, along with the files that will be skipped for exceeding the file token budget.
+
+    With an output_writer, the results of each file are written as the formatter streams them instead
+    of being displayed, so that no file's results are held in memory unless the manifest records them.
+    A file whose results cannot be written is logged and skipped.
+
+    With a report_formatter, the completion of each analyzed file is added to it as the file is
+    displayed or written, for a report of the whole directory. With a records_formatter, the completion
+    is added along with the model and token usage of the file, as records of its critical locations.
+    The manifest records the completions and their variables too, and a file whose stored output was
+    recorded without its completion is analyzed again.
+
+    Example:
+        >>> DirectoryAnalysis(SourceCodeAnalyzer(), output_writer=OutputWriter("results")).run("src")
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, analyzer: "SourceCodeAnalyzer", output_writer: OutputWriter | None = None,
+            report_formatter: RepositoryReportFormatter | None = None,
+            records_formatter: RecordsFormatter | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize a directory analysis.
+
+        Args:
+            analyzer (SourceCodeAnalyzer): Analyzes the files, or creates the workers analyzing them concurrently
+            output_writer (OutputWriter | None, optional): Writes the results of each file. Defaults to None,
+                displaying them.
+            report_formatter (RepositoryReportFormatter | None, optional): Aggregates the completion of each
+                file. Defaults to None.
+            records_formatter (RecordsFormatter | None, optional): Writes the records of the completion of each
+                file. Defaults to None.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._analyzer = analyzer
+        self._config = Configuration("source_analyzer/config.yaml")
+        self._output_writer = output_writer
+        self._report_formatter = report_formatter
+        self._records_formatter = records_formatter
+
+    def run(self, source_path: str, full: bool = False) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze the Python files of a directory and its subdirectories.
+
+        Args:
+            source_path (str): Path to the directory to process
+            full (bool, optional): Analyze every file, even if its stored output is current, and record the
+                new output. Defaults to False.
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start run")
+        self._logger.debug(f"source_path: {source_path}, full: {full}")
+        print(f"Process directory '{source_path}'")
+
+        if not Path(source_path).exists():
+            self._logger.error(f"Source path '{source_path}' does not exist")
+            self._logger.trace("end run path does not exist")
+            return
+        if not Path(source_path).is_dir():
+            self._logger.error(f"Source path '{source_path}' is not a directory")
+            self._logger.trace("end run path is not a directory")
+            return
+
+        source_paths = self._analyzer.find_python_files(source_path)
+        max_workers = self._config.int_value("concurrency.max_workers", 1, None, 1)
+        self._logger.debug(f"python files: {len(source_paths)}, max_workers: {max_workers}")
+
+        stored = None
+        if self._config.bool_value("incremental.enabled", "false"):
+            stored = StoredAnalyses(
+                manifest_path=self._config.str_value(
+                    "incremental.manifest_path", ".cache/source_analyzer/manifest.json"),
+                settings_hash=self._analyzer.analysis_settings_hash())
+            stored.load(
+                source_path, source_paths, full,
+                completion_required=self._report_formatter is not None or self._records_formatter is not None)
+        changed_paths = [
+            file_path for file_path in source_paths if stored is None or stored.get(file_path) is None]
+        self._display_projected_usage(self._analyzer.project_usage(changed_paths))
+
+        try:
+            analyses = iter(self.analyze_files(
+                changed_paths, max_workers, stream=self._output_writer is not None))
+            for file_path in source_paths:
+                stored_analysis = stored.get(file_path) if stored is not None else None
+                if stored_analysis is not None:
+                    self._use_stored_analysis(file_path, *stored_analysis)
+                else:
+                    self._use_analysis(next(analyses), stored)
+        finally:
+            if stored is not None:
+                stored.save()
+
+        self._logger.trace("end run")
+
+    def _use_stored_analysis(
+            self, file_path: str, output: str, completion_json: Dict[str, Any] | None,
+            formatter_inputs: Dict[str, Any] | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Display or write the stored output of an unchanged file and add its stored completion to the report and records.
+
+        Args:
+            file_path (str): The path of the file
+            output (str): The stored formatted output
+            completion_json (Dict[str, Any] | None): The stored completion
+            formatter_inputs (Dict[str, Any] | None): The stored variables the completion was formatted with
+        """
+        # pylint: enable=line-too-long
+        if self._output_writer is None:
+            self._logger.success(output)
+        else:
+            self._write_output(file_path, [output])
+        self._add_to_reports(file_path, completion_json, formatter_inputs)
+
+    def _use_analysis(self, analysis: FileAnalysis, stored: StoredAnalyses | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Display or write the results of an analyzed file, add its completion to the report and records, and
+        record its results in the manifest.
+
+        Files that failed or are empty are skipped.
+
+        Args:
+            analysis (FileAnalysis): The analysis of the file
+            stored (StoredAnalyses | None): The stored analyses recording it, or None if incremental.enabled is not set
+        """
+        # pylint: enable=line-too-long
+        file_path, results, error, completion_json, formatter_inputs = analysis
+        if results is None or error is not None:
+            return
+        self._add_to_reports(file_path, completion_json, formatter_inputs)
+
+        recorded = stored is not None and stored.recordable(file_path)
+        if self._output_writer is not None:
+            results = self._write_output(file_path, results, collect=recorded)
+        elif results:
+            self._logger.success(results)
+        if results and recorded:
+            stored.put(file_path, results, completion_json, formatter_inputs)
+
+    def _add_to_reports(
+            self, file_path: str, completion_json: Dict[str, Any], formatter_inputs: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Add the completion of a file to the repository report and records, if they are produced.
+
+        Args:
+            file_path (str): The path of the file
+            completion_json (Dict[str, Any]): The completion of the file
+            formatter_inputs (Dict[str, Any]): The model and token usage the completion is formatted with
+        """
+        # pylint: enable=line-too-long
+        if self._report_formatter is not None:
+            self._report_formatter.add_file(file_path, completion_json)
+        if self._records_formatter is not None:
+            self._records_formatter.add_file(file_path, completion_json, formatter_inputs)
+
+    def _write_output(self, file_path: str, chunks: Iterable[str], collect: bool = False) -> str | None:
+        # pylint: disable=line-too-long
+        """
+        Write the results of a file with the output writer, logging instead of raising if they cannot be written.
+
+        Args:
+            file_path (str): The path of the analyzed file
+            chunks (Iterable[str]): The pieces of the formatted results
+            collect (bool, optional): Whether to also return the written results. Defaults to False.
+
+        Returns:
+            str | None: The written results if collect is set and they were written, None otherwise
+        """
+        # pylint: enable=line-too-long
+
+        collected: List[str] = []
+
+        def tee(chunks: Iterable[str]) -> Iterator[str]:
+            for chunk in chunks:
+                collected.append(chunk)
+                yield chunk
+
+        try:
+            self._output_writer.write(file_path, tee(chunks) if collect else chunks)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._logger.error(f"Failed to write the results of '{file_path}': {str(e)}", exc_info=True)
+            return None
+        return "".join(collected) if collect else None
+
+    def _display_projected_usage(self, projection: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Display the projected usage of a run and warn when it exceeds the run token budget.
+
+        Args:
+            projection (Dict[str, Any]): The projection returned by SourceCodeAnalyzer.project_usage
+        """
+        # pylint: enable=line-too-long
+        projected_tokens = projection["prompt_tokens"] + projection["completion_tokens"]
+        print(
+            f"Projected usage: {projection['requests']} requests for {projection['files']} files, "
+            f"about {projection['prompt_tokens']} prompt and {projection['completion_tokens']} "
+            f"completion tokens, estimated cost ${projection['cost']:.2f} before cached responses"
+        )
+        for file_path in projection["skipped"]:
+            print(f"Skipping '{file_path}': over the file token budget")
+        token_budget = self._analyzer.token_budget
+        if token_budget is not None and projected_tokens > token_budget.remaining:
+            self._logger.warning(
+                f"Projected {projected_tokens} tokens exceed the remaining run token budget of "
+                f"{token_budget.remaining}; files analyzed after the budget is exhausted are skipped")
+
+    def analyze_files(self, source_paths: List[str], max_workers: int, stream: bool = False) -> Iterator[FileAnalysis]:
+        # pylint: disable=line-too-long
+        """
+        Analyze files, concurrently when max_workers is greater than 1, yielding the results in the order of source_paths.
+
+        Each worker borrows one of max_workers analyzers created by SourceCodeAnalyzer.create_worker, so no
+        model or formatter state is shared between concurrent analyses.
+
+        Args:
+            source_paths (List[str]): The paths of the files to analyze
+            max_workers (int): The number of files analyzed at the same time
+            stream (bool, optional): Whether to yield the formatted results as returned by process_file_stream
+                instead of process_file. Defaults to False.
+
+        Yields:
+            FileAnalysis: The analysis of each file
+        """
+        # pylint: enable=line-too-long
+        if max_workers <= 1 or len(source_paths) <= 1:
+            for file_path in source_paths:
+                yield self._analyze_file(self._analyzer, file_path, stream)
+            return
+
+        self._logger.trace("start analyze_files")
+        print(f"Analyzing {len(source_paths)} files with {max_workers} workers")
+
+        analyzers: queue.SimpleQueue = queue.SimpleQueue()
+        for _ in range(min(max_workers, len(source_paths))):
+            analyzers.put(self._analyzer.create_worker())
+
+        def analyze(file_path: str) -> FileAnalysis:
+            analyzer = analyzers.get()
+            try:
+                return self._analyze_file(analyzer, file_path, stream)
+            finally:
+                analyzers.put(analyzer)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analyzer") as executor:
+            # map yields the results in submission order as soon as each one is available
+            yield from executor.map(analyze, source_paths)
+
+        self._logger.trace("end analyze_files")
+
+    def _analyze_file(self, analyzer: "SourceCodeAnalyzer", file_path: str, stream: bool) -> FileAnalysis:
+        # pylint: disable=line-too-long
+        """
+        Analyze one file.
+
+        Args:
+            analyzer (SourceCodeAnalyzer): The analyzer, used by no other thread meanwhile
+            file_path (str): The path of the file
+            stream (bool): Whether to return the formatted results as returned by process_file_stream
+
+        Returns:
+            FileAnalysis: The analysis of the file
+        """
+        # pylint: enable=line-too-long
+        results = analyzer.process_file_stream(file_path) if stream else analyzer.process_file(file_path)
+        if results is None:
+            return file_path, results, analyzer.last_error, None, None
+        return file_path, results, analyzer.last_error, analyzer.last_completion_json, analyzer.last_formatter_inputs
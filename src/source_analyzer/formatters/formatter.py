@@ -24,7 +24,7 @@ Typical usage example:
 """
 # pylint: enable=line-too-long
 
-from typing import Dict
+from typing import Dict, Iterator
 from common.generic_utils import GenericUtils
 from common.logging_utils import LoggingUtils
 from common.configuration import Configuration
@@ -252,6 +252,25 @@ class FormatterObject:  # pylint: disable=too-few-public-methods
             cls._instance = super().__new__(cls)
         return cls._instance
 
+    @classmethod
+    def create_isolated(cls, configuration: Configuration) -> "FormatterObject":
+        # pylint: disable=line-too-long
+        """
+        Create an instance of the formatter class that is not the shared singleton.
+
+        Args:
+            configuration (Configuration): A configuration object containing settings and parameters
+                                        for the formatter.
+
+        Returns:
+            FormatterObject: A new, unshared instance of the formatter class.
+        """
+        # pylint: enable=line-too-long
+
+        instance = object.__new__(cls)
+        instance.__init__(configuration=configuration)
+        return instance
+
     def __init__(self, configuration: Configuration):
         # pylint: disable=line-too-long
         """
@@ -296,6 +315,29 @@ class FormatterObject:  # pylint: disable=too-few-public-methods
 
         raise NotImplementedError("Subclasses must implement this method")
 
+    def format_json_stream(
+        self, data: Dict[str, str], variables: Dict[str, str] = None
+    ) -> Iterator[str]:
+        # pylint: disable=line-too-long
+        """
+        Format JSON data like format_json, yielding the output in pieces as it is produced.
+
+        The pieces joined together are the output of format_json. This implementation yields the output of
+        format_json as one piece; subclasses that can produce their output incrementally override it, so
+        that long outputs can be written out without being held in memory.
+
+        Args:
+            data (Dict[str, str]): The input JSON data to be formatted as a dictionary.
+            variables (Dict[str, str], optional): Additional variables that might be used in formatting.
+                                                Defaults to None.
+
+        Yields:
+            str: The next piece of the formatted output.
+        """
+        # pylint: enable=line-too-long
+
+        yield self.format_json(data=data, variables=variables)
+
 
 class FormatterFactory:
     # pylint: disable=line-too-long
@@ -357,7 +399,9 @@ class FormatterFactory:
         self._generic_utils: GenericUtils = GenericUtils()
         self._config: Configuration = configuration
 
-    def get_formatter(self, module_name: str, class_name: str) -> FormatterObject:
+    def get_formatter(
+        self, module_name: str, class_name: str, shared: bool = True
+    ) -> FormatterObject:
         # pylint: disable=line-too-long
         """
         Dynamically load and instantiate a formatter based on module and class names.
@@ -368,6 +412,8 @@ class FormatterFactory:
         Args:
             module_name (str): Name of the module containing the formatter class.
             class_name (str): Name of the formatter class to instantiate.
+            shared (bool, optional): Whether to return the shared singleton instance or a new,
+                                     isolated one. Defaults to True.
 
         Returns:
             FormatterObject: An instance of the specified formatter class.
@@ -383,4 +429,6 @@ class FormatterFactory:
             class_name=class_name,
             package_name="formatters",
         )
+        if not shared:
+            return formatter_class.create_isolated(configuration=self._config)
         return formatter_class(configuration=self._config)
@@ -7,11 +7,18 @@ This module implements a formatter class that converts JSON data to Markdown for
 engine. It provides methods for loading templates and rendering JSON data to structured Markdown documents.
 The formatter supports additional variables for template rendering and includes comprehensive logging for
 debugging purposes.
+
+Templates are compiled once per process and kept by a shared Jinja2 environment for each template directory.
+The environment checks the template file for changes before each use, and compiled templates are also kept
+in a bytecode cache on disk so that later runs skip the compilation as well.
 """
 # pylint: enable=line-too-long
 
-from typing import Dict
-from jinja2 import Environment
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
 from source_analyzer.formatters.formatter import FormatterObject
 from common.configuration import Configuration
 
@@ -31,9 +38,14 @@ class Jinja2JsonToMarkdownFormatter(
     Attributes:
         _config (Configuration): Configuration object containing template settings
         _logger: Logger instance for debugging and information output
+        _environments (Dict[Tuple[str, bool, str], Environment]): The Jinja2 environments shared by all instances,
+            keyed by template directory, debug extension and bytecode cache directory
     """
     # pylint: enable=line-too-long
 
+    _environments: Dict[Tuple[str, bool, str], Environment] = {}
+    _environments_lock = threading.Lock()
+
     def __init__(self, configuration: Configuration):
         # pylint: disable=line-too-long
         """
@@ -50,30 +62,61 @@ class Jinja2JsonToMarkdownFormatter(
         # pylint: enable=line-too-long
         super().__init__(configuration=configuration)
 
-    def _load_template(self, template_path: str) -> str:
+    def _get_template(self) -> Template:
         # pylint: disable=line-too-long
         """
-        Load the Jinja2 template from the specified file path.
+        Get the configured Jinja2 template, compiled at most once per process.
 
-        This private method reads a Jinja2 template file from the filesystem and returns its contents
-        as a string. The template is loaded with UTF-8 encoding to ensure proper handling of special
-        characters.
-
-        Args:
-            template_path (str): The full file path to the Jinja2 template file to load
+        The template is loaded through the shared environment of its directory, which compiles it on first use
+        and recompiles it only when the file changes. Its bytecode is cached in formatter.template.bytecode_cache_path,
+        unless that is empty.
 
         Returns:
-            str: The complete contents of the Jinja2 template file as a string
+            Template: The compiled template
 
         Raises:
-            FileNotFoundError: If the specified template file does not exist
-            IOError: If there are issues reading the template file
-            UnicodeDecodeError: If the file cannot be decoded as UTF-8
+            TemplateNotFound: If the template file does not exist
+            TemplateError: If the template cannot be compiled
         """
         # pylint: enable=line-too-long
 
-        with open(template_path, "r", encoding="utf-8") as template_file:
-            return template_file.read()
+        # FUTURE refactor to use a shared utilities module
+        # Get the template file name and path from the configuration
+        file_name = self._config.str_value(
+            "formatter.template.name",
+            "notfound.jinja2",
+        )
+        file_path = self._config.str_value(
+            "formatter.template.path",
+            "template path not found",
+        )
+        debug = self._config.bool_value("formatter.template.debug", "false")
+        bytecode_cache_path = self._config.str_value(
+            "formatter.template.bytecode_cache_path",
+            ".cache/source_analyzer/jinja2",
+        )
+        self._logger.debug(f"Template path: {file_path}/{file_name}")
+
+        # relative paths are resolved now, as the working directory may change while the environment is kept
+        file_path = os.path.abspath(file_path)
+        bytecode_cache_path = os.path.abspath(bytecode_cache_path) if bytecode_cache_path else ""
+        key = (file_path, debug, bytecode_cache_path)
+        with self._environments_lock:
+            jinja2_env = self._environments.get(key)
+            if jinja2_env is None:
+                bytecode_cache = None
+                if bytecode_cache_path:
+                    Path(bytecode_cache_path).mkdir(parents=True, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(directory=bytecode_cache_path)
+                jinja2_env = Environment(
+                    loader=FileSystemLoader(file_path, encoding="utf-8"),
+                    extensions=["jinja2.ext.debug"] if debug else [],
+                    auto_reload=True,
+                    bytecode_cache=bytecode_cache,
+                )
+                self._environments[key] = jinja2_env
+
+        return jinja2_env.get_template(file_name)
 
     def format_json(self, data: Dict[str, str], variables: Dict[str, str] = None):
         # pylint: disable=line-too-long
@@ -97,47 +140,69 @@ class Jinja2JsonToMarkdownFormatter(
 
         Raises:
             KeyError: If required keys are missing from the data or variables dictionaries
-            FileNotFoundError: If the template file cannot be found
+            TemplateNotFound: If the template file cannot be found
             TemplateError: If there are issues with the Jinja2 template rendering
         """
         # pylint: enable=line-too-long
 
-        # FUTURE refactor to use a shared utilities module
-        # Get the template file name and path from the configuration
-        file_name = self._config.str_value(
-            "formatter.template.name",
-            "template name not found",
-        )
-        file_path = self._config.str_value(
-            "formatter.template.path",
-            "template path not found",
-        )
-        template_path = (
-            f"{file_path}/{file_name if file_name is not None else "notfound.jinja2"}"
-        )
-        self._logger.debug(f"Template path: {template_path}")
-        template_string = self._load_template(template_path=template_path)
+        markdown_output = self._get_template().render(**self._template_variables(data, variables))
+        self._logger.debug(f"Markdown output: {markdown_output}")
 
-        # Create the Jinja2 environment and template
-        # FUTURE make jinja debug extension optional
-        jinja2_env = Environment(
-            extensions=["jinja2.ext.debug"],  # Enable the debug extension
-        )
-        template = jinja2_env.from_string(template_string)
+        return markdown_output
+
+    def format_json_stream(
+        self, data: Dict[str, str], variables: Dict[str, str] = None
+    ) -> Iterator[str]:
+        # pylint: disable=line-too-long
+        """
+        Format JSON data like format_json, yielding the Markdown as the template produces it.
+
+        The template is rendered with Template.generate, so each piece is yielded as soon as it is rendered
+        and the whole Markdown is never held in memory.
+
+        Args:
+            data (Dict[str, str]): The JSON data to format, as for format_json
+            variables (Dict[str, str], optional): Additional variables to include in template rendering,
+                as for format_json. Defaults to None.
+
+        Yields:
+            str: The next piece of the formatted Markdown
+
+        Raises:
+            KeyError: If required keys are missing from the data or variables dictionaries
+            TemplateNotFound: If the template file cannot be found
+            TemplateError: If there are issues with the Jinja2 template rendering
+        """
+        # pylint: enable=line-too-long
+
+        yield from self._get_template().generate(**self._template_variables(data, variables))
+
+    def _template_variables(self, data: Dict[str, str], variables: Dict[str, str]) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Get the variables the template is rendered with.
+
+        Args:
+            data (Dict[str, str]): The JSON data to format
+            variables (Dict[str, str]): Additional variables to include in template rendering
+
+        Returns:
+            Dict[str, Any]: The template variables
+
+        Raises:
+            KeyError: If required keys are missing from the data or variables dictionaries
+        """
+        # pylint: enable=line-too-long
 
         self._logger.debug("Formatting json data: ")
         self._logger.debug(data, enable_pformat=True)
         self._logger.debug(f"priorities: {data["priorities"]}")
-        # Render the template with the data
-        markdown_output = template.render(
-            overall_analysis_summary=data["overall_analysis_summary"],
-            priorities=data["priorities"],
-            model_vendor=variables["model_vendor"],
-            model_name=variables["model_name"],
-            total_prompt_tokens=variables["total_prompt_tokens"],
-            total_completion_tokens=variables["total_completion_tokens"],
-            stopped_reason=variables["stopped_reason"],
-        )
-        self._logger.debug(f"Markdown output: {markdown_output}")
-
-        return markdown_output
+        return {
+            "overall_analysis_summary": data["overall_analysis_summary"],
+            "priorities": data["priorities"],
+            "model_vendor": variables["model_vendor"],
+            "model_name": variables["model_name"],
+            "total_prompt_tokens": variables["total_prompt_tokens"],
+            "total_completion_tokens": variables["total_completion_tokens"],
+            "stopped_reason": variables["stopped_reason"],
+        }
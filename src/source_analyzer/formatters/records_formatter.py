@@ -0,0 +1,264 @@
+# pylint: disable=line-too-long
+"""
+Module that provides functionality for formatting analysis results into flat, machine-readable records.
+
+The Markdown formatters are meant to be read; loading their output into a warehouse means parsing the Markdown
+again. The RecordsFormatter instead emits one flat record per critical location, with the file, function,
+priority, code block, rationale, trace information, model and token usage as columns.
+
+Records are written as JSON Lines or, when pyarrow is installed, as Parquet, in batches of records.batch_size
+records: a JSONL batch is flushed to the file, a Parquet batch is written as a row group. Records are buffered
+only until their batch is written, so directory runs of any size keep memory bounded.
+"""
+# pylint: enable=line-too-long
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, TextIO
+from source_analyzer.formatters.formatter import FormatterError, FormatterObject
+from common.configuration import Configuration
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    # pyarrow is optional; records can be written as JSONL without it
+    pyarrow = None
+
+# The file suffix selecting the Parquet backend; any other suffix selects JSONL
+PARQUET_SUFFIX = ".parquet"
+
+# The columns of each record, in order, and whether they hold integers rather than strings
+RECORD_COLUMNS = {
+    "file_path": False,
+    "function_name": False,
+    "location_name": False,
+    "priority": False,
+    "code_block": False,
+    "rationale": False,
+    "trace_info": False,
+    "model_vendor": False,
+    "model_name": False,
+    "model_id": False,
+    "prompt_tokens": True,
+    "completion_tokens": True,
+    "stopped_reason": False,
+}
+
+
+class RecordsFormatter(FormatterObject):
+    # pylint: disable=line-too-long
+    """
+    A formatter that converts analysis results into one flat record per critical location.
+
+    format_json formats the completion of one file as JSON Lines, so the formatter can be configured as the
+    per-file formatter. For a whole run, open a records file, add the completion of each file with add_file,
+    and close the file; the formatter then holds the open file, so each run must use its own instance from
+    create_isolated rather than the shared singleton.
+
+    The token columns hold the prompt and completion tokens of the whole file, repeated for each of its records.
+
+    Attributes:
+        _config: Configuration settings for the formatter.
+        _logger: Utility for logging operations.
+
+    Example:
+        >>> records_formatter = RecordsFormatter.create_isolated(configuration=config)
+        >>> records_formatter.open("results/records.parquet")
+        >>> for file_path, completion_json, variables in analyses:
+        ...     records_formatter.add_file(file_path, completion_json, variables)
+        >>> records_formatter.close()
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, configuration: Configuration):
+        # pylint: disable=line-too-long
+        """
+        Initialize the RecordsFormatter with the given configuration, without an open records file.
+
+        Parameters:
+            configuration: The configuration object containing settings and parameters for the formatter.
+        """
+        # pylint: enable=line-too-long
+        super().__init__(configuration=configuration)
+        self._batch_size = self._config.int_value("records.batch_size", 1, None, 1000)
+        self._batch: List[Dict[str, Any]] = []
+        self._records_path: Path | None = None
+        self._temporary_path: Path | None = None
+        self._jsonl_file: TextIO | None = None
+        self._parquet_writer = None
+        self._record_count = 0
+
+    def records(self, data: Dict[str, Any], variables: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Flatten the completion of a file into one record per critical location.
+
+        Parameters:
+            data: The completion of the file, with its priorities and their critical locations.
+            variables: A dictionary of additional variables: 'file_path', 'model_vendor', 'model_name', 'model_id',
+                      'total_prompt_tokens', 'total_completion_tokens' and 'stopped_reason'. Missing variables are
+                      left empty. Defaults to None.
+
+        Yields:
+            The record of each critical location, with the columns of RECORD_COLUMNS.
+        """
+        # pylint: enable=line-too-long
+        variables = variables or {}
+        for priority in data.get("priorities", []) or []:
+            for location in priority.get("critical_locations") or []:
+                yield {
+                    "file_path": variables.get("file_path"),
+                    "function_name": location.get("function_name"),
+                    "location_name": location.get("location_name"),
+                    "priority": priority.get("priority"),
+                    "code_block": location.get("code_block"),
+                    "rationale": location.get("rationale"),
+                    "trace_info": location.get("trace_info"),
+                    "model_vendor": variables.get("model_vendor"),
+                    "model_name": variables.get("model_name"),
+                    "model_id": variables.get("model_id"),
+                    "prompt_tokens": variables.get("total_prompt_tokens"),
+                    "completion_tokens": variables.get("total_completion_tokens"),
+                    "stopped_reason": variables.get("stopped_reason"),
+                }
+
+    def format_json(
+        self, data: Dict[str, str], variables: Dict[str, str] = None
+    ) -> str:
+        # pylint: disable=line-too-long
+        """
+        Format the completion of one file as JSON Lines, one record per critical location.
+
+        Parameters:
+            data: The completion of the file.
+            variables: A dictionary of additional variables, as for records. Defaults to None.
+
+        Returns:
+            The records of the file, each a JSON object on its own line.
+        """
+        # pylint: enable=line-too-long
+        return "".join(self.format_json_stream(data=data, variables=variables))
+
+    def format_json_stream(
+        self, data: Dict[str, str], variables: Dict[str, str] = None
+    ) -> Iterator[str]:
+        # pylint: disable=line-too-long
+        """
+        Format the completion of one file as JSON Lines like format_json, yielding one line per record.
+
+        Parameters:
+            data: The completion of the file.
+            variables: A dictionary of additional variables, as for records. Defaults to None.
+
+        Yields:
+            The JSON line of each record, with its newline.
+        """
+        # pylint: enable=line-too-long
+        for record in self.records(data, variables):
+            yield json.dumps(record) + "\n"
+
+    def open(self, records_path: str) -> None:
+        # pylint: disable=line-too-long
+        """
+        Open a records file for add_file, as Parquet if its name ends with ".parquet" and as JSONL otherwise.
+
+        The records are written to a temporary file that replaces records_path when the file is closed.
+
+        Parameters:
+            records_path: The records file. Parent directories are created as needed.
+
+        Raises:
+            FormatterError: If a records file is already open, or Parquet is requested and pyarrow is not installed.
+        """
+        # pylint: enable=line-too-long
+        if self._records_path is not None:
+            raise FormatterError(f"Records file '{self._records_path}' is already open")
+        records_path = Path(records_path)
+        if records_path.suffix == PARQUET_SUFFIX and pyarrow is None:
+            raise FormatterError("Writing Parquet records requires pyarrow; install it or write JSONL records")
+
+        records_path.parent.mkdir(parents=True, exist_ok=True)
+        self._temporary_path = records_path.with_name(f"{records_path.name}.{os.getpid()}.tmp")
+        if records_path.suffix == PARQUET_SUFFIX:
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(str(self._temporary_path), self._parquet_schema())
+        else:
+            self._jsonl_file = open(self._temporary_path, "w", encoding="utf-8")  # pylint: disable=consider-using-with
+        self._records_path = records_path
+        self._record_count = 0
+        self._logger.debug(f"Opened records file '{records_path}'")
+
+    def add_file(self, file_path: str, data: Dict[str, Any], variables: Dict[str, Any] = None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Add the records of the completion of a file to the open records file, writing a batch when it is full.
+
+        Parameters:
+            file_path: The path of the analyzed file.
+            data: The completion of the file.
+            variables: The model and token variables the completion was formatted with, as for records. Defaults to None.
+
+        Raises:
+            FormatterError: If no records file is open.
+        """
+        # pylint: enable=line-too-long
+        if self._records_path is None:
+            raise FormatterError("No records file is open")
+        for record in self.records(data, {**(variables or {}), "file_path": file_path}):
+            self._batch.append(record)
+            if len(self._batch) >= self._batch_size:
+                self._write_batch()
+
+    def close(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Write the last batch and close the records file, replacing the records path with it.
+
+        Does nothing if no records file is open.
+        """
+        # pylint: enable=line-too-long
+        if self._records_path is None:
+            return
+        try:
+            self._write_batch()
+        finally:
+            if self._parquet_writer is not None:
+                self._parquet_writer.close()
+            if self._jsonl_file is not None:
+                self._jsonl_file.close()
+        os.replace(self._temporary_path, self._records_path)
+        self._logger.debug(f"Wrote {self._record_count} records to '{self._records_path}'")
+        self._records_path = None
+        self._temporary_path = None
+        self._parquet_writer = None
+        self._jsonl_file = None
+
+    def _write_batch(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Write the buffered records to the open records file, as a Parquet row group or flushed JSON lines.
+        """
+        # pylint: enable=line-too-long
+        if len(self._batch) == 0:
+            return
+        if self._parquet_writer is not None:
+            self._parquet_writer.write_table(pyarrow.Table.from_pylist(self._batch, schema=self._parquet_writer.schema))
+        else:
+            self._jsonl_file.writelines(json.dumps(record) + "\n" for record in self._batch)
+            self._jsonl_file.flush()
+        self._record_count += len(self._batch)
+        self._batch = []
+
+    def _parquet_schema(self):
+        # pylint: disable=line-too-long
+        """
+        Get the Arrow schema of the records.
+
+        Returns:
+            pyarrow.Schema: The columns of RECORD_COLUMNS, as 64-bit integers or strings
+        """
+        # pylint: enable=line-too-long
+        return pyarrow.schema([
+            (column, pyarrow.int64() if is_integer else pyarrow.string())
+            for column, is_integer in RECORD_COLUMNS.items()
+        ])
@@ -0,0 +1,291 @@
+# pylint: disable=line-too-long
+"""
+Module that provides functionality for aggregating the analyses of the files of a repository into one Markdown report.
+
+The per-file formatters format each file's analysis on its own, so a helper embedded in many files has its critical
+locations repeated in each file's output, and nothing summarizes the run. The RepositoryReportFormatter instead
+consumes the completion of every file as it is analyzed, indexing the critical locations by priority, file and
+function, deduplicating the locations that recur across files, and formats one consolidated report with counts
+and a ranked list of hotspots.
+
+Aggregation is streaming: each completion is folded into counters and dropped, and the deduplicated locations
+are pruned to the most widespread ones, so memory stays bounded however many files are analyzed.
+"""
+# pylint: enable=line-too-long
+
+import hashlib
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+from source_analyzer.formatters.formatter import FormatterObject
+from common.configuration import Configuration
+
+# The number of files listed for each hotspot
+HOTSPOT_SAMPLE_FILES = 3
+
+
+@dataclass
+class Hotspot:
+    # pylint: disable=line-too-long
+    """
+    A critical location deduplicated across the files it occurs in.
+
+    Attributes:
+        priority (str): The tracing priority of the location
+        function_name (str): The function of the location, as reported for the first file it occurred in
+        code_block (str): The code block to trace, as reported for the first file it occurred in
+        rationale (str): The rationale for tracing, as reported for the first file it occurred in
+        file_count (int): The number of files the location occurs in
+        occurrences (int): The number of times the location was reported, counting repeats within a file
+        files (List[str]): The first files the location occurs in, up to HOTSPOT_SAMPLE_FILES
+    """
+    # pylint: enable=line-too-long
+
+    priority: str
+    function_name: str
+    code_block: str
+    rationale: str
+    file_count: int = 0
+    occurrences: int = 0
+    files: List[str] = field(default_factory=list)
+
+
+class RepositoryReportFormatter(FormatterObject):
+    # pylint: disable=line-too-long
+    """
+    A formatter that aggregates the completions of the files of a repository into one Markdown report.
+
+    Unlike the per-file formatters, the formatter holds the aggregation of the files added so far, so each
+    directory run must use its own instance from create_isolated rather than the shared singleton.
+
+    A location recurs across files when it has the same priority, the same function name without its class or
+    module qualifier, and the same code block up to whitespace. Hotspots are ranked by the number of files they
+    occur in, then by occurrences.
+
+    Attributes:
+        _config: Configuration settings for the formatter.
+        _logger: Utility for logging operations.
+
+    Example:
+        >>> report_formatter = RepositoryReportFormatter.create_isolated(configuration=config)
+        >>> for file_path, completion_json in completions:
+        ...     report_formatter.add_file(file_path, completion_json)
+        >>> markdown = report_formatter.format_report(variables)
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, configuration: Configuration):
+        # pylint: disable=line-too-long
+        """
+        Initialize the RepositoryReportFormatter with the given configuration and an empty aggregation.
+
+        Parameters:
+            configuration: The configuration object containing settings and parameters for the formatter.
+        """
+        # pylint: enable=line-too-long
+        super().__init__(configuration=configuration)
+        self._max_hotspots = self._config.int_value("report.max_hotspots", 1, None, 20)
+        self._max_tracked_locations = self._config.int_value(
+            "report.max_tracked_locations", self._max_hotspots, None, 10000)
+        self._priority_locations: Counter = Counter()
+        self._priority_files: Counter = Counter()
+        self._file_locations: Dict[str, int] = {}
+        self._file_functions: Dict[str, int] = {}
+        self._hotspots: Dict[str, Hotspot] = {}
+        self._pruned_locations = 0
+
+    def add_file(self, file_path: str, data: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Fold the completion of a file into the aggregation.
+
+        Parameters:
+            file_path: The path of the analyzed file.
+            data: The completion of the file, with its priorities and their critical locations.
+        """
+        # pylint: enable=line-too-long
+        location_count = 0
+        functions = set()
+        seen_keys = set()
+        for priority in data.get("priorities", []) or []:
+            priority_name = priority.get("priority")
+            locations = priority.get("critical_locations") or []
+            if locations:
+                self._priority_files[priority_name] += 1
+            for location in locations:
+                function_name = location.get("function_name") or location.get("location_name") or ""
+                code_block = location.get("code_block") or ""
+                location_count += 1
+                functions.add(function_name)
+                self._priority_locations[priority_name] += 1
+
+                key = self._location_key(priority_name, function_name, code_block)
+                hotspot = self._hotspots.get(key)
+                if hotspot is None:
+                    hotspot = Hotspot(
+                        priority=priority_name,
+                        function_name=function_name,
+                        code_block=code_block,
+                        rationale=location.get("rationale") or "",
+                    )
+                    self._hotspots[key] = hotspot
+                hotspot.occurrences += 1
+                if key not in seen_keys:
+                    seen_keys.add(key)
+                    hotspot.file_count += 1
+                    if len(hotspot.files) < HOTSPOT_SAMPLE_FILES:
+                        hotspot.files.append(file_path)
+
+        self._file_locations[file_path] = location_count
+        self._file_functions[file_path] = len(functions)
+        if len(self._hotspots) > 2 * self._max_tracked_locations:
+            self._prune_hotspots()
+        self._logger.debug(f"Added {location_count} locations of '{file_path}'")
+
+    def hotspots(self) -> List[Hotspot]:
+        # pylint: disable=line-too-long
+        """
+        Get the locations that occur in the most files, most widespread first.
+
+        Returns:
+            List[Hotspot]: Up to report.max_hotspots hotspots
+        """
+        # pylint: enable=line-too-long
+        return self._ranked_hotspots()[:self._max_hotspots]
+
+    def format_report(self, variables: Dict[str, Any] = None) -> str:
+        # pylint: disable=line-too-long
+        """
+        Format the aggregation of the files added so far into a Markdown report.
+
+        Parameters:
+            variables: A dictionary of additional variables: 'source_path', 'model_vendor' and 'model_name'.
+                      Defaults to None.
+
+        Returns:
+            A markdown-formatted report of the repository.
+        """
+        # pylint: enable=line-too-long
+        variables = variables or {}
+        total_locations = sum(self._file_locations.values())
+        distinct_locations = (
+            f"{len(self._hotspots)}" if self._pruned_locations == 0
+            else f"about {len(self._hotspots) + self._pruned_locations}"
+        )
+        output_strings = []
+        output_strings.append(f"# Repository Report: {variables.get('source_path', '')}")
+        output_strings.append("")
+        output_strings.append(
+            f"{variables.get('model_vendor', '')} {variables.get('model_name', '')} analysis of "
+            f"{len(self._file_locations)} files: {total_locations} critical locations, "
+            f"{distinct_locations} distinct across files."
+        )
+
+        output_strings.append("")
+        output_strings.append("## Critical Locations by Priority")
+        output_strings.append("")
+        output_strings.append("| Priority | Locations | Files |")
+        output_strings.append("| --- | ---: | ---: |")
+        tracing_priorities: list = self._config.list_value("tracing_priorities", [])
+        other_priorities = sorted(
+            (priority for priority in self._priority_locations if priority not in tracing_priorities), key=str)
+        for priority in tracing_priorities + other_priorities:
+            output_strings.append(
+                f"| {priority} | {self._priority_locations[priority]} | {self._priority_files[priority]} |")
+
+        output_strings.append("")
+        output_strings.append("## Hotspots")
+        output_strings.append("")
+        hotspots = self.hotspots()
+        if len(hotspots) == 0:
+            output_strings.append("No critical findings.")
+        for rank, hotspot in enumerate(hotspots, start=1):
+            more_files = hotspot.file_count - len(hotspot.files)
+            output_strings.append(
+                f"{rank}. **{hotspot.function_name}** ({hotspot.priority}): "
+                f"{hotspot.file_count} files, {hotspot.occurrences} occurrences"
+            )
+            output_strings.append(
+                f"   - **Files:** {', '.join(hotspot.files)}{f' and {more_files} more' if more_files > 0 else ''}")
+            output_strings.append(f"   - **Rationale for tracing:** {hotspot.rationale}")
+            output_strings.append("   ```python")
+            output_strings.extend(f"   {line}" for line in hotspot.code_block.splitlines())
+            output_strings.append("   ```")
+
+        output_strings.append("")
+        output_strings.append("## Files")
+        output_strings.append("")
+        output_strings.append("| File | Locations | Functions |")
+        output_strings.append("| --- | ---: | ---: |")
+        for file_path in sorted(self._file_locations):
+            output_strings.append(
+                f"| {file_path} | {self._file_locations[file_path]} | {self._file_functions[file_path]} |")
+
+        return "\n".join(output_strings)
+
+    def format_json(
+        self, data: Dict[str, str], variables: Dict[str, str] = None
+    ) -> str:
+        # pylint: disable=line-too-long
+        """
+        Format the completion of one file as the report of a repository holding only that file.
+
+        The aggregation of this formatter is left unchanged.
+
+        Parameters:
+            data: The completion of the file.
+            variables: A dictionary of additional variables as for format_report, and 'file_path'. Defaults to None.
+
+        Returns:
+            A markdown-formatted report of the file.
+        """
+        # pylint: enable=line-too-long
+        report_formatter = self.create_isolated(configuration=self._config)
+        report_formatter.add_file((variables or {}).get("file_path", ""), data)
+        return report_formatter.format_report(variables)
+
+    def _location_key(self, priority: str, function_name: str, code_block: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute the key under which a critical location is deduplicated across files.
+
+        Parameters:
+            priority: The tracing priority of the location.
+            function_name: The function of the location, possibly qualified by its class or module.
+            code_block: The code block to trace.
+
+        Returns:
+            The hex digest of the priority, the unqualified function name and the code block with whitespace collapsed.
+        """
+        # pylint: enable=line-too-long
+        normalized = "\0".join([str(priority), function_name.rsplit(".", 1)[-1], " ".join(code_block.split())])
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def _ranked_hotspots(self) -> List[Hotspot]:
+        # pylint: disable=line-too-long
+        """
+        Rank the tracked locations by the number of files they occur in, then by occurrences.
+
+        Returns:
+            List[Hotspot]: The tracked locations, most widespread first
+        """
+        # pylint: enable=line-too-long
+        return sorted(
+            self._hotspots.values(), key=lambda hotspot: (-hotspot.file_count, -hotspot.occurrences))
+
+    def _prune_hotspots(self) -> None:
+        # pylint: disable=line-too-long
+        """
+        Keep only the report.max_tracked_locations most widespread locations.
+
+        Pruning when twice that many are tracked keeps its cost constant per added location. A pruned location
+        that recurs in later files is tracked again from its next file, so the counts of locations occurring
+        in few files each may be underestimated; those of the reported hotspots are exact unless a pruning
+        dropped them earlier.
+        """
+        # pylint: enable=line-too-long
+        kept = self._ranked_hotspots()[:self._max_tracked_locations]
+        self._pruned_locations += len(self._hotspots) - len(kept)
+        kept_ids = {id(hotspot) for hotspot in kept}
+        self._hotspots = {key: hotspot for key, hotspot in self._hotspots.items() if id(hotspot) in kept_ids}
+        self._logger.debug(f"Pruned tracked locations to {len(self._hotspots)}")
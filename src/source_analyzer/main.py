@@ -9,64 +9,36 @@ SourceCodeAnalyzer class.
 """
 # pylint: enable=line-too-long
 
+import argparse
 import sys
 import os
-from itertools import chain
 from pathlib import Path
+from typing import List
 from common.path_utils import PathUtils
 from common.logging_utils import LoggingUtils
 from common.generic_utils import GenericUtils
+from common.configuration import Configuration
+from source_analyzer.batch_inference import BatchAnalysis
+from source_analyzer.formatters.records_formatter import RecordsFormatter
+from source_analyzer.formatters.repository_report_formatter import RepositoryReportFormatter
+from source_analyzer.output_writer import DirectoryOutputWriter, OutputWriter, StreamOutputWriter
 from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.response_cache import (
+    RESPONSE_CACHE_BYPASS,
+    RESPONSE_CACHE_REFRESH,
+    RESPONSE_CACHE_USE,
+)
 
-def main():
-    # pylint: disable=line-too-long
-    """
-    Main entry point for the source code analyzer.
-    Processes either a single Python file or a directory of Python files based on command line arguments.
-
-    Usage:
-        python script.py source_directory_path|source_file_path
+BATCH_SUBMIT = "submit"
+BATCH_INGEST = "ingest"
 
-    Returns:
-        None
-    """
-    # pylint: enable=line-too-long
+# --output-dir=- streams the analysis of each file to stdout
+OUTPUT_DIR_STDOUT = "-"
 
-    main_logger: LoggingUtils = LoggingUtils().get_class_logger(class_name=__name__)
-    path_utils: PathUtils = PathUtils()
-    generic_utils = GenericUtils()
+# --report=- writes the report to stdout
+REPORT_STDOUT = "-"
 
-    def usage(script_name: str = "", invalid_args: bool = False, **invalid_arg_values):
-        # pylint: disable=line-too-long
-        """
-        Display usage information for the script.
-
-        Args:
-            script_name (str, optional): The name of the script being executed. Defaults to an empty string.
-            invalid_args (bool, optional): Flag indicating whether invalid arguments were provided. Defaults to False.
-            **invalid_arg_values: Dictionary containing invalid argument values to display in the error message.
-
-        Returns:
-            None
-        """
-        # pylint: enable=line-too-long
-
-        print(f"Usage: python {script_name} [FILE|DIRECTORY]")
-        print(
-            f"Invalid argument(s): {",".join(chain.from_iterable(invalid_arg_values.values()))}"
-            if invalid_args
-            else "Analyze the source code in the specified file or directory."
-        )
-        print(
-            """
-Arguments:
-FILE          Path to an input file
-DIRECTORY     Path to an input directory
-            """
-        )
-        if not invalid_args:
-            print(
-                """
+ENVIRONMENT_HELP = """
 Environment variables:
     LOG_LEVEL:
         Sets the level of the logger writing to the file defined by LOG_FILE.
@@ -98,19 +70,240 @@ Log Levels:
     CRITICAL:
         Standard functionality from the Python logging package.
 """
-            )
 
-    # Check if file path is provided
-    if len(sys.argv) < 2:
-        usage(script_name=sys.argv[0] if len(sys.argv) > 0 else __name__)
+
+def create_argument_parser() -> argparse.ArgumentParser:
+    # pylint: disable=line-too-long
+    """
+    Create the parser of the command line arguments.
+
+    The response cache options and the batch modes are mutually exclusive groups.
+
+    Returns:
+        argparse.ArgumentParser: The parser
+    """
+    # pylint: enable=line-too-long
+
+    parser = argparse.ArgumentParser(
+        description="Analyze the source code in the specified file or directory.",
+        epilog=ENVIRONMENT_HELP,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "source_path", nargs="?", metavar="FILE|DIRECTORY|MANIFEST",
+        help="a Python file, a directory of Python files, or the manifest of a batch job written by --batch-submit")
+
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument(
+        "--no-cache", dest="response_cache_mode", action="store_const", const=RESPONSE_CACHE_BYPASS,
+        help="neither read nor write the model response cache")
+    cache_group.add_argument(
+        "--refresh-cache", dest="response_cache_mode", action="store_const", const=RESPONSE_CACHE_REFRESH,
+        help="call the model even if a cached response exists, and cache the new response")
+    parser.set_defaults(response_cache_mode=RESPONSE_CACHE_USE)
+
+    parser.add_argument(
+        "--full", action="store_true",
+        help="analyze every file of DIRECTORY, even if its stored analysis is current")
+
+    batch_group = parser.add_mutually_exclusive_group()
+    batch_group.add_argument(
+        "--batch-submit", dest="batch_mode", action="store_const", const=BATCH_SUBMIT,
+        help="submit the analysis of DIRECTORY as a Bedrock batch inference job")
+    batch_group.add_argument(
+        "--batch-ingest", dest="batch_mode", action="store_const", const=BATCH_INGEST,
+        help="display the analysis of the completed batch job of MANIFEST")
+
+    parser.add_argument(
+        "--output-dir", metavar="OUTPUT",
+        help="write the analysis of each file to OUTPUT/<path of the file>.md as soon as it is formatted, "
+             "or stream it to stdout if OUTPUT is -")
+    parser.add_argument(
+        "--report", metavar="REPORT",
+        help="write a report of all analyzed files, with counts by priority and the critical locations "
+             "recurring across the most files, to REPORT, or to stdout if REPORT is -")
+    parser.add_argument(
+        "--records", metavar="RECORDS",
+        help="write a flat record of each critical location, with its file, function, priority, code block, "
+             "rationale, trace information, model and tokens, to RECORDS, as Parquet if it ends with "
+             ".parquet (requires pyarrow) and as JSON Lines otherwise")
+    return parser
+
+
+def parse_arguments(argv: List[str]) -> argparse.Namespace:
+    # pylint: disable=line-too-long
+    """
+    Parse the command line arguments, exiting with the usage if they are invalid.
+
+    Without a source path, the help is displayed and the process exits successfully. Invalid arguments,
+    including --full with a source path that is not a directory and an --output-dir that is an existing
+    file, exit with status 2.
+
+    Args:
+        argv (List[str]): The arguments, without the script name
+
+    Returns:
+        argparse.Namespace: The source_path, response_cache_mode, full, batch_mode, output_dir, report and
+                            records arguments
+    """
+    # pylint: enable=line-too-long
+
+    parser = create_argument_parser()
+    arguments = parser.parse_args(argv)
+    if arguments.source_path is None:
+        parser.print_help()
         sys.exit(0)
-    if len(sys.argv) > 2:
-        usage(
-            script_name=sys.argv[0] if len(sys.argv) > 0 else __name__,
-            invalid_args=True,
-            invalid_arg_values=sys.argv[2:] if len(sys.argv) > 2 else ["none"],
-        )
-        sys.exit(1)
+    if arguments.batch_mode is not None and (
+            arguments.full or arguments.output_dir or arguments.report or arguments.records):
+        parser.error("--full, --output-dir, --report and --records cannot be used with a batch mode")
+    for option in ("output_dir", "report", "records"):
+        if getattr(arguments, option) == "":
+            parser.error(f"--{option.replace('_', '-')} requires a non-empty value")
+    if arguments.full and not PathUtils().is_dir(arguments.source_path):
+        parser.error(f"--full requires a DIRECTORY, but '{arguments.source_path}' is not a directory")
+    if arguments.output_dir not in (None, OUTPUT_DIR_STDOUT) and Path(arguments.output_dir).exists() \
+            and not Path(arguments.output_dir).is_dir():
+        parser.error(f"--output-dir requires a directory, but '{arguments.output_dir}' is not a directory")
+    return arguments
+
+
+def create_output_writer(output_dir: str | None, source_path: str) -> OutputWriter | None:
+    # pylint: disable=line-too-long
+    """
+    Create the writer of the analysis of each file selected by --output-dir.
+
+    Args:
+        output_dir (str | None): The output directory, OUTPUT_DIR_STDOUT, or None to display the analysis
+        source_path (str): The analyzed file or directory
+
+    Returns:
+        OutputWriter | None: The writer, or None if the analysis is displayed
+    """
+    # pylint: enable=line-too-long
+
+    if output_dir is None:
+        return None
+    if output_dir == OUTPUT_DIR_STDOUT:
+        return StreamOutputWriter()
+    return DirectoryOutputWriter(
+        output_dir=output_dir,
+        source_root=source_path if PathUtils().is_dir(source_path) else str(Path(source_path).parent),
+    )
+
+
+def run_batch(analyzer: SourceCodeAnalyzer, batch_mode: str, source_path: str) -> None:
+    # pylint: disable=line-too-long
+    """
+    Submit the analysis of a directory as a batch job, or display the analysis of a completed batch job.
+
+    Args:
+        analyzer (SourceCodeAnalyzer): The analyzer
+        batch_mode (str): BATCH_SUBMIT or BATCH_INGEST
+        source_path (str): The directory to submit, or the manifest of the batch job to ingest
+    """
+    # pylint: enable=line-too-long
+
+    main_logger: LoggingUtils = LoggingUtils().get_class_logger(class_name=__name__)
+    try:
+        batch_analysis = BatchAnalysis(analyzer)
+        if batch_mode == BATCH_SUBMIT:
+            batch_analysis.submit(source_path)
+            return
+        results = batch_analysis.ingest(source_path)
+        if results is None:
+            print("Batch job has not completed yet; ingest it again later")
+        for results_str in (results or {}).values():
+            main_logger.success(results_str)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        main_logger.error(f"Failed to run batch job: {str(e)}")
+        main_logger.trace("end __main__ (batch error)")
+
+
+def process_file(
+        analyzer: SourceCodeAnalyzer, source_path: str, output_writer: OutputWriter | None,
+        report_formatter: RepositoryReportFormatter | None, records_formatter: RecordsFormatter | None) -> None:
+    # pylint: disable=line-too-long
+    """
+    Analyze a single file, displaying or writing its analysis and adding it to the report and records.
+
+    Args:
+        analyzer (SourceCodeAnalyzer): The analyzer
+        source_path (str): The file to analyze
+        output_writer (OutputWriter | None): Writes the analysis; None to display it
+        report_formatter (RepositoryReportFormatter | None): Aggregates the completion for --report
+        records_formatter (RecordsFormatter | None): Writes the records of the completion for --records
+    """
+    # pylint: enable=line-too-long
+
+    main_logger: LoggingUtils = LoggingUtils().get_class_logger(class_name=__name__)
+    main_logger.debug("Path(source_path)")
+    main_logger.debug(Path(source_path))
+    try:
+        if output_writer is None:
+            analyzer.process_file(source_path, display_results=True)
+        else:
+            results = analyzer.process_file_stream(source_path)
+            if results is not None and analyzer.last_error is None:
+                output_writer.write(source_path, results)
+        if report_formatter is not None and analyzer.last_completion_json is not None:
+            report_formatter.add_file(source_path, analyzer.last_completion_json)
+        if records_formatter is not None and analyzer.last_completion_json is not None:
+            records_formatter.add_file(
+                source_path, analyzer.last_completion_json, analyzer.last_formatter_inputs)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        main_logger.error(f"Failed to process file: {str(e)}")
+        main_logger.trace("end __main__ (file error)")
+
+
+def write_report(
+        analyzer: SourceCodeAnalyzer, report_formatter: RepositoryReportFormatter, source_path: str,
+        report_path: str) -> None:
+    # pylint: disable=line-too-long
+    """
+    Format the report of --report and write it to its file or stdout.
+
+    Args:
+        analyzer (SourceCodeAnalyzer): The analyzer, for the model the report names
+        report_formatter (RepositoryReportFormatter): The aggregation of the analyzed files
+        source_path (str): The analyzed file or directory
+        report_path (str): The report file, or REPORT_STDOUT
+    """
+    # pylint: enable=line-too-long
+
+    report = report_formatter.format_report({
+        "source_path": source_path,
+        "model_vendor": analyzer.model.model_vendor,
+        "model_name": analyzer.model.model_name,
+    })
+    if report_path == REPORT_STDOUT:
+        print(report)
+        return
+    Path(report_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(report_path).write_text(report, encoding="utf-8")
+    print(f"Wrote the report of '{source_path}' to '{report_path}'")
+
+
+def main():
+    # pylint: disable=line-too-long
+    """
+    Main entry point for the source code analyzer.
+    Processes either a single Python file or a directory of Python files based on command line arguments.
+
+    Usage:
+        python script.py [--no-cache|--refresh-cache] [--full] [--output-dir=output_directory_path|-] [--report=report_file_path|-] [--records=records_file_path] source_directory_path|source_file_path
+        python script.py --batch-submit source_directory_path
+        python script.py [--no-cache|--refresh-cache] --batch-ingest batch_manifest_path
+
+    Returns:
+        None
+    """
+    # pylint: enable=line-too-long
+
+    main_logger: LoggingUtils = LoggingUtils().get_class_logger(class_name=__name__)
+    path_utils: PathUtils = PathUtils()
+    generic_utils = GenericUtils()
+
+    arguments = parse_arguments(sys.argv[1:])
 
     print("Starting...")
 
@@ -118,32 +311,54 @@ Log Levels:
     print(f"Using GenAI with {'code interpreter' if use_assistant else 'no'} assistant")
 
     # Initialize the SourceCodeAnalyzerUtils with the configuration
-    analyzer: SourceCodeAnalyzer = SourceCodeAnalyzer()
+    analyzer: SourceCodeAnalyzer = SourceCodeAnalyzer(response_cache_mode=arguments.response_cache_mode)
 
     # Analyze the source code
-    source_path = sys.argv[1]
+    source_path = arguments.source_path
     main_logger.debug(f"source_path: {source_path}")
 
-    if path_utils.is_file(source_path):
-        main_logger.debug("Path(source_path)")
-        main_logger.debug(Path(source_path))
+    output_writer = create_output_writer(arguments.output_dir, source_path)
+    report_formatter: RepositoryReportFormatter | None = None
+    if arguments.report is not None:
+        report_formatter = RepositoryReportFormatter.create_isolated(
+            configuration=Configuration("source_analyzer/config.yaml"))
+    records_formatter: RecordsFormatter | None = None
+    if arguments.records is not None:
+        records_formatter = RecordsFormatter.create_isolated(
+            configuration=Configuration("source_analyzer/config.yaml"))
         try:
-            analyzer.process_file(source_path, display_results=True)
+            records_formatter.open(arguments.records)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            main_logger.error(f"Failed to open records file: {str(e)}")
+            sys.exit(1)
+
+    if arguments.batch_mode is not None:
+        run_batch(analyzer, arguments.batch_mode, source_path)
+    elif path_utils.is_file(source_path):
+        process_file(analyzer, source_path, output_writer, report_formatter, records_formatter)
+    elif path_utils.is_dir(source_path):
+        try:
+            analyzer.process_directory(
+                source_path, full=arguments.full, output_writer=output_writer,
+                report_formatter=report_formatter, records_formatter=records_formatter)
         except Exception as e:  # pylint: disable=broad-exception-caught
             main_logger.error(f"Failed to process file: {str(e)}")
             main_logger.trace("end __main__ (file error)")
     else:
-        if path_utils.is_dir(source_path):
-            try:
-                analyzer.process_directory(source_path)
-            except Exception as e:  # pylint: disable=broad-exception-caught
-                main_logger.error(f"Failed to process file: {str(e)}")
-                main_logger.trace("end __main__ (file error)")
-        else:
-            main_logger.error(
-                __name__,
-                f"Source path '{source_path}' is neither a file nor a directory",
-            )
+        main_logger.error(
+            __name__,
+            f"Source path '{source_path}' is neither a file nor a directory",
+        )
+
+    if records_formatter is not None:
+        try:
+            records_formatter.close()
+            print(f"Wrote the records of '{source_path}' to '{arguments.records}'")
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            main_logger.error(f"Failed to write records file: {str(e)}")
+
+    if report_formatter is not None:
+        write_report(analyzer, report_formatter, source_path, arguments.report)
 
     main_logger.trace("end __main__")
 
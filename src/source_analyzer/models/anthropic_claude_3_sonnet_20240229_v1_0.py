@@ -8,10 +8,10 @@ handling API requests and responses, and processing the returned data.
 # pylint: enable=line-too-long
 
 import json
-from botocore.exceptions import ClientError, TokenRetrievalError
+from typing import Iterator
 from common.configuration import Configuration
-from source_analyzer.models import model
-from source_analyzer.models.model import BedrockModelObject, ModelException
+from common.partial_json_parser import PartialJsonParser
+from source_analyzer.models.model import BedrockModelObject, ModelResult, ModelStreamUpdate
 
 MAX_TOKENS_EXPECTED_MIN = 0
 MAX_TOKENS_EXPECTED_MAX = 134144
@@ -28,11 +28,19 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
 
     Attributes:
         _max_completion_tokens (int): Maximum number of tokens for model completion.
-        completion_json (dict): Processed JSON data from the model response.
-        stopped_reason (str): Reason why the model stopped generating text.
     """
     # pylint: enable=line-too-long
 
+    DEFAULT_CONTEXT_WINDOW_TOKENS = 200000
+
+    # The Claude tokenizer is not public; cl100k_base undercounts it, mostly on code
+    TOKEN_ENCODING_NAME = "cl100k_base"
+    TOKEN_ESTIMATE_FACTOR = 1.2
+
+    # Bedrock on-demand pricing
+    DEFAULT_INPUT_PRICE_PER_1K_TOKENS = 0.003
+    DEFAULT_OUTPUT_PRICE_PER_1K_TOKENS = 0.015
+
     def __init__(self, configuration: Configuration):
         # pylint: disable=line-too-long
         """
@@ -46,7 +54,7 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
         super().__init__(configuration=configuration)
         self._max_completion_tokens = None
 
-    def generate_text(self, prompt):
+    def generate_text(self, prompt, on_token=None):
         # pylint: disable=line-too-long
         """
         Generate text using the Claude 3 Sonnet model.
@@ -56,17 +64,94 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
 
         Args:
             prompt (str): The text prompt to send to the model.
+            on_token (Callable[[str], None], optional): When given, the response is streamed and each text
+                delta is passed to this callable as it arrives. Defaults to None.
 
         Raises:
             ModelException: If there's an error with token retrieval or model invocation.
 
         Returns:
-            None: Results are stored in instance attributes.
+            ModelResult: The text, completion JSON, token usage and stop reason of the response.
         """
         # pylint: enable=line-too-long
 
         self._logger.trace(__class__.__name__, "start generate_text")
 
+        if on_token is not None:
+            result = self._generate_text_to_callback(prompt, on_token)
+            self._logger.trace(__class__.__name__, "end generate_text (streamed)")
+            return result
+
+        response = self.invoke_model(request=self._build_request(prompt=prompt))
+        self._logger.debug(__class__.__name__, "response:")
+        self._logger.debug(__class__.__name__, response, enable_pformat=True)
+
+        result = self._handle_response(response=response)
+        self._logger.trace(__class__.__name__, "end generate_text")
+        return result
+
+    def generate_text_stream(self, prompt) -> Iterator[ModelStreamUpdate]:
+        # pylint: disable=line-too-long
+        """
+        Generate text using the Claude 3 Sonnet model, yielding the response as it is streamed.
+
+        The Anthropic messages streaming protocol delivers the input token usage in the message_start
+        event, text in content_block_delta events, and the stop reason and output token usage in the
+        message_delta event. Each text delta is yielded with the completion JSON parsed so far; once the
+        stream ends, the reassembled response is processed as a non-streaming response would be.
+
+        Args:
+            prompt (str): The text prompt to send to the model.
+
+        Raises:
+            ModelException: If there's an error with token retrieval or model invocation.
+
+        Yields:
+            ModelStreamUpdate: Each text delta and the completion JSON parsed so far, then the result of
+                the request.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger.trace(__class__.__name__, "start generate_text_stream")
+
+        response = self.invoke_model_with_response_stream(request=self._build_request(prompt=prompt))
+        parser = PartialJsonParser()
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        stop_reason = None
+        for chunk in self.iter_stream_chunks(response):
+            chunk_type = chunk.get("type")
+            if chunk_type == "message_start":
+                usage["input_tokens"] = chunk["message"]["usage"]["input_tokens"]
+            elif chunk_type == "content_block_delta":
+                text = chunk["delta"].get("text", "")
+                if text:
+                    yield ModelStreamUpdate(
+                        text=text, partial_json=self.partial_completion_json(parser.feed(text)))
+            elif chunk_type == "message_delta":
+                stop_reason = chunk["delta"].get("stop_reason")
+                usage["output_tokens"] = chunk["usage"]["output_tokens"]
+
+        result = self._handle_model_response(model_response={
+            "content": [{"type": "text", "text": parser.text}],
+            "usage": usage,
+            "stop_reason": stop_reason,
+        })
+        yield ModelStreamUpdate(text="", partial_json=result.completion_json, result=result)
+        self._logger.trace(__class__.__name__, "end generate_text_stream")
+
+    def _build_request(self, prompt) -> str:
+        # pylint: disable=line-too-long
+        """
+        Build the Claude 3 Sonnet request body for a prompt.
+
+        Args:
+            prompt (str): The text prompt to send to the model.
+
+        Returns:
+            str: The JSON request body.
+        """
+        # pylint: enable=line-too-long
+
         self._logger.debug(__class__.__name__, "prompt:")
         self._logger.debug(__class__.__name__, prompt)
 
@@ -84,7 +169,7 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
         )
         self._logger.debug(__class__.__name__, f"system_prompt: {system_prompt}")
         self._logger.debug(__class__.__name__, f"max_tokens: {self.max_completion_tokens}")
-        request = json.dumps(
+        return json.dumps(
             {
                 "anthropic_version": "bedrock-2023-05-31",
                 "max_tokens": self.max_completion_tokens,
@@ -93,32 +178,6 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
             }
         )
 
-        try:
-            # Get a client for the model.
-            client = self.model_client
-            # Invoke the model with the request.
-            response = client.invoke_model(modelId=self.model_id, body=request)
-            self._logger.debug(__class__.__name__, "response:")
-            self._logger.debug(__class__.__name__, response, enable_pformat=True)
-        except TokenRetrievalError as tre:  # expired or otherwise invalid AWS token
-            self._logger.debug(__class__.__name__, f"raising ModelException for TokenRetrievalError: {str(tre)}")
-            raise ModelException(
-                f"TokenRetrievalError error: {str(tre)}",
-                model.EXCEPTION_LEVEL_ERROR,
-            ) from tre
-        except ClientError as ce:
-            error_code = ce.response["Error"]["Code"]
-            self._logger.trace(
-                __class__.__name__,
-                f"end generate_text with Bedrock invoke_model error ({error_code}): {str(ce)}"
-            )
-            raise ModelException(
-                f"Bedrock invoke_model error ({error_code}): {str(ce)}", model.EXCEPTION_LEVEL_WARN
-            ) from ce
-
-        self._handle_response(response=response)
-        self._logger.trace(__class__.__name__, "end generate_text")
-
     def _handle_response(self, response):
         # pylint: disable=line-too-long
         """
@@ -131,7 +190,7 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
             response: Raw response object from the AWS Bedrock API.
 
         Returns:
-            None: Results are stored in instance attributes.
+            ModelResult: The result of the request.
         """
         # pylint: enable=line-too-long
 
@@ -139,6 +198,24 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
 
         # Decode the response body.
         model_response = json.loads(response["body"].read())
+        result = self._handle_model_response(model_response=model_response)
+
+        self._logger.trace(__class__.__name__, "end _handle_response")
+        return result
+
+    def _handle_model_response(self, model_response: dict) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Process a decoded Claude 3 Sonnet response body.
+
+        Args:
+            model_response (dict): The decoded response body.
+
+        Returns:
+            ModelResult: The result of the request.
+        """
+        # pylint: enable=line-too-long
+
         self._logger.debug(__class__.__name__, "model_response")
         self._logger.debug(__class__.__name__, model_response, enable_pformat=False)
 
@@ -148,22 +225,18 @@ class AnthropicClaude3Sonnet20240229V1(BedrockModelObject):
         )
         response_text = model_response["content"][0].get("text")
         self._logger.debug(__class__.__name__, f"usage: {model_response.get("usage")}")
-        extracted_json = self._json_utils.extract_json(response_text)
-        self._logger.debug(__class__.__name__, "Extracted json:")
-        self._logger.debug(__class__.__name__, extracted_json, enable_pformat=True)
-
-        data = self._json_utils.json_loads(json_string=extracted_json)
+        data = self._json_utils.decode_json_response(response_text)
         data = data[0] if isinstance(data, list) else data
         self._logger.debug(__class__.__name__, "data:")
         self._logger.debug(__class__.__name__, data)
-        self.completion_json = data
 
-        # Increment the
-        self.increment_completion_tokens(value=model_response["usage"]["output_tokens"])
-        self.increment_prompt_tokens(value=model_response["usage"]["input_tokens"])
-        self.stopped_reason = model_response["stop_reason"]
-
-        self._logger.trace(__class__.__name__, "end _handle_response")
+        return ModelResult(
+            text=response_text,
+            completion_json=data,
+            prompt_tokens=model_response["usage"]["input_tokens"],
+            completion_tokens=model_response["usage"]["output_tokens"],
+            stopped_reason=model_response["stop_reason"],
+        )
 
     @property
     def model_id(self) -> str:
@@ -0,0 +1,360 @@
+# pylint: disable=line-too-long
+"""
+Module providing a local, deterministic stand-in for a language model.
+
+The stub answers prompts without any network access, so the analysis pipeline, the formatters and
+the renderer can be load tested and benchmarked without calling Bedrock. Its latency, token counts and
+failures are drawn from configurable distributions, with a seeded random generator so that runs are
+reproducible.
+
+Select it with:
+
+    ai_model:
+      class:
+        name: LocalStubModel
+      module:
+        name: local_stub_model
+"""
+# pylint: enable=line-too-long
+
+import copy
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+from common.configuration import Configuration
+from source_analyzer.models import model
+from source_analyzer.models.model import ModelException, ModelObject, ModelResult, ModelThrottlingException
+
+LATENCY_DISTRIBUTION_FIXED = "fixed"
+LATENCY_DISTRIBUTION_UNIFORM = "uniform"
+LATENCY_DISTRIBUTION_LOGNORMAL = "lognormal"
+LATENCY_DISTRIBUTIONS = (LATENCY_DISTRIBUTION_FIXED, LATENCY_DISTRIBUTION_UNIFORM, LATENCY_DISTRIBUTION_LOGNORMAL)
+
+LATENCY_SECONDS_EXPECTED_MIN = 0.0
+LATENCY_SECONDS_EXPECTED_MAX = 600.0
+LATENCY_SECONDS_DEFAULT = 0.0
+
+RATE_EXPECTED_MIN = 0.0
+RATE_EXPECTED_MAX = 1.0
+
+COMPLETION_TOKENS_EXPECTED_MIN = 0
+COMPLETION_TOKENS_EXPECTED_MAX = 134144
+COMPLETION_TOKENS_DEFAULT = 0
+
+SOURCE_CODE_PATTERN = re.compile(r"Source Code:\n```python\n(.*)\n```", re.DOTALL)
+FUNCTION_PATTERN = re.compile(r"^([ \t]*)(?:async[ \t]+)?def[ \t]+(\w+)|^([ \t]*)class[ \t]+(\w+)", re.MULTILINE)
+
+
+class LocalStubModel(ModelObject):
+    # pylint: disable=line-too-long
+    """
+    A model answering prompts locally with canned or synthesized critical locations.
+
+    Unless ai_model.custom.response_path names a JSON file holding the completion to return, the
+    completion is synthesized from the prompt: every function of the source code gets one critical
+    location, under one of the configured tracing priorities chosen from the function name. The same
+    prompt always gets the same completion.
+
+    Each request waits for a latency drawn from ai_model.custom.latency_distribution and may fail,
+    with the probability ai_model.custom.failure_rate, or be throttled, with the probability
+    ai_model.custom.throttle_rate.
+    """
+    # pylint: enable=line-too-long
+
+    DEFAULT_CONTEXT_WINDOW_TOKENS = 200000
+
+    def __init__(self, configuration: Configuration):
+        # pylint: disable=line-too-long
+        """
+        Initialize the stub model.
+
+        Args:
+            configuration (Configuration): Configuration object containing model settings.
+
+        Raises:
+            ValueError: If ai_model.custom.latency_distribution is not one of LATENCY_DISTRIBUTIONS
+        """
+        # pylint: enable=line-too-long
+
+        super().__init__(configuration=configuration)
+        self._rng = random.Random(self._config.int_value("ai_model.custom.seed", None, None, 0))
+        self._rng_lock = threading.Lock()
+        self._latency_distribution = self._config.str_value(
+            "ai_model.custom.latency_distribution", LATENCY_DISTRIBUTION_FIXED)
+        if self._latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Invalid ai_model.custom.latency_distribution '{self._latency_distribution}'; "
+                f"expected one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        self._latency_seconds = self._config.float_value(
+            "ai_model.custom.latency_seconds",
+            LATENCY_SECONDS_EXPECTED_MIN, LATENCY_SECONDS_EXPECTED_MAX, LATENCY_SECONDS_DEFAULT)
+        self._latency_spread = self._config.float_value(
+            "ai_model.custom.latency_spread", 0.0, None, 0.0)
+        self._failure_rate = self._config.float_value(
+            "ai_model.custom.failure_rate", RATE_EXPECTED_MIN, RATE_EXPECTED_MAX, 0.0)
+        self._throttle_rate = self._config.float_value(
+            "ai_model.custom.throttle_rate", RATE_EXPECTED_MIN, RATE_EXPECTED_MAX, 0.0)
+        self.max_completion_tokens = self._config.int_value(
+            "ai_model.custom.max_tokens", 0, None, 4096)
+
+        self._canned_completion: Dict[str, Any] | None = None
+        response_path = self._config.str_value("ai_model.custom.response_path", "")
+        if response_path:
+            with open(response_path, "r", encoding="utf-8") as response_file:
+                self._canned_completion = json.load(response_file)
+
+    def generate_text(self, prompt, on_token=None):
+        # pylint: disable=line-too-long
+        """
+        Answer a prompt after the drawn latency, or raise the drawn failure.
+
+        Args:
+            prompt (str): The text prompt.
+            on_token (Callable[[str], None], optional): Ignored; the response is not streamed. Defaults to None.
+
+        Raises:
+            ModelThrottlingException: If the request is drawn to be throttled.
+            ModelException: If the request is drawn to fail.
+
+        Returns:
+            ModelResult: The text, completion JSON, token usage and stop reason of the response.
+        """
+        # pylint: enable=line-too-long
+
+        latency, outcome = self._draw()
+        time.sleep(latency)
+        return self._respond(prompt, outcome)
+
+    def batch_model_input(self, prompt: str) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Build the "modelInput" of a batch inference record.
+
+        Args:
+            prompt: The text prompt.
+
+        Returns:
+            The request body
+        """
+        # pylint: enable=line-too-long
+
+        return {"prompt": prompt}
+
+    def batch_result(self, model_output: Dict[str, Any]) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Process the "modelOutput" of a batch inference record, as returned by stub_batch_output.
+
+        Args:
+            model_output: The output of the record
+
+        Returns:
+            The result of the record
+        """
+        # pylint: enable=line-too-long
+
+        return ModelResult(
+            text=model_output["text"],
+            completion_json=self._json_utils.decode_json_response(model_output["text"]),
+            prompt_tokens=model_output["prompt_tokens"],
+            completion_tokens=model_output["completion_tokens"],
+            stopped_reason=model_output["stop_reason"],
+        )
+
+    def stub_batch_output(self, model_input: Dict[str, Any]) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Answer the "modelInput" of a batch inference record immediately, for use with LocalBatchJobRunner.
+
+        Args:
+            model_input: The input of the record, as returned by batch_model_input
+
+        Returns:
+            The output of the record
+        """
+        # pylint: enable=line-too-long
+
+        result = self._respond(model_input["prompt"], None)
+        return {
+            "text": result.text,
+            "prompt_tokens": result.prompt_tokens,
+            "completion_tokens": result.completion_tokens,
+            "stop_reason": result.stopped_reason,
+        }
+
+    def _draw(self) -> Tuple[float, str | None]:
+        # pylint: disable=line-too-long
+        """
+        Draw the latency of a request and whether it fails.
+
+        Returns:
+            Tuple[float, str | None]: The latency in seconds, and "failure", "throttled" or None if it succeeds
+        """
+        # pylint: enable=line-too-long
+
+        with self._rng_lock:
+            if self._latency_distribution == LATENCY_DISTRIBUTION_UNIFORM:
+                latency = self._rng.uniform(
+                    self._latency_seconds - self._latency_spread, self._latency_seconds + self._latency_spread)
+            elif self._latency_distribution == LATENCY_DISTRIBUTION_LOGNORMAL and self._latency_seconds > 0:
+                # the median of a lognormal distribution is exp(mu)
+                latency = self._rng.lognormvariate(0.0, self._latency_spread) * self._latency_seconds
+            else:
+                latency = self._latency_seconds
+            draw = self._rng.random()
+        if draw < self._throttle_rate:
+            return 0.0, "throttled"
+        if draw < self._throttle_rate + self._failure_rate:
+            return max(latency, 0.0), "failure"
+        return max(latency, 0.0), None
+
+    def _respond(self, prompt: str, outcome: str | None) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Raise the drawn failure, or build the response to a prompt.
+
+        Args:
+            prompt (str): The text prompt.
+            outcome (str | None): "failure", "throttled" or None, as drawn by _draw
+
+        Raises:
+            ModelThrottlingException: If the request is throttled.
+            ModelException: If the request fails.
+
+        Returns:
+            ModelResult: The result of the request.
+        """
+        # pylint: enable=line-too-long
+
+        if outcome == "throttled":
+            raise ModelThrottlingException("Stub model throttled the request")
+        if outcome == "failure":
+            raise ModelException("Stub model failed the request", model.EXCEPTION_LEVEL_WARN)
+
+        # like a model response, each response gets a completion of its own
+        completion_json = (
+            copy.deepcopy(self._canned_completion) if self._canned_completion is not None
+            else self._synthesize_completion(prompt))
+        text = f"```json\n{json.dumps(completion_json, indent=2)}\n```"
+        completion_tokens = self._config.int_value(
+            "ai_model.custom.completion_tokens",
+            COMPLETION_TOKENS_EXPECTED_MIN, COMPLETION_TOKENS_EXPECTED_MAX, COMPLETION_TOKENS_DEFAULT)
+        return ModelResult(
+            text=text,
+            completion_json=completion_json,
+            prompt_tokens=self.estimate_tokens(prompt),
+            completion_tokens=completion_tokens or self.estimate_tokens(text),
+            stopped_reason=self._config.str_value("ai_model.custom.stop_reason", "end_turn"),
+        )
+
+    def _synthesize_completion(self, prompt: str) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Synthesize a completion with one critical location per function of the prompt's source code.
+
+        Args:
+            prompt (str): The text prompt.
+
+        Returns:
+            Dict[str, Any]: The completion JSON
+        """
+        # pylint: enable=line-too-long
+
+        match = SOURCE_CODE_PATTERN.search(prompt)
+        functions = self._find_functions(match.group(1) if match else "")
+        priorities = self._config.list_value("tracing_priorities", []) or ["Function Entry/Exit Points"]
+
+        locations: Dict[str, List[Dict[str, Any]]] = {}
+        for qualified_name, name, line in functions:
+            priority = priorities[sum(name.encode("utf-8")) % len(priorities)]
+            locations.setdefault(priority, []).append({
+                "location_name": name,
+                "function_name": qualified_name,
+                "code_block": line,
+                "rationale": f"{name} is a {priority.lower()} location",
+                "trace_info": f"Arguments and result of {name}",
+            })
+
+        completion_json = {
+            "overall_analysis_summary": f"The source code defines {len(functions)} functions and methods.",
+            "priorities": [
+                {"priority": priority, "critical_locations": locations[priority]}
+                for priority in priorities if priority in locations
+            ],
+        }
+        if "\"function_summaries\"" in prompt:
+            completion_json["function_summaries"] = {
+                qualified_name: f"{qualified_name} is analyzed." for qualified_name, _, _ in functions
+            }
+        return completion_json
+
+    def _find_functions(self, source_code: str) -> List[Tuple[str, str, str]]:
+        # pylint: disable=line-too-long
+        """
+        Find the functions and methods of source code without parsing it, since chunks may not parse.
+
+        Args:
+            source_code (str): The source code
+
+        Returns:
+            List[Tuple[str, str, str]]: The qualified name, name and definition line of each function
+        """
+        # pylint: enable=line-too-long
+
+        functions = []
+        classes: List[Tuple[int, str]] = []
+        for match in FUNCTION_PATTERN.finditer(source_code):
+            indent = len(match.group(1) if match.group(2) else match.group(3))
+            while classes and classes[-1][0] >= indent:
+                classes.pop()
+            if match.group(4):
+                classes.append((indent, match.group(4)))
+                continue
+            name = match.group(2)
+            qualified_name = ".".join([class_name for _, class_name in classes] + [name])
+            line_end = source_code.find("\n", match.start())
+            line = source_code[match.start():line_end if line_end >= 0 else len(source_code)]
+            functions.append((qualified_name, name, line.strip()))
+        return functions
+
+    @property
+    def model_id(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the model ID of the stub.
+
+        Returns:
+            str: The model ID string.
+        """
+        # pylint: enable=line-too-long
+
+        return "local.stub-v1"
+
+    @property
+    def model_name(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the human-readable name of the model.
+
+        Returns:
+            str: The human-readable model name.
+        """
+        # pylint: enable=line-too-long
+
+        return "Stub"
+
+    @property
+    def model_vendor(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the vendor name for the model.
+
+        Returns:
+            str: The vendor name of the model.
+        """
+        # pylint: enable=line-too-long
+
+        return "Local"
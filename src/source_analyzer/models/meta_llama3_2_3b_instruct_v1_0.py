@@ -8,9 +8,10 @@ handling the specific formatting requirements and response parsing for this mode
 # pylint: enable=line-too-long
 
 import json
-from botocore.exceptions import ClientError
-from source_analyzer.models.model import BedrockModelObject, ModelException
+from typing import Any, Dict, Iterator
+from source_analyzer.models.model import BedrockModelObject, ModelResult, ModelStreamUpdate
 from common.configuration import Configuration
+from common.partial_json_parser import PartialJsonParser
 
 MAX_GEN_LEN_EXPECTED_MIN = 0
 MAX_GEN_LEN_EXPECTED_MAX = 204800
@@ -26,13 +27,19 @@ class MetaLlama323bInstructV1(BedrockModelObject):
     parsing required for the Llama 3.2 3B Instruct model. It provides methods for
     generating text and processing responses, including JSON extraction and token
     usage tracking.
-
-    Attributes:
-        completion_json (dict): Structured data extracted from the model's response,
-            containing overall analysis summary and priorities.
     """
     # pylint: enable=line-too-long
 
+    DEFAULT_CONTEXT_WINDOW_TOKENS = 128000
+
+    # The Llama 3 tokenizer extends the cl100k_base vocabulary
+    TOKEN_ENCODING_NAME = "cl100k_base"
+    TOKEN_ESTIMATE_FACTOR = 1.0
+
+    # Bedrock on-demand pricing
+    DEFAULT_INPUT_PRICE_PER_1K_TOKENS = 0.00015
+    DEFAULT_OUTPUT_PRICE_PER_1K_TOKENS = 0.00015
+
     def __init__(self, configuration: Configuration):
         # pylint: disable=line-too-long
         """
@@ -46,7 +53,7 @@ class MetaLlama323bInstructV1(BedrockModelObject):
 
         super().__init__(configuration=configuration)
 
-    def generate_text(self, prompt):
+    def generate_text(self, prompt, on_token=None):
         # pylint: disable=line-too-long
         """
         Generate text using the Llama 3.2 3B Instruct model.
@@ -57,6 +64,11 @@ class MetaLlama323bInstructV1(BedrockModelObject):
 
         Args:
             prompt (str): The input prompt to send to the model.
+            on_token (Callable[[str], None], optional): When given, the response is streamed and each text
+                fragment is passed to this callable as it arrives. Defaults to None.
+
+        Returns:
+            ModelResult: The text, completion JSON, token usage and stop reason of the response.
 
         Raises:
             ModelException: If there's an error invoking the model through AWS Bedrock.
@@ -65,6 +77,99 @@ class MetaLlama323bInstructV1(BedrockModelObject):
 
         self._logger.trace("start generate_text")
 
+        if on_token is not None:
+            result = self._generate_text_to_callback(prompt, on_token)
+            self._logger.trace("end generate_text (streamed)")
+            return result
+
+        response = self.invoke_model(request=self._build_request(prompt=prompt))
+        self._logger.debug("response:")
+        self._logger.debug(response, enable_pformat=True)
+
+        result = self._handle_response(response=response)
+        self._logger.trace("end generate_text")
+        return result
+
+    def generate_text_stream(self, prompt) -> Iterator[ModelStreamUpdate]:
+        # pylint: disable=line-too-long
+        """
+        Generate text using the Llama 3.2 3B Instruct model, yielding the response as it is streamed.
+
+        Every chunk of a Llama response stream carries a "generation" text fragment; the prompt token
+        count arrives with the first chunk, and the stop reason and generation token count with the last.
+        Once the stream ends, the reassembled response is processed as a non-streaming response would be.
+
+        Args:
+            prompt (str): The input prompt to send to the model.
+
+        Raises:
+            ModelException: If there's an error invoking the model through AWS Bedrock.
+
+        Yields:
+            ModelStreamUpdate: Each text fragment and the completion JSON parsed so far, then the result
+                of the request.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger.trace("start generate_text_stream")
+
+        response = self.invoke_model_with_response_stream(request=self._build_request(prompt=prompt))
+        parser = PartialJsonParser()
+        model_response = {"prompt_token_count": 0, "generation_token_count": 0, "stop_reason": None}
+        for chunk in self.iter_stream_chunks(response):
+            text = chunk.get("generation") or ""
+            if chunk.get("prompt_token_count") is not None:
+                model_response["prompt_token_count"] = chunk["prompt_token_count"]
+            if chunk.get("generation_token_count") is not None:
+                model_response["generation_token_count"] = chunk["generation_token_count"]
+            if chunk.get("stop_reason") is not None:
+                model_response["stop_reason"] = chunk["stop_reason"]
+            if text:
+                yield ModelStreamUpdate(
+                    text=text, partial_json=self.partial_completion_json(parser.feed(text)))
+
+        model_response["generation"] = parser.text
+        result = self._handle_model_response(model_response=model_response)
+        yield ModelStreamUpdate(text="", partial_json=result.completion_json, result=result)
+        self._logger.trace("end generate_text_stream")
+
+    def partial_completion_json(self, data: Any) -> Dict[str, Any] | None:
+        # pylint: disable=line-too-long
+        """
+        Convert the JSON parsed from an incomplete Llama response into the shape of completion_json.
+
+        Llama nests the message and the priorities in its overall_analysis_summary object.
+
+        Args:
+            data: The JSON parsed from the response received so far
+
+        Returns:
+            The partial completion JSON, or None if the response has no JSON object yet
+        """
+        # pylint: enable=line-too-long
+
+        data = super().partial_completion_json(data)
+        if data is None:
+            return None
+        summary = data.get("overall_analysis_summary")
+        if not isinstance(summary, dict):
+            return {}
+        return {key: summary[source_key] for key, source_key in (
+            ("overall_analysis_summary", "message"), ("priorities", "priorities")) if source_key in summary}
+
+    def _build_request(self, prompt) -> str:
+        # pylint: disable=line-too-long
+        """
+        Build the Llama 3.2 3B Instruct request body for a prompt.
+
+        Args:
+            prompt (str): The input prompt to send to the model.
+
+        Returns:
+            str: The JSON request body.
+        """
+        # pylint: enable=line-too-long
+
         self._logger.debug("prompt:")
         self._logger.debug(prompt)
         formatted_prompt = f"""
@@ -91,28 +196,7 @@ class MetaLlama323bInstructV1(BedrockModelObject):
         self._logger.debug(native_request, enable_pformat=True)
 
         # Convert the native request to JSON.
-        request = json.dumps(native_request)
-
-        try:
-            # Get a client for the model.
-            client = self.model_client
-            # Invoke the model with the request.
-            response = client.invoke_model(modelId=self.model_id, body=request)
-            self._logger.debug("response:")
-            self._logger.debug(response, enable_pformat=True)
-        except ClientError as ce:
-            error_code = ce.response["Error"]["Code"]
-            self._logger.trace(
-                __class__,
-                f"end generate_text with Bedrock invoke_model error ({error_code}): {str(ce)}",
-            )
-            raise ModelException(
-                f"Bedrock invoke_model error ({error_code}): {str(ce)}"
-            ) from ce
-
-        # return self._handle_response(response=response)
-        self._handle_response(response=response)
-        self._logger.trace("end generate_text")
+        return json.dumps(native_request)
 
     def _handle_response(self, response):
         # pylint: disable=line-too-long
@@ -127,12 +211,32 @@ class MetaLlama323bInstructV1(BedrockModelObject):
         Args:
             response: The raw response from the model invocation containing the
                 response body and metadata.
+
+        Returns:
+            ModelResult: The result of the request.
         """
         # pylint: enable=line-too-long
 
         self._logger.trace("start _handle_response")
         # Decode the response body.
         model_response: dict = json.loads(response["body"].read())
+        result = self._handle_model_response(model_response=model_response)
+        self._logger.trace("end _handle_response")
+        return result
+
+    def _handle_model_response(self, model_response: dict) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Process a decoded Llama 3.2 3B Instruct response body.
+
+        Args:
+            model_response (dict): The decoded response body.
+
+        Returns:
+            ModelResult: The result of the request.
+        """
+        # pylint: enable=line-too-long
+
         self._logger.debug("model_response keys")
         self._logger.debug(model_response.keys(), enable_pformat=True)
         self._logger.debug("model_response")
@@ -144,38 +248,30 @@ class MetaLlama323bInstructV1(BedrockModelObject):
             __class__, f"response_text: {response_text}", enable_pformat=True
         )
 
-        extracted_json = self._json_utils.extract_json(response_text)
-        self._logger.debug(
-            __class__, f"Extracted code blocks type: {type(extracted_json)}"
-        )
-        self._logger.debug(
-            __class__, f"Extracted code blocks len: {len(extracted_json)}"
-        )
-        self._logger.debug("Extracted json:")
-        self._logger.debug(extracted_json, enable_pformat=True)
-
-        data = self._json_utils.json_loads(json_string=extracted_json)
+        data = self._json_utils.decode_json_response(response_text)
         data: dict = data[0] if isinstance(data, list) else data
         self._logger.debug("data:")
         self._logger.debug(data, enable_pformat=True)
 
-        self.completion_json = {}
-        self.completion_json["overall_analysis_summary"] = data.get(
+        completion_json = {}
+        completion_json["overall_analysis_summary"] = data.get(
             "overall_analysis_summary"
         ).get("message")
-        self.completion_json["priorities"] = data.get("overall_analysis_summary").get(
+        completion_json["priorities"] = data.get("overall_analysis_summary").get(
             "priorities"
         )
 
-        self.increment_prompt_tokens(value=model_response["prompt_token_count"])
-        self.increment_completion_tokens(value=model_response["generation_token_count"])
-        self.stopped_reason = model_response["stop_reason"]
-
         # Return the response text.
         self._logger.debug(
             __class__, f"response text: {response_text}", enable_pformat=True
         )
-        self._logger.trace("end _handle_response")
+        return ModelResult(
+            text=response_text,
+            completion_json=completion_json,
+            prompt_tokens=model_response["prompt_token_count"],
+            completion_tokens=model_response["generation_token_count"],
+            stopped_reason=model_response["stop_reason"],
+        )
 
     @property
     def model_id(self) -> str:
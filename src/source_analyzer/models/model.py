@@ -8,10 +8,18 @@ a factory pattern for creating model instances.
 """
 # pylint: enable=line-too-long
 
+import json
+import math
 import os
-from abc import ABC
-from typing import Dict, List
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Tuple
 import boto3
+import tiktoken
+from botocore.config import Config
 from botocore.exceptions import ClientError, TokenRetrievalError
 from common.generic_utils import GenericUtils
 from common.logging_utils import LoggingUtils
@@ -29,10 +37,107 @@ RETRY_DELAY_EXPECTED_MIN = 0
 RETRY_DELAY_EXPECTED_MAX = 30
 RETRY_DELAY_DEFAULT = 1
 
+MAX_RETRY_DELAY_EXPECTED_MIN = 0
+MAX_RETRY_DELAY_EXPECTED_MAX = 300
+MAX_RETRY_DELAY_DEFAULT = 30
+
+MAX_THROTTLED_LLM_TRIES_EXPECTED_MIN = 1
+MAX_THROTTLED_LLM_TRIES_EXPECTED_MAX = 20
+MAX_THROTTLED_LLM_TRIES_DEFAULT = 8
+
 TEMPERATURE_EXPECTED_MIN = 0.0
 TEMPERATURE_EXPECTED_MAX = 1.0
 TEMPERATURE_DEFAULT = 0.0
 
+CONTEXT_WINDOW_TOKENS_EXPECTED_MIN = 1024
+CONTEXT_WINDOW_TOKENS_EXPECTED_MAX = 2000000
+
+# Python source averages a little under four characters per token; used when no tokenizer is available
+CHARS_PER_TOKEN_ESTIMATE = 3.5
+
+PRICE_EXPECTED_MIN = 0.0
+PRICE_EXPECTED_MAX = 1000.0
+
+# Fragments of Bedrock ValidationException messages reporting a prompt longer than the context window
+CONTEXT_WINDOW_ERROR_FRAGMENTS = ("too long", "too many tokens", "context length", "context window")
+
+# Bedrock error codes for requests rejected by throttling; errors in a response stream use lower camel case
+THROTTLING_ERROR_CODES = ("ThrottlingException", "throttlingException", "TooManyRequestsException")
+
+MAX_POOL_CONNECTIONS_EXPECTED_MIN = 1
+MAX_POOL_CONNECTIONS_EXPECTED_MAX = 1000
+MAX_POOL_CONNECTIONS_DEFAULT = 10
+
+# boto3 clients are thread-safe but slow to create, so one is shared per region and client settings
+_bedrock_clients: Dict[Tuple[str, int, bool], Any] = {}
+_bedrock_clients_lock = threading.Lock()
+
+@lru_cache(maxsize=None)
+def get_token_encoding(encoding_name: str) -> tiktoken.Encoding | None:
+    # pylint: disable=line-too-long
+    """
+    Load a tiktoken encoding once per process.
+
+    tiktoken downloads the encoding the first time it is used, so it may be unavailable on hosts
+    without network access; callers then fall back to a character-based estimate.
+
+    Args:
+        encoding_name: The tiktoken encoding name, such as cl100k_base
+
+    Returns:
+        The encoding, or None if it cannot be loaded
+    """
+    # pylint: enable=line-too-long
+
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        LoggingUtils().get_class_logger(class_name=__name__).warning(
+            f"Cannot load token encoding '{encoding_name}', estimating tokens from characters: {str(e)}")
+        return None
+
+def get_bedrock_client(region_name: str, max_pool_connections: int, tcp_keepalive: bool) -> Any:
+    # pylint: disable=line-too-long
+    """
+    Get the shared bedrock-runtime client for a region and client settings, creating it on first use.
+
+    Creating a client loads the endpoint and service models, resolves credentials and builds a new
+    connection pool, so reusing one client also reuses its open connections across requests.
+
+    Args:
+        region_name: The AWS region
+        max_pool_connections: The maximum number of connections the client keeps open
+        tcp_keepalive: Whether to enable TCP keep-alive on the connections
+
+    Returns:
+        The bedrock-runtime client
+    """
+    # pylint: enable=line-too-long
+
+    key = (region_name, max_pool_connections, tcp_keepalive)
+    with _bedrock_clients_lock:
+        client = _bedrock_clients.get(key)
+        if client is None:
+            start = time.perf_counter()
+            # The default boto3 session is not thread-safe, so each client gets its own session
+            client = boto3.session.Session().client(
+                "bedrock-runtime",
+                region_name=region_name,
+                config=Config(
+                    read_timeout=300,
+                    # RetryPolicy retries with backoff and the rate limiter; botocore retrying
+                    # underneath would multiply the attempts and hide throttling from both
+                    retries={"total_max_attempts": 1, "mode": "standard"},
+                    max_pool_connections=max_pool_connections,
+                    tcp_keepalive=tcp_keepalive,
+                ),
+            )
+            _bedrock_clients[key] = client
+            LoggingUtils().get_class_logger(class_name=__name__).debug(
+                f"Created bedrock-runtime client for {key} in "
+                f"{(time.perf_counter() - start) * 1000:.1f} ms")
+        return client
+
 class ModelException(Exception):
     # pylint: disable=line-too-long
     """
@@ -76,6 +181,150 @@ class ModelMaxTokenLimitException(ModelException):
     def __str__(self):
         return self._message
 
+class ModelThrottlingException(ModelException):
+    # pylint: disable=line-too-long
+    """
+    Exception raised when the model service rejects a request because the request rate or token quota is exceeded.
+
+    The same request can succeed later, so this exception has the warn level. It is retried against its
+    own budget, ai_model.max_throttled_llm_tries, rather than ai_model.max_llm_tries.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, message: str):
+        super().__init__(message=message, level=EXCEPTION_LEVEL_WARN)
+
+class ModelContextWindowExceededException(ModelException):
+    # pylint: disable=line-too-long
+    """
+    Exception raised when a prompt does not fit in the model's context window.
+
+    Sending the same prompt again cannot succeed, so this exception has the error level and is not
+    retried. Callers can split the source into smaller prompts instead.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, context_window_tokens: int, prompt_tokens: int | None = None):
+        self._context_window_tokens = context_window_tokens
+        self._prompt_tokens = prompt_tokens
+        prompt_size = f" of about {prompt_tokens} tokens" if prompt_tokens is not None else ""
+        self._message = (
+            f"Prompt{prompt_size} exceeds the model context window of {context_window_tokens} tokens"
+        )
+        super().__init__(message=self._message, level=EXCEPTION_LEVEL_ERROR)
+
+    @property
+    def context_window_tokens(self) -> int:
+        """ The size of the model context window in tokens. """
+        return self._context_window_tokens
+
+    @property
+    def prompt_tokens(self) -> int | None:
+        """ The estimated number of prompt tokens, if known. """
+        return self._prompt_tokens
+
+    def __str__(self):
+        return self._message
+
+@dataclass(frozen=True)
+class ModelResult:
+    # pylint: disable=line-too-long
+    """
+    The result of one model request.
+
+    Model objects return a new result from every request instead of storing it on themselves, so one
+    model object can serve concurrent requests from threads or tasks.
+
+    The dataclass is frozen, but completion_json is a plain dictionary that is shared, not copied: with
+    the final update of a stream, with the response cache writer, and with every caller of
+    SourceCodeAnalyzer.last_completion_json. It must be treated as read-only. A changed completion is
+    built as a new dictionary and stored with dataclasses.replace, as CompletionUtils does.
+    Results loaded from the response cache or a batch inference job are decoded from JSON, so they
+    never share their completion with another result.
+
+    Attributes:
+        text (str): The text of the response
+        completion_json (Dict[str, Any]): The completion JSON extracted from the response, read-only
+        prompt_tokens (int): The number of prompt tokens used by the request
+        completion_tokens (int): The number of completion tokens used by the request
+        stopped_reason (str | None): The reason why the model stopped generating text
+    """
+    # pylint: enable=line-too-long
+
+    text: str
+    completion_json: Dict[str, Any]
+    prompt_tokens: int
+    completion_tokens: int
+    stopped_reason: str | None
+
+    @property
+    def total_tokens(self) -> int:
+        """ The number of prompt and completion tokens used by the request. """
+        return self.prompt_tokens + self.completion_tokens
+
+    def to_cache_entry(self) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Get the JSON-serializable response cache entry of the result.
+
+        Returns:
+            Dict[str, Any]: The entry, from which from_cache_entry builds an equal result
+        """
+        # pylint: enable=line-too-long
+        return {
+            "text": self.text,
+            "completion_json": self.completion_json,
+            "stopped_reason": self.stopped_reason,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+    @classmethod
+    def from_cache_entry(cls, entry: Dict[str, Any]) -> "ModelResult":
+        # pylint: disable=line-too-long
+        """
+        Build a result from a response cache entry decoded from JSON.
+
+        Args:
+            entry (Dict[str, Any]): The decoded entry; entries cached before the text was stored have none
+
+        Returns:
+            ModelResult: The result, owning the decoded completion
+        """
+        # pylint: enable=line-too-long
+        return cls(
+            text=entry.get("text", ""),
+            completion_json=entry["completion_json"],
+            prompt_tokens=entry["prompt_tokens"],
+            completion_tokens=entry["completion_tokens"],
+            stopped_reason=entry["stopped_reason"],
+        )
+
+class ModelStreamUpdate:
+    # pylint: disable=line-too-long
+    """
+    One update of a streamed model response.
+
+    Attributes:
+        text (str): The text fragment received with this update
+        partial_json (Dict[str, Any] | None): The completion JSON parsed from the response received so far,
+                                              in the shape of completion_json; None until the JSON starts
+        result (ModelResult | None): The result of the request, set on the last update only
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(
+            self, text: str, partial_json: Dict[str, Any] | None, result: ModelResult | None = None):
+        self.text = text
+        self.partial_json = partial_json
+        self.result = result
+
+    def __repr__(self):
+        return (
+            f"ModelStreamUpdate(text={self.text!r}, partial_json={self.partial_json!r}, "
+            f"result={self.result!r})"
+        )
+
 class ModelObject:
     # pylint: disable=line-too-long
     """
@@ -89,11 +338,44 @@ class ModelObject:
 
     _instance = None
 
+    # Context window of the model, used unless ai_model.context_window_tokens is configured
+    DEFAULT_CONTEXT_WINDOW_TOKENS = 8192
+
+    # tiktoken encoding approximating the model tokenizer, and the factor its counts are scaled by
+    TOKEN_ENCODING_NAME = "cl100k_base"
+    TOKEN_ESTIMATE_FACTOR = 1.0
+
+    # Prices in USD per 1,000 tokens, used unless ai_model.pricing is configured
+    DEFAULT_INPUT_PRICE_PER_1K_TOKENS = 0.0
+    DEFAULT_OUTPUT_PRICE_PER_1K_TOKENS = 0.0
+
     def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
         if not cls._instance:
             cls._instance = super().__new__(cls)
         return cls._instance
 
+    @classmethod
+    def create_isolated(cls, configuration: Configuration) -> "ModelObject":
+        # pylint: disable=line-too-long
+        """
+        Create an instance of the model class that is not the shared singleton.
+
+        Model objects keep no state of the requests they serve, so the singleton can be shared by
+        concurrent callers; callers that must not share settings cached by the instance, such as
+        max_completion_tokens, use an instance of their own.
+
+        Args:
+            configuration: Configuration object containing model settings and parameters
+
+        Returns:
+            A new, unshared instance of the model class
+        """
+        # pylint: enable=line-too-long
+
+        instance = object.__new__(cls)
+        instance.__init__(configuration=configuration)
+        return instance
+
     def __init__(self, configuration: Configuration) -> None:
         # pylint: disable=line-too-long
         """
@@ -109,23 +391,27 @@ class ModelObject:
         self._model_utils = ModelUtils(configuration=configuration)
         self._max_llm_tries = None
         self._retry_delay = None
+        self._max_retry_delay = None
+        self._max_throttled_llm_tries = None
         self._temperature = None
-        self._completion_tokens = 0
-        self._prompt_tokens = 0
         self._max_completion_tokens = None
-        self._completion_json = None
         self._json_utils = JsonUtils()
-        self._stopped_reason = None
         self._stop_valid_reasons = None
         self._stop_max_tokens_reasons = None
+        self._context_window_tokens = None
 
-    def generate_text(self, prompt: str) -> str:
+    def generate_text(self, prompt: str, on_token: Callable[[str], None] = None) -> ModelResult:
         # pylint: disable=line-too-long
         """
         Generate text based on the provided prompt.
 
         Args:
             prompt: The input text to generate a response for
+            on_token: Optional callable receiving each text fragment as it is generated. Models that
+                cannot stream their response ignore it and return the complete response as usual.
+
+        Returns:
+            The result of the request
 
         Raises:
             NotImplementedError: This method must be implemented by subclasses
@@ -134,6 +420,104 @@ class ModelObject:
 
         raise NotImplementedError("Subclasses must implement this method")
 
+    def generate_text_stream(self, prompt: str) -> Iterator[ModelStreamUpdate]:
+        # pylint: disable=line-too-long
+        """
+        Generate text based on the provided prompt, yielding the response as it arrives.
+
+        Each update carries the text fragment received and the completion JSON parsed from the response
+        so far. The last update also carries the result of the request, as generate_text returns it.
+
+        Models that cannot stream their response generate it with generate_text and yield a single
+        update with the complete response.
+
+        Args:
+            prompt: The input text to generate a response for
+
+        Yields:
+            ModelStreamUpdate: The updates of the response, in order
+        """
+        # pylint: enable=line-too-long
+
+        result = self.generate_text(prompt=prompt)
+        yield ModelStreamUpdate(text=result.text, partial_json=result.completion_json, result=result)
+
+    def _generate_text_to_callback(self, prompt: str, on_token: Callable[[str], None]) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Generate text with generate_text_stream, passing each text fragment to a callable as it arrives.
+
+        Args:
+            prompt: The input text to generate a response for
+            on_token: Receives each text fragment of the response
+
+        Returns:
+            The result of the request
+        """
+        # pylint: enable=line-too-long
+
+        result = None
+        for update in self.generate_text_stream(prompt=prompt):
+            if update.text:
+                on_token(update.text)
+            result = update.result
+        return result
+
+    def partial_completion_json(self, data: Any) -> Dict[str, Any] | None:
+        # pylint: disable=line-too-long
+        """
+        Convert the JSON parsed from an incomplete response into the shape of completion_json.
+
+        Models whose response JSON differs from completion_json override this method; it must accept
+        JSON with any of its keys missing.
+
+        Args:
+            data: The JSON parsed from the response received so far
+
+        Returns:
+            The partial completion JSON, or None if the response has no JSON object yet
+        """
+        # pylint: enable=line-too-long
+
+        data = data[0] if isinstance(data, list) and data else data
+        return data if isinstance(data, dict) else None
+
+    def batch_model_input(self, prompt: str) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Build the model-native request body of a prompt for a batch inference record.
+
+        Args:
+            prompt: The input text to generate a response for
+
+        Returns:
+            The request body, as it would be sent for the prompt
+
+        Raises:
+            NotImplementedError: If the model does not support batch inference
+        """
+        # pylint: enable=line-too-long
+
+        raise NotImplementedError(f"{self.__class__.__name__} does not support batch inference")
+
+    def batch_result(self, model_output: Dict[str, Any]) -> ModelResult:
+        # pylint: disable=line-too-long
+        """
+        Process the model-native response body of a batch inference record.
+
+        Args:
+            model_output: The decoded response body of the record
+
+        Returns:
+            The result of the record, as generate_text returns it
+
+        Raises:
+            NotImplementedError: If the model does not support batch inference
+        """
+        # pylint: enable=line-too-long
+
+        raise NotImplementedError(f"{self.__class__.__name__} does not support batch inference")
+
     @property
     def max_llm_tries(self) -> int:
         # pylint: disable=line-too-long
@@ -172,91 +556,114 @@ class ModelObject:
         return self._max_llm_tries
 
     @property
-    def completion_tokens(self) -> int:
+    def context_window_tokens(self) -> int:
         # pylint: disable=line-too-long
         """
-        Get the count of completion tokens used in the current or most recent request.
+        Get the number of tokens the model accepts in a prompt and its completion together.
 
         Returns:
-            The number of completion tokens
+            The configured ai_model.context_window_tokens, or the model class default
+
+        Raises:
+            ModelException: If the configuration value is invalid or outside the expected range
         """
         # pylint: enable=line-too-long
 
-        return self._completion_tokens
+        if self._context_window_tokens is None:
+            try:
+                self._context_window_tokens = self._config.int_value(
+                    "ai_model.context_window_tokens",
+                    CONTEXT_WINDOW_TOKENS_EXPECTED_MIN,
+                    CONTEXT_WINDOW_TOKENS_EXPECTED_MAX,
+                    self.DEFAULT_CONTEXT_WINDOW_TOKENS,
+                )
+            except (TypeError, ValueError) as e:
+                raise ModelException(
+                    "Value for context window tokens is invalid. "
+                    "Value must be a valid integer between "
+                    f"{CONTEXT_WINDOW_TOKENS_EXPECTED_MIN} and {CONTEXT_WINDOW_TOKENS_EXPECTED_MAX}."
+                ) from e
+
+        return self._context_window_tokens
 
-    def increment_completion_tokens(self, value: int) -> None:
+    def estimate_tokens(self, text: str) -> int:
         # pylint: disable=line-too-long
         """
-        Increment the completion token count by the specified value.
+        Estimate the number of tokens the model needs for a text without calling the model.
+
+        The text is counted with the TOKEN_ENCODING_NAME tiktoken encoding, scaled by
+        TOKEN_ESTIMATE_FACTOR. If the encoding cannot be loaded, the estimate is based on the number of
+        characters and errs on the high side for source code.
 
         Args:
-            value: The number of tokens to add to the completion token count
+            text: The text to estimate
+
+        Returns:
+            The estimated number of tokens
         """
         # pylint: enable=line-too-long
 
-        self._completion_tokens += value
+        encoding = get_token_encoding(self.TOKEN_ENCODING_NAME)
+        if encoding is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE)
+        return math.ceil(len(encoding.encode(text, disallowed_special=())) * self.TOKEN_ESTIMATE_FACTOR)
 
-    @completion_tokens.setter
-    def completion_tokens(self, value: int) -> None:
+    def _price_per_1k_tokens(self, key_path: str, default_value: float) -> float:
         # pylint: disable=line-too-long
         """
-        Set the completion token count to the specified value.
+        Get a configured price per 1,000 tokens.
 
         Args:
-            value: The new completion token count
-        """
-        # pylint: enable=line-too-long
-
-        self._completion_tokens = value
-
-    @property
-    def prompt_tokens(self) -> int:
-        # pylint: disable=line-too-long
-        """
-        Get the count of prompt tokens used in the current or most recent request.
+            key_path: The configuration key of the price
+            default_value: The model class default price
 
         Returns:
-            The number of prompt tokens
+            The price in USD
+
+        Raises:
+            ModelException: If the configuration value is invalid or outside the expected range
         """
         # pylint: enable=line-too-long
 
-        return self._prompt_tokens
-
-    def increment_prompt_tokens(self, value: int) -> None:
-        # pylint: disable=line-too-long
-        """
-        Increment the prompt token count by the specified value.
+        try:
+            return self._config.float_value(
+                key_path, PRICE_EXPECTED_MIN, PRICE_EXPECTED_MAX, default_value)
+        except (TypeError, ValueError) as e:
+            raise ModelException(
+                f"Value for {key_path} is invalid. Value must be a valid floating point "
+                f"between {PRICE_EXPECTED_MIN} and {PRICE_EXPECTED_MAX}."
+            ) from e
 
-        Args:
-            value: The number of tokens to add to the prompt token count
-        """
-        # pylint: enable=line-too-long
+    @property
+    def input_price_per_1k_tokens(self) -> float:
+        """ The price in USD of 1,000 prompt tokens, from ai_model.pricing.input_per_1k_tokens. """
+        return self._price_per_1k_tokens(
+            "ai_model.pricing.input_per_1k_tokens", self.DEFAULT_INPUT_PRICE_PER_1K_TOKENS)
 
-        self._prompt_tokens += value
+    @property
+    def output_price_per_1k_tokens(self) -> float:
+        """ The price in USD of 1,000 completion tokens, from ai_model.pricing.output_per_1k_tokens. """
+        return self._price_per_1k_tokens(
+            "ai_model.pricing.output_per_1k_tokens", self.DEFAULT_OUTPUT_PRICE_PER_1K_TOKENS)
 
-    @prompt_tokens.setter
-    def prompt_tokens(self, value: int) -> None:
+    def estimate_cost(self, prompt_tokens: int, completion_tokens: int) -> float:
         # pylint: disable=line-too-long
         """
-        Set the prompt token count to the specified value.
+        Estimate the price of a number of tokens.
 
         Args:
-            value: The new prompt token count
-        """
-        # pylint: enable=line-too-long
-        self._prompt_tokens = value
-
-    def reset_tokens(self) -> None:
-        # pylint: disable=line-too-long
-        """
-        Reset both completion and prompt token counters to zero.
+            prompt_tokens: The number of prompt tokens
+            completion_tokens: The number of completion tokens
 
-        This method should be called before starting a new model interaction to ensure accurate token counting.
+        Returns:
+            The price in USD
         """
         # pylint: enable=line-too-long
 
-        self.completion_tokens = 0
-        self.prompt_tokens = 0
+        return (
+            prompt_tokens * self.input_price_per_1k_tokens
+            + completion_tokens * self.output_price_per_1k_tokens
+        ) / 1000
 
     @property
     def max_completion_tokens(self) -> int:
@@ -327,7 +734,10 @@ class ModelObject:
     def retry_delay(self) -> int:
         # pylint: disable=line-too-long
         """
-        Get the delay between retry attempts in seconds.
+        Get the base delay between retry attempts in seconds.
+
+        The delay before a retry is drawn at random up to this value after the first failure, doubling the
+        upper bound with each further failure up to max_retry_delay.
 
         Returns:
             The retry delay in seconds
@@ -359,6 +769,82 @@ class ModelObject:
 
         return self._retry_delay
 
+    @property
+    def max_retry_delay(self) -> int:
+        # pylint: disable=line-too-long
+        """
+        Get the longest delay between retry attempts in seconds.
+
+        The delay before a retry grows exponentially from retry_delay with the number of failures, up to
+        this value.
+
+        Returns:
+            The maximum retry delay in seconds
+
+        Raises:
+            ModelException: If the configuration value is invalid or outside the expected range
+        """
+        # pylint: enable=line-too-long
+
+        if self._max_retry_delay is None:
+            try:
+                self._max_retry_delay = self._config.int_value(
+                    "ai_model.max_retry_delay",
+                    MAX_RETRY_DELAY_EXPECTED_MIN,
+                    MAX_RETRY_DELAY_EXPECTED_MAX,
+                    MAX_RETRY_DELAY_DEFAULT,
+                )
+            except TypeError as te:
+                raise ModelException(
+                    f"Type for max retry delay is invalid. Value must be a valid integer between "
+                    f"{MAX_RETRY_DELAY_EXPECTED_MIN} and {MAX_RETRY_DELAY_EXPECTED_MAX}."
+                ) from te
+            except ValueError as ve:
+                raise ModelException(
+                    "Value for max retry delay is invalid. "
+                    "Value must be a valid integer between "
+                    f"{MAX_RETRY_DELAY_EXPECTED_MIN} and {MAX_RETRY_DELAY_EXPECTED_MAX}."
+                ) from ve
+
+        return self._max_retry_delay
+
+    @property
+    def max_throttled_llm_tries(self) -> int:
+        # pylint: disable=line-too-long
+        """
+        Get the maximum number of tries for LLM API calls rejected by throttling.
+
+        Returns:
+            The maximum number of tries while the calls are throttled
+
+        Raises:
+            ModelException: If the configuration value is invalid or outside the expected range
+        """
+        # pylint: enable=line-too-long
+
+        if self._max_throttled_llm_tries is None:
+            try:
+                self._max_throttled_llm_tries = self._config.int_value(
+                    "ai_model.max_throttled_llm_tries",
+                    MAX_THROTTLED_LLM_TRIES_EXPECTED_MIN,
+                    MAX_THROTTLED_LLM_TRIES_EXPECTED_MAX,
+                    MAX_THROTTLED_LLM_TRIES_DEFAULT,
+                )
+            except TypeError as te:
+                raise ModelException(
+                    "Type for max throttled LLM tries is invalid. "
+                    "Value must be a valid integer between "
+                    f"{MAX_THROTTLED_LLM_TRIES_EXPECTED_MIN} and {MAX_THROTTLED_LLM_TRIES_EXPECTED_MAX}."
+                ) from te
+            except ValueError as ve:
+                raise ModelException(
+                    "Value for max throttled LLM tries is invalid. "
+                    "Value must be a valid integer between "
+                    f"{MAX_THROTTLED_LLM_TRIES_EXPECTED_MIN} and {MAX_THROTTLED_LLM_TRIES_EXPECTED_MAX}."
+                ) from ve
+
+        return self._max_throttled_llm_tries
+
     @property
     def temperature(self) -> float:
         # pylint: disable=line-too-long
@@ -473,85 +959,114 @@ class ModelObject:
 
         return self._stop_valid_reasons
 
+
+class BedrockModelObject(ModelObject, ABC):
+    # pylint: disable=line-too-long
+    """
+    AWS Bedrock-specific model object that extends the base ModelObject.
+
+    This class provides AWS Bedrock-specific functionality including client management,
+    error handling for Bedrock-specific exceptions, and AWS region configuration.
+    This is an abstract base class that requires subclasses to implement the abstract methods.
+    """
+    # pylint: enable=line-too-long
+
     @property
-    def stopped_reason(self) -> str:
+    def model_client(self) -> boto3.client:
         # pylint: disable=line-too-long
         """
-        Get the reason why the model stopped generating text in the most recent request.
+        Get the boto3 client for interacting with AWS Bedrock.
+
+        The client is shared by all model objects using the same region, aws.max_pool_connections and
+        aws.tcp_keepalive settings, including isolated ones running requests concurrently.
 
         Returns:
-            The stop reason string
+            A configured boto3 client for bedrock-runtime with appropriate region settings
         """
         # pylint: enable=line-too-long
 
-        return self._stopped_reason
+        return get_bedrock_client(
+            region_name=self._model_utils.region_name,
+            max_pool_connections=self.max_pool_connections,
+            tcp_keepalive=self._config.bool_value("aws.tcp_keepalive", "true"),
+        )
 
-    @stopped_reason.setter
-    def stopped_reason(self, stopped_reason: str) -> None:
+    @property
+    def max_pool_connections(self) -> int:
         # pylint: disable=line-too-long
         """
-        Set the reason why the model stopped generating text.
+        Get the maximum number of connections of the Bedrock client.
 
-        Args:
-            stopped_reason: The stop reason string
+        Returns:
+            The configured aws.max_pool_connections
         """
         # pylint: enable=line-too-long
-        self._stopped_reason = stopped_reason
 
-    @property
-    def completion_json(self) -> Dict[str, str]:
+        return self._config.int_value(
+            "aws.max_pool_connections",
+            MAX_POOL_CONNECTIONS_EXPECTED_MIN,
+            MAX_POOL_CONNECTIONS_EXPECTED_MAX,
+            MAX_POOL_CONNECTIONS_DEFAULT,
+        )
+
+    @abstractmethod
+    def _build_request(self, prompt: str) -> str:
         # pylint: disable=line-too-long
         """
-        Get the JSON response from the model completion.
+        Build the model specific invoke_model request body for a prompt.
+
+        Args:
+            prompt: The input text to generate a response for
 
         Returns:
-            The completion response as a dictionary
+            The JSON request body
         """
         # pylint: enable=line-too-long
 
-        return self._completion_json
-
-    @completion_json.setter
-    def completion_json(self, completion_json: Dict[str, str]) -> None:
+    @abstractmethod
+    def _handle_model_response(self, model_response: Dict[str, Any]) -> ModelResult:
         # pylint: disable=line-too-long
         """
-        Set the JSON response from the model completion.
+        Process a decoded, model specific invoke_model response body.
 
         Args:
-            completion_json: The completion response as a dictionary
+            model_response: The decoded response body
+
+        Returns:
+            The result of the request
         """
         # pylint: enable=line-too-long
 
-        self._completion_json = completion_json
+    def batch_model_input(self, prompt: str) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Build the "modelInput" of a Bedrock batch inference record: the invoke_model request body.
 
+        Args:
+            prompt: The input text to generate a response for
 
-class BedrockModelObject(ModelObject, ABC):
-    # pylint: disable=line-too-long
-    """
-    AWS Bedrock-specific model object that extends the base ModelObject.
+        Returns:
+            The decoded request body
+        """
+        # pylint: enable=line-too-long
 
-    This class provides AWS Bedrock-specific functionality including client management,
-    error handling for Bedrock-specific exceptions, and AWS region configuration.
-    This is an abstract base class that requires subclasses to implement the abstract methods.
-    """
-    # pylint: enable=line-too-long
+        return json.loads(self._build_request(prompt=prompt))
 
-    @property
-    def model_client(self) -> boto3.client:
+    def batch_result(self, model_output: Dict[str, Any]) -> ModelResult:
         # pylint: disable=line-too-long
         """
-        Get the boto3 client for interacting with AWS Bedrock.
+        Process the "modelOutput" of a Bedrock batch inference record, which is the decoded body
+        invoke_model would have returned.
+
+        Args:
+            model_output: The decoded response body of the record
 
         Returns:
-            A configured boto3 client for bedrock-runtime with appropriate region settings
+            The result of the record
         """
         # pylint: enable=line-too-long
 
-        return boto3.client(
-            "bedrock-runtime",
-            region_name=self._model_utils.region_name,
-            config=boto3.session.Config(read_timeout=300, retries={"max_attempts": 3}),
-        )
+        return self._handle_model_response(model_response=model_output)
 
     def _handle_bedrock_exceptions(self, func, *args, **kwargs):
         # pylint: disable=line-too-long
@@ -588,11 +1103,57 @@ class BedrockModelObject(ModelObject, ABC):
                 __class__.__name__,
                 f"Bedrock invoke_model error ({error_code}): {str(ce)}"
             )
+            context_window_exception = self.context_window_exception(ce)
+            if context_window_exception is not None:
+                raise context_window_exception from ce
+            throttling_exception = self.throttling_exception(ce)
+            if throttling_exception is not None:
+                raise throttling_exception from ce
             raise ModelException(
                 f"Bedrock invoke_model error ({error_code}): {str(ce)}",
                 EXCEPTION_LEVEL_WARN
             ) from ce
 
+    def throttling_exception(self, client_error: ClientError) -> ModelThrottlingException | None:
+        # pylint: disable=line-too-long
+        """
+        Recognize a Bedrock error rejecting a request because the account quota is exceeded.
+
+        Args:
+            client_error: The error raised by the Bedrock client
+
+        Returns:
+            A ModelThrottlingException to raise instead, or None for any other error
+        """
+        # pylint: enable=line-too-long
+
+        error_code = client_error.response.get("Error", {}).get("Code")
+        if error_code not in THROTTLING_ERROR_CODES:
+            return None
+        return ModelThrottlingException(f"Bedrock invoke_model error ({error_code}): {str(client_error)}")
+
+    def context_window_exception(
+            self, client_error: ClientError) -> ModelContextWindowExceededException | None:
+        # pylint: disable=line-too-long
+        """
+        Recognize a Bedrock error rejecting a prompt that is longer than the model context window.
+
+        Args:
+            client_error: The error raised by the Bedrock client
+
+        Returns:
+            A ModelContextWindowExceededException to raise instead, or None for any other error
+        """
+        # pylint: enable=line-too-long
+
+        error = client_error.response.get("Error", {})
+        if error.get("Code") != "ValidationException":
+            return None
+        message = str(error.get("Message", "")).lower()
+        if not any(fragment in message for fragment in CONTEXT_WINDOW_ERROR_FRAGMENTS):
+            return None
+        return ModelContextWindowExceededException(context_window_tokens=self.context_window_tokens)
+
     def invoke_model(self, request: str):
         # pylint: disable=line-too-long
         """
@@ -615,6 +1176,54 @@ class BedrockModelObject(ModelObject, ABC):
 
         return self._handle_bedrock_exceptions(_invoke)
 
+    def invoke_model_with_response_stream(self, request: str):
+        # pylint: disable=line-too-long
+        """
+        Invoke the Bedrock model with the given request, asking for a streamed response.
+
+        Args:
+            request: JSON string containing the model request
+
+        Returns:
+            The streaming response from the Bedrock model; its "body" is an event stream
+
+        Raises:
+            ModelException: If there's an error invoking the model
+        """
+        # pylint: enable=line-too-long
+
+        def _invoke():
+            client = self.model_client
+            return client.invoke_model_with_response_stream(modelId=self.model_id, body=request)
+
+        return self._handle_bedrock_exceptions(_invoke)
+
+    def iter_stream_chunks(self, response) -> Iterator[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Decode the chunks of a Bedrock streaming response into model-native dictionaries.
+
+        Errors raised by Bedrock while the stream is being consumed are converted to ModelExceptions
+        the same way errors raised by the initial invocation are.
+
+        Args:
+            response: The response returned by invoke_model_with_response_stream
+
+        Yields:
+            Dict[str, Any]: The decoded JSON payload of each chunk event
+        """
+        # pylint: enable=line-too-long
+
+        events = iter(response["body"])
+        while True:
+            event = self._handle_bedrock_exceptions(next, events, None)
+            if event is None:
+                return
+            chunk = event.get("chunk")
+            if chunk is None:
+                continue
+            yield json.loads(chunk["bytes"])
+
 class ModelUtils:
     # pylint: disable=line-too-long
     """
@@ -812,7 +1421,7 @@ class ModelFactory:
         self._generic_utils = GenericUtils()
         self._configuration = configuration
 
-    def get_model(self, module_name: str, class_name: str) -> ModelObject:
+    def get_model(self, module_name: str, class_name: str, shared: bool = True) -> ModelObject:
         # pylint: disable=line-too-long
         """
         Create and return a model object of the specified type.
@@ -823,6 +1432,7 @@ class ModelFactory:
         Args:
             module_name: The name of the module containing the model class
             class_name: The name of the model class to instantiate
+            shared: Whether to return the shared singleton instance or a new, isolated one. Defaults to True.
 
         Returns:
             An instance of the specified model class
@@ -834,4 +1444,6 @@ class ModelFactory:
             class_name=class_name,
             package_name="models",
         )
+        if not shared:
+            return model_class.create_isolated(configuration=self._configuration)
         return model_class(configuration=self._configuration)
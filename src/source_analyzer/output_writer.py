@@ -0,0 +1,165 @@
+# pylint: disable=line-too-long
+"""
+Writers of the formatted analysis of each file, as soon as it is ready.
+
+Whole-repository runs produce a Markdown document per file. Rather than holding a document in memory
+and logging it once it is complete, process_directory hands each one to an OutputWriter as the pieces
+the formatter streams, so memory stays flat and the analysis of each file can be read while the run
+goes on.
+
+Classes:
+    OutputWriter: Writes the formatted analysis of each file; the interface of the writers below
+    StreamOutputWriter: Writes the formatted analysis of every file to one stream, such as stdout
+    DirectoryOutputWriter: Writes the formatted analysis of each file to its own Markdown file
+"""
+# pylint: enable=line-too-long
+
+import os
+import sys
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable, TextIO
+from common.logging_utils import LoggingUtils
+
+OUTPUT_FILE_SUFFIX = ".md"
+
+
+class OutputWriter(ABC):
+    # pylint: disable=line-too-long
+    """
+    Writes the formatted analysis of each file as the formatter produces it.
+
+    process_directory writes files one at a time, in sorted path order, from the thread that called it.
+    """
+    # pylint: enable=line-too-long
+
+    @abstractmethod
+    def write(self, source_path: str, chunks: Iterable[str]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Write the formatted analysis of a file.
+
+        Args:
+            source_path (str): The path of the analyzed file
+            chunks (Iterable[str]): The pieces of the formatted analysis, written as they are produced
+
+        Raises:
+            Exception: Any exception raised while producing the pieces, after discarding the incomplete output
+        """
+        # pylint: enable=line-too-long
+
+
+class StreamOutputWriter(OutputWriter):
+    # pylint: disable=line-too-long
+    """
+    Writes the formatted analysis of every file to one stream, separated by a blank line.
+
+    The stream is flushed after each piece, so the analysis of a file is visible while it is formatted.
+    Pieces already written when producing the analysis fails cannot be taken back.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, stream: TextIO | None = None):
+        # pylint: disable=line-too-long
+        """
+        Initialize the writer.
+
+        Args:
+            stream (TextIO | None, optional): The stream to write to. Defaults to None, for sys.stdout.
+        """
+        # pylint: enable=line-too-long
+
+        self._stream = stream
+
+    def write(self, source_path: str, chunks: Iterable[str]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Write the formatted analysis of a file to the stream.
+
+        Args:
+            source_path (str): The path of the analyzed file
+            chunks (Iterable[str]): The pieces of the formatted analysis
+        """
+        # pylint: enable=line-too-long
+
+        # sys.stdout is looked up on each write, as it may be replaced after the writer is created
+        stream = self._stream or sys.stdout
+        for chunk in chunks:
+            stream.write(chunk)
+            stream.flush()
+        stream.write("\n\n")
+        stream.flush()
+
+
+class DirectoryOutputWriter(OutputWriter):
+    # pylint: disable=line-too-long
+    """
+    Writes the formatted analysis of each file to a Markdown file of an output directory.
+
+    The output file mirrors the path of the analyzed file below the analyzed directory, with ".md"
+    appended: the analysis of <source_root>/pkg/module.py is written to <output_dir>/pkg/module.py.md.
+    Each output file is written to a temporary file and renamed when complete, so readers never see
+    a partial analysis and a failed analysis leaves the previous output in place.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, output_dir: str, source_root: str):
+        # pylint: disable=line-too-long
+        """
+        Initialize the writer.
+
+        Args:
+            output_dir (str): The directory to write the output files to. It is created as needed.
+            source_root (str): The analyzed directory, or the directory of the analyzed file
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._output_dir = Path(output_dir)
+        self._source_root = Path(source_root)
+
+    def output_path(self, source_path: str) -> Path:
+        # pylint: disable=line-too-long
+        """
+        Get the output file of an analyzed file.
+
+        Args:
+            source_path (str): The path of the analyzed file
+
+        Returns:
+            Path: The output file. A file outside of the source root is written to the top of the output directory.
+        """
+        # pylint: enable=line-too-long
+
+        try:
+            relative_path = Path(source_path).resolve().relative_to(self._source_root.resolve())
+        except ValueError:
+            relative_path = Path(Path(source_path).name)
+        return self._output_dir / relative_path.with_name(relative_path.name + OUTPUT_FILE_SUFFIX)
+
+    def write(self, source_path: str, chunks: Iterable[str]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Write the formatted analysis of a file to its output file.
+
+        Args:
+            source_path (str): The path of the analyzed file
+            chunks (Iterable[str]): The pieces of the formatted analysis
+
+        Raises:
+            Exception: Any exception raised while producing the pieces, after removing the temporary file
+        """
+        # pylint: enable=line-too-long
+
+        output_path = self.output_path(source_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = output_path.with_name(f"{output_path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporary_path, "w", encoding="utf-8") as output_file:
+                for chunk in chunks:
+                    output_file.write(chunk)
+            os.replace(temporary_path, output_path)
+        except BaseException:
+            temporary_path.unlink(missing_ok=True)
+            raise
+        self._logger.debug(f"Wrote the analysis of '{source_path}' to '{output_path}'")
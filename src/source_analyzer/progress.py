@@ -0,0 +1,44 @@
+# pylint: disable=line-too-long
+"""
+Progress reporting of source code analyses.
+
+Callers of SourceCodeAnalyzer pass a ProgressCallback receiving the name of each analysis phase and a
+dictionary of phase-specific details, so that interactive renderers can display an analysis as it
+progresses.
+"""
+# pylint: enable=line-too-long
+
+from typing import Any, Callable, Dict
+from common.logging_utils import LoggingUtils
+
+PROGRESS_PHASE_QUEUED = "queued"
+PROGRESS_PHASE_PROMPT_BUILT = "prompt_built"
+PROGRESS_PHASE_MODEL_INVOKED = "model_invoked"
+PROGRESS_PHASE_TOKENS_STREAMED = "tokens_streamed"
+PROGRESS_PHASE_FORMATTED = "formatted"
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+_logger = LoggingUtils().get_class_logger(class_name="progress")
+
+
+def report_progress(progress_callback: ProgressCallback | None, phase: str, **details) -> None:
+    # pylint: disable=line-too-long
+    """
+    Report an analysis phase to the caller-supplied progress callback, if any.
+
+    Progress reporting must never break an analysis, so exceptions raised by the callback are
+    logged and discarded.
+
+    Args:
+        progress_callback (ProgressCallback | None): Callable receiving the phase name and a details dictionary
+        phase (str): One of the PROGRESS_PHASE_* constants
+        **details: Phase-specific details passed to the callback
+    """
+    # pylint: enable=line-too-long
+    if progress_callback is None:
+        return
+    try:
+        progress_callback(phase, details)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        _logger.warning(f"Progress callback failed for phase '{phase}': {str(e)}")
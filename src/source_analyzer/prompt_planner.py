@@ -0,0 +1,288 @@
+# pylint: disable=line-too-long
+"""
+Planning of the prompts a source code analysis sends to the model.
+
+Before the model is invoked, the source of a file is reduced to the context of the analyzed functions
+when prompt.function_scoped is enabled, and split into chunks when chunking is enabled or its prompt
+exceeds the file token budget. Each chunk is then analyzed with a prompt of its own.
+
+Classes:
+    PromptPlanner: Builds the prompts of an analysis and decides how source is split across them
+"""
+# pylint: enable=line-too-long
+
+from typing import List, Tuple
+from common.configuration import Configuration
+from common.logging_utils import LoggingUtils
+from source_analyzer.models.model import ModelObject
+from source_analyzer.source_chunker import SourceChunk, SourceChunker
+from source_analyzer.source_context_extractor import SourceContextExtractor
+from source_analyzer.token_budget import TokenBudgetExceededException
+
+OVER_BUDGET_FILE_SPLIT = "split"
+OVER_BUDGET_FILE_SKIP = "skip"
+
+FUNCTION_SCOPED_SOURCE_DESCRIPTION = (
+    " The source code is an excerpt of the file: the imports, constants and helper signatures the function uses,"
+    " its class header, and the function itself."
+)
+FUNCTIONS_SCOPED_SOURCE_DESCRIPTION = (
+    " The source code is an excerpt of the file: the imports, constants and helper signatures the functions use,"
+    " their class headers, and the functions themselves."
+)
+CHUNK_SOURCE_DESCRIPTION = (
+    " The source code is part {part} of {parts} of the file."
+    " The imports, and the header of a class split across parts, are repeated in every part."
+)
+
+
+class PromptPlanner:
+    # pylint: disable=line-too-long
+    """
+    Builds the prompts asking a model for the critical locations of source code.
+
+    The token estimates the plan is based on are those of the model the prompts are sent to.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, configuration: Configuration, model: ModelObject):
+        # pylint: disable=line-too-long
+        """
+        Initialize a planner.
+
+        Args:
+            configuration (Configuration): The prompt, chunking and budget settings
+            model (ModelObject): The model the prompts are sent to
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._config = configuration
+        self._model = model
+
+    def scope_source_code(self, source_code: str, function_names: List[str]) -> Tuple[str, str]:
+        # pylint: disable=line-too-long
+        """
+        Reduce the source to the context of the analyzed functions, if prompt.function_scoped is enabled.
+
+        Args:
+            source_code (str): The source code of the file
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+
+        Returns:
+            Tuple[str, str]: The source to send and the sentence describing it in the prompt
+        """
+        # pylint: enable=line-too-long
+        if function_names and self._config.bool_value("prompt.function_scoped", "true"):
+            function_context = SourceContextExtractor().extract_functions(source_code, function_names)
+            if function_context is not None:
+                return function_context, (
+                    FUNCTION_SCOPED_SOURCE_DESCRIPTION if len(function_names) == 1
+                    else FUNCTIONS_SCOPED_SOURCE_DESCRIPTION)
+        return source_code, ""
+
+    def plan_chunks(
+            self, source_code: str, function_names: List[str],
+            source_description: str) -> List[SourceChunk]:
+        # pylint: disable=line-too-long
+        """
+        Decide, without invoking the model, whether source is analyzed with one prompt or in chunks.
+
+        Args:
+            source_code (str): The source code to analyze
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+            source_description (str): The sentence describing the source in the prompt
+
+        Returns:
+            List[SourceChunk]: The chunks to analyze; a single chunk holding the whole source if it is not split
+
+        Raises:
+            TokenBudgetExceededException: If the prompt exceeds budget.max_file_tokens and cannot or may not be split
+        """
+        # pylint: enable=line-too-long
+        max_file_tokens = self._config.int_value("budget.max_file_tokens", 0, None, 0)
+        over_budget = False
+        if max_file_tokens > 0:
+            prompt_tokens = self._model.estimate_tokens(
+                self.build_prompt(source_code, function_names, source_description))
+            over_budget = prompt_tokens > max_file_tokens
+            if over_budget and self._over_budget_file_action() == OVER_BUDGET_FILE_SKIP:
+                raise TokenBudgetExceededException(
+                    f"Prompt of about {prompt_tokens} tokens exceeds the file token budget of "
+                    f"{max_file_tokens}")
+
+        source_tokens = self._model.estimate_tokens(source_code)
+        max_source_tokens = self.max_source_tokens(function_names)
+        self._logger.debug(
+            f"source tokens: about {source_tokens}, max_source_tokens: {max_source_tokens}")
+        chunking_enabled = self._config.bool_value("chunking.enabled", "false")
+        if not (chunking_enabled or over_budget) or source_tokens <= max_source_tokens:
+            return [SourceChunk(source_code, [])]
+
+        chunks = SourceChunker().chunk(source_code, max_source_tokens, self._model.estimate_tokens)
+        if over_budget:
+            largest_prompt_tokens = max(
+                self._model.estimate_tokens(self.build_prompt(
+                    chunk.source, function_names, self.chunk_description(index, len(chunks))))
+                for index, chunk in enumerate(chunks)
+            )
+            if largest_prompt_tokens > max_file_tokens:
+                raise TokenBudgetExceededException(
+                    f"Source cannot be split into prompts within the file token budget of "
+                    f"{max_file_tokens}; the largest needs about {largest_prompt_tokens} tokens")
+        return chunks
+
+    def file_prompts(self, source_code: str) -> List[str]:
+        # pylint: disable=line-too-long
+        """
+        Build the prompts analyzing all functions of source code: one, or one per chunk if the source is split.
+
+        Args:
+            source_code (str): The source code of the file
+
+        Returns:
+            List[str]: The prompts, in source order
+
+        Raises:
+            TokenBudgetExceededException: If the prompt exceeds budget.max_file_tokens and cannot or may not be split
+        """
+        # pylint: enable=line-too-long
+        chunks = self.plan_chunks(source_code, [], "")
+        return [
+            self.build_prompt(chunk.source, [], self.chunk_description(index, len(chunks)))
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def _over_budget_file_action(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get what is done with source whose prompt exceeds budget.max_file_tokens.
+
+        Returns:
+            str: OVER_BUDGET_FILE_SPLIT or OVER_BUDGET_FILE_SKIP
+
+        Raises:
+            ValueError: If budget.over_budget_file is neither
+        """
+        # pylint: enable=line-too-long
+        action = self._config.str_value("budget.over_budget_file", OVER_BUDGET_FILE_SPLIT)
+        if action not in (OVER_BUDGET_FILE_SPLIT, OVER_BUDGET_FILE_SKIP):
+            raise ValueError(
+                f"Invalid budget.over_budget_file '{action}'; expected "
+                f"'{OVER_BUDGET_FILE_SPLIT}' or '{OVER_BUDGET_FILE_SKIP}'")
+        return action
+
+    def chunk_description(self, index: int, count: int) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the sentence describing a chunk in its prompt.
+
+        Args:
+            index (int): The zero-based index of the chunk
+            count (int): The number of chunks
+
+        Returns:
+            str: The description, or an empty string if the source is not split
+        """
+        # pylint: enable=line-too-long
+        return CHUNK_SOURCE_DESCRIPTION.format(part=index + 1, parts=count) if count > 1 else ""
+
+    def max_source_tokens(self, function_names: List[str]) -> int:
+        # pylint: disable=line-too-long
+        """
+        Get the number of source tokens above which source is analyzed in chunks.
+
+        The configured chunking.max_source_tokens is capped at half the model context window, leaving
+        the other half for the instructions of the prompt and the completion. When budget.max_file_tokens
+        is set, it is also capped so that the prompt of each chunk fits in the file budget.
+
+        Args:
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+
+        Returns:
+            int: The maximum number of estimated source tokens per prompt
+        """
+        # pylint: enable=line-too-long
+        limits = [
+            self._config.int_value("chunking.max_source_tokens", 1, None, 24000),
+            self._model.context_window_tokens // 2,
+        ]
+        max_file_tokens = self._config.int_value("budget.max_file_tokens", 0, None, 0)
+        if max_file_tokens > 0:
+            instruction_tokens = self._model.estimate_tokens(
+                self.build_prompt("", function_names, CHUNK_SOURCE_DESCRIPTION))
+            limits.append(max(max_file_tokens - instruction_tokens, 1))
+        return min(limits)
+
+    def build_prompt(
+            self, source_code: str, function_names: List[str], source_description: str) -> str:
+        # pylint: disable=line-too-long
+        """
+        Build the prompt asking the model for the critical locations of source code.
+
+        When several functions are analyzed, the model is also asked for a summary of each of them
+        under "function_summaries", so that the result can be split by function.
+
+        Args:
+            source_code (str): The source code to analyze
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+            source_description (str): A sentence added to the instructions describing what part of the file the source is
+
+        Returns:
+            str: The prompt
+        """
+        # pylint: enable=line-too-long
+        tracing_priorities = self._config.list_value("tracing_priorities", [])
+        clarifications = self._config.list_value("clarifications", [])
+        function_name = ", ".join(function_names) if function_names else None
+        if len(function_names) > 1:
+            embed_function_name = f"only the functions or methods named {function_name}"
+        else:
+            embed_function_name = (
+                f"only the function or method named {function_name}" if function_name is not None
+                else "all functions and methods"
+            )
+        exclude_others = " Exclude all other functions and methods." if function_name is not None else ""
+        found_text = f" within {function_name}" if function_name is not None else ""
+        summary_instruction = (
+            f"A summary of the source code analysis. In the summary describe only the {function_name}.")
+        function_summaries = (
+            "\n- \"function_summaries\": An object with a summary of each of the functions or methods, "
+            "keyed by the name given above."
+            if len(function_names) > 1 else ""
+        )
+
+        return f"""
+Analyze the following Python source code and identify critical locations for adding trace statements.
+Within the source code, analyze {embed_function_name}.{exclude_others}{source_description}
+Categorize critical locations based on the following priorities.
+
+Priorities:
+{', '.join(tracing_priorities)}
+
+{'\n'.join(clarifications)}
+
+For each critical location found{found_text}, include the following details:
+1. Name of the location function/method.
+2. Fully-qualified name of the containing function/method.
+3. Specific code blocks/lines to trace. Include the function/method name and parent class name.
+4. Rationale for tracing.
+5. Recommended trace information to capture.
+
+Format the output as a JSON array with the following keys:
+- "overall_analysis_summary": {summary_instruction}{function_summaries}
+- "priorities": for each priority, list the following:
+    - "priority": the priority
+    - "critical_locations": a list of critical locations found for this priority.
+        - for each critical location found for this priority, include the following keys:
+            - "location_name": Name of the location function/method
+            - "function_name": Fully-qualified name of the function/method
+            - "code_block": Specific code block/line to trace
+            - "rationale": Rationale for tracing
+            - "trace_info": Recommended trace information to capture
+
+Source Code:
+```python
+{source_code}
+```
+"""
@@ -0,0 +1,182 @@
+# pylint: disable=line-too-long
+"""
+A content-addressed cache of model responses stored in SQLite.
+
+Analyzing the same source with the same model settings sends the same prompt, and with a temperature
+of 0.0 gets an equivalent answer. The ResponseCache keeps the parsed model response under a hash of
+everything that determines it, so re-analyzing unchanged code does not call the model again.
+
+Entries expire after a time to live, and the least recently used entries are evicted when the
+cache grows beyond its size limit.
+"""
+# pylint: enable=line-too-long
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Optional
+from common.logging_utils import LoggingUtils
+
+RESPONSE_CACHE_USE = "use"
+RESPONSE_CACHE_BYPASS = "bypass"
+RESPONSE_CACHE_REFRESH = "refresh"
+
+RESPONSE_CACHE_MODES = (RESPONSE_CACHE_USE, RESPONSE_CACHE_BYPASS, RESPONSE_CACHE_REFRESH)
+
+
+class ResponseCache:
+    # pylint: disable=line-too-long
+    """
+    A SQLite-backed cache of model responses with TTL and size-based LRU eviction.
+
+    Each operation opens its own connection, so one cache can be used from several threads and
+    processes at once.
+
+    Attributes:
+        _database_path (Path): The SQLite database file.
+        _ttl_seconds (int): Seconds an entry stays valid. 0 means entries never expire.
+        _max_size_bytes (int): The total size of the stored responses above which the least recently
+                               used entries are evicted. 0 means unlimited.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, database_path: str, ttl_seconds: int, max_size_bytes: int):
+        # pylint: disable=line-too-long
+        """
+        Initialize the cache, creating the database if needed.
+
+        Args:
+            database_path (str): The SQLite database file. Parent directories are created.
+            ttl_seconds (int): Seconds an entry stays valid. 0 means entries never expire.
+            max_size_bytes (int): The maximum total size of the stored responses. 0 means unlimited.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._database_path = Path(database_path)
+        self._ttl_seconds = ttl_seconds
+        self._max_size_bytes = max_size_bytes
+
+        self._database_path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                    "created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+                )
+                connection.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_last_used_at ON responses (last_used_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # pylint: disable=line-too-long
+        """
+        Open a connection to the cache database.
+
+        Returns:
+            sqlite3.Connection: The connection.
+        """
+        # pylint: enable=line-too-long
+
+        connection = sqlite3.connect(self._database_path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute the cache key of a request from everything that determines its response.
+
+        Args:
+            **parts: The JSON-serializable request parts, e.g. model id, temperature and prompt.
+
+        Returns:
+            str: The hex SHA-256 digest of the canonical JSON encoding of the parts.
+        """
+        # pylint: enable=line-too-long
+
+        canonical = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        # pylint: disable=line-too-long
+        """
+        Get a cached response.
+
+        Args:
+            key (str): The cache key returned by make_key.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached response, or None if it is missing or expired.
+        """
+        # pylint: enable=line-too-long
+
+        now = time.time()
+        with closing(self._connect()) as connection:
+            with connection:
+                row = connection.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                value, created_at = row
+                if 0 < self._ttl_seconds < now - created_at:
+                    connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._logger.debug(f"Response cache entry {key[:12]} expired")
+                    return None
+                connection.execute(
+                    "UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def put(self, key: str, response: Dict[str, Any]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Store a response, then drop expired entries and evict least recently used entries over the size limit.
+
+        Args:
+            key (str): The cache key returned by make_key.
+            response (Dict[str, Any]): The JSON-serializable response.
+        """
+        # pylint: enable=line-too-long
+
+        value = json.dumps(response)
+        now = time.time()
+        with closing(self._connect()) as connection:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, created_at, last_used_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now),
+                )
+                if self._ttl_seconds > 0:
+                    connection.execute(
+                        "DELETE FROM responses WHERE created_at < ?", (now - self._ttl_seconds,))
+                if self._max_size_bytes > 0:
+                    self._evict(connection)
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        # pylint: disable=line-too-long
+        """
+        Delete the least recently used entries until the total size is within the limit.
+
+        Args:
+            connection (sqlite3.Connection): The connection of the current transaction.
+        """
+        # pylint: enable=line-too-long
+
+        total_size = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total_size <= self._max_size_bytes:
+            return
+
+        evicted = 0
+        for key, size in connection.execute(
+                "SELECT key, size FROM responses ORDER BY last_used_at").fetchall():
+            if total_size <= self._max_size_bytes:
+                break
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total_size -= size
+            evicted += 1
+        self._logger.debug(f"Evicted {evicted} response cache entries")
@@ -6,29 +6,54 @@ and leverage AI-powered analysis for trace point recommendations.
 """
 # pylint: enable=line-too-long
 
-import time
+import dataclasses
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
 from pprint import pformat
+from typing import Any, Dict, Iterator, List, Tuple
 from common.path_utils import PathUtils
 from common.logging_utils import LoggingUtils
 from common.configuration import Configuration
+from common.rate_limiter import RateLimiter
 from common.generic_utils import (
     GenericUtils,
 )
+from source_analyzer.completion_requester import CompletionRequester
+from source_analyzer.completion_utils import CompletionUtils
+from source_analyzer.directory_analysis import DirectoryAnalysis
 from source_analyzer.formatters.formatter import FormatterUtils
-from source_analyzer.models import model
+from source_analyzer.formatters.records_formatter import RecordsFormatter
+from source_analyzer.formatters.repository_report_formatter import RepositoryReportFormatter
+from source_analyzer.output_writer import OutputWriter
 from source_analyzer.models.model import (
-    EXCEPTION_LEVEL_ERROR,
-    ModelException,
+    ModelContextWindowExceededException,
     ModelFactory,
     ModelObject,
     ModelMaxTokenLimitException,
+    ModelResult,
     ModelUtils,
 )
 from source_analyzer.formatters.formatter import (
     FormatterObject,
     FormatterFactory,
 )
+from source_analyzer.progress import (
+    PROGRESS_PHASE_FORMATTED,
+    PROGRESS_PHASE_PROMPT_BUILT,
+    PROGRESS_PHASE_TOKENS_STREAMED,
+    ProgressCallback,
+    report_progress,
+)
+from source_analyzer.prompt_planner import OVER_BUDGET_FILE_SPLIT, PromptPlanner
+from source_analyzer.response_cache import (
+    RESPONSE_CACHE_REFRESH,
+    RESPONSE_CACHE_USE,
+    ResponseCache,
+)
+from source_analyzer.source_chunker import SourceChunk, SourceChunker
+from source_analyzer.token_budget import TokenBudget, TokenBudgetExceededException
 
 class SourceCodeAnalyzer:
     # pylint: disable=line-too-long
@@ -44,12 +69,30 @@ class SourceCodeAnalyzer:
     """
     # pylint: enable=line-too-long
 
-    def __init__(self):
+    def __init__(
+            self, isolated: bool = False, rate_limiter: RateLimiter | None = None,
+            response_cache_mode: str = RESPONSE_CACHE_USE, token_budget: TokenBudget | None = None):
         # pylint: disable=line-too-long
         """
         Initialize the SourceCodeAnalyzer with required dependencies.
 
         Sets up utility objects, configuration, model, and formatter needed for source code analysis.
+
+        Args:
+            isolated (bool, optional): Use a model and formatter of its own instead of the shared
+                singletons. Models return the result of each request instead of keeping it, so this is
+                not needed for concurrency; the analyzer keeps the state of the analysis in progress, so
+                concurrent analyses need one analyzer each. Defaults to False.
+            rate_limiter (RateLimiter | None, optional): Limits the model requests; shared by concurrent
+                analyzers. Defaults to a limiter built from concurrency.requests_per_minute, if set.
+            response_cache_mode (str, optional): RESPONSE_CACHE_USE reads and writes the response cache,
+                RESPONSE_CACHE_REFRESH only writes it and RESPONSE_CACHE_BYPASS ignores it. Defaults to
+                RESPONSE_CACHE_USE.
+            token_budget (TokenBudget | None, optional): Limits the tokens of the run; shared by concurrent
+                analyzers. Defaults to a budget built from budget.max_run_tokens, if set.
+
+        Raises:
+            ValueError: If response_cache_mode is not one of the RESPONSE_CACHE_* modes
         """
         # pylint: enable=line-too-long
 
@@ -63,6 +106,7 @@ class SourceCodeAnalyzer:
         self._model: ModelObject = ModelFactory(configuration=self._config).get_model(
             module_name=model_utils.desired_model_module_name,
             class_name=model_utils.desired_model_class_name,
+            shared=not isolated,
         )
 
         formatter_utils = FormatterUtils(configuration=self._config)
@@ -71,9 +115,22 @@ class SourceCodeAnalyzer:
         ).get_formatter(
             module_name=formatter_utils.get_desired_formatter_module_name(),
             class_name=formatter_utils.get_desired_formatter_class_name(),
+            shared=not isolated,
+        )
+
+        self._requester = CompletionRequester(
+            configuration=self._config,
+            model=self._model,
+            rate_limiter=rate_limiter,
+            response_cache_mode=response_cache_mode,
+            token_budget=token_budget,
         )
+        self._prompt_planner = PromptPlanner(configuration=self._config, model=self._model)
+        self._completion_utils = CompletionUtils()
 
         self._total_tokens: dict = {"completion": 0, "prompt": 0}
+        self._last_error: str | None = None
+        self._result: ModelResult | None = None
 
         self._logger.debug(f"Model: {self._model.model_id}")
         self._logger.debug("_config:")
@@ -81,96 +138,130 @@ class SourceCodeAnalyzer:
         self._logger.debug("Configuration:")
         self._logger.debug(pformat(str(self._config)))
 
-    def get_completion_with_retry(self, prompt: str) -> None:
+    @property
+    def total_tokens(self) -> Dict[str, int]:
+        # pylint: disable=line-too-long
+        """
+        Get the prompt and completion tokens used by the most recent analysis.
+
+        Returns:
+            Dict[str, int]: A copy of the token counts keyed by "prompt" and "completion"
+        """
+        # pylint: enable=line-too-long
+        return dict(self._total_tokens)
+
+    @property
+    def model(self) -> ModelObject:
+        # pylint: disable=line-too-long
+        """
+        Get the model the analyzer sends its prompts to.
+
+        Returns:
+            ModelObject: The model
+        """
+        # pylint: enable=line-too-long
+        return self._model
+
+    @property
+    def token_budget(self) -> TokenBudget | None:
+        # pylint: disable=line-too-long
+        """
+        Get the token budget the prompts of the analyzer are reserved against.
+
+        Returns:
+            TokenBudget | None: The budget, or None if the tokens are unlimited
+        """
+        # pylint: enable=line-too-long
+        return self._requester.token_budget
+
+    @token_budget.setter
+    def token_budget(self, value: TokenBudget | None):
+        self._requester.token_budget = value
+
+    @property
+    def last_error(self) -> str | None:
+        # pylint: disable=line-too-long
+        """
+        Get the error message of the most recent process_file call.
+
+        process_file reports failures as its return value, so callers that cache results use this
+        property to tell an analysis from an error message.
+
+        Returns:
+            str | None: The error message, or None if the most recent call succeeded
+        """
+        # pylint: enable=line-too-long
+        return self._last_error
+
+    @property
+    def last_completion_json(self) -> Dict[str, Any] | None:
+        # pylint: disable=line-too-long
+        """
+        Get the completion of the most recent process_file or process_file_stream call that analyzed a file.
+
+        Returns:
+            Dict[str, Any] | None: The completion, merged across chunks, or None if the most recent call failed
+        """
+        # pylint: enable=line-too-long
+        if self._last_error is not None or self._result is None:
+            return None
+        return self._result.completion_json
+
+    @property
+    def last_formatter_inputs(self) -> Dict[str, Any] | None:
         # pylint: disable=line-too-long
         """
-        Get an AI completion with automatic retry logic.
+        Get the variables the completion of last_completion_json is formatted with: the model and the token usage.
 
-        Attempts to generate text from the AI model with the given prompt, implementing retry logic
-        in case of failures. Tracks token usage and handles various error conditions.
+        Returns:
+            Dict[str, Any] | None: The variables, or None if the most recent call failed
+        """
+        # pylint: enable=line-too-long
+        if self._last_error is not None or self._result is None:
+            return None
+        return self._formatter_inputs()
+
+    def get_completion_with_retry(
+            self, prompt: str, progress_callback: ProgressCallback | None = None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Get an AI completion with automatic retry logic, keeping its result and token usage for the analysis in progress.
+
+        The completion is requested as described in CompletionRequester.request, from the response cache or
+        the model, streaming the response to the progress callback if there is one.
 
         Args:
             prompt (str): The prompt to send to the AI model
+            progress_callback (ProgressCallback | None, optional): Receives phase updates. Defaults to None.
 
         Raises:
+            ModelContextWindowExceededException: If the prompt is estimated to exceed the model context window
+            TokenBudgetExceededException: If the prompt does not fit in the remaining run token budget
             ModelException: If all retry attempts fail or if a token limit exception occurs
         """
         # pylint: enable=line-too-long
         self._logger.trace("start get_completion_with_retry")
-        self._logger.debug(f"prompt:\n{prompt}")
-        self._logger.debug(
-            f"max_llm_tries: {self._model.max_llm_tries}, "
-            f"retry_delay: {self._model.retry_delay}, "
-            f"temperature: {self._model.temperature}",
-        )
-
         self._total_tokens = {"completion": 0, "prompt": 0}
-        # break_llm_loop = False
-        for attempt in range(self._model.max_llm_tries):
-            print(
-                f"Get completion attempt: (attempt {attempt + 1}/{self._model.max_llm_tries})",  # pylint: disable=line-too-long
-            )
-
-            try:
-                self._model.generate_text(prompt=prompt)
-                break
-            except ModelException as me:    # pylint: disable=broad-exception-caught
-                self._logger.error(
-                    f"Cannot generate text from model '{self._model.model_name}'."
-                    f"Reason: {me}",
-                )
-                self._logger.debug(f"ModelException level: {me.level}")
-                if me.level == EXCEPTION_LEVEL_ERROR:
-                    raise me # pylint: disable=broad-exception-raised)
-
-            if attempt < self._model.max_llm_tries - 1:
-                print(f"Retrying in {self._model.retry_delay} seconds...",)
-                time.sleep(self._model.retry_delay)
-
-        print("LLM response received")
-        self._logger.debug(
-            f"LLM Prompt Tokens: {self._model.prompt_tokens}, "
-            f"LLM Completion Tokens: {self._model.completion_tokens}, "
-            f"Stopped Reason: {self._model.stopped_reason}",
-        )
+        self._store_result(self._requester.request(prompt, progress_callback))
+        self._logger.trace("end get_completion_with_retry")
 
-        self._logger.debug(
-            f"total tokens after loop: {self._total_tokens}"
-        )
+    def _store_result(self, result: ModelResult) -> None:
+        # pylint: disable=line-too-long
+        """
+        Keep the result of a completion request, and its tokens as the totals, for the analysis in progress.
 
-        if self._model.stopped_reason in self._model.stop_max_tokens_reasons:
-            raise ModelMaxTokenLimitException(
-                max_token_limit=self._model.max_completion_tokens,
-                prompt_tokens=self._model.prompt_tokens,
-                completion_tokens=self._model.completion_tokens,
-            )
-
-        if self._model.stopped_reason not in self._model.stop_valid_reasons:
-            self._logger.warning(
-                f"Invalid stop reason '{self._model.stopped_reason}'",
-            )
-            raise ModelException(
-                f"Invalid stop reason '{self._model.stopped_reason}'",
-                model.EXCEPTION_LEVEL_ERROR,
-            )
-
-        # Update token counts
-        self._total_tokens["prompt"] += self._model.prompt_tokens
-        self._total_tokens["completion"] += self._model.completion_tokens
-
-        tokens_output = pformat(
-            {
-                "total_prompt_tokens": self._total_tokens["prompt"],
-                "total_completion_tokens": self._total_tokens["completion"],
-            }
-        )
+        Args:
+            result (ModelResult): The validated result
+        """
+        # pylint: enable=line-too-long
+        self._result = result
+        self._total_tokens = {"prompt": result.prompt_tokens, "completion": result.completion_tokens}
         self._logger.debug("total tokens:")
-        self._logger.debug(tokens_output)
-
-        self._logger.trace("end get_completion_with_retry")
+        self._logger.debug(pformat(self._total_tokens))
 
     def analyze_source_code_for_decision_points(
-            self, source_code: str, function_name: str=None) -> None:
+            self, source_code: str, function_name: str=None,
+            progress_callback: ProgressCallback | None = None) -> None:
         # pylint: disable=line-too-long
         """
         Analyze source code to identify optimal locations for adding trace statements.
@@ -178,82 +269,258 @@ class SourceCodeAnalyzer:
         Constructs a prompt with the source code and tracing priorities from configuration,
         then sends it to the AI model to identify critical locations for adding trace statements.
 
+        When a function name is given and prompt.function_scoped is enabled, only the function and
+        the context it references (imports, class header and helper signatures) are sent instead of
+        the whole file. The whole file is sent if the function cannot be located.
+
+        When chunking.enabled is set, source estimated to be larger than chunking.max_source_tokens is
+        split along class and function boundaries and the chunks are analyzed concurrently; the
+        priorities and critical locations of all chunks are merged into one result. Source that the
+        model rejects as too long, or whose analysis is cut off at the completion token limit, is
+        analyzed again in chunks.
+
+        Source whose prompt is estimated to exceed budget.max_file_tokens is split into prompts within
+        the budget or skipped, according to budget.over_budget_file, before the model is invoked.
+
         Args:
             source_code (str): The source code to analyze
-            focus_name (str):
+            function_name (str, optional): The function or method to analyze. Defaults to None, analyzing all of them.
+            progress_callback (ProgressCallback | None, optional): Receives phase updates. Defaults to None.
 
         Returns:
             None
+
+        Raises:
+            TokenBudgetExceededException: If the source does not fit in the file or run token budget
         """
         # pylint: enable=line-too-long
         self._logger.trace(
             "start analyze_source_code_for_decision_points"
         )
+        self._analyze_functions(
+            source_code, [function_name] if function_name is not None else [], progress_callback)
+        self._logger.trace(
+            "end analyze_source_code_for_decision_points"
+        )
 
-        tracing_priorities = self._config.list_value("tracing_priorities", [])
-        clarifications = self._config.list_value("clarifications", [])
-        embed_function_name = f"only the function or method named {function_name}" if function_name is not None else "all functions and methods"
-        exclude_others = " Exclude all other functions and methods." if function_name is not None else ""
-        found_text = f" within {function_name}" if function_name is not None else ""
-
-        prompt = f"""
-Analyze the following Python source code and identify critical locations for adding trace statements.
-Within the source code, analyze {embed_function_name}.{exclude_others}
-Categorize critical locations based on the following priorities.
-
-Priorities:
-{', '.join(tracing_priorities)}
-
-{'\n'.join(clarifications)}
-
-For each critical location found{found_text}, include the following details:
-1. Name of the location function/method.
-2. Fully-qualified name of the containing function/method.
-3. Specific code blocks/lines to trace. Include the function/method name and parent class name.
-4. Rationale for tracing.
-5. Recommended trace information to capture.
-
-Format the output as a JSON array with the following keys:
-- "overall_analysis_summary": A summary of the source code analysis. In the summary describe only the {function_name}.
-- "priorities": for each priority, list the following:
-    - "priority": the priority
-    - "critical_locations": a list of critical locations found for this priority.
-        - for each critical location found for this priority, include the following keys:
-            - "location_name": Name of the location function/method
-            - "function_name": Fully-qualified name of the function/method
-            - "code_block": Specific code block/line to trace
-            - "rationale": Rationale for tracing
-            - "trace_info": Recommended trace information to capture
-
-Source Code:
-```python
-{source_code}
-```
-"""
+    def _analyze_functions(
+            self, source_code: str, function_names: List[str],
+            progress_callback: ProgressCallback | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze some or all functions of source code, as described in analyze_source_code_for_decision_points.
+
+        Args:
+            source_code (str): The source code to analyze
+            function_names (List[str]): The functions or methods to analyze; empty to analyze all of them
+            progress_callback (ProgressCallback | None): Receives phase updates
+
+        Raises:
+            TokenBudgetExceededException: If the source does not fit in the file or run token budget
+        """
+        # pylint: enable=line-too-long
+        source_code, source_description = self._prompt_planner.scope_source_code(source_code, function_names)
+        chunks = self._prompt_planner.plan_chunks(source_code, function_names, source_description)
+        if len(chunks) > 1:
+            self._analyze_chunks(chunks, function_names, progress_callback)
+            return
+
+        try:
+            self._analyze_source_code(
+                source_code, function_names, source_description, progress_callback)
+        except (ModelContextWindowExceededException, ModelMaxTokenLimitException) as e:
+            if not self._config.bool_value("chunking.enabled", "false"):
+                raise
+            chunks = SourceChunker().chunk(
+                source_code, max(self._model.estimate_tokens(source_code) // 2, 1),
+                self._model.estimate_tokens)
+            if len(chunks) <= 1:
+                raise
+            self._logger.warning(f"{str(e)}. Analyzing the source in {len(chunks)} chunks")
+            self._analyze_chunks(chunks, function_names, progress_callback)
+
+    def _analyze_source_code(
+            self, source_code: str, function_names: List[str], source_description: str,
+            progress_callback: ProgressCallback | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze source code with a single prompt, leaving the result in the model.
+
+        Args:
+            source_code (str): The source code to analyze
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+            source_description (str): A sentence added to the instructions describing what part of the file the source is
+            progress_callback (ProgressCallback | None): Receives phase updates
+        """
+        # pylint: enable=line-too-long
+        prompt = self._prompt_planner.build_prompt(source_code, function_names, source_description)
+
+        report_progress(
+            progress_callback, PROGRESS_PHASE_PROMPT_BUILT, prompt_characters=len(prompt))
 
         print("Analyzing code")
         self.get_completion_with_retry(
             prompt=prompt,
+            progress_callback=progress_callback,
         )
         print("Code analysis complete")
+        self._mark_included_locations(function_names)
 
-        for priority in self._model.completion_json.get("priorities"):
-            self._logger.debug(f"priority: {priority}")
-            for location in priority.get("critical_locations", priority.get(priority.get("locations"))):
-                self._logger.debug(f"location: {location}")
-                if location.get("function_name") == function_name:
-                    self._logger.debug("function_name matches")
-                    location["include"] = True
-                else:
-                    location["include"] = False
+    def _mark_included_locations(self, function_names: List[str]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Mark the critical locations of the model's completion that belong to the analyzed functions.
+
+        The completion of the model's result is left unchanged, since it may be shared with the response
+        cache or another analysis; the result is replaced with one holding a marked copy.
 
+        Args:
+            function_names (List[str]): The functions or methods analyzed; empty for all of them
+        """
+        # pylint: enable=line-too-long
+        self._result = dataclasses.replace(
+            self._result, completion_json=self._completion_utils.included_locations_marked(
+                self._result.completion_json, function_names))
         self._logger.debug("completion json:")
-        self._logger.debug(self._model.completion_json, enable_pformat=False)
-        self._logger.trace(
-            "end analyze_source_code_for_decision_points"
+        self._logger.debug(self._result.completion_json, enable_pformat=False)
+
+    def _analyze_chunks(
+            self, chunks: List[SourceChunk], function_names: List[str],
+            progress_callback: ProgressCallback | None) -> None:
+        # pylint: disable=line-too-long
+        """
+        Analyze source chunks and merge their results into one, as if analyzed with one prompt.
+
+        Up to chunking.max_workers chunks are analyzed at the same time, each by an analyzer created by
+        create_worker. Progress updates are only forwarded when the chunks are
+        analyzed one at a time, so that streamed tokens of different chunks are not interleaved.
+
+        Args:
+            chunks (List[SourceChunk]): The chunks of the source code
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+            progress_callback (ProgressCallback | None): Receives phase updates
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start _analyze_chunks")
+        max_workers = min(self._config.int_value("chunking.max_workers", 1, None, 4), len(chunks))
+        print(f"Analyzing source in {len(chunks)} chunks with {max_workers} workers")
+
+        def analyze_chunk(
+                analyzer: "SourceCodeAnalyzer", index: int,
+                callback: ProgressCallback | None) -> ModelResult:
+            analyzer._analyze_source_code(  # pylint: disable=protected-access
+                chunks[index].source, function_names, self._prompt_planner.chunk_description(index, len(chunks)),
+                callback)
+            return analyzer._result  # pylint: disable=protected-access
+
+        if max_workers <= 1:
+            results = [analyze_chunk(self, index, progress_callback) for index in range(len(chunks))]
+        else:
+            analyzers: queue.SimpleQueue = queue.SimpleQueue()
+            for _ in range(max_workers):
+                analyzers.put(self.create_worker())
+
+            def analyze(index: int) -> ModelResult:
+                analyzer = analyzers.get()
+                try:
+                    return analyze_chunk(analyzer, index, None)
+                finally:
+                    analyzers.put(analyzer)
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chunk") as executor:
+                results = list(executor.map(analyze, range(len(chunks))))
+
+        self._store_chunk_results(results)
+        self._logger.trace("end _analyze_chunks")
+
+    def _store_chunk_results(self, results: List[ModelResult]) -> None:
+        # pylint: disable=line-too-long
+        """
+        Merge the results of the chunks of a source into one result and the token totals.
+
+        Args:
+            results (List[ModelResult]): The result of each chunk, in source order
+        """
+        # pylint: enable=line-too-long
+        self._result = ModelResult(
+            text="\n".join(result.text for result in results),
+            completion_json=self._completion_utils.merge_completions(
+                [result.completion_json for result in results]),
+            prompt_tokens=sum(result.prompt_tokens for result in results),
+            completion_tokens=sum(result.completion_tokens for result in results),
+            stopped_reason=results[-1].stopped_reason,
         )
+        self._total_tokens = {
+            "prompt": self._result.prompt_tokens,
+            "completion": self._result.completion_tokens,
+        }
+        self._logger.debug(f"total tokens of {len(results)} chunks: {self._total_tokens}")
+
+    def _formatter_inputs(self, partial: bool = False) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Get the variables the completion of the analysis is formatted with: the model and the token usage.
+
+        Args:
+            partial (bool, optional): Whether the completion is still being received, so it has no stop reason yet. Defaults to False.
+
+        Returns:
+            Dict[str, Any]: The model vendor, name and id, the total prompt and completion tokens, and the stop reason
+        """
+        # pylint: enable=line-too-long
+        formatter_inputs = {}
+        formatter_inputs["model_vendor"] = self._model.model_vendor
+        formatter_inputs["model_name"] = self._model.model_name
+        formatter_inputs["model_id"] = self._model.model_id
+        formatter_inputs["total_prompt_tokens"] = self._total_tokens["prompt"]
+        formatter_inputs["total_completion_tokens"] = self._total_tokens["completion"]
+        formatter_inputs["stopped_reason"] = None if partial else self._result.stopped_reason
+        return formatter_inputs
+
+    def _partial_markdown_progress(
+            self, progress_callback: ProgressCallback | None, header: List[str], function_names: List[str]
+    ) -> ProgressCallback | None:
+        # pylint: disable=line-too-long
+        """
+        Wrap a progress callback so that the completion streamed so far can be rendered as markdown.
+
+        Each PROGRESS_PHASE_TOKENS_STREAMED event with a partial completion also gets a "format_markdown"
+        callable, returning the markdown of the completion received so far laid out like the results of
+        process_file, or None if it cannot be formatted yet. Formatting is left to the callback, which
+        calls it only as often as it displays the markdown.
+
+        Args:
+            progress_callback (ProgressCallback | None): The callback to wrap
+            header (List[str]): The lines the results start with
+            function_names (List[str]): The functions or methods analyzed; empty for all of them
+
+        Returns:
+            ProgressCallback | None: The wrapped callback, or None without a callback
+        """
+        # pylint: enable=line-too-long
+        if progress_callback is None:
+            return None
 
-    def generate_formatted_output(self) -> str:
+        def format_markdown(partial_json: Dict[str, Any]) -> str | None:
+            completion_json = self._completion_utils.included_locations_marked(
+                dict({"overall_analysis_summary": "", "priorities": []}, **partial_json), function_names)
+            try:
+                formatted_output = self._formatter.format_json(
+                    data=completion_json, variables=self._formatter_inputs(partial=True))
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._logger.debug(f"Cannot format the partial completion yet: {str(e)}")
+                return None
+            return "\n".join(header + [formatted_output])
+
+        def partial_markdown_progress(phase: str, details: Dict[str, Any]) -> None:
+            partial_json = details.get("partial_json")
+            if phase == PROGRESS_PHASE_TOKENS_STREAMED and partial_json is not None:
+                details = dict(details, format_markdown=lambda: format_markdown(partial_json))
+            progress_callback(phase, details)
+
+        return partial_markdown_progress
+
+    def generate_formatted_output(self, data: Dict[str, Any] | None = None) -> str:
         # pylint: disable=line-too-long
         """
         Generate formatted output based on the model's completion data.
@@ -261,6 +528,9 @@ Source Code:
         Uses the configured formatter to convert the model's JSON completion data into a formatted string,
         including metadata about the model and token usage.
 
+        Args:
+            data (Dict[str, Any] | None, optional): Completion data to format instead of the completion of the analysis. Defaults to None.
+
         Returns:
             str: The formatted output string containing analysis results
         """
@@ -268,25 +538,44 @@ Source Code:
         self._logger.trace("start generate_formatted_output")
         self._logger.debug("completion_json:")
         self._logger.debug(
-            self._model.completion_json, enable_pformat=True)
+            self._result.completion_json, enable_pformat=True)
 
-        formatter_inputs = {}
-        formatter_inputs["model_vendor"] = self._model.model_vendor
-        formatter_inputs["model_name"] = self._model.model_name
-        formatter_inputs["total_prompt_tokens"] = self._total_tokens["prompt"]
-        formatter_inputs["total_completion_tokens"] = self._total_tokens["completion"]
-        formatter_inputs["stopped_reason"] = self._model.stopped_reason
+        formatter_inputs = self._formatter_inputs()
 
         formatted_output = self._formatter.format_json(
-            data=self._model.completion_json, variables=formatter_inputs
+            data=self._result.completion_json if data is None else data, variables=formatter_inputs
         )
 
         self._logger.debug("end generate_formatted_output")
         return formatted_output
 
+    def generate_formatted_output_stream(self, data: Dict[str, Any] | None = None) -> Iterator[str]:
+        # pylint: disable=line-too-long
+        """
+        Generate formatted output like generate_formatted_output, as the pieces the formatter streams.
+
+        The completion data and the model and token variables are taken when this method is called, so the
+        pieces can be consumed after the analyzer has moved on to another analysis.
+
+        Args:
+            data (Dict[str, Any] | None, optional): Completion data to format instead of the completion of the analysis. Defaults to None.
+
+        Returns:
+            Iterator[str]: The pieces of the formatted output, produced as they are consumed
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start generate_formatted_output_stream")
+
+        formatter_inputs = self._formatter_inputs()
+
+        return self._formatter.format_json_stream(
+            data=self._result.completion_json if data is None else data, variables=formatter_inputs
+        )
+
     # pylint: disable=inconsistent-return-statements
     def process_file(
         self, input_source_path: str, function_name: str=None, display_results: bool=False,
+        progress_callback: ProgressCallback | None = None,
     ) -> str | None:
         # pylint: disable=line-too-long
         """
@@ -298,6 +587,10 @@ Source Code:
         Args:
             input_source_path (str): Path to the Python source file to analyze
             display_results (bool, optional): Whether to display results to console. Defaults to False.
+            progress_callback (ProgressCallback | None, optional): Receives a (phase, details) call for each
+                analysis phase: prompt built, model invoked, tokens streamed and formatted. Tokens streamed
+                details also carry a "format_markdown" callable returning the markdown of the completion
+                received so far. Defaults to None.
 
         Returns:
             str | None: Formatted analysis results as a string if display_results is False, None otherwise.
@@ -307,37 +600,18 @@ Source Code:
         self._logger.trace("start process_file")
         self._logger.debug(f"input_source_path: {input_source_path}")
 
-        # Load the source file
-        try:
-            full_code = self._path_utils.get_ascii_file_contents(
-                source_path=input_source_path
-            )
-            self._logger.debug(f"full_code len: {len(full_code)}")
-            if len(full_code) == 0:
-                self._logger.warning("Source file is empty")
-                return
-
-            results = []
-            results.append(f"# Source File: {Path(input_source_path).name}")
-            results.append(f"Full file path: '{input_source_path}'")
-            results.append("")
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            e_msg = f"Failed to load source file '{input_source_path}': {str(e)}"
-            self._logger.error(e_msg, exc_info=True)
-
-            self._logger.trace("end process_file (file error)")
-            return f"# {e_msg}" if display_results else e_msg
-
-        # Analyze the code
-        try:
-            self.analyze_source_code_for_decision_points(full_code, function_name=function_name)
-        except Exception as e:  # pylint: disable=broad-exception-caught
-            e_msg = f"Failed to analyze source code: {str(e)}"
-            self._logger.error(e_msg, exc_info=True)
-            self._logger.trace("end process_file (analyzer error)")
-            return f"# {e_msg}" if display_results else e_msg
-
-        print("Analysis complete")
+        results = [
+            f"# Source File: {Path(input_source_path).name}",
+            f"Full file path: '{input_source_path}'",
+            "",
+        ]
+        function_names = [function_name] if function_name is not None else []
+        analyzed, e_msg = self._load_and_analyze(
+            input_source_path, function_names,
+            self._partial_markdown_progress(progress_callback, list(results), function_names))
+        if not analyzed:
+            self._logger.trace("end process_file (not analyzed)")
+            return None if e_msg is None else f"# {e_msg}" if display_results else e_msg
 
         # Format the output
         try:
@@ -346,12 +620,14 @@ Source Code:
             self._logger.error(f"Failed to format output: {str(e)}", exc_info=True)
             self._logger.trace("end process_file (formatter error)")
             e_msg = f"Failed to Failed to format results: {str(e)}"
+            self._last_error = e_msg
             return f"# {e_msg}" if display_results else e_msg
 
         self._logger.debug(formatted_output)
         results.append(formatted_output)
 
         results_str = "\n".join(results)
+        report_progress(progress_callback, PROGRESS_PHASE_FORMATTED, markdown=results_str)
 
         # Write the formatted output to the console or return them to the caller
         if display_results:
@@ -363,52 +639,345 @@ Source Code:
         return results_str
         # pylint: enable=inconsistent-return-statements
 
-    def process_directory(self, source_path: str) -> None:
+    def process_file_stream(
+            self, input_source_path: str, function_name: str=None,
+            progress_callback: ProgressCallback | None = None) -> Iterator[str] | None:
+        # pylint: disable=line-too-long
+        """
+        Process a single Python source file like process_file, returning the formatted results as a stream.
+
+        The file is analyzed before this method returns; the results are then formatted piece by piece as the
+        returned iterator is consumed, so they can be written out without being held in memory. The
+        iterator does not depend on the state of the analyzer, which can analyze another file meanwhile.
+
+        Args:
+            input_source_path (str): Path to the Python source file to analyze
+            function_name (str, optional): The function or method to analyze. Defaults to None, analyzing all of them.
+            progress_callback (ProgressCallback | None, optional): Receives a (phase, details) call for each
+                analysis phase up to the model invocation. Defaults to None.
+
+        Returns:
+            Iterator[str] | None: The pieces of the formatted results, None if the file is empty, or the error
+                                  message as the only piece if loading or analyzing the file fails. Errors
+                                  formatting the results are raised while the pieces are consumed.
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start process_file_stream")
+        self._logger.debug(f"input_source_path: {input_source_path}")
+
+        analyzed, e_msg = self._load_and_analyze(
+            input_source_path, [function_name] if function_name is not None else [], progress_callback)
+        if not analyzed:
+            self._logger.trace("end process_file_stream (not analyzed)")
+            return None if e_msg is None else iter([e_msg])
+
+        header = "\n".join([
+            f"# Source File: {Path(input_source_path).name}",
+            f"Full file path: '{input_source_path}'",
+            "",
+            "",
+        ])
+        self._logger.trace("end process_file_stream")
+        return chain([header], self.generate_formatted_output_stream())
+
+    def process_functions(
+        self, input_source_path: str, function_names: List[str],
+        progress_callback: ProgressCallback | None = None,
+    ) -> Dict[str, str]:
+        # pylint: disable=line-too-long
+        """
+        Analyze several functions or methods of a source file with one model request.
+
+        The functions are analyzed together, sharing the context they reference, and the returned critical
+        locations are split by function_name into one result per function, formatted like process_file.
+        The token counts in each result are those of the shared request.
+
+        Args:
+            input_source_path (str): Path to the Python source file containing the functions
+            function_names (List[str]): The functions or methods to analyze, possibly qualified
+            progress_callback (ProgressCallback | None, optional): Receives phase updates, as for process_file. Defaults to None.
+
+        Returns:
+            Dict[str, str]: The formatted analysis results of each function, keyed by function name.
+                            If processing fails, each function is mapped to the error message.
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start process_functions")
+        self._logger.debug(f"input_source_path: {input_source_path}, function_names: {function_names}")
+        function_names = list(dict.fromkeys(function_names))
+
+        def failed(e_msg: str) -> Dict[str, str]:
+            self._last_error = e_msg
+            return {function_name: e_msg for function_name in function_names}
+
+        analyzed, e_msg = self._load_and_analyze(input_source_path, function_names, progress_callback)
+        if not analyzed:
+            self._logger.trace("end process_functions (not analyzed)")
+            return failed("Source file is empty" if e_msg is None else e_msg)
+
+        header = [
+            f"# Source File: {Path(input_source_path).name}",
+            f"Full file path: '{input_source_path}'",
+            "",
+        ]
+        results: Dict[str, str] = {}
+        try:
+            for function_name, completion_json in self._completion_utils.split_completion(
+                    self._result.completion_json, function_names).items():
+                results[function_name] = "\n".join(
+                    header + [self.generate_formatted_output(data=completion_json)])
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._logger.error(f"Failed to format output: {str(e)}", exc_info=True)
+            self._logger.trace("end process_functions (formatter error)")
+            return failed(f"Failed to format results: {str(e)}")
+
+        for function_name, results_str in results.items():
+            report_progress(
+                progress_callback, PROGRESS_PHASE_FORMATTED, markdown=results_str,
+                function_name=function_name)
+
+        self._logger.trace("end process_functions")
+        return results
+
+    def _load_and_analyze(
+            self, input_source_path: str, function_names: List[str],
+            progress_callback: ProgressCallback | None) -> Tuple[bool, str | None]:
+        # pylint: disable=line-too-long
+        """
+        Load a source file and analyze some or all of its functions, keeping the error message as last_error if it fails.
+
+        Args:
+            input_source_path (str): Path to the Python source file to analyze
+            function_names (List[str]): The functions or methods to analyze; empty for all of them
+            progress_callback (ProgressCallback | None): Receives phase updates
+
+        Returns:
+            Tuple[bool, str | None]: Whether the file was analyzed, and the error message if it could not be loaded or
+                                     analyzed; an empty file is neither analyzed nor an error
+        """
+        # pylint: enable=line-too-long
+        self._last_error = None
+        try:
+            full_code = self._path_utils.get_ascii_file_contents(source_path=input_source_path)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._last_error = f"Failed to load source file '{input_source_path}': {str(e)}"
+            self._logger.error(self._last_error, exc_info=True)
+            return False, self._last_error
+        self._logger.debug(f"full_code len: {len(full_code)}")
+        if len(full_code) == 0:
+            self._logger.warning("Source file is empty")
+            return False, None
+
+        try:
+            self._analyze_functions(full_code, function_names, progress_callback)
+        except TokenBudgetExceededException as tbe:
+            self._last_error = f"Skipped source code analysis: {str(tbe)}"
+            self._logger.warning(self._last_error)
+            return False, self._last_error
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._last_error = f"Failed to analyze source code: {str(e)}"
+            self._logger.error(self._last_error, exc_info=True)
+            return False, self._last_error
+        print("Analysis complete")
+        return True, None
+
+    def process_directory(
+            self, source_path: str, full: bool = False, output_writer: OutputWriter | None = None,
+            report_formatter: RepositoryReportFormatter | None = None,
+            records_formatter: RecordsFormatter | None = None) -> None:
         # pylint: disable=line-too-long
         """
         Process all Python files in a directory and its subdirectories.
 
-        Recursively walks through the directory structure, identifying Python files and processing
-        each one for trace point analysis.
+        The files are analyzed, displayed or written, and recorded as described in DirectoryAnalysis.
 
         Args:
             source_path (str): Path to the directory to process
+            full (bool, optional): Analyze every file, even if its stored output is current, and record the
+                new output. Defaults to False. Refreshing the response cache also analyzes every file.
+            output_writer (OutputWriter | None, optional): Writes the results of each file. Defaults to None,
+                displaying them.
+            report_formatter (RepositoryReportFormatter | None, optional): Aggregates the completion of each
+                file. Defaults to None.
+            records_formatter (RecordsFormatter | None, optional): Writes the records of the completion of each
+                file. Defaults to None.
 
         Returns:
             None
         """
         # pylint: enable=line-too-long
         self._logger.trace("start process_directory")
-        self._logger.debug(f"source_path: {source_path}")
-        print(f"Process directory '{source_path}'")
-
-        if not Path(source_path).exists():
-            self._logger.error(
-                f"Source path '{source_path}' does not exist"
-            )
-            self._logger.trace(
-                "end process_directory path does not exist"
-            )
-            return
-        if not Path(source_path).is_dir():
-            self._logger.error(
-                f"Source path '{source_path}' is not a directory"
-            )
-            self._logger.trace(
-                "end process_directory path is not a directory"
-            )
-            return
+        DirectoryAnalysis(
+            self,
+            output_writer=output_writer,
+            report_formatter=report_formatter,
+            records_formatter=records_formatter,
+        ).run(source_path, full=full or self._requester.response_cache_mode == RESPONSE_CACHE_REFRESH)
+        self._logger.trace("end process_directory")
+
+    def create_worker(self) -> "SourceCodeAnalyzer":
+        # pylint: disable=line-too-long
+        """
+        Create an isolated analyzer for a concurrent worker, sharing this analyzer's rate limiter, response cache
+        mode and run token budget.
+
+        Returns:
+            SourceCodeAnalyzer: The worker's analyzer
+        """
+        # pylint: enable=line-too-long
+        return SourceCodeAnalyzer(
+            isolated=True,
+            rate_limiter=self._requester.rate_limiter,
+            response_cache_mode=self._requester.response_cache_mode,
+            token_budget=self._requester.token_budget,
+        )
+
+    def analysis_settings_hash(self) -> str:
+        # pylint: disable=line-too-long
+        """
+        Compute a hash of everything besides the content of a file that determines its formatted analysis.
+
+        The hash covers the model and its settings, the tracing priorities and clarifications, the prompt
+        instructions, the chunking and file budget settings and the formatter settings.
+
+        Returns:
+            str: The settings hash
+        """
+        # pylint: enable=line-too-long
+        return ResponseCache.make_key(
+            response_cache_key=self._requester.cache_key(self._prompt_planner.build_prompt("", [], "")),
+            chunking_enabled=self._config.bool_value("chunking.enabled", "false"),
+            max_source_tokens=self._prompt_planner.max_source_tokens([]),
+            max_file_tokens=self._config.int_value("budget.max_file_tokens", 0, None, 0),
+            over_budget_file=self._config.str_value("budget.over_budget_file", OVER_BUDGET_FILE_SPLIT),
+            formatter=self._config.items().get("formatter", {}),
+        )
+
+    def project_usage(self, source_paths: List[str]) -> Dict[str, Any]:
+        # pylint: disable=line-too-long
+        """
+        Project the requests, tokens and cost of analyzing files, without invoking the model.
+
+        Each file is planned the way process_file would analyze it, including chunking and the file
+        token budget. Completion tokens are projected from budget.expected_completion_tokens per request.
+        Responses served from the response cache are not taken into account.
+
+        Args:
+            source_paths (List[str]): The paths of the files to analyze
+
+        Returns:
+            Dict[str, Any]: The projection, with keys "files", "requests", "prompt_tokens",
+                            "completion_tokens", "cost" (USD) and "skipped" (paths over the file budget)
+        """
+        # pylint: enable=line-too-long
+        projection = {
+            "files": 0, "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost": 0.0,
+            "skipped": [],
+        }
+        for file_path in source_paths:
+            try:
+                source_code = self._path_utils.get_ascii_file_contents(source_path=file_path)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                self._logger.warning(f"Cannot project usage of '{file_path}': {str(e)}")
+                continue
+            if len(source_code) == 0:
+                continue
+            try:
+                prompts = self.build_file_prompts(source_code)
+            except TokenBudgetExceededException:
+                projection["skipped"].append(file_path)
+                continue
+            projection["files"] += 1
+            projection["requests"] += len(prompts)
+            projection["prompt_tokens"] += sum(self._model.estimate_tokens(prompt) for prompt in prompts)
+        projection["completion_tokens"] = projection["requests"] * self._requester.expected_completion_tokens()
+        projection["cost"] = self._model.estimate_cost(
+            projection["prompt_tokens"], projection["completion_tokens"])
+        self._logger.debug(f"projected usage: {projection}")
+        return projection
+
+    def build_file_prompts(self, source_code: str) -> List[str]:
+        # pylint: disable=line-too-long
+        """
+        Build, without invoking the model, the prompts process_file would send to analyze all functions of source code.
+
+        Args:
+            source_code (str): The source code of the file
+
+        Returns:
+            List[str]: One prompt, or one prompt per chunk if the source is analyzed in chunks
+
+        Raises:
+            TokenBudgetExceededException: If the prompt exceeds budget.max_file_tokens and cannot or may not be split
+        """
+        # pylint: enable=line-too-long
+        return self._prompt_planner.file_prompts(source_code)
+
+    def process_batch_results(
+            self, input_source_path: str, prompts: List[str], results: List[ModelResult]) -> str:
+        # pylint: disable=line-too-long
+        """
+        Format the results of a file analyzed by a batch inference job, as process_file formats the
+        results of the model requests it sends.
+
+        Each result is checked and cached as if the prompt had been sent by get_completion_with_retry, and
+        the results of a file analyzed in chunks are merged.
+
+        Args:
+            input_source_path (str): Path to the Python source file that was analyzed
+            prompts (List[str]): The prompts of the file, as returned by build_file_prompts
+            results (List[ModelResult]): The result of each prompt, in the same order
+
+        Returns:
+            str: Formatted analysis results, or an error message if a result is invalid or cannot be formatted
+        """
+        # pylint: enable=line-too-long
+        self._logger.trace("start process_batch_results")
+        self._last_error = None
+        self._total_tokens = {"completion": 0, "prompt": 0}
+
+        try:
+            chunk_results = []
+            for prompt, result in zip(prompts, results, strict=True):
+                self._store_result(self._requester.record(prompt, result))
+                self._mark_included_locations([])
+                chunk_results.append(self._result)
+            if len(chunk_results) > 1:
+                self._store_chunk_results(chunk_results)
+            formatted_output = self.generate_formatted_output()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            e_msg = f"Failed to process batch results: {str(e)}"
+            self._logger.error(e_msg, exc_info=True)
+            self._last_error = e_msg
+            self._logger.trace("end process_batch_results (error)")
+            return f"# {e_msg}"
+
+        self._logger.trace("end process_batch_results")
+        return "\n".join([
+            f"# Source File: {Path(input_source_path).name}",
+            f"Full file path: '{input_source_path}'",
+            "",
+            formatted_output,
+        ])
+
+    def find_python_files(self, source_path: str) -> List[str]:
+        # pylint: disable=line-too-long
+        """
+        Find all Python files in a directory and its subdirectories.
 
+        Args:
+            source_path (str): Path to the directory to search
+
+        Returns:
+            List[str]: The paths of the Python files, sorted
+        """
+        # pylint: enable=line-too-long
+        source_paths = []
         for root, dirs, files in Path(source_path).walk():
             self._logger.debug(f"root: {root}")
             self._logger.debug(f"dirs: {dirs}")
             self._logger.debug(f"files: {files}", enable_pformat=True)
             for file in files:
-                self._logger.debug(f"file: {file}")
                 if Path(file).suffix == ".py":
-                    self._logger.debug("Path(file)")
-                    self._logger.debug(Path(file))
-                    source_path = f"{root}/{file}"
-                    self.process_file(source_path, display_results=True)
-
-        self._logger.trace("end process_directory")
+                    source_paths.append(f"{root}/{file}")
+        return sorted(source_paths)
@@ -0,0 +1,274 @@
+# pylint: disable=line-too-long
+"""
+Split Python source files that are too large for one model prompt into chunks along AST boundaries.
+
+Each chunk holds whole top-level statements: functions, classes and other module code. A class too
+large for one chunk is split between its methods, and each part repeats the class header. The
+imports and short module-level assignments of the file are repeated at the top of every chunk so
+each can be analyzed on its own.
+
+Classes:
+    SourceChunk: The source of one chunk and the names of the functions and classes it defines
+    SourceChunker: Singleton utility splitting a source file into chunks
+"""
+# pylint: enable=line-too-long
+
+import ast
+from typing import Callable, List, Tuple
+from common.logging_utils import LoggingUtils
+from source_analyzer.source_context_extractor import class_header
+
+TokenEstimator = Callable[[str], int]
+
+# Module-level assignments up to this length are repeated in every chunk like the imports
+MAX_PREAMBLE_ASSIGNMENT_LENGTH = 300
+
+
+class SourceChunk:
+    # pylint: disable=line-too-long
+    """
+    One chunk of a source file.
+
+    Attributes:
+        source (str): The chunk source, starting with the imports and short assignments of the file
+        names (List[str]): The functions and classes defined in the chunk; methods of a split class
+                           are named "Class.method"
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, source: str, names: List[str]):
+        self.source = source
+        self.names = names
+
+    def __repr__(self):
+        return f"SourceChunk(names={self.names}, characters={len(self.source)})"
+
+
+class SourceChunker:
+    # pylint: disable=line-too-long
+    """
+    A singleton utility splitting source files into chunks that fit a token budget.
+    """
+    # pylint: enable=line-too-long
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Creates and returns a singleton instance of the SourceChunker class.
+
+        Args:
+            cls (type): The class being instantiated.
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+            SourceChunker: The singleton instance of the SourceChunker class.
+        """
+        # pylint: enable=line-too-long
+
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # pylint: disable=line-too-long
+        """
+        Initializes the SourceChunker class.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+
+    def chunk(
+            self, source_code: str, max_tokens: int, estimate_tokens: TokenEstimator
+    ) -> List[SourceChunk]:
+        # pylint: disable=line-too-long
+        """
+        Split a source file into chunks of at most max_tokens estimated tokens.
+
+        Statements are kept whole, so a single function larger than max_tokens becomes a chunk of its
+        own that exceeds the budget. Source that cannot be parsed is returned as a single chunk.
+
+        Args:
+            source_code (str): The source of the file.
+            max_tokens (int): The token budget of a chunk, including the repeated preamble.
+            estimate_tokens (TokenEstimator): Estimates the number of tokens of a text.
+
+        Returns:
+            List[SourceChunk]: The chunks in source order.
+        """
+        # pylint: enable=line-too-long
+
+        try:
+            module = ast.parse(source_code)
+        except SyntaxError as e:
+            self._logger.warning(f"Cannot parse source for chunking: {str(e)}")
+            return [SourceChunk(source_code, [])]
+
+        lines = source_code.splitlines()
+        preamble_sources: List[str] = []
+        statements: List[ast.stmt] = []
+        for node in module.body:
+            if self._is_docstring(node):
+                continue
+            source = self._statement_source(lines, node)
+            if isinstance(node, (ast.Import, ast.ImportFrom)) or (
+                    isinstance(node, (ast.Assign, ast.AnnAssign))
+                    and len(source) <= MAX_PREAMBLE_ASSIGNMENT_LENGTH):
+                preamble_sources.append(source)
+            else:
+                statements.append(node)
+        preamble = "\n".join(preamble_sources)
+        budget = max(max_tokens - estimate_tokens(preamble), 1)
+
+        chunks: List[SourceChunk] = []
+        group: List[Tuple[str, str]] = []
+        group_tokens = 0
+
+        def flush():
+            nonlocal group, group_tokens
+            if group:
+                chunks.append(self._make_chunk(preamble, [source for source, _ in group],
+                                               [name for _, name in group if name]))
+            group = []
+            group_tokens = 0
+
+        for node in statements:
+            source = self._statement_source(lines, node)
+            tokens = estimate_tokens(source)
+            if tokens > budget:
+                flush()
+                if isinstance(node, ast.ClassDef):
+                    chunks.extend(self._split_class(lines, node, preamble, budget, estimate_tokens))
+                else:
+                    self._logger.warning(
+                        f"Statement at line {node.lineno} needs about {tokens} tokens, "
+                        f"more than the chunk budget of {budget}")
+                    chunks.append(self._make_chunk(preamble, [source], self._names(node)))
+                continue
+            if group_tokens + tokens > budget:
+                flush()
+            group.append((source, getattr(node, "name", "")))
+            group_tokens += tokens
+        flush()
+
+        if not chunks:
+            return [SourceChunk(source_code, [])]
+
+        self._logger.debug(f"Split source into {len(chunks)} chunks: {chunks}")
+        return chunks
+
+    def _split_class(
+            self, lines: List[str], class_node: ast.ClassDef, preamble: str, budget: int,
+            estimate_tokens: TokenEstimator,
+    ) -> List[SourceChunk]:
+        # pylint: disable=line-too-long
+        """
+        Split a class between its body statements, repeating the class header in each chunk.
+
+        Args:
+            lines (List[str]): The source lines.
+            class_node (ast.ClassDef): The class.
+            preamble (str): The imports and assignments repeated in every chunk.
+            budget (int): The token budget of a chunk, excluding the preamble.
+            estimate_tokens (TokenEstimator): Estimates the number of tokens of a text.
+
+        Returns:
+            List[SourceChunk]: The chunks of the class.
+        """
+        # pylint: enable=line-too-long
+
+        header = class_header(lines, class_node)
+        member_budget = max(budget - estimate_tokens(header), 1)
+
+        chunks: List[SourceChunk] = []
+        members: List[str] = []
+        names: List[str] = []
+        members_tokens = 0
+        for node in class_node.body:
+            source = self._statement_source(lines, node)
+            tokens = estimate_tokens(source)
+            if members and members_tokens + tokens > member_budget:
+                chunks.append(self._make_chunk(preamble, [header + "\n\n" + "\n\n".join(members)], names))
+                members, names, members_tokens = [], [], 0
+            if tokens > member_budget:
+                self._logger.warning(
+                    f"{class_node.name} statement at line {node.lineno} needs about {tokens} tokens, "
+                    f"more than the chunk budget of {member_budget}")
+            members.append(source)
+            if hasattr(node, "name"):
+                names.append(f"{class_node.name}.{node.name}")
+            members_tokens += tokens
+        if members:
+            chunks.append(self._make_chunk(preamble, [header + "\n\n" + "\n\n".join(members)], names))
+        return chunks
+
+    def _make_chunk(self, preamble: str, sources: List[str], names: List[str]) -> SourceChunk:
+        # pylint: disable=line-too-long
+        """
+        Assemble a chunk from the preamble and whole statements.
+
+        Args:
+            preamble (str): The imports and assignments repeated in every chunk.
+            sources (List[str]): The statement sources.
+            names (List[str]): The names defined by the statements.
+
+        Returns:
+            SourceChunk: The chunk.
+        """
+        # pylint: enable=line-too-long
+
+        body = "\n\n\n".join(sources)
+        return SourceChunk(f"{preamble}\n\n\n{body}" if preamble else body, names)
+
+    def _names(self, node: ast.stmt) -> List[str]:
+        # pylint: disable=line-too-long
+        """
+        Get the name defined by a statement, if it defines a function or class.
+
+        Args:
+            node (ast.stmt): The statement.
+
+        Returns:
+            List[str]: The name, or an empty list.
+        """
+        # pylint: enable=line-too-long
+
+        return [node.name] if hasattr(node, "name") else []
+
+    def _is_docstring(self, node: ast.stmt) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether a statement is a bare string, such as the module docstring.
+
+        Args:
+            node (ast.stmt): The statement.
+
+        Returns:
+            bool: True if the statement is a string expression.
+        """
+        # pylint: enable=line-too-long
+
+        return (
+            isinstance(node, ast.Expr)
+            and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        )
+
+    def _statement_source(self, lines: List[str], node: ast.stmt) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the source of a statement, including its decorators, with its original indentation.
+
+        Args:
+            lines (List[str]): The source lines.
+            node (ast.stmt): The statement.
+
+        Returns:
+            str: The statement source.
+        """
+        # pylint: enable=line-too-long
+
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+        return "\n".join(lines[start - 1:node.end_lineno])
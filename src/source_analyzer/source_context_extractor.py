@@ -0,0 +1,411 @@
+# pylint: disable=line-too-long
+"""
+Extract the source code relevant to a single function or method.
+
+When only one function of a file is analyzed, sending the whole file to the model wastes input
+tokens on code the model is told to ignore. The SourceContextExtractor parses the file and keeps:
+
+    - the imports whose names the function uses
+    - the module-level constants the function uses
+    - the header of the class containing the function, if it is a method
+    - the full source of the function
+    - the signatures of the module functions and sibling methods the function calls
+
+Classes:
+    SourceContextExtractor: Singleton utility building the reduced source for a function
+
+Functions:
+    class_header: Get the source of a class header, without the class body
+"""
+# pylint: enable=line-too-long
+
+import ast
+import copy
+import io
+import tokenize
+from typing import Dict, List, Optional, Set, Tuple
+from common.logging_utils import LoggingUtils
+
+# Module-level assignments longer than this are left out of the context
+MAX_CONSTANT_LENGTH = 300
+
+FunctionNode = ast.FunctionDef | ast.AsyncFunctionDef
+
+
+def class_header(lines: List[str], class_node: ast.ClassDef) -> str:
+    # pylint: disable=line-too-long
+    """
+    Get the source of a class header: its decorators and class statement, without the body.
+
+    The class statement ends at the colon that opens the body, found by tokenizing from the class
+    statement, so a class statement spanning several lines or followed by a comment is kept whole.
+    A body on the same line as the colon is left out.
+
+    Args:
+        lines (List[str]): The source lines.
+        class_node (ast.ClassDef): The class.
+
+    Returns:
+        str: The header source.
+    """
+    # pylint: enable=line-too-long
+
+    start = min([class_node.lineno] + [node.lineno for node in class_node.decorator_list])
+    statement = io.StringIO("\n".join(lines[class_node.lineno - 1:class_node.body[0].end_lineno]) + "\n")
+    depth = 0
+    for token in tokenize.generate_tokens(statement.readline):
+        if token.type != tokenize.OP:
+            continue
+        if token.string in "([{":
+            depth += 1
+        elif token.string in ")]}":
+            depth -= 1
+        elif token.string == ":" and depth == 0:
+            colon_line = class_node.lineno + token.start[0] - 1
+            header = lines[start - 1:colon_line]
+            if colon_line == class_node.body[0].lineno:
+                header[-1] = header[-1][:token.end[1]]
+            return "\n".join(header)
+    return "\n".join(lines[start - 1:class_node.lineno])
+
+
+class SourceContextExtractor:
+    # pylint: disable=line-too-long
+    """
+    A singleton utility that reduces a source file to the context needed to analyze one function.
+
+    Function names are matched the way the call tracer reports them: "function", "Class.method",
+    "module.function", "module.Class.method" or "self.method". Several functions of the same file can
+    be extracted together, sharing the context they reference.
+    """
+    # pylint: enable=line-too-long
+
+    _instance = None
+
+    def __new__(cls, *args, **kwargs):  # pylint: disable=unused-argument
+        # pylint: disable=line-too-long
+        """
+        Creates and returns a singleton instance of the SourceContextExtractor class.
+
+        Args:
+            cls (type): The class being instantiated.
+            *args: Variable length argument list.
+            **kwargs: Arbitrary keyword arguments.
+
+        Returns:
+            SourceContextExtractor: The singleton instance of the SourceContextExtractor class.
+        """
+        # pylint: enable=line-too-long
+
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        # pylint: disable=line-too-long
+        """
+        Initializes the SourceContextExtractor class.
+        """
+        # pylint: enable=line-too-long
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+
+    def extract(self, source_code: str, function_name: str) -> Optional[str]:
+        # pylint: disable=line-too-long
+        """
+        Build the reduced source for a function.
+
+        Args:
+            source_code (str): The full source of the file containing the function.
+            function_name (str): The name of the function, possibly qualified.
+
+        Returns:
+            Optional[str]: The reduced source, or None if the source cannot be parsed or the function
+                           is not found, in which case the caller should use the full source.
+        """
+        # pylint: enable=line-too-long
+
+        return self.extract_functions(source_code, [function_name])
+
+    def extract_functions(self, source_code: str, function_names: List[str]) -> Optional[str]:
+        # pylint: disable=line-too-long
+        """
+        Build the reduced source for several functions of the same file.
+
+        The context the functions reference is included once, and methods of the same class share
+        one class header.
+
+        Args:
+            source_code (str): The full source of the file containing the functions.
+            function_names (List[str]): The names of the functions, possibly qualified.
+
+        Returns:
+            Optional[str]: The reduced source, or None if the source cannot be parsed or any of the
+                           functions is not found, in which case the caller should use the full source.
+        """
+        # pylint: enable=line-too-long
+
+        try:
+            module = ast.parse(source_code)
+        except SyntaxError as e:
+            self._logger.debug(f"Cannot parse source for context extraction: {str(e)}")
+            return None
+
+        targets: List[Tuple[Optional[ast.ClassDef], FunctionNode]] = []
+        for function_name in function_names:
+            found = self._find_function(module, function_name)
+            if found is None:
+                self._logger.debug(f"Function '{function_name}' not found for context extraction")
+                return None
+            class_node, function_node = found
+            if not any(function_node is target for _, target in targets):
+                targets.append((class_node, function_node))
+        targets.sort(key=lambda target: target[1].lineno)
+        function_nodes = [function_node for _, function_node in targets]
+
+        lines = source_code.splitlines()
+        used_names: Set[str] = set()
+        for function_node in function_nodes:
+            used_names |= self._used_names(function_node)
+
+        # Each section is a list of parts separated by one blank line; sections by two
+        sections: List[List[str]] = []
+
+        imports = [
+            ast.get_source_segment(source_code, node)
+            for node in module.body
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and self._binds_used_name(node, used_names)
+        ]
+        if imports:
+            sections.append(["\n".join(imports)])
+
+        constants = [
+            segment
+            for node in module.body
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and self._assigns_used_name(node, used_names)
+            for segment in [ast.get_source_segment(source_code, node)]
+            if segment and len(segment) <= MAX_CONSTANT_LENGTH
+        ]
+        if constants:
+            sections.append(["\n".join(constants)])
+
+        helpers = [
+            self._signature(node)
+            for node in module.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and not any(node is function_node for function_node in function_nodes)
+            and node.name in used_names
+        ]
+        if helpers:
+            sections.append(helpers)
+
+        # Methods of the same class are grouped under one class header, in source order
+        class_sections: Dict[int, List[str]] = {}
+        for class_node, function_node in targets:
+            function_source = self._indented_source(lines, function_node)
+            if class_node is None:
+                sections.append([function_source])
+                continue
+            if id(class_node) in class_sections:
+                class_sections[id(class_node)].append(function_source)
+                continue
+            class_methods = [
+                function_node for target_class, function_node in targets if target_class is class_node
+            ]
+            called_methods: Set[str] = set()
+            for method in class_methods:
+                called_methods |= self._called_self_methods(method)
+            class_parts = [class_header(lines, class_node)]
+            class_parts.extend(
+                self._indent(self._signature(node), class_node.col_offset + 4)
+                for node in class_node.body
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and not any(node is method for method in class_methods)
+                and node.name in called_methods
+            )
+            class_parts.append(function_source)
+            class_sections[id(class_node)] = class_parts
+            sections.append(class_parts)
+
+        context = "\n\n\n".join("\n\n".join(parts) for parts in sections)
+        self._logger.debug(
+            f"Context for {function_names}: {len(context)} of {len(source_code)} characters")
+        return context
+
+    def _find_function(
+            self, module: ast.Module, function_name: str
+    ) -> Optional[Tuple[Optional[ast.ClassDef], FunctionNode]]:
+        # pylint: disable=line-too-long
+        """
+        Find a function or method by its possibly qualified name.
+
+        A "Class.method" qualification selects the method of that class; otherwise a module-level
+        function is preferred over a method of the same name.
+
+        Args:
+            module (ast.Module): The parsed source.
+            function_name (str): The name of the function, possibly qualified.
+
+        Returns:
+            Optional[Tuple[Optional[ast.ClassDef], FunctionNode]]: The containing class, if any, and the
+                                                                   function, or None if not found.
+        """
+        # pylint: enable=line-too-long
+
+        parts = function_name.split(".")
+        name = parts[-1]
+        qualifier = parts[-2] if len(parts) > 1 else None
+        classes = [node for node in module.body if isinstance(node, ast.ClassDef)]
+
+        candidates: List[Tuple[Optional[ast.ClassDef], FunctionNode]] = []
+        for class_node in classes:
+            if class_node.name == qualifier:
+                candidates.extend(
+                    (class_node, node) for node in class_node.body
+                    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name
+                )
+        candidates.extend(
+            (None, node) for node in module.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name
+        )
+        for class_node in classes:
+            candidates.extend(
+                (class_node, node) for node in class_node.body
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name
+            )
+        return candidates[0] if candidates else None
+
+    def _used_names(self, function_node: FunctionNode) -> Set[str]:
+        # pylint: disable=line-too-long
+        """
+        Collect the names a function refers to, including those in its decorators and annotations.
+
+        For attribute chains such as os.path.join, the root name (os) is collected.
+
+        Args:
+            function_node (FunctionNode): The function.
+
+        Returns:
+            Set[str]: The names.
+        """
+        # pylint: enable=line-too-long
+
+        return {node.id for node in ast.walk(function_node) if isinstance(node, ast.Name)}
+
+    def _called_self_methods(self, function_node: FunctionNode) -> Set[str]:
+        # pylint: disable=line-too-long
+        """
+        Collect the names of the methods a method accesses on self or cls.
+
+        Args:
+            function_node (FunctionNode): The method.
+
+        Returns:
+            Set[str]: The method names.
+        """
+        # pylint: enable=line-too-long
+
+        return {
+            node.attr
+            for node in ast.walk(function_node)
+            if isinstance(node, ast.Attribute)
+            and isinstance(node.value, ast.Name) and node.value.id in ("self", "cls")
+        }
+
+    def _binds_used_name(self, node: ast.Import | ast.ImportFrom, used_names: Set[str]) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether an import binds a name used by the function.
+
+        Args:
+            node (ast.Import | ast.ImportFrom): The import statement.
+            used_names (Set[str]): The names used by the function.
+
+        Returns:
+            bool: True if the import is needed.
+        """
+        # pylint: enable=line-too-long
+
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            return True
+        for alias in node.names:
+            bound_name = alias.asname or alias.name.split(".")[0]
+            if bound_name in used_names:
+                return True
+        return False
+
+    def _assigns_used_name(self, node: ast.Assign | ast.AnnAssign, used_names: Set[str]) -> bool:
+        # pylint: disable=line-too-long
+        """
+        Check whether a module-level assignment binds a name used by the function.
+
+        Args:
+            node (ast.Assign | ast.AnnAssign): The assignment.
+            used_names (Set[str]): The names used by the function.
+
+        Returns:
+            bool: True if the assignment is needed.
+        """
+        # pylint: enable=line-too-long
+
+        targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+        return any(
+            isinstance(name_node, ast.Name) and name_node.id in used_names
+            for target in targets
+            for name_node in ast.walk(target)
+        )
+
+    def _signature(self, function_node: FunctionNode) -> str:
+        # pylint: disable=line-too-long
+        """
+        Render the signature of a function with its docstring summary line and an elided body.
+
+        Args:
+            function_node (FunctionNode): The function.
+
+        Returns:
+            str: The signature source.
+        """
+        # pylint: enable=line-too-long
+
+        stub = copy.copy(function_node)
+        body: List[ast.stmt] = []
+        docstring = ast.get_docstring(function_node)
+        if docstring:
+            body.append(ast.Expr(ast.Constant(docstring.strip().splitlines()[0])))
+        body.append(ast.Expr(ast.Constant(Ellipsis)))
+        stub.body = body
+        return ast.unparse(stub)
+
+    def _indented_source(self, lines: List[str], function_node: FunctionNode) -> str:
+        # pylint: disable=line-too-long
+        """
+        Get the full source of a function, including its decorators, with its original indentation.
+
+        Args:
+            lines (List[str]): The source lines.
+            function_node (FunctionNode): The function.
+
+        Returns:
+            str: The function source.
+        """
+        # pylint: enable=line-too-long
+
+        start = min([function_node.lineno] + [node.lineno for node in function_node.decorator_list])
+        return "\n".join(lines[start - 1:function_node.end_lineno])
+
+    def _indent(self, text: str, width: int) -> str:
+        # pylint: disable=line-too-long
+        """
+        Indent every line of a text.
+
+        Args:
+            text (str): The text.
+            width (int): The number of spaces.
+
+        Returns:
+            str: The indented text.
+        """
+        # pylint: enable=line-too-long
+
+        return "\n".join(" " * width + line if line else line for line in text.splitlines())
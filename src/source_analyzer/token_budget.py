@@ -0,0 +1,112 @@
+# pylint: disable=line-too-long
+"""
+A token budget shared by the analyses of one run.
+
+Before a prompt is sent, its estimated prompt tokens plus the expected completion tokens are
+reserved against the budget; a prompt that does not fit is not sent. Once the model has answered,
+the reservation is replaced by the tokens actually used.
+
+Classes:
+    TokenBudgetExceededException: Raised when a prompt does not fit in a token budget
+    TokenBudget: Thread-safe run token budget
+"""
+# pylint: enable=line-too-long
+
+import threading
+from common.logging_utils import LoggingUtils
+
+
+class TokenBudgetExceededException(Exception):
+    # pylint: disable=line-too-long
+    """
+    Exception raised when a prompt is not sent because it does not fit in a token budget.
+    """
+    # pylint: enable=line-too-long
+
+
+class TokenBudget:
+    # pylint: disable=line-too-long
+    """
+    A thread-safe budget of tokens shared by concurrent analyzers.
+
+    Like RateLimiter, TokenBudget is not a singleton: each run has its own budget.
+    """
+    # pylint: enable=line-too-long
+
+    def __init__(self, max_tokens: int):
+        # pylint: disable=line-too-long
+        """
+        Initialize an unused budget.
+
+        Args:
+            max_tokens (int): The number of prompt and completion tokens the run may use. Must be positive.
+
+        Raises:
+            ValueError: If max_tokens is not positive.
+        """
+        # pylint: enable=line-too-long
+
+        if max_tokens <= 0:
+            raise ValueError(f"max_tokens must be positive, got {max_tokens}")
+
+        self._logger = LoggingUtils().get_class_logger(class_name=__class__.__name__)
+        self._max_tokens = max_tokens
+        self._spent = 0
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_tokens(self) -> int:
+        """ The number of tokens the run may use. """
+        return self._max_tokens
+
+    @property
+    def spent(self) -> int:
+        """ The number of tokens used by answered prompts. """
+        with self._lock:
+            return self._spent
+
+    @property
+    def remaining(self) -> int:
+        """ The number of tokens neither used nor reserved. """
+        with self._lock:
+            return self._max_tokens - self._spent - self._reserved
+
+    def reserve(self, tokens: int) -> None:
+        # pylint: disable=line-too-long
+        """
+        Reserve tokens for a prompt about to be sent.
+
+        Args:
+            tokens (int): The estimated prompt and completion tokens of the prompt.
+
+        Raises:
+            TokenBudgetExceededException: If the tokens do not fit in the remaining budget.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            remaining = self._max_tokens - self._spent - self._reserved
+            if tokens > remaining:
+                raise TokenBudgetExceededException(
+                    f"Run token budget exhausted: about {tokens} tokens needed, {remaining} of "
+                    f"{self._max_tokens} remaining"
+                )
+            self._reserved += tokens
+
+    def settle(self, reserved_tokens: int, used_tokens: int) -> None:
+        # pylint: disable=line-too-long
+        """
+        Replace a reservation with the tokens actually used.
+
+        Args:
+            reserved_tokens (int): The tokens reserved for the prompt.
+            used_tokens (int): The prompt and completion tokens reported by the model; 0 if the prompt failed.
+        """
+        # pylint: enable=line-too-long
+
+        with self._lock:
+            self._reserved -= reserved_tokens
+            self._spent += used_tokens
+            self._logger.debug(
+                f"Token budget: {self._spent} spent, {self._reserved} reserved of {self._max_tokens}")
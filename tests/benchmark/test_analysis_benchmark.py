@@ -0,0 +1,139 @@
+"""
+Benchmarks of the analysis pipeline against the local stub model.
+
+Run with the output shown to see the throughput and latency of each benchmark:
+
+    PYTHONPATH=src:src/source_analyzer python -m pytest -s --benchmark tests/benchmark
+"""
+import statistics
+import time
+from pathlib import Path
+import pytest
+from source_analyzer.output_writer import DirectoryOutputWriter
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+
+pytestmark = pytest.mark.benchmark
+
+FILE_COUNT = 40
+FUNCTIONS_PER_FILE = 12
+
+
+def write_sources(source_path, file_count=FILE_COUNT):
+    source_path.mkdir()
+    for file_index in range(file_count):
+        lines = [f"class Service{file_index}:"]
+        for function_index in range(FUNCTIONS_PER_FILE):
+            lines += [
+                f"    def handle_{function_index}(self, request):",
+                "        if request is None:",
+                "            raise ValueError('missing request')",
+                f"        return request.process({function_index})",
+                "",
+            ]
+        (source_path / f"service_{file_index:03d}.py").write_text("\n".join(lines))
+    return str(source_path)
+
+
+def report(name, latencies, elapsed):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"\n{name}: {len(latencies)} files in {elapsed:.2f} s, {len(latencies) / elapsed:.1f} files/s, "
+        f"p50 {quantiles[49] * 1000:.1f} ms, p99 {quantiles[98] * 1000:.1f} ms"
+    )
+    return len(latencies) / elapsed
+
+
+@pytest.fixture
+def file_latencies(monkeypatch):
+    """ Record the latency of every process_file call, including those of concurrent workers. """
+
+    latencies = []
+    errors = []
+    process_file = SourceCodeAnalyzer.process_file
+
+    def timed_process_file(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return process_file(self, *args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+            if self.last_error is not None:
+                errors.append(self.last_error)
+
+    monkeypatch.setattr(SourceCodeAnalyzer, "process_file", timed_process_file)
+    return latencies, errors
+
+
+class TestAnalysisBenchmark:
+
+    def test_process_file(self, tmp_path, configure_stub, file_latencies):
+        configure_stub(latency_distribution="fixed", latency_seconds=0.01)
+        source_path = write_sources(tmp_path / "repo")
+        analyzer = SourceCodeAnalyzer(isolated=True)
+        latencies, errors = file_latencies
+
+        start = time.perf_counter()
+        results = [analyzer.process_file(str(path)) for path in sorted(Path(source_path).iterdir())]
+        report("process_file", latencies, time.perf_counter() - start)
+
+        assert not errors
+        assert all(f"defines {FUNCTIONS_PER_FILE} functions" in result for result in results)
+        assert statistics.median(latencies) >= 0.01
+
+    @pytest.mark.parametrize("max_workers", [1, 8])
+    def test_process_directory(self, tmp_path, configure_stub, file_latencies, max_workers):
+        configure_stub(
+            max_workers=max_workers, latency_distribution="lognormal", latency_seconds=0.02, latency_spread=0.5)
+        source_path = write_sources(tmp_path / "repo")
+        analyzer = SourceCodeAnalyzer(isolated=True)
+        latencies, errors = file_latencies
+
+        start = time.perf_counter()
+        analyzer.process_directory(source_path)
+        report(f"process_directory with {max_workers} workers", latencies, time.perf_counter() - start)
+
+        assert not errors
+        assert len(latencies) == FILE_COUNT
+
+    def test_process_directory_with_output_writer(self, tmp_path, configure_stub):
+        configure_stub(max_workers=4, latency_distribution="fixed", latency_seconds=0.01)
+        source_path = write_sources(tmp_path / "repo")
+        output_writer = DirectoryOutputWriter(output_dir=str(tmp_path / "out"), source_root=source_path)
+
+        start = time.perf_counter()
+        SourceCodeAnalyzer(isolated=True).process_directory(source_path, output_writer=output_writer)
+        elapsed = time.perf_counter() - start
+        print(f"\nprocess_directory with output writer: {FILE_COUNT} files in {elapsed:.2f} s")
+
+        outputs = sorted((tmp_path / "out").iterdir())
+        assert [path.name for path in outputs] == [f"service_{index:03d}.py.md" for index in range(FILE_COUNT)]
+        assert all(f"defines {FUNCTIONS_PER_FILE} functions" in path.read_text() for path in outputs)
+
+    def test_process_directory_concurrency_speedup(self, tmp_path, configure_stub, file_latencies):
+        source_path = write_sources(tmp_path / "repo")
+        latencies, _ = file_latencies
+        throughputs = {}
+        for max_workers in (1, 8):
+            configure_stub(max_workers=max_workers, latency_distribution="fixed", latency_seconds=0.05)
+            latencies.clear()
+            start = time.perf_counter()
+            SourceCodeAnalyzer(isolated=True).process_directory(source_path)
+            throughputs[max_workers] = report(
+                f"process_directory speedup with {max_workers} workers", latencies, time.perf_counter() - start)
+
+        assert throughputs[8] > 2 * throughputs[1]
+
+    def test_process_directory_with_injected_failures(self, tmp_path, configure_stub, file_latencies):
+        configure_stub(
+            max_workers=4, latency_distribution="uniform", latency_seconds=0.01, latency_spread=0.005,
+            failure_rate=0.1, throttle_rate=0.1, seed=7)
+        source_path = write_sources(tmp_path / "repo")
+        analyzer = SourceCodeAnalyzer(isolated=True)
+        latencies, errors = file_latencies
+
+        start = time.perf_counter()
+        analyzer.process_directory(source_path)
+        report("process_directory with failures and throttling", latencies, time.perf_counter() - start)
+
+        assert not errors
+        assert len(latencies) == FILE_COUNT
@@ -0,0 +1,71 @@
+"""
+Benchmark of decoding the JSON of large model responses.
+
+Run with the output shown to see the timings:
+
+    PYTHONPATH=src:src/source_analyzer python -m pytest -s --benchmark tests/benchmark/test_json_extraction_benchmark.py
+"""
+import json
+import re
+import time
+import pytest
+from common.json_utils import JsonUtils
+
+pytestmark = pytest.mark.benchmark
+
+LOCATION_COUNT = 1500
+ROUNDS = 20
+
+
+def synthetic_response():
+    """ A response of about 40k tokens: prose, a fenced analysis and trailing prose. """
+
+    completion = {
+        "overall_analysis_summary": "Trace the request handlers. " * 20,
+        "priorities": [
+            {
+                "priority": "Exception Handling Blocks",
+                "critical_locations": [
+                    {
+                        "location_name": f"handle_{index}",
+                        "function_name": f"Service.handle_{index}",
+                        "code_block": f"if request is None:\n    raise ValueError('missing request {index}')",
+                        "rationale": "Rejected requests are otherwise invisible in the trace",
+                        "trace_info": "The request identifier and the reason for the rejection",
+                        "line_number": index,
+                    }
+                    for index in range(LOCATION_COUNT)
+                ],
+            }
+        ],
+    }
+    prose = "The analysis below lists the locations to instrument, in order of priority.\n" * 50
+    return completion, prose + "```json\n" + json.dumps(completion, indent=2) + "\n```\n" + prose
+
+
+def regex_decode(text):
+    """ The previous extraction: match every fenced block, then decode the first. """
+
+    return json.loads(re.findall(r"```json\s*(.*?)\s*```", text, re.DOTALL)[0])
+
+
+def timed(decode, text):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        value = decode(text)
+    return value, (time.perf_counter() - start) / ROUNDS
+
+
+class TestJsonExtractionBenchmark:
+
+    def test_decode_json_response(self):
+        completion, text = synthetic_response()
+
+        regex_value, regex_seconds = timed(regex_decode, text)
+        value, seconds = timed(JsonUtils().decode_json_response, text)
+        print(
+            f"\n{len(text) / 1024:.0f} KiB response: regex and json.loads {regex_seconds * 1000:.2f} ms, "
+            f"decode_json_response {seconds * 1000:.2f} ms"
+        )
+
+        assert value == regex_value == completion
@@ -0,0 +1,104 @@
+from pathlib import Path
+import pytest
+import yaml
+from common.configuration import Configuration
+from source_analyzer.analyzer_session import AnalyzerSession
+from source_analyzer.models.local_stub_model import LocalStubModel
+
+SRC_PATH = Path(__file__).parents[1] / "src"
+CONFIG_PATH = SRC_PATH / "source_analyzer" / "config.yaml"
+CALL_TRACER_CONFIG_PATH = SRC_PATH / "call_tracer" / "config.yaml"
+
+
+def pytest_addoption(parser):
+    parser.addoption("--benchmark", action="store_true", help="run the benchmarks, which are deselected by default")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: a wall-clock benchmark, run only with --benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    """ Deselect the benchmarks unless --benchmark is given, as their timings depend on the host. """
+
+    if config.getoption("--benchmark"):
+        return
+    benchmarks = [item for item in items if item.get_closest_marker("benchmark") is not None]
+    if benchmarks:
+        config.hook.pytest_deselected(items=benchmarks)
+        items[:] = [item for item in items if item.get_closest_marker("benchmark") is None]
+
+
+@pytest.fixture
+def configure_stub(tmp_path, monkeypatch):
+    """ Write a configuration selecting the stub model with the given settings and run from it. """
+
+    def configure(max_workers=1, settings=None, **custom):
+        config = yaml.safe_load(CONFIG_PATH.read_text())
+        config["ai_model"].update({
+            "class": {"name": "LocalStubModel"},
+            "module": {"name": "local_stub_model"},
+            "max_llm_tries": 10,
+            "max_throttled_llm_tries": 20,
+            "retry_delay": 0,
+            "max_retry_delay": 0,
+            "custom": custom,
+        })
+        config["concurrency"].update({"max_workers": max_workers, "requests_per_minute": 0})
+        config["response_cache"]["enabled"] = "false"
+        config["incremental"]["enabled"] = "false"
+        for key, value in (settings or {}).items():
+            if isinstance(value, dict):
+                config.setdefault(key, {}).update(value)
+            else:
+                config[key] = value
+
+        config_path = tmp_path / "source_analyzer"
+        config_path.mkdir(exist_ok=True)
+        (config_path / "config.yaml").write_text(yaml.safe_dump(config))
+        if not (config_path / "formatters").exists():
+            (config_path / "formatters").symlink_to(SRC_PATH / "source_analyzer" / "formatters")
+        monkeypatch.chdir(tmp_path)
+
+    return configure
+
+
+@pytest.fixture
+def model_prompts(monkeypatch):
+    """ Record the prompt of every request to the stub model. """
+
+    prompts = []
+    generate_text = LocalStubModel.generate_text
+
+    def recorded_generate_text(self, prompt, on_token=None):
+        prompts.append(prompt)
+        return generate_text(self, prompt, on_token)
+
+    monkeypatch.setattr(LocalStubModel, "generate_text", recorded_generate_text)
+    return prompts
+
+
+@pytest.fixture
+def configure_renderer(tmp_path, monkeypatch, configure_stub):
+    """ Write a call tracer configuration with the given renderer settings over a stub analyzer configuration. """
+
+    def configure(**settings):
+        configure_stub(latency_seconds=0)
+        # the renderer analyzes on a session of its own, set up from the stub configuration
+        monkeypatch.setattr(AnalyzerSession, "_instance", None)
+        monkeypatch.setattr(AnalyzerSession, "_initialized", False)
+        config = yaml.safe_load(CALL_TRACER_CONFIG_PATH.read_text())
+        for key, value in settings.items():
+            if isinstance(value, dict):
+                config["renderer"]["configuration"].setdefault(key, {}).update(value)
+            else:
+                config["renderer"]["configuration"][key] = value
+
+        config_path = tmp_path / "call_tracer"
+        config_path.mkdir(exist_ok=True)
+        (config_path / "config.yaml").write_text(yaml.safe_dump(config))
+        if not (config_path / "renderers").exists():
+            (config_path / "renderers").symlink_to(SRC_PATH / "call_tracer" / "renderers")
+        return Configuration("call_tracer/config.yaml")
+
+    return configure
@@ -0,0 +1,265 @@
+import json
+import pytest
+from starlette.testclient import TestClient
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.requests import Request
+from call_tracer.renderers import fasthtml_renderer
+from call_tracer.renderers.fasthtml_renderer import FastHtmlRenderer, compute_page_etag, etag_matches
+from source_analyzer.models.local_stub_model import LocalStubModel
+from source_analyzer.models.model import EXCEPTION_LEVEL_WARN, ModelException, ModelStreamUpdate
+
+
+@pytest.fixture
+def trace(tmp_path):
+    source_root = tmp_path / "repo"
+    source_root.mkdir()
+    (source_root / "service.py").write_text("def main():\n    return helper()\n\n\ndef helper():\n    return 1\n")
+    (tmp_path / "outside.py").write_text("def outside():\n    return 2\n")
+    return {
+        "id": "main", "name": "main", "type": "function", "qualified_name": "main",
+        "file_path": str(source_root / "service.py"),
+        "calls": [
+            {
+                "id": "helper<1>", "name": "<script>alert('helper')</script>", "type": "function\"",
+                "qualified_name": "helper", "file_path": str(source_root / "service.py"),
+            },
+            {
+                "id": "outside", "name": "outside", "type": "function", "qualified_name": "outside",
+                "file_path": str(tmp_path / "outside.py"),
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def client(tmp_path, configure_renderer, trace):
+    configuration = configure_renderer(source_root=str(tmp_path / "repo"))
+    return TestClient(FastHtmlRenderer(configuration=configuration, data=trace).app)
+
+
+class TestTreeRendering:
+
+    def test_escapes_node_fields(self, client):
+        page = client.get("/").text
+
+        assert "<script>alert" not in page
+        assert "&lt;script&gt;alert(&#x27;helper&#x27;)&lt;/script&gt;" in page
+        assert "(function&quot;)" in page
+        assert 'hx-get="/node/helper%3C1%3E"' in page
+
+    def test_only_nodes_under_the_source_root_are_selectable(self, client):
+        page = client.get("/").text
+
+        assert 'hx-get="/node/main"' in page
+        assert 'hx-get="/node/outside"' not in page
+
+    def test_node_details_stream_url_is_encoded(self, client):
+        details = client.get("/node/helper<1>").text
+
+        assert 'new EventSource("/node/helper%3C1%3E/stream")' in details
+
+
+class TestSourceRoot:
+
+    def test_files_outside_the_source_root_are_not_analyzed(self, client, model_prompts):
+        assert client.get("/node/outside/content").status_code == 403
+        assert client.get("/node/outside/stream").status_code == 403
+        assert not model_prompts
+
+    def test_files_under_the_source_root_are_analyzed(self, client, model_prompts):
+        response = client.get("/node/main/content")
+
+        assert response.status_code == 200
+        assert len(model_prompts) == 1
+
+    def test_any_file_is_analyzed_without_a_source_root(self, configure_renderer, trace, model_prompts):
+        client = TestClient(FastHtmlRenderer(configuration=configure_renderer(), data=trace).app)
+
+        assert 'hx-get="/node/outside"' in client.get("/").text
+        assert client.get("/node/outside/content").status_code == 200
+        assert len(model_prompts) == 1
+
+
+
+def read_events(client, url):
+    """ Read a server-sent event stream into a list of (event, data) pairs. """
+
+    with client.stream("GET", url) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = response.read().decode("utf-8")
+    events = []
+    for block in body.split("\n\n"):
+        if block:
+            event_line, data_line = block.split("\n")
+            events.append((event_line.removeprefix("event: "), json.loads(data_line.removeprefix("data: "))))
+    return events
+
+
+class TestNodeContentEvents:
+
+    def test_streams_the_phases_tokens_and_markdown(self, client, model_prompts):
+        events = read_events(client, "/node/main/stream")
+
+        names = [event for event, _ in events]
+        assert names[:3] == ["phase"] * 3
+        assert [data["phase"] for _, data in events[:3]] == ["queued", "prompt_built", "model_invoked"]
+        assert set(names[3:-3]) == {"tokens"}
+        assert events[-3] == ("phase", {"phase": "formatted"})
+        assert names[-2:] == ["markdown", "done"]
+        assert len(model_prompts) == 1
+        streamed_text = "".join(data["text"] for event, data in events if event == "tokens")
+        assert '"overall_analysis_summary"' in streamed_text
+        markdown = events[-2][1]["markdown"]
+        assert markdown.startswith("# Source File: service.py")
+        assert markdown == client.get("/node/main/content").text
+
+    def test_completion_received_so_far_is_streamed_as_markdown(self, client, monkeypatch):
+        def generate_text_stream(self, prompt):
+            result = self.generate_text(prompt)
+            yield ModelStreamUpdate(text="{", partial_json={"overall_analysis_summary": "Halfway there."})
+            yield ModelStreamUpdate(text=result.text, partial_json=result.completion_json, result=result)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text_stream", generate_text_stream)
+        monkeypatch.setattr(fasthtml_renderer, "TOKEN_EVENT_INTERVAL_SECONDS", 0)
+
+        events = read_events(client, "/node/main/stream")
+
+        assert [event for event, _ in events[3:-3]] == ["tokens", "markdown", "tokens", "markdown"]
+        partial = [data for event, data in events if event == "markdown" and data["partial"]]
+        assert partial[0]["markdown"].startswith("# Source File: service.py")
+        assert "Halfway there." in partial[0]["markdown"]
+        assert "Stopped Reason: None" in partial[0]["markdown"]
+        assert events[-2][1]["partial"] is False
+        assert partial[1]["markdown"].split("## Summary")[0] == events[-2][1]["markdown"].split("## Summary")[0]
+
+    def test_retried_request_streams_its_response_again(self, client, monkeypatch):
+        attempts = []
+
+        def generate_text_stream(self, prompt):
+            attempts.append(prompt)
+            result = self.generate_text(prompt)
+            yield ModelStreamUpdate(text="{", partial_json=None)
+            if len(attempts) == 1:
+                raise ModelException("connection reset", EXCEPTION_LEVEL_WARN)
+            yield ModelStreamUpdate(text=result.text, partial_json=result.completion_json, result=result)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text_stream", generate_text_stream)
+        monkeypatch.setattr(fasthtml_renderer, "TOKEN_EVENT_INTERVAL_SECONDS", 0)
+
+        events = read_events(client, "/node/main/stream")
+
+        invoked = [data for event, data in events if data.get("phase") == "model_invoked"]
+        assert invoked == [{"phase": "model_invoked", "attempt": 1}, {"phase": "model_invoked", "attempt": 2}]
+        names = [event for event, _ in events]
+        assert names.index("tokens") < events.index(("phase", invoked[1]))
+        assert names[-2:] == ["markdown", "done"]
+
+    def test_cached_analysis_is_streamed_without_the_model(self, client, model_prompts):
+        read_events(client, "/node/main/stream")
+
+        events = read_events(client, "/node/main/stream")
+
+        assert [event for event, _ in events] == ["phase", "markdown", "done"]
+        assert events[1][1]["markdown"].startswith("# Source File: service.py")
+        assert len(model_prompts) == 1
+
+    def test_failed_analysis_streams_an_error(self, client, monkeypatch):
+        def failing_analyze_node(node, progress_callback=None):
+            raise RuntimeError("model unavailable")
+
+        monkeypatch.setattr(fasthtml_renderer, "analyze_node", failing_analyze_node)
+
+        events = read_events(client, "/node/main/stream")
+
+        assert events == [
+            ("phase", {"phase": "queued"}), ("error", {"message": "model unavailable"}), ("done", {}),
+        ]
+
+
+def request_with(if_none_match):
+    return Request({"type": "http", "headers": [(b"if-none-match", if_none_match.encode())]})
+
+
+class TestEntityTags:
+
+    def test_page_etag_follows_the_trace_and_prefetch_setting(self, trace):
+        etag = compute_page_etag(trace, prefetch_enabled=False)
+
+        assert etag.startswith('"') and etag.endswith('"')
+        assert etag == compute_page_etag(dict(reversed(list(trace.items()))), prefetch_enabled=False)
+        assert etag != compute_page_etag(trace, prefetch_enabled=True)
+        assert etag != compute_page_etag(dict(trace, name="other"), prefetch_enabled=False)
+
+    def test_etag_matches(self):
+        assert etag_matches(request_with('"a"'), '"a"')
+        assert etag_matches(request_with('W/"a"'), '"a"')
+        assert etag_matches(request_with('"b", "a"'), '"a"')
+        assert etag_matches(request_with("*"), '"a"')
+        assert not etag_matches(request_with('"b"'), '"a"')
+        assert not etag_matches(Request({"type": "http", "headers": []}), '"a"')
+
+    def test_unchanged_page_is_not_modified(self, client):
+        response = client.get("/")
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-cache"
+        revalidated = client.get("/", headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == response.headers["etag"]
+        assert client.get("/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    def test_cached_node_content_is_revalidated(self, client, model_prompts):
+        response = client.get("/node/main/content")
+
+        assert response.headers["cache-control"] == "private, no-cache"
+        revalidated = client.get("/node/main/content", headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert len(model_prompts) == 1
+
+    def test_failed_node_content_is_not_stored(self, client, monkeypatch):
+        monkeypatch.setattr(fasthtml_renderer, "analyze_node", lambda node: ("Failed to analyze", 0, False))
+
+        response = client.get("/node/main/content")
+
+        assert response.headers["cache-control"] == "no-store"
+        assert "etag" not in response.headers
+
+
+class TestCachingStaticFiles:
+
+    def test_static_files_carry_max_age_and_are_revalidated(self, tmp_path, configure_renderer, trace):
+        configuration = configure_renderer(source_root=str(tmp_path / "repo"), static={"max_age": 60})
+        client = TestClient(FastHtmlRenderer(configuration=configuration, data=trace).app)
+
+        response = client.get("/static/styles.css")
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "public, max-age=60"
+        revalidated = client.get("/static/styles.css", headers={"If-None-Match": response.headers["etag"]})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["cache-control"] == "public, max-age=60"
+
+
+class TestCompression:
+
+    @pytest.mark.skipif(fasthtml_renderer.BrotliMiddleware is None, reason="brotli-asgi is not installed")
+    def test_brotli_with_gzip_fallback(self, client):
+        assert client.get("/", headers={"Accept-Encoding": "br, gzip"}).headers["content-encoding"] == "br"
+        assert client.get("/", headers={"Accept-Encoding": "gzip"}).headers["content-encoding"] == "gzip"
+        assert "content-encoding" not in client.get("/", headers={"Accept-Encoding": "identity"}).headers
+
+    def test_gzip_without_brotli(self, tmp_path, configure_renderer, trace, monkeypatch):
+        monkeypatch.setattr(fasthtml_renderer, "BrotliMiddleware", None)
+        configuration = configure_renderer(source_root=str(tmp_path / "repo"))
+        renderer = FastHtmlRenderer(configuration=configuration, data=trace)
+
+        assert renderer.app.user_middleware[0].cls is GZipMiddleware
+        response = TestClient(renderer.app).get("/", headers={"Accept-Encoding": "br, gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+
+    def test_small_responses_and_event_streams_are_not_compressed(self, client):
+        assert "content-encoding" not in client.get("/node/missing", headers={"Accept-Encoding": "gzip"}).headers
+        with client.stream("GET", "/node/main/stream", headers={"Accept-Encoding": "br, gzip"}) as response:
+            assert "content-encoding" not in response.headers
+            response.read()
@@ -0,0 +1,72 @@
+import json
+import pytest
+from starlette.testclient import TestClient
+from call_tracer.renderers.fasthtml_trace_server import FastHtmlTraceServer
+
+TRACE = {"id": "main", "name": "<b>main</b>", "type": "function", "calls": []}
+
+
+@pytest.fixture
+def create_client(tmp_path, configure_renderer):
+    def create(**trace_server):
+        configuration = configure_renderer(
+            trace_server={"traces_directory": str(tmp_path / "traces"), **trace_server})
+        return TestClient(FastHtmlTraceServer(configuration=configuration).app)
+    return create
+
+
+def upload(client, headers=None, content_type="application/json"):
+    return client.post(
+        "/traces?trace_id=main", content=json.dumps(TRACE),
+        headers={"Content-Type": content_type, **(headers or {})})
+
+
+class TestUploadTrace:
+
+    def test_uploaded_trace_is_served_escaped(self, create_client):
+        client = create_client()
+
+        response = upload(client)
+
+        assert response.status_code == 201
+        assert response.json() == {"trace_id": "main", "url": "/trace/main/"}
+        page = client.get("/trace/main/").text
+        assert "&lt;b&gt;main&lt;/b&gt;" in page and "<b>main</b>" not in page
+
+    def test_requires_json_content_type(self, create_client):
+        client = create_client()
+
+        assert upload(client, content_type="text/plain").status_code == 415
+        assert upload(client, content_type="application/x-www-form-urlencoded").status_code == 415
+        assert upload(client, content_type="application/json; charset=utf-8").status_code == 201
+
+    def test_refuses_cross_origin_uploads(self, create_client):
+        client = create_client()
+
+        assert upload(client, {"Origin": "https://attacker.example"}).status_code == 403
+        assert upload(client, {"Sec-Fetch-Site": "cross-site"}).status_code == 403
+        assert upload(client, {"Origin": "http://testserver", "Sec-Fetch-Site": "same-origin"}).status_code == 201
+        assert client.get("/trace/main/").status_code == 200
+
+    def test_requires_the_configured_token(self, create_client):
+        client = create_client(upload_token="secret")
+
+        assert upload(client).status_code == 403
+        assert upload(client, {"Authorization": "Bearer wrong"}).status_code == 403
+        assert client.get("/trace/main/").status_code == 404
+        assert upload(client, {"Authorization": "Bearer secret"}).status_code == 201
+
+
+class TestSourceRoot:
+
+    def test_only_files_under_the_working_directory_are_analyzed(self, tmp_path, create_client, model_prompts):
+        (tmp_path / "service.py").write_text("def main():\n    return 1\n")
+        client = create_client()
+        trace = {"id": "main", "name": "main", "file_path": str(tmp_path / "service.py"), "calls": [
+            {"id": "outside", "name": "outside", "file_path": "/outside/service.py"},
+        ]}
+        client.post("/traces?trace_id=main", json=trace)
+
+        assert client.get("/trace/main/node/outside/content").status_code == 403
+        assert client.get("/trace/main/node/main/content").status_code == 200
+        assert len(model_prompts) == 1
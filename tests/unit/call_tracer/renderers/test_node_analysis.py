@@ -0,0 +1,267 @@
+import threading
+import pytest
+from call_tracer.renderers import node_analysis
+from call_tracer.renderers.node_analysis import AnalysisPrefetcher, NodeAnalysisCache
+from source_analyzer.token_budget import TokenBudgetExceededException
+
+
+@pytest.fixture
+def nodes(tmp_path):
+    source_path = tmp_path / "service.py"
+    source_path.write_text("def alpha():\n    return 1\n\n\ndef beta():\n    return 2\n")
+    return [
+        {"id": name, "file_path": str(source_path), "qualified_name": name}
+        for name in ("alpha", "beta")
+    ]
+
+
+class BlockedCompute:
+    """ An analysis that blocks until released, counting its calls. """
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, *args):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return self.result
+
+
+def logged(cache, message):
+    """ Get an event set once the cache logs a debug message starting with message. """
+
+    event = threading.Event()
+    debug = cache._logger.debug
+
+    def recorded_debug(text, *args, **kwargs):
+        if str(text).startswith(message):
+            event.set()
+        return debug(text, *args, **kwargs)
+
+    cache._logger.debug = recorded_debug
+    return event
+
+
+def run_in_thread(function, *args):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(function(*args)))
+    thread.start()
+    return thread, results
+
+
+class TestNodeAnalysisCache:
+
+    def test_key_changes_with_the_file_and_the_function(self, nodes):
+        cache = NodeAnalysisCache()
+        alpha, beta = nodes
+        key = cache.key_for(alpha)
+
+        assert key == cache.key_for(dict(alpha))
+        assert key != cache.key_for(beta)
+        with open(alpha["file_path"], "a", encoding="utf-8") as f:
+            f.write("\n")
+        assert key != cache.key_for(alpha)
+        assert cache.key_for({"id": "missing", "file_path": "missing.py"}) is None
+
+    def test_concurrent_requests_share_the_analysis_in_flight(self, nodes):
+        cache = NodeAnalysisCache()
+        compute = BlockedCompute(("alpha analysis", 10, True))
+        waiting = logged(cache, "Waiting for in-flight analysis")
+        owner, owner_results = run_in_thread(cache.get_or_compute, nodes[0], compute)
+        assert compute.started.wait(5)
+        waiter, waiter_results = run_in_thread(cache.get_or_compute, nodes[0], compute)
+
+        assert waiting.wait(5)
+        assert cache.is_known(cache.key_for(nodes[0]))
+        compute.release.set()
+        owner.join(5)
+        waiter.join(5)
+
+        assert compute.calls == 1
+        assert owner_results == waiter_results == ["alpha analysis"]
+        assert cache.get(cache.key_for(nodes[0])) == "alpha analysis"
+        assert cache.get_or_compute(nodes[0], compute) == "alpha analysis"
+        assert compute.calls == 1
+
+    def test_failed_analysis_is_not_cached(self, nodes):
+        cache = NodeAnalysisCache()
+
+        assert cache.get_or_compute(nodes[0], lambda: ("error", 0, False)) == "error"
+
+        assert not cache.is_known(cache.key_for(nodes[0]))
+        assert cache.get_or_compute(nodes[0], lambda: ("alpha analysis", 10, True)) == "alpha analysis"
+
+    def test_exception_is_raised_to_the_waiting_requests(self, nodes):
+        cache = NodeAnalysisCache()
+        compute = BlockedCompute(None)
+
+        def failing_compute():
+            compute()
+            raise RuntimeError("model unavailable")
+
+        waiting = logged(cache, "Waiting for in-flight analysis")
+        owner, _ = run_in_thread(lambda: pytest.raises(RuntimeError, cache.get_or_compute, nodes[0], failing_compute))
+        assert compute.started.wait(5)
+        waiter, waiter_results = run_in_thread(
+            lambda: pytest.raises(RuntimeError, cache.get_or_compute, nodes[0], failing_compute))
+        assert waiting.wait(5)
+        compute.release.set()
+        owner.join(5)
+        waiter.join(5)
+
+        assert compute.calls == 1
+        assert str(waiter_results[0].value) == "model unavailable"
+        assert not cache.is_known(cache.key_for(nodes[0]))
+
+    def test_batch_waits_for_nodes_in_flight_and_computes_the_others_together(self, nodes):
+        cache = NodeAnalysisCache()
+        single = BlockedCompute(("alpha analysis", 10, True))
+        batches = []
+
+        def compute_batch(batch_nodes):
+            batches.append([node["id"] for node in batch_nodes])
+            return {node["qualified_name"]: f"{node['id']} batch analysis" for node in batch_nodes}, 20, True
+
+        batching = logged(cache, "Analyze 1 of 2 nodes")
+        owner, _ = run_in_thread(cache.get_or_compute, nodes[0], single)
+        assert single.started.wait(5)
+        batch, batch_results = run_in_thread(cache.get_or_compute_batch, nodes, compute_batch)
+        assert batching.wait(5)
+        single.release.set()
+        owner.join(5)
+        batch.join(5)
+
+        assert batches == [["beta"]]
+        assert batch_results == [["alpha analysis", "beta batch analysis"]]
+        assert cache.get_or_compute_batch(nodes, compute_batch) == ["alpha analysis", "beta batch analysis"]
+        assert batches == [["beta"]]
+
+
+class TestAnalysisPrefetcher:
+
+    @pytest.fixture
+    def started(self):
+        """ Set to let the queued analyses start. """
+
+        event = threading.Event()
+        event.set()
+        return event
+
+    @pytest.fixture
+    def analyses(self, monkeypatch, started):
+        """
+        Replace the node analyses with ones reserving and costing 10 tokens each, recording the nodes
+        analyzed.
+        """
+
+        analyzed = []
+
+        def spend(token_budget):
+            started.wait(5)
+            if token_budget is None:
+                return True
+            try:
+                token_budget.reserve(10)
+            except TokenBudgetExceededException:
+                return False
+            token_budget.settle(10, 10)
+            return True
+
+        def fake_analyze_node(node, progress_callback=None, token_budget=None):
+            if not spend(token_budget):
+                return None, 0, False
+            analyzed.append([node["id"]])
+            return f"{node['id']} analysis", 10, True
+
+        def fake_analyze_file_nodes(nodes, progress_callback=None, token_budget=None):
+            if not spend(token_budget):
+                return {}, 0, False
+            analyzed.append([node["id"] for node in nodes])
+            return {node["qualified_name"]: f"{node['id']} batch analysis" for node in nodes}, 10, True
+
+        monkeypatch.setattr(node_analysis, "analyze_node", fake_analyze_node)
+        monkeypatch.setattr(node_analysis, "analyze_file_nodes", fake_analyze_file_nodes)
+        return analyzed
+
+    @pytest.fixture
+    def file_nodes(self, tmp_path):
+        (tmp_path / "repo").mkdir()
+        nodes = []
+        for index in range(5):
+            source_path = tmp_path / "repo" / f"module_{index}.py"
+            source_path.write_text(f"def function_{index}():\n    return {index}\n")
+            name = f"function_{index}"
+            nodes.append({"id": name, "file_path": str(source_path), "qualified_name": name})
+        return nodes
+
+    @staticmethod
+    def wait_for(prefetcher):
+        # let the queued analyses run to completion
+        prefetcher._executor.shutdown(wait=True)
+
+    def test_stops_once_the_token_budget_is_spent(self, analyses, started, file_nodes):
+        prefetcher = AnalysisPrefetcher(cache=NodeAnalysisCache(), max_workers=1, token_budget=30)
+
+        started.clear()
+        assert prefetcher.enqueue(file_nodes) == 5
+        started.set()
+        self.wait_for(prefetcher)
+
+        assert analyses == [["function_0"], ["function_1"], ["function_2"]]
+        assert prefetcher.tokens_spent == 30
+        assert prefetcher.budget_exhausted()
+        assert prefetcher.enqueue(file_nodes[3:]) == 0
+
+    def test_concurrent_workers_do_not_overspend_the_token_budget(self, analyses, started, file_nodes):
+        prefetcher = AnalysisPrefetcher(cache=NodeAnalysisCache(), max_workers=5, token_budget=25)
+
+        started.clear()
+        assert prefetcher.enqueue(file_nodes) == 5
+        started.set()
+        self.wait_for(prefetcher)
+
+        assert len(analyses) == 2
+        assert prefetcher.tokens_spent == 20
+
+    def test_prefetched_node_is_served_from_the_cache(self, analyses, file_nodes):
+        cache = NodeAnalysisCache()
+        prefetcher = AnalysisPrefetcher(cache=cache, max_workers=2, token_budget=0)
+
+        prefetcher.enqueue(file_nodes[:2] + [{"id": "no file"}])
+        self.wait_for(prefetcher)
+
+        def not_called():
+            raise AssertionError("the prefetched analysis is not reused")
+
+        assert cache.get_or_compute(file_nodes[0], not_called) == "function_0 analysis"
+        assert cache.get_or_compute(file_nodes[1], not_called) == "function_1 analysis"
+        assert prefetcher.enqueue(file_nodes[:2]) == 0
+        assert sorted(analyses) == [["function_0"], ["function_1"]]
+
+    def test_functions_of_a_file_are_prefetched_in_batches(self, analyses, file_nodes):
+        cache = NodeAnalysisCache()
+        nodes = [dict(file_nodes[0], id=name, qualified_name=name) for name in ("alpha", "beta", "gamma")]
+        prefetcher = AnalysisPrefetcher(cache=cache, max_workers=1, token_budget=0, max_batch_size=2)
+
+        assert prefetcher.enqueue(nodes) == 3
+        self.wait_for(prefetcher)
+
+        assert analyses == [["alpha", "beta"], ["gamma"]]
+        assert [cache.get(cache.key_for(node)) for node in nodes] == [
+            "alpha batch analysis", "beta batch analysis", "gamma analysis"]
+
+    def test_files_outside_the_source_root_are_not_prefetched(self, tmp_path, analyses, file_nodes):
+        outside_path = tmp_path / "outside.py"
+        outside_path.write_text("def outside():\n    return 0\n")
+        outside = {"id": "outside", "file_path": str(outside_path), "qualified_name": "outside"}
+        prefetcher = AnalysisPrefetcher(
+            cache=NodeAnalysisCache(), max_workers=1, token_budget=0, source_root=(tmp_path / "repo").resolve())
+
+        assert prefetcher.enqueue([outside, file_nodes[0]]) == 1
+        self.wait_for(prefetcher)
+
+        assert analyses == [["function_0"]]
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+from types import SimpleNamespace
+import pytest
+import streamlit as st
+from call_tracer.renderers import streamlit_renderer
+from call_tracer.renderers.streamlit_renderer import (
+    StreamlitRenderer, TraceIndex, build_trace_index, get_node_details_markdown, load_trace_file,
+)
+
+TREE = {
+    "id": "main", "name": "main", "qualified_name": "app.main", "file_path": "app.py", "lineno": 1,
+    "calls": [
+        {"id": "load", "name": "load", "qualified_name": "app.load", "calls": [{"id": "read", "name": "read"}]},
+        {"id": "save", "name": "save", "not_found": True},
+    ],
+}
+
+MAPPING = {
+    "main": {"id": "main", "name": "main", "calls": [{"id": "load"}, {"id": "print", "qualified_name": "print"}]},
+    "load": {"id": "load", "name": "load"},
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_streamlit_state():
+    """ Start every test with empty Streamlit caches and session state. """
+
+    load_trace_file.clear()
+    build_trace_index.clear()
+    get_node_details_markdown.clear()
+    st.session_state.clear()
+    yield
+    st.session_state.clear()
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    trace_path = tmp_path / "trace.json"
+    trace_path.write_text(json.dumps(TREE))
+    return str(trace_path)
+
+
+class TestTraceIndex:
+
+    def test_indexes_a_call_tree(self):
+        index = TraceIndex(TREE)
+
+        assert index.roots == ["main"]
+        assert set(index.nodes) == {"main", "load", "read", "save"}
+        assert index.children == {"main": ["load", "save"], "load": ["read"]}
+        assert index.labels == {"main": "app.main", "load": "app.load", "read": "read", "save": "save"}
+
+    def test_indexes_a_deep_call_tree(self):
+        root = node = {"id": "node_0"}
+        for depth in range(1, 5000):
+            child = {"id": f"node_{depth}"}
+            node["calls"] = [child]
+            node = child
+
+        index = TraceIndex(root)
+
+        assert len(index.nodes) == 5000
+        assert index.children["node_4998"] == ["node_4999"]
+
+    def test_indexes_a_mapping_of_nodes(self):
+        index = TraceIndex(MAPPING)
+
+        assert index.roots == ["main", "load"]
+        assert index.children == {"main": ["load", "print"]}
+        assert index.nodes["load"] is MAPPING["load"]
+        assert index.labels == {"main": "main", "load": "load", "print": "print"}
+
+    def test_node_details(self):
+        index = TraceIndex(TREE)
+
+        details = index.node_details("main")
+        assert details.startswith("# app.main\n")
+        assert "**File Path:** app.py\n" in details
+        assert "**Line Number:** 1\n" in details
+        assert "**Not Found:** True\n" in index.node_details("save")
+        assert index.node_details("missing") == "# No details found for node: missing"
+
+
+class TestCachedLoaders:
+
+    def test_trace_file_is_loaded_again_only_once_modified(self, trace_path):
+        modified_time = os.path.getmtime(trace_path)
+        data = load_trace_file(trace_path, modified_time)
+
+        assert data == TREE
+        assert load_trace_file(trace_path, modified_time) is data
+        assert load_trace_file(trace_path, modified_time + 1) is not data
+
+    def test_index_and_details_are_built_once_per_trace_key(self, monkeypatch):
+        index = build_trace_index("trace", TREE)
+
+        assert build_trace_index("trace", {"id": "other"}) is index
+        assert build_trace_index("other", TREE) is not index
+
+        calls = []
+        node_details = TraceIndex.node_details
+        monkeypatch.setattr(
+            TraceIndex, "node_details", lambda self, node_id: calls.append(node_id) or node_details(self, node_id))
+
+        assert get_node_details_markdown("trace", "main", index) == index.node_details("main")
+        calls.clear()
+        assert get_node_details_markdown("trace", "main", index).startswith("# app.main")
+        assert get_node_details_markdown("trace", "load", index).startswith("# app.load")
+        assert calls == ["load"]
+
+
+class TestTraceKey:
+
+    def test_trace_file_is_keyed_by_path_and_modified_time(self, configure_renderer, trace_path):
+        configuration = configure_renderer()
+
+        renderer = StreamlitRenderer(configuration=configuration, data=None, json_file_path=trace_path)
+
+        assert renderer._trace_key == f"{os.path.abspath(trace_path)}:{os.path.getmtime(trace_path)}"
+        assert renderer._index.roots == ["main"]
+        assert st.session_state.expanded_nodes == {"main"}
+
+    def test_data_passed_in_is_hashed_once_per_session(self, configure_renderer, monkeypatch):
+        configuration = configure_renderer()
+        hashed = []
+        monkeypatch.setattr(streamlit_renderer, "hashlib", SimpleNamespace(
+            sha256=lambda content: hashed.append(content) or hashlib.sha256(content)))
+
+        keys = [StreamlitRenderer(configuration=configuration, data=TREE)._trace_key for _ in range(3)]
+
+        assert len(hashed) == 1
+        assert len(set(keys)) == 1
+        assert StreamlitRenderer(configuration=configuration, data=MAPPING)._trace_key != keys[0]
+        assert len(hashed) == 2
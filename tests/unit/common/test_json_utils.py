@@ -0,0 +1,28 @@
+import json
+import pytest
+from common.json_utils import JsonUtils
+
+
+class TestDecodeJsonResponse:
+
+    def test_decodes_fenced_value_and_ignores_trailing_prose(self):
+        text = 'Here it is:\n```json\n{"a": "x ``` y", "b": [1, 2]}\n```\nLet me know if {this} helps.'
+        assert JsonUtils().decode_json_response(text) == {"a": "x ``` y", "b": [1, 2]}
+
+    def test_decodes_unfenced_object_after_prose(self):
+        text = 'Items [1] and {not json} first, then [{"a": 1}] and {"b": 2}.'
+        assert JsonUtils().decode_json_response(text) == [{"a": 1}]
+
+    def test_invalid_fenced_value_raises(self):
+        with pytest.raises(json.JSONDecodeError):
+            JsonUtils().decode_json_response('```json\n{"a": [1, 2\n```\n{"b": 2}')
+
+    def test_truncated_fenced_value_is_no_json(self):
+        assert JsonUtils().decode_json_response('Here it is:\n```json\n{"a": [1, 2') == {}
+        assert JsonUtils().extract_json('```json\n{"a": "x') == "{}"
+
+    def test_returns_empty_object_without_json(self):
+        assert JsonUtils().decode_json_response("No findings [1].") == {}
+
+    def test_extract_json_returns_the_decoded_text(self):
+        assert JsonUtils().extract_json('```json\n  {"a": 1}  \n```') == '{"a": 1}'
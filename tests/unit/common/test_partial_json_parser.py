@@ -0,0 +1,30 @@
+import json
+from common.partial_json_parser import PartialJsonParser
+
+
+class TestPartialJsonParser:
+
+    def test_returns_none_before_json_starts(self):
+        parser = PartialJsonParser()
+        assert parser.feed("Here is the analysis:\n```json\n") is None
+
+    def test_closes_open_values(self):
+        parser = PartialJsonParser()
+        assert parser.feed('{"summary": "Trace the') == {"summary": "Trace the"}
+        assert parser.feed(' retries", "count": 1') == {"summary": "Trace the retries"}
+        assert parser.feed('2, "items": [1, {"a"') == {"summary": "Trace the retries", "count": 12, "items": [1, {}]}
+
+    def test_leaves_out_incomplete_escape(self):
+        parser = PartialJsonParser()
+        assert parser.feed('{"a": "x\\u00') == {"a": "x"}
+        assert parser.feed('e9"}') == {"a": "xé"}
+        assert parser.finished
+
+    def test_any_fragmentation_yields_complete_value(self):
+        document = {"a": [1, 2.5, True, None, {"b": "c \\\" d"}], "e": {}, "f": []}
+        text = "prefix " + json.dumps(document, indent=2) + "\n``` suffix {"
+        for size in (1, 2, 5, 13):
+            parser = PartialJsonParser()
+            for index in range(0, len(text), size):
+                value = parser.feed(text[index:index + size])
+            assert value == document
@@ -0,0 +1,51 @@
+import pytest
+from common import rate_limiter
+from common.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """ Replaces time.monotonic and time.sleep in the rate limiter module with a simulated clock. """
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        self.sleeps = []
+        monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: self.now)
+        monkeypatch.setattr(rate_limiter.time, "sleep", self.sleep)
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestRateLimiter:
+
+    def test_burst_is_allowed_then_requests_are_spaced(self, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        limiter = RateLimiter(requests_per_minute=60, burst=2)
+
+        assert [limiter.acquire() for _ in range(4)] == [0.0, 0.0, pytest.approx(1.0), pytest.approx(1.0)]
+        assert clock.now == pytest.approx(2.0)
+
+    def test_idle_time_refills_up_to_burst(self, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        limiter = RateLimiter(requests_per_minute=120, burst=2)
+        limiter.acquire()
+        limiter.acquire()
+
+        clock.now += 60
+        assert [limiter.acquire() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+
+    def test_drain_makes_next_caller_wait_for_refill(self, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        limiter = RateLimiter(requests_per_minute=30, burst=3)
+
+        limiter.drain()
+
+        assert limiter.acquire() == pytest.approx(2.0)
+        assert clock.sleeps == [pytest.approx(2.0)]
+
+    def test_rejects_non_positive_settings(self):
+        with pytest.raises(ValueError):
+            RateLimiter(requests_per_minute=0)
+        with pytest.raises(ValueError):
+            RateLimiter(requests_per_minute=60, burst=0)
@@ -0,0 +1,35 @@
+import random
+from common.retry_policy import RetryPolicy
+
+
+class MaxRandom(random.Random):
+
+    def uniform(self, a, b):
+        return b
+
+
+class TestRetryPolicy:
+
+    def test_backoff_doubles_up_to_max_delay(self):
+        retry_policy = RetryPolicy(max_tries=10, max_throttled_tries=1, base_delay=1, max_delay=5, rng=MaxRandom())
+        assert [retry_policy.record_failure() for _ in range(5)] == [1, 2, 4, 5, 5]
+
+    def test_delay_is_jittered_below_ceiling(self):
+        retry_policy = RetryPolicy(max_tries=10, max_throttled_tries=1, base_delay=2, max_delay=30, rng=random.Random(7))
+        delays = [retry_policy.record_failure() for _ in range(6)]
+        assert all(0 <= delay <= min(30, 2 * 2 ** n) for n, delay in enumerate(delays))
+        assert len(set(delays)) == len(delays)
+
+    def test_throttling_and_transient_budgets_are_separate(self):
+        retry_policy = RetryPolicy(max_tries=2, max_throttled_tries=4, base_delay=1, max_delay=30, rng=MaxRandom())
+        assert retry_policy.record_failure(throttled=True) == 1
+        assert retry_policy.record_failure(throttled=True) == 2
+        assert retry_policy.record_failure() == 1
+        assert retry_policy.record_failure(throttled=True) == 4
+        assert retry_policy.attempt == 5
+        assert retry_policy.attempts_left
+        assert retry_policy.record_failure() is None
+        assert not retry_policy.attempts_left
+
+    def test_no_attempts_without_tries(self):
+        assert not RetryPolicy(max_tries=0, max_throttled_tries=8, base_delay=1, max_delay=30).attempts_left
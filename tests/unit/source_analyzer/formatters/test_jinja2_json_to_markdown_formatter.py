@@ -1,6 +1,14 @@
 import json
+import os
 import sys
+from pathlib import Path
+import jinja2
+import pytest
+from common.configuration import Configuration
 from formatters.formatter import FormatterFactory, FormatterObject
+from formatters.jinja2_json_to_markdown_formatter import Jinja2JsonToMarkdownFormatter
+
+CONFIG_PATH = Path(__file__).parents[4] / "src" / "source_analyzer" / "config.yaml"
 
 
 class TestUtilsDirectoryExists:
@@ -42,3 +50,49 @@ class TestUtilsDirectoryExists:
 
         assert response is not None
         assert response == expected_response
+
+
+class TestJinja2TemplateCache:
+
+    def create_formatter(self, tmp_path, debug="false"):
+        configuration = Configuration(str(CONFIG_PATH))
+        configuration._config_setter("formatter.template.name", "summary.jinja2")
+        configuration._config_setter("formatter.template.path", str(tmp_path / "templates"))
+        configuration._config_setter("formatter.template.debug", debug)
+        configuration._config_setter("formatter.template.bytecode_cache_path", str(tmp_path / "bytecode"))
+        return Jinja2JsonToMarkdownFormatter.create_isolated(configuration=configuration)
+
+    def format(self, formatter):
+        data = {"overall_analysis_summary": "Trace the retries", "priorities": []}
+        variables = {
+            "model_vendor": "Anthropic",
+            "model_name": "Claude 3 Sonnet",
+            "total_prompt_tokens": 10,
+            "total_completion_tokens": 5,
+            "stopped_reason": "end_turn",
+        }
+        return formatter.format_json(data=data, variables=variables)
+
+    def test_compiles_template_once_until_it_changes(self, tmp_path):
+        template_file = tmp_path / "templates" / "summary.jinja2"
+        template_file.parent.mkdir()
+        template_file.write_text("{{ model_name }}: {{ overall_analysis_summary }}")
+        formatter = self.create_formatter(tmp_path)
+
+        assert self.format(formatter) == "Claude 3 Sonnet: Trace the retries"
+        template = formatter._get_template()
+        assert self.create_formatter(tmp_path)._get_template() is template
+        assert list((tmp_path / "bytecode").iterdir())
+
+        template_file.write_text("{{ stopped_reason }}")
+        os.utime(template_file, (0, os.stat(template_file).st_mtime + 10))
+        assert self.format(formatter) == "end_turn"
+
+    def test_debug_extension_is_optional(self, tmp_path):
+        template_file = tmp_path / "templates" / "summary.jinja2"
+        template_file.parent.mkdir()
+        template_file.write_text("{% debug %}")
+
+        with pytest.raises(jinja2.TemplateSyntaxError):
+            self.format(self.create_formatter(tmp_path))
+        assert "model_name" in self.format(self.create_formatter(tmp_path, debug="true"))
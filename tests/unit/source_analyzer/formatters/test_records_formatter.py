@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+import pytest
+from common.configuration import Configuration
+from formatters.records_formatter import RECORD_COLUMNS, RecordsFormatter
+
+CONFIG_PATH = Path(__file__).parents[4] / "src" / "source_analyzer" / "config.yaml"
+
+COMPLETION = {
+    "overall_analysis_summary": "Trace the retries",
+    "priorities": [
+        {
+            "priority": "Exception Handling Blocks",
+            "critical_locations": [
+                {
+                    "location_name": "send",
+                    "function_name": "Client.send",
+                    "code_block": "except Error:",
+                    "rationale": "Failures are retried",
+                    "trace_info": "The error",
+                },
+                {
+                    "location_name": "close",
+                    "function_name": "Client.close",
+                    "code_block": "finally:",
+                    "rationale": "Connections leak",
+                    "trace_info": "The connection",
+                },
+            ],
+        },
+        {"priority": "State Changes", "critical_locations": []},
+    ],
+}
+
+VARIABLES = {
+    "model_vendor": "Anthropic",
+    "model_name": "Claude 3 Sonnet",
+    "model_id": "anthropic.claude-3-sonnet-20240229-v1:0",
+    "total_prompt_tokens": 120,
+    "total_completion_tokens": 40,
+    "stopped_reason": "end_turn",
+}
+
+
+def create_records_formatter(batch_size=2):
+    configuration = Configuration(str(CONFIG_PATH))
+    configuration._config_setter("records.batch_size", batch_size)
+    return RecordsFormatter.create_isolated(configuration=configuration)
+
+
+class TestRecordsFormatter:
+
+    def test_format_json_emits_a_record_per_location(self):
+        lines = create_records_formatter().format_json(COMPLETION, {**VARIABLES, "file_path": "client.py"}).splitlines()
+
+        records = [json.loads(line) for line in lines]
+        assert [list(record) for record in records] == [list(RECORD_COLUMNS)] * 2
+        assert [(record["function_name"], record["priority"]) for record in records] == [
+            ("Client.send", "Exception Handling Blocks"), ("Client.close", "Exception Handling Blocks")]
+        assert records[0]["file_path"] == "client.py"
+        assert records[0]["prompt_tokens"] == 120
+
+    def test_writes_jsonl_in_batches(self, tmp_path):
+        records_formatter = create_records_formatter()
+        records_path = tmp_path / "out" / "records.jsonl"
+        records_formatter.open(str(records_path))
+
+        records_formatter.add_file("a.py", COMPLETION, VARIABLES)
+        records_formatter.add_file("b.py", {"priorities": COMPLETION["priorities"][:1]}, VARIABLES)
+        assert not records_path.exists()
+        records_formatter.close()
+
+        records = [json.loads(line) for line in records_path.read_text().splitlines()]
+        assert [record["file_path"] for record in records] == ["a.py", "a.py", "b.py", "b.py"]
+        assert list(records_path.parent.iterdir()) == [records_path]
+
+    def test_writes_parquet_row_groups(self, tmp_path):
+        parquet = pytest.importorskip("pyarrow.parquet")
+        records_formatter = create_records_formatter()
+        records_path = tmp_path / "records.parquet"
+        records_formatter.open(str(records_path))
+
+        for file_index in range(3):
+            records_formatter.add_file(f"f{file_index}.py", COMPLETION, VARIABLES)
+        records_formatter.close()
+
+        parquet_file = parquet.ParquetFile(records_path)
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.column_names == list(RECORD_COLUMNS)
+        assert table.column("completion_tokens").to_pylist() == [40] * 6
@@ -0,0 +1,60 @@
+from pathlib import Path
+from common.configuration import Configuration
+from formatters.repository_report_formatter import RepositoryReportFormatter
+
+CONFIG_PATH = Path(__file__).parents[4] / "src" / "source_analyzer" / "config.yaml"
+
+
+def location(function_name, code_block):
+    return {
+        "function_name": function_name,
+        "code_block": code_block,
+        "rationale": "Failures are retried",
+        "trace_info": "The error",
+    }
+
+
+def completion(*locations, priority="Exception Handling Blocks"):
+    return {
+        "overall_analysis_summary": "Trace the retries",
+        "priorities": [{"priority": priority, "critical_locations": list(locations)}],
+    }
+
+
+def create_report_formatter(**report_settings):
+    configuration = Configuration(str(CONFIG_PATH))
+    for key, value in report_settings.items():
+        configuration._config_setter(f"report.{key}", value)
+    return RepositoryReportFormatter.create_isolated(configuration=configuration)
+
+
+class TestRepositoryReportFormatter:
+
+    def test_deduplicates_locations_across_files(self):
+        report_formatter = create_report_formatter()
+        helper = "except Error:\n    retry()"
+
+        report_formatter.add_file("a.py", completion(location("Client.retry", helper), location("send", "raise")))
+        report_formatter.add_file("b.py", completion(location("retry", "except  Error:\n  retry()")))
+        report_formatter.add_file("c.py", completion(location("Other.retry", helper), location("retry", helper)))
+
+        hotspots = report_formatter.hotspots()
+        assert [(hotspot.function_name, hotspot.file_count, hotspot.occurrences) for hotspot in hotspots] == [
+            ("Client.retry", 3, 4), ("send", 1, 1)]
+        assert hotspots[0].files == ["a.py", "b.py", "c.py"]
+
+        report = report_formatter.format_report({"source_path": "repo", "model_vendor": "Anthropic"})
+        assert "analysis of 3 files: 5 critical locations, 2 distinct across files." in report
+        assert "| Exception Handling Blocks | 5 | 3 |" in report
+        assert "| c.py | 2 | 2 |" in report
+
+    def test_tracked_locations_stay_bounded(self):
+        report_formatter = create_report_formatter(max_hotspots=2, max_tracked_locations=10)
+        shared = location("log_failure", "logger.error(e)")
+
+        for index in range(200):
+            report_formatter.add_file(f"f{index}.py", completion(shared, location(f"handle_{index}", "return")))
+
+        assert len(report_formatter._hotspots) <= 20
+        assert [(hotspot.function_name, hotspot.file_count) for hotspot in report_formatter.hotspots()][0] == (
+            "log_failure", 200)
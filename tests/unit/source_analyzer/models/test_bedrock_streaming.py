@@ -0,0 +1,211 @@
+import json
+from pathlib import Path
+from unittest import mock
+import pytest
+from botocore.exceptions import ClientError, TokenRetrievalError
+from common.configuration import Configuration
+from source_analyzer.models.anthropic_claude_3_sonnet_20240229_v1_0 import AnthropicClaude3Sonnet20240229V1
+from source_analyzer.models.meta_llama3_2_3b_instruct_v1_0 import MetaLlama323bInstructV1
+from source_analyzer.models.model import (
+    EXCEPTION_LEVEL_ERROR, EXCEPTION_LEVEL_WARN, BedrockModelObject, ModelException, ModelThrottlingException,
+    get_bedrock_client,
+)
+
+CONFIG_PATH = Path(__file__).parents[4] / "src" / "source_analyzer" / "config.yaml"
+
+COMPLETION = {
+    "overall_analysis_summary": "Trace the retry loop",
+    "priorities": [
+        {
+            "priority": "Error handling",
+            "critical_locations": [
+                {"location_name": "retry", "function_name": "Client.send", "code_block": "except Error:"}
+            ],
+        }
+    ],
+}
+
+
+class FakeBedrockClient:
+    """ Serves canned chunks from invoke_model_with_response_stream like the bedrock-runtime client. """
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requests = []
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.requests.append((modelId, json.loads(body)))
+        return {"body": iter([{"chunk": {"bytes": json.dumps(chunk).encode("utf-8")}} for chunk in self.chunks])}
+
+
+def fenced(data):
+    return "```json\n" + json.dumps(data) + "\n```"
+
+
+def split_text(text, size=7):
+    return [text[index:index + size] for index in range(0, len(text), size)]
+
+
+def create_model(model_class, client):
+    model = model_class.create_isolated(configuration=Configuration(str(CONFIG_PATH)))
+    patcher = mock.patch.object(BedrockModelObject, "model_client", new_callable=mock.PropertyMock)
+    patcher.start().return_value = client
+    return model, patcher
+
+
+class TestBedrockStreaming:
+
+    def test_claude_stream_yields_text_and_partial_json(self):
+        text = fenced(COMPLETION)
+        chunks = [{"type": "message_start", "message": {"usage": {"input_tokens": 120}}}]
+        chunks += [{"type": "content_block_delta", "delta": {"text": part}} for part in split_text(text)]
+        chunks += [{"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 45}}]
+        model, patcher = create_model(AnthropicClaude3Sonnet20240229V1, FakeBedrockClient(chunks))
+        try:
+            updates = list(model.generate_text_stream(prompt="Analyze"))
+        finally:
+            patcher.stop()
+
+        assert "".join(update.text for update in updates) == text
+        summaries = [update.partial_json.get("overall_analysis_summary") for update in updates if update.partial_json]
+        assert any(summary and summary != COMPLETION["overall_analysis_summary"] for summary in summaries)
+        assert COMPLETION["overall_analysis_summary"].startswith(summaries[0] or "")
+        assert updates[-1].partial_json == COMPLETION
+        assert all(update.result is None for update in updates[:-1])
+        result = updates[-1].result
+        assert result.text == text
+        assert result.completion_json == COMPLETION
+        assert result.stopped_reason == "end_turn"
+        assert (result.prompt_tokens, result.completion_tokens) == (120, 45)
+
+    def test_claude_generate_text_forwards_tokens(self):
+        text = fenced(COMPLETION)
+        chunks = [{"type": "message_start", "message": {"usage": {"input_tokens": 10}}}]
+        chunks += [{"type": "content_block_delta", "delta": {"text": part}} for part in split_text(text, 3)]
+        chunks += [{"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 5}}]
+        model, patcher = create_model(AnthropicClaude3Sonnet20240229V1, FakeBedrockClient(chunks))
+        received = []
+        try:
+            result = model.generate_text(prompt="Analyze", on_token=received.append)
+        finally:
+            patcher.stop()
+
+        assert "".join(received) == text
+        assert result.completion_json == COMPLETION
+        assert result.total_tokens == 15
+
+    def test_claude_truncated_response_leaves_stop_reason_to_caller(self):
+        text = fenced(COMPLETION)[:60]
+        chunks = [{"type": "message_start", "message": {"usage": {"input_tokens": 10}}}]
+        chunks += [{"type": "content_block_delta", "delta": {"text": part}} for part in split_text(text)]
+        chunks += [{"type": "message_delta", "delta": {"stop_reason": "max_tokens"}, "usage": {"output_tokens": 20}}]
+        model, patcher = create_model(AnthropicClaude3Sonnet20240229V1, FakeBedrockClient(chunks))
+        try:
+            result = model.generate_text(prompt="Analyze", on_token=[].append)
+        finally:
+            patcher.stop()
+
+        assert result.completion_json == {}
+        assert result.stopped_reason in model.stop_max_tokens_reasons
+
+    def test_llama_stream_yields_partial_completion_json(self):
+        native = {
+            "overall_analysis_summary": {
+                "message": COMPLETION["overall_analysis_summary"],
+                "priorities": COMPLETION["priorities"],
+            }
+        }
+        parts = split_text(fenced(native), 11)
+        chunks = [{"generation": part, "prompt_token_count": 200 if index == 0 else None,
+                   "generation_token_count": index + 1, "stop_reason": None}
+                  for index, part in enumerate(parts)]
+        chunks[-1]["stop_reason"] = "stop"
+        client = FakeBedrockClient(chunks)
+        model, patcher = create_model(MetaLlama323bInstructV1, client)
+        try:
+            updates = list(model.generate_text_stream(prompt="Analyze"))
+        finally:
+            patcher.stop()
+
+        assert client.requests[0][0] == model.model_id
+        assert [update.text for update in updates[:-1]] == parts
+        partials = [update.partial_json for update in updates if update.partial_json]
+        assert any("priorities" not in partial_json for partial_json in partials)
+        assert updates[-1].partial_json == COMPLETION
+        result = updates[-1].result
+        assert result.completion_json == COMPLETION
+        assert result.stopped_reason == "stop"
+        assert (result.prompt_tokens, result.completion_tokens) == (200, len(parts))
+
+    def test_interleaved_requests_on_one_model_keep_their_results(self):
+        def chunks(summary):
+            text = fenced({"overall_analysis_summary": summary, "priorities": []})
+            return ([{"type": "message_start", "message": {"usage": {"input_tokens": len(summary)}}}]
+                    + [{"type": "content_block_delta", "delta": {"text": part}} for part in split_text(text, 5)]
+                    + [{"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 1}}])
+
+        class PromptEchoClient(FakeBedrockClient):
+            def invoke_model_with_response_stream(self, modelId, body):
+                self.chunks = chunks(json.loads(body)["messages"][0]["content"])
+                return super().invoke_model_with_response_stream(modelId, body)
+
+        model, patcher = create_model(AnthropicClaude3Sonnet20240229V1, PromptEchoClient([]))
+        streams = {prompt: model.generate_text_stream(prompt=prompt) for prompt in ("first", "second request")}
+        results = {}
+        try:
+            while streams:
+                for prompt, stream in list(streams.items()):
+                    update = next(stream, None)
+                    if update is None:
+                        del streams[prompt]
+                    elif update.result is not None:
+                        results[prompt] = update.result
+        finally:
+            patcher.stop()
+
+        assert {prompt: result.completion_json["overall_analysis_summary"] for prompt, result in results.items()} == {
+            "first": "first", "second request": "second request"}
+        assert results["second request"].prompt_tokens == len("second request")
+
+
+class FailingBedrockClient:
+    """ Raises an error from invoke_model like the bedrock-runtime client. """
+
+    def __init__(self, error):
+        self.error = error
+
+    def invoke_model(self, modelId, body):
+        raise self.error
+
+
+def client_error(code, message="rejected"):
+    return ClientError({"Error": {"Code": code, "Message": message}}, "InvokeModel")
+
+
+class TestBedrockErrors:
+
+    @pytest.mark.parametrize("model_class", [AnthropicClaude3Sonnet20240229V1, MetaLlama323bInstructV1])
+    @pytest.mark.parametrize("error, exception_class, level", [
+        (client_error("ThrottlingException"), ModelThrottlingException, EXCEPTION_LEVEL_WARN),
+        (client_error("ValidationException"), ModelException, EXCEPTION_LEVEL_WARN),
+        (TokenRetrievalError(provider="sso", error_msg="expired"), ModelException, EXCEPTION_LEVEL_ERROR),
+    ])
+    def test_generate_text_maps_bedrock_errors(self, model_class, error, exception_class, level):
+        model, patcher = create_model(model_class, FailingBedrockClient(error))
+        try:
+            with pytest.raises(exception_class) as raised:
+                model.generate_text(prompt="Analyze")
+        finally:
+            patcher.stop()
+
+        assert type(raised.value) is exception_class
+        assert raised.value.level == level
+
+
+class TestBedrockClient:
+
+    def test_client_leaves_retries_to_the_analyzer(self):
+        client = get_bedrock_client(region_name="us-west-2", max_pool_connections=2, tcp_keepalive=False)
+
+        assert client.meta.config.retries == {"total_max_attempts": 1, "mode": "standard"}
+        assert get_bedrock_client(region_name="us-west-2", max_pool_connections=2, tcp_keepalive=False) is client
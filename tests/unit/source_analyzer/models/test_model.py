@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+from common.configuration import Configuration
+from source_analyzer.models import model
+from source_analyzer.models.anthropic_claude_3_sonnet_20240229_v1_0 import AnthropicClaude3Sonnet20240229V1
+from source_analyzer.models.local_stub_model import LocalStubModel
+
+CONFIG_PATH = Path(__file__).parents[4] / "src" / "source_analyzer" / "config.yaml"
+
+
+class FakeEncoding:
+    """ Encodes each word as one token. """
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+class TestEstimateTokens:
+
+    def test_counts_encoded_tokens_scaled_by_model_factor(self, monkeypatch):
+        monkeypatch.setattr(model, "get_token_encoding", lambda encoding_name: FakeEncoding())
+        configuration = Configuration(str(CONFIG_PATH))
+
+        assert LocalStubModel.create_isolated(configuration).estimate_tokens("def a(): return 1") == 4
+        assert AnthropicClaude3Sonnet20240229V1.create_isolated(
+            configuration).estimate_tokens("def a(): return 1") == 5
+
+    def test_falls_back_to_characters_without_encoding(self, monkeypatch):
+        monkeypatch.setattr(model, "get_token_encoding", lambda encoding_name: None)
+        stub_model = LocalStubModel.create_isolated(Configuration(str(CONFIG_PATH)))
+
+        assert stub_model.estimate_tokens("x" * 35) == 10
+        assert stub_model.estimate_tokens("x" * 36) == 11
+        assert stub_model.estimate_tokens("") == 0
+
+
+class TestModelResult:
+
+    def test_cache_entry_round_trips_through_json(self):
+        result = model.ModelResult(
+            text="```json\n{}\n```", completion_json={"priorities": [{"priority": "High"}]},
+            prompt_tokens=12, completion_tokens=3, stopped_reason="end_turn")
+
+        cached = model.ModelResult.from_cache_entry(json.loads(json.dumps(result.to_cache_entry())))
+
+        assert cached == result
+        assert cached.completion_json is not result.completion_json
+
+    def test_cache_entry_without_text(self):
+        cached = model.ModelResult.from_cache_entry({
+            "completion_json": {}, "prompt_tokens": 1, "completion_tokens": 2, "stopped_reason": "end_turn"})
+
+        assert cached.text == ""
+        assert cached.total_tokens == 3
@@ -0,0 +1,95 @@
+import json
+import pytest
+from source_analyzer.analysis_manifest import AnalysisManifest
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+
+
+class TestAnalysisManifest:
+
+    def test_get_requires_same_content_and_settings(self, tmp_path):
+        manifest = AnalysisManifest(str(tmp_path / "manifest.json"))
+        manifest.put("repo/a.py", "content", "settings", "output", {"priorities": []}, {"model_id": "stub"})
+
+        assert manifest.get("repo/a.py", "content", "settings") == "output"
+        assert manifest.get("repo/a.py", "changed content", "settings") is None
+        assert manifest.get("repo/a.py", "content", "changed settings") is None
+        assert manifest.get("repo/b.py", "content", "settings") is None
+        assert manifest.completion_json("repo/a.py") == {"priorities": []}
+        assert manifest.formatter_inputs("repo/a.py") == {"model_id": "stub"}
+
+    def test_save_and_load(self, tmp_path):
+        manifest_path = tmp_path / "cache" / "manifest.json"
+        manifest = AnalysisManifest(str(manifest_path))
+        manifest.put("repo/a.py", "content", "settings", "output")
+        manifest.save()
+
+        assert AnalysisManifest(str(manifest_path)).get("repo/a.py", "content", "settings") == "output"
+        assert [path.name for path in manifest_path.parent.iterdir()] == ["manifest.json"]
+
+    def test_ignores_other_versions_and_unreadable_files(self, tmp_path):
+        manifest_path = tmp_path / "manifest.json"
+        manifest_path.write_text(json.dumps({"version": 0, "files": {"a.py": {}}}))
+        assert AnalysisManifest(str(manifest_path)).get("a.py", "content", "settings") is None
+
+        manifest_path.write_text("{")
+        assert AnalysisManifest(str(manifest_path)).get("a.py", "content", "settings") is None
+
+    def test_retain_drops_missing_files_of_the_directory_only(self, tmp_path):
+        manifest = AnalysisManifest(str(tmp_path / "manifest.json"))
+        for file_path in ("repo/kept.py", "repo/pkg/deleted.py", "repository/other.py"):
+            manifest.put(file_path, "content", "settings", file_path)
+
+        manifest.retain("repo", ["repo/kept.py"])
+
+        assert manifest.get("repo/kept.py", "content", "settings") == "repo/kept.py"
+        assert manifest.get("repo/pkg/deleted.py", "content", "settings") is None
+        assert manifest.get("repository/other.py", "content", "settings") == "repository/other.py"
+
+
+class TestIncrementalAnalysis:
+
+    @pytest.fixture
+    def configure_incremental(self, tmp_path, configure_stub):
+        def configure(**settings):
+            configure_stub(latency_seconds=0, settings={
+                "incremental": {"enabled": "true", "manifest_path": str(tmp_path / "manifest.json")},
+                **settings,
+            })
+        return configure
+
+    @pytest.fixture
+    def source_path(self, tmp_path):
+        source_path = tmp_path / "repo"
+        source_path.mkdir()
+        (source_path / "a.py").write_text("def a():\n    return 1\n")
+        (source_path / "b.py").write_text("def b():\n    return 2\n")
+        return source_path
+
+    def test_analyzes_only_changed_files(self, configure_incremental, source_path, model_prompts):
+        configure_incremental()
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+        assert len(model_prompts) == 2
+
+        (source_path / "b.py").write_text("def b():\n    return 3\n")
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        assert len(model_prompts) == 3
+        assert "return 3" in model_prompts[-1]
+
+    def test_changed_settings_invalidate_stored_output(self, configure_incremental, source_path, model_prompts):
+        configure_incremental()
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        configure_incremental(tracing_priorities=["State Changes"])
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        assert len(model_prompts) == 4
+
+    def test_full_analyzes_every_file(self, configure_incremental, source_path, model_prompts):
+        configure_incremental()
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path), full=True)
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        assert len(model_prompts) == 4
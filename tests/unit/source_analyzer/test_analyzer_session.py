@@ -0,0 +1,101 @@
+import threading
+import pytest
+from source_analyzer.analyzer_session import AnalyzerSession
+from source_analyzer.models.local_stub_model import LocalStubModel
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.token_budget import TokenBudget
+
+SOURCE = "def alpha():\n    return 1\n"
+
+
+@pytest.fixture
+def new_session(monkeypatch, configure_stub):
+    """ Set up a session of its own for the test from a stub configuration with the given settings. """
+
+    def create(**settings):
+        configure_stub(latency_seconds=0, settings=settings)
+        monkeypatch.setattr(AnalyzerSession, "_instance", None)
+        monkeypatch.setattr(AnalyzerSession, "_initialized", False)
+        return AnalyzerSession()
+
+    return create
+
+
+@pytest.fixture
+def source_path(tmp_path):
+    source_path = tmp_path / "alpha.py"
+    source_path.write_text(SOURCE)
+    return str(source_path)
+
+
+def reserved_tokens():
+    """ The tokens a request for SOURCE reserves against its budget. """
+
+    analyzer = SourceCodeAnalyzer(isolated=True)
+    prompt = analyzer.build_file_prompts(SOURCE)[0]
+    return analyzer.model.estimate_tokens(prompt) + 100
+
+
+class TestAnalyzerSession:
+
+    def test_is_shared(self, new_session):
+        assert new_session() is AnalyzerSession()
+
+    def test_analyze_file(self, new_session, source_path):
+        result = new_session().analyze_file(source_path)
+
+        assert result.succeeded
+        assert result.content.startswith("# Source File: alpha.py")
+        assert result.tokens == sum(result.total_tokens.values()) > 0
+
+    def test_each_request_has_a_budget_of_its_own(self, new_session, source_path):
+        new_session(budget={"expected_completion_tokens": 100})
+        max_tokens = reserved_tokens()
+        session = new_session(budget={"expected_completion_tokens": 100, "max_run_tokens": max_tokens})
+
+        results = [session.analyze_file(source_path) for _ in range(3)]
+
+        assert all(result.succeeded for result in results)
+
+    def test_requests_sharing_a_budget_are_limited_together(self, new_session, source_path):
+        session = new_session(budget={"expected_completion_tokens": 100})
+        token_budget = TokenBudget(max_tokens=reserved_tokens())
+
+        first = session.analyze_file(source_path, token_budget=token_budget)
+        second = session.analyze_file(source_path, token_budget=token_budget)
+
+        assert first.succeeded
+        assert second.error.startswith("Skipped source code analysis")
+        assert token_budget.spent == first.tokens
+
+    def test_pool_is_capped(self, new_session, source_path, monkeypatch):
+        session = new_session(concurrency={"max_session_analyzers": 2})
+        release = threading.Event()
+        started = threading.Semaphore(0)
+        generate_text = LocalStubModel.generate_text
+
+        def blocked_generate_text(self, prompt, on_token=None):
+            started.release()
+            release.wait(5)
+            return generate_text(self, prompt, on_token)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text", blocked_generate_text)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(session.analyze_file(source_path)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for _ in range(2):
+            assert started.acquire(timeout=5)
+
+        # the other requests wait for an analyzer instead of creating one
+        assert not started.acquire(timeout=0.2)
+        assert session.pool_size == 2
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(results) == 4 and all(result.succeeded for result in results)
+        assert session.pool_size == 2
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+import pytest
+from source_analyzer.async_source_analyzer import AsyncSourceCodeAnalyzer
+from source_analyzer.models.local_stub_model import LocalStubModel
+from source_analyzer.progress import PROGRESS_PHASE_FORMATTED, PROGRESS_PHASE_PROMPT_BUILT
+from source_analyzer.token_budget import TokenBudget
+
+
+def write_sources(source_path, file_count):
+    source_path.mkdir()
+    for index in range(file_count):
+        (source_path / f"module_{index}.py").write_text(f"def function_{index}():\n    return {index}\n")
+    return sorted(str(path) for path in source_path.iterdir())
+
+
+def run(analyzer, coroutine):
+    try:
+        return asyncio.run(coroutine)
+    finally:
+        analyzer.close()
+
+
+class TestAsyncSourceCodeAnalyzer:
+
+    @pytest.fixture
+    def requests_in_flight(self, monkeypatch):
+        """ Record the most model requests in flight at the same time. """
+
+        lock = threading.Lock()
+        counts = {"current": 0, "most": 0}
+        generate_text = LocalStubModel.generate_text
+
+        def counted_generate_text(self, prompt, on_token=None):
+            with lock:
+                counts["current"] += 1
+                counts["most"] = max(counts["most"], counts["current"])
+            try:
+                time.sleep(0.02)
+                return generate_text(self, prompt, on_token)
+            finally:
+                with lock:
+                    counts["current"] -= 1
+
+        monkeypatch.setattr(LocalStubModel, "generate_text", counted_generate_text)
+        return counts
+
+    def test_semaphore_bounds_analyses_in_flight(self, tmp_path, configure_stub, requests_in_flight):
+        configure_stub(latency_seconds=0)
+        source_paths = write_sources(tmp_path / "repo", 8)
+        analyzer = AsyncSourceCodeAnalyzer(max_concurrency=3)
+
+        results = run(analyzer, analyzer.process_files(source_paths))
+
+        assert requests_in_flight["most"] == 3
+        assert [result.splitlines()[0] for result in results] == [
+            f"# Source File: module_{index}.py" for index in range(8)]
+
+    def test_pooled_analyzers_are_reused(self, tmp_path, configure_stub, monkeypatch):
+        configure_stub(latency_seconds=0)
+        source_paths = write_sources(tmp_path / "repo", 8)
+        analyzer = AsyncSourceCodeAnalyzer(max_concurrency=2)
+        created = []
+        create_analyzer = AsyncSourceCodeAnalyzer._create_analyzer
+
+        def counted_create_analyzer(self):
+            created.append(create_analyzer(self))
+            return created[-1]
+
+        monkeypatch.setattr(AsyncSourceCodeAnalyzer, "_create_analyzer", counted_create_analyzer)
+
+        run(analyzer, analyzer.process_files(source_paths))
+
+        assert len(created) == 2
+
+    def test_analyses_share_the_token_budget(self, tmp_path, configure_stub):
+        configure_stub(latency_seconds=0)
+        source_paths = write_sources(tmp_path / "repo", 4)
+        token_budget = TokenBudget(max_tokens=1_000_000)
+        analyzer = AsyncSourceCodeAnalyzer(max_concurrency=2, token_budget=token_budget)
+
+        run(analyzer, analyzer.process_files(source_paths))
+
+        assert token_budget.spent == sum(analyzer.total_tokens.values()) > 0
+
+    def test_prompts_over_the_shared_budget_are_skipped(self, tmp_path, configure_stub, model_prompts):
+        configure_stub(latency_seconds=0)
+        source_paths = write_sources(tmp_path / "repo", 3)
+        analyzer = AsyncSourceCodeAnalyzer(max_concurrency=2, token_budget=TokenBudget(max_tokens=1))
+
+        results = run(analyzer, analyzer.process_files(source_paths))
+
+        assert not model_prompts
+        assert all(result.startswith("Skipped source code analysis") for result in results)
+        assert analyzer.total_tokens == {"prompt": 0, "completion": 0}
+
+    def test_reports_progress(self, tmp_path, configure_stub):
+        configure_stub(latency_seconds=0)
+        source_paths = write_sources(tmp_path / "repo", 1)
+        analyzer = AsyncSourceCodeAnalyzer(max_concurrency=2)
+        phases = []
+
+        run(analyzer, analyzer.process_file(source_paths[0], progress_callback=lambda phase, _: phases.append(phase)))
+
+        assert phases[0] == PROGRESS_PHASE_PROMPT_BUILT
+        assert phases[-1] == PROGRESS_PHASE_FORMATTED
@@ -0,0 +1,97 @@
+import json
+from pathlib import Path
+from source_analyzer.batch_inference import (
+    BATCH_INPUT_FILE_NAME,
+    BatchAnalysis,
+    LocalBatchJobRunner,
+)
+from source_analyzer.response_cache import RESPONSE_CACHE_BYPASS
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+
+SRC_PATH = Path(__file__).parents[3] / "src"
+
+COMPLETION = {
+    "overall_analysis_summary": "Trace the retry loop",
+    "priorities": [
+        {
+            "priority": "Exception Handling Blocks",
+            "critical_locations": [
+                {
+                    "location_name": "send",
+                    "function_name": "Client.send",
+                    "code_block": "except Error:",
+                    "rationale": "Failures are retried",
+                    "trace_info": "The error",
+                }
+            ],
+        }
+    ],
+}
+
+
+def respond(model_input):
+    prompt = model_input["messages"][0]["content"]
+    if "def broken" in prompt:
+        raise ValueError("Malformed input")
+    return {
+        "content": [{"type": "text", "text": "```json\n" + json.dumps(COMPLETION) + "\n```"}],
+        "usage": {"input_tokens": 100, "output_tokens": 20},
+        "stop_reason": "end_turn",
+    }
+
+
+class PendingBatchJobRunner(LocalBatchJobRunner):
+    """ Never completes its jobs. """
+
+    def status(self, job_id):
+        return "InProgress"
+
+
+def create_batch_analysis(monkeypatch, tmp_path, runner):
+    monkeypatch.chdir(SRC_PATH)
+    analyzer = SourceCodeAnalyzer(isolated=True, response_cache_mode=RESPONSE_CACHE_BYPASS)
+    return BatchAnalysis(analyzer, runner=runner, batch_path=str(tmp_path / "batch"))
+
+
+def write_sources(tmp_path, sources):
+    source_path = tmp_path / "repo"
+    source_path.mkdir()
+    for name, source in sources.items():
+        (source_path / name).write_text(source)
+    return str(source_path)
+
+
+class TestBatchAnalysis:
+
+    def test_submit_writes_a_record_per_prompt(self, monkeypatch, tmp_path):
+        batch_analysis = create_batch_analysis(monkeypatch, tmp_path, LocalBatchJobRunner(respond))
+        source_path = write_sources(tmp_path, {"b.py": "def b():\n    pass\n", "a.py": "def a():\n    pass\n"})
+
+        manifest_path = Path(batch_analysis.submit(source_path))
+
+        manifest = json.loads(manifest_path.read_text())
+        records = [json.loads(line) for line in (manifest_path.parent / BATCH_INPUT_FILE_NAME).open()]
+        assert [file["path"] for file in manifest["files"]] == [f"{source_path}/a.py", f"{source_path}/b.py"]
+        assert [record["recordId"] for record in records] == ["REC00000000", "REC00000001"]
+        assert "def a():" in records[0]["modelInput"]["messages"][0]["content"]
+        assert manifest["job_id"] == f"local/{manifest['job_name']}"
+
+    def test_ingest_formats_each_file(self, monkeypatch, tmp_path):
+        batch_analysis = create_batch_analysis(monkeypatch, tmp_path, LocalBatchJobRunner(respond))
+        source_path = write_sources(tmp_path, {
+            "client.py": "def send():\n    pass\n",
+            "broken.py": "def broken():\n    pass\n",
+        })
+
+        results = batch_analysis.ingest(batch_analysis.submit(source_path))
+
+        assert list(results) == [f"{source_path}/broken.py", f"{source_path}/client.py"]
+        assert "Malformed input" in results[f"{source_path}/broken.py"]
+        assert "# Source File: client.py" in results[f"{source_path}/client.py"]
+        assert "Trace the retry loop" in results[f"{source_path}/client.py"]
+
+    def test_ingest_waits_for_the_job(self, monkeypatch, tmp_path):
+        batch_analysis = create_batch_analysis(monkeypatch, tmp_path, PendingBatchJobRunner(respond))
+        source_path = write_sources(tmp_path, {"client.py": "def send():\n    pass\n"})
+
+        assert batch_analysis.ingest(batch_analysis.submit(source_path)) is None
@@ -0,0 +1,69 @@
+import pytest
+from source_analyzer.main import BATCH_INGEST, parse_arguments
+from source_analyzer.response_cache import RESPONSE_CACHE_BYPASS, RESPONSE_CACHE_USE
+
+
+class TestParseArguments:
+
+    def test_defaults(self):
+        arguments = parse_arguments(["repo"])
+
+        assert vars(arguments) == {
+            "source_path": "repo", "response_cache_mode": RESPONSE_CACHE_USE, "full": False, "batch_mode": None,
+            "output_dir": None, "report": None, "records": None,
+        }
+
+    def test_options(self, tmp_path):
+        arguments = parse_arguments(
+            ["--no-cache", "--full", "--output-dir=-", "--report=report.md", "--records", "records.jsonl",
+             str(tmp_path)])
+
+        assert arguments.response_cache_mode == RESPONSE_CACHE_BYPASS
+        assert arguments.full
+        assert (arguments.output_dir, arguments.report, arguments.records) == ("-", "report.md", "records.jsonl")
+
+    def test_batch_mode(self):
+        assert parse_arguments(["--batch-ingest", "manifest.json"]).batch_mode == BATCH_INGEST
+
+    @pytest.mark.parametrize("argv", [
+        ["--no-cache", "--refresh-cache", "repo"],
+        ["--batch-submit", "--batch-ingest", "repo"],
+        ["--batch-submit", "--report=-", "repo"],
+        ["--batch-submit", "--full", "repo"],
+        ["--output-dir=", "repo"],
+        ["--unknown", "repo"],
+        ["repo", "other"],
+    ])
+    def test_rejects_invalid_arguments(self, argv, capsys):
+        with pytest.raises(SystemExit) as exit_info:
+            parse_arguments(argv)
+
+        assert exit_info.value.code == 2
+        assert capsys.readouterr().err.startswith("usage:")
+
+    def test_rejects_full_analysis_of_a_file(self, tmp_path, capsys):
+        source_path = tmp_path / "module.py"
+        source_path.write_text("def f():\n    return 1\n")
+
+        with pytest.raises(SystemExit) as exit_info:
+            parse_arguments(["--full", str(source_path)])
+
+        assert exit_info.value.code == 2
+        assert "--full requires a DIRECTORY" in capsys.readouterr().err
+
+    def test_rejects_an_output_dir_that_is_a_file(self, tmp_path, capsys):
+        output_path = tmp_path / "results.md"
+        output_path.write_text("")
+
+        with pytest.raises(SystemExit) as exit_info:
+            parse_arguments([f"--output-dir={output_path}", str(tmp_path)])
+
+        assert exit_info.value.code == 2
+        assert "--output-dir requires a directory" in capsys.readouterr().err
+
+    def test_displays_help_without_source_path(self, capsys):
+        with pytest.raises(SystemExit) as exit_info:
+            parse_arguments([])
+
+        assert exit_info.value.code == 0
+        assert "Environment variables:" in capsys.readouterr().out
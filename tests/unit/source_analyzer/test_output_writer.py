@@ -0,0 +1,41 @@
+import io
+import pytest
+from source_analyzer.output_writer import DirectoryOutputWriter, StreamOutputWriter
+
+
+def failing_chunks():
+    yield "# Source File: "
+    raise ValueError("Template error")
+
+
+class TestDirectoryOutputWriter:
+
+    def test_mirrors_source_paths(self, tmp_path):
+        writer = DirectoryOutputWriter(output_dir=str(tmp_path / "out"), source_root=str(tmp_path / "repo"))
+
+        writer.write(str(tmp_path / "repo" / "pkg" / "client.py"), iter(["# Source File: ", "client.py"]))
+
+        assert (tmp_path / "out" / "pkg" / "client.py.md").read_text() == "# Source File: client.py"
+
+    def test_failed_write_keeps_previous_output(self, tmp_path):
+        writer = DirectoryOutputWriter(output_dir=str(tmp_path / "out"), source_root=str(tmp_path / "repo"))
+        source_path = str(tmp_path / "repo" / "client.py")
+        writer.write(source_path, ["previous"])
+
+        with pytest.raises(ValueError):
+            writer.write(source_path, failing_chunks())
+
+        assert [path.name for path in (tmp_path / "out").iterdir()] == ["client.py.md"]
+        assert (tmp_path / "out" / "client.py.md").read_text() == "previous"
+
+
+class TestStreamOutputWriter:
+
+    def test_separates_files(self):
+        stream = io.StringIO()
+        writer = StreamOutputWriter(stream)
+
+        writer.write("a.py", ["# a", "\nbody"])
+        writer.write("b.py", ["# b"])
+
+        assert stream.getvalue() == "# a\nbody\n\n# b\n\n"
@@ -0,0 +1,79 @@
+import sqlite3
+from contextlib import closing
+from source_analyzer import response_cache
+from source_analyzer.response_cache import ResponseCache
+
+RESPONSE = {"text": "{}", "completion_json": {}, "stopped_reason": "end_turn"}
+
+
+class FakeClock:
+    """ Replaces time.time in the response cache module with a settable clock. """
+
+    def __init__(self, monkeypatch, now=1000.0):
+        self.now = now
+        monkeypatch.setattr(response_cache.time, "time", lambda: self.now)
+
+
+def stored_keys(database_path):
+    with closing(sqlite3.connect(database_path)) as connection:
+        return {key for (key,) in connection.execute("SELECT key FROM responses")}
+
+
+class TestResponseCache:
+
+    def test_round_trip(self, tmp_path):
+        cache = ResponseCache(str(tmp_path / "cache" / "responses.sqlite3"), ttl_seconds=0, max_size_bytes=0)
+        key = ResponseCache.make_key(model_id="stub", prompt="analyze")
+
+        assert cache.get(key) is None
+        cache.put(key, RESPONSE)
+
+        assert cache.get(key) == RESPONSE
+        assert key == ResponseCache.make_key(prompt="analyze", model_id="stub")
+        assert key != ResponseCache.make_key(model_id="stub", prompt="analyze again")
+
+    def test_entries_expire_after_ttl(self, tmp_path, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        database_path = tmp_path / "responses.sqlite3"
+        cache = ResponseCache(str(database_path), ttl_seconds=60, max_size_bytes=0)
+        cache.put("old", RESPONSE)
+
+        clock.now += 60
+        assert cache.get("old") == RESPONSE
+        clock.now += 1
+        assert cache.get("old") is None
+        assert stored_keys(database_path) == set()
+
+    def test_put_drops_expired_entries(self, tmp_path, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        database_path = tmp_path / "responses.sqlite3"
+        cache = ResponseCache(str(database_path), ttl_seconds=60, max_size_bytes=0)
+        cache.put("old", RESPONSE)
+
+        clock.now += 61
+        cache.put("new", RESPONSE)
+
+        assert stored_keys(database_path) == {"new"}
+
+    def test_evicts_least_recently_used_over_size_limit(self, tmp_path, monkeypatch):
+        clock = FakeClock(monkeypatch)
+        database_path = tmp_path / "responses.sqlite3"
+        entry_size = len(response_cache.json.dumps(RESPONSE))
+        cache = ResponseCache(str(database_path), ttl_seconds=0, max_size_bytes=2 * entry_size)
+        for key in ("a", "b"):
+            cache.put(key, RESPONSE)
+            clock.now += 1
+        # reading a makes b the least recently used
+        assert cache.get("a") == RESPONSE
+        clock.now += 1
+
+        cache.put("c", RESPONSE)
+
+        assert stored_keys(database_path) == {"a", "c"}
+
+    def test_uses_write_ahead_log(self, tmp_path):
+        database_path = tmp_path / "responses.sqlite3"
+        ResponseCache(str(database_path), ttl_seconds=0, max_size_bytes=0)
+
+        with closing(sqlite3.connect(database_path)) as connection:
+            assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
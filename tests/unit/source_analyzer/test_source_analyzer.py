@@ -0,0 +1,271 @@
+import json
+import re
+import threading
+import time
+import pytest
+from common.logging_utils import ClassLogger
+from source_analyzer.models.local_stub_model import LocalStubModel
+from source_analyzer.models.model import EXCEPTION_LEVEL_WARN, ModelException, ModelStreamUpdate
+from source_analyzer.progress import PROGRESS_PHASE_MODEL_INVOKED, PROGRESS_PHASE_TOKENS_STREAMED
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+
+SOURCE = '''class Service:
+
+    def alpha(self):
+        return "alpha"
+
+
+def beta():
+    return "beta"
+'''
+
+COMPLETION = {
+    "overall_analysis_summary": "Two functions.",
+    "function_summaries": {"Service.alpha": "Alpha returns alpha.", "beta": "Beta returns beta."},
+    "priorities": [
+        {
+            "priority": "State Changes",
+            "critical_locations": [
+                {"function_name": "Service.alpha", "code_block": "return \"alpha\"", "rationale": "alpha result"},
+                {"function_name": "beta", "code_block": "return \"beta\"", "rationale": "beta result"},
+            ],
+        },
+        {
+            "priority": "Exception Handling Blocks",
+            "critical_locations": [
+                {"function_name": "module.beta", "code_block": "def beta():", "rationale": "beta entry"},
+            ],
+        },
+    ],
+}
+
+
+class TestProcessFunctions:
+
+    def test_splits_priorities_by_function_name(self, tmp_path, configure_stub, model_prompts):
+        response_path = tmp_path / "completion.json"
+        response_path.write_text(json.dumps(COMPLETION))
+        configure_stub(latency_seconds=0, response_path=str(response_path))
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+
+        results = analyzer.process_functions(str(source_path), ["Service.alpha", "beta", "beta"])
+
+        assert len(model_prompts) == 1
+        assert '"function_summaries"' in model_prompts[0]
+        assert list(results) == ["Service.alpha", "beta"]
+        assert "Alpha returns alpha." in results["Service.alpha"]
+        assert "alpha result" in results["Service.alpha"]
+        assert "beta" not in results["Service.alpha"].split("## Summary")[0].split("Analysis", 1)[1]
+        assert "Exception Handling Blocks" not in results["Service.alpha"]
+        assert "Beta returns beta." in results["beta"]
+        assert "beta result" in results["beta"] and "beta entry" in results["beta"]
+        assert "alpha" not in results["beta"].split("## Summary")[0].split("Analysis", 1)[1]
+
+    def test_maps_every_function_to_the_error(self, tmp_path, configure_stub):
+        configure_stub(latency_seconds=0)
+        source_path = tmp_path / "empty.py"
+        source_path.write_text("")
+
+        results = SourceCodeAnalyzer(isolated=True).process_functions(str(source_path), ["alpha", "beta"])
+
+        assert results == {"alpha": "Source file is empty", "beta": "Source file is empty"}
+
+
+class TestStreamedCompletion:
+
+    def test_stream_without_a_final_result_fails(self, tmp_path, configure_stub, monkeypatch):
+        configure_stub(latency_seconds=0)
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+        phases = []
+
+        def generate_text_stream(self, prompt):
+            yield ModelStreamUpdate(text="{", partial_json=None)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text_stream", generate_text_stream)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+
+        results = analyzer.process_file(str(source_path), progress_callback=lambda phase, _: phases.append(phase))
+
+        assert results == analyzer.last_error
+        assert results.endswith(f"Stream from model '{analyzer.model.model_name}' ended without a final result")
+        assert phases.count(PROGRESS_PHASE_MODEL_INVOKED) == analyzer.model.max_llm_tries
+
+    def test_each_attempt_is_announced_before_it_streams(self, tmp_path, configure_stub, monkeypatch):
+        configure_stub(latency_seconds=0)
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+        events = []
+        generate_text_stream = LocalStubModel.generate_text_stream
+
+        def failing_once_generate_text_stream(self, prompt):
+            if not any(phase == PROGRESS_PHASE_MODEL_INVOKED and details["attempt"] > 1 for phase, details in events):
+                yield ModelStreamUpdate(text="{", partial_json=None)
+                raise ModelException("connection reset", EXCEPTION_LEVEL_WARN)
+            yield from generate_text_stream(self, prompt)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text_stream", failing_once_generate_text_stream)
+
+        results = SourceCodeAnalyzer(isolated=True).process_file(
+            str(source_path), progress_callback=lambda phase, details: events.append((phase, details)))
+
+        assert results.startswith("# Source File: service.py")
+        phases = [
+            (phase, details.get("attempt")) for phase, details in events
+            if phase in (PROGRESS_PHASE_MODEL_INVOKED, PROGRESS_PHASE_TOKENS_STREAMED)]
+        assert phases == [
+            (PROGRESS_PHASE_MODEL_INVOKED, 1), (PROGRESS_PHASE_TOKENS_STREAMED, None),
+            (PROGRESS_PHASE_MODEL_INVOKED, 2), (PROGRESS_PHASE_TOKENS_STREAMED, None),
+        ]
+
+
+class TestMarkIncludedLocations:
+
+    def test_marks_a_copy_of_the_model_completion(self, tmp_path, configure_stub, monkeypatch):
+        response_path = tmp_path / "completion.json"
+        response_path.write_text(json.dumps(COMPLETION))
+        configure_stub(latency_seconds=0, response_path=str(response_path))
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+        completions = []
+        generate_text = LocalStubModel.generate_text
+
+        def recorded_generate_text(self, prompt, on_token=None):
+            result = generate_text(self, prompt, on_token)
+            completions.append(result.completion_json)
+            return result
+
+        monkeypatch.setattr(LocalStubModel, "generate_text", recorded_generate_text)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+
+        analyzer.process_file(str(source_path), function_name="beta")
+
+        assert completions == [COMPLETION]
+        assert [
+            [(location["function_name"], location["include"]) for location in priority["critical_locations"]]
+            for priority in analyzer.last_completion_json["priorities"]
+        ] == [[("Service.alpha", False), ("beta", True)], [("module.beta", True)]]
+
+
+class TestProjectUsage:
+
+    def test_projects_requests_tokens_and_cost_per_file(self, tmp_path, configure_stub):
+        configure_stub(latency_seconds=0, settings={"budget": {"expected_completion_tokens": 100}})
+        source_path = tmp_path / "repo"
+        source_path.mkdir()
+        (source_path / "a.py").write_text("def a():\n    return 1\n")
+        (source_path / "b.py").write_text(SOURCE)
+        (source_path / "empty.py").write_text("")
+        analyzer = SourceCodeAnalyzer(isolated=True)
+
+        projection = analyzer.project_usage(analyzer.find_python_files(str(source_path)))
+
+        prompt_tokens = sum(
+            analyzer.model.estimate_tokens(prompt)
+            for path in ("a.py", "b.py")
+            for prompt in analyzer.build_file_prompts((source_path / path).read_text())
+        )
+        assert projection == {
+            "files": 2, "requests": 2, "prompt_tokens": prompt_tokens, "completion_tokens": 200,
+            "cost": analyzer.model.estimate_cost(prompt_tokens, 200), "skipped": [],
+        }
+
+    def test_counts_chunks_and_skips_files_over_budget(self, tmp_path, configure_stub):
+        configure_stub(latency_seconds=0, settings={"chunking": {"max_source_tokens": 20}})
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+
+        projection = SourceCodeAnalyzer(isolated=True).project_usage([str(source_path)])
+        assert projection["requests"] == 2
+
+        configure_stub(latency_seconds=0, settings={
+            "budget": {"max_file_tokens": 1, "over_budget_file": "skip"},
+        })
+        projection = SourceCodeAnalyzer(isolated=True).project_usage([str(source_path)])
+        assert projection["skipped"] == [str(source_path)]
+        assert projection["requests"] == 0
+
+    def test_run_displays_projection_before_analyzing(self, tmp_path, configure_stub, capsys, model_prompts):
+        configure_stub(latency_seconds=0, settings={"budget": {"max_run_tokens": 10}})
+        source_path = tmp_path / "repo"
+        source_path.mkdir()
+        (source_path / "a.py").write_text("def a():\n    return 1\n")
+
+        SourceCodeAnalyzer(isolated=True).process_directory(str(source_path))
+
+        assert "Projected usage: 1 requests for 1 files" in capsys.readouterr().out
+        # the prompt does not fit in the run budget, so it is never sent
+        assert not model_prompts
+
+
+class TestProcessDirectoryConcurrently:
+
+    FILE_COUNT = 6
+
+    @pytest.fixture
+    def source_path(self, tmp_path):
+        source_path = tmp_path / "repo"
+        source_path.mkdir()
+        for index in range(self.FILE_COUNT):
+            (source_path / f"module_{index}.py").write_text(f"def function_{index}():\n    return {index}\n")
+        return source_path
+
+    @pytest.fixture
+    def analyses(self, monkeypatch):
+        """ Make earlier files slower to analyze, recording the model and formatter of every analysis. """
+
+        lock = threading.Lock()
+        recorded = {"completed": [], "models_in_use": set(), "shared_models": 0, "formatters": []}
+        generate_text = LocalStubModel.generate_text
+        generate_formatted_output = SourceCodeAnalyzer.generate_formatted_output
+
+        def slow_generate_text(self, prompt, on_token=None):
+            index = int(re.search(r"def function_(\d+)", prompt).group(1))
+            with lock:
+                if id(self) in recorded["models_in_use"]:
+                    recorded["shared_models"] += 1
+                recorded["models_in_use"].add(id(self))
+            try:
+                time.sleep((TestProcessDirectoryConcurrently.FILE_COUNT - index) * 0.03)
+                return generate_text(self, prompt, on_token)
+            finally:
+                with lock:
+                    recorded["models_in_use"].discard(id(self))
+                    recorded["completed"].append(index)
+
+        def recorded_generate_formatted_output(self, data=None):
+            with lock:
+                recorded["formatters"].append((id(self.model), id(self._formatter)))
+            return generate_formatted_output(self, data)
+
+        monkeypatch.setattr(LocalStubModel, "generate_text", slow_generate_text)
+        monkeypatch.setattr(SourceCodeAnalyzer, "generate_formatted_output", recorded_generate_formatted_output)
+        return recorded
+
+    def test_results_are_displayed_in_path_order(self, source_path, configure_stub, analyses, monkeypatch):
+        configure_stub(max_workers=4, latency_seconds=0)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+        displayed = []
+        monkeypatch.setattr(ClassLogger, "success", lambda self, msg, *args, **kwargs: displayed.append(msg))
+
+        analyzer.process_directory(str(source_path))
+
+        assert analyses["completed"] != sorted(analyses["completed"])
+        assert [results.splitlines()[0] for results in displayed] == [
+            f"# Source File: module_{index}.py" for index in range(self.FILE_COUNT)]
+
+    def test_each_worker_has_a_model_and_formatter_of_its_own(self, source_path, configure_stub, analyses):
+        configure_stub(max_workers=4, latency_seconds=0)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+
+        analyzer.process_directory(str(source_path))
+
+        assert analyses["shared_models"] == 0
+        models = {model for model, _ in analyses["formatters"]}
+        formatters = {formatter for _, formatter in analyses["formatters"]}
+        assert len(analyses["formatters"]) == self.FILE_COUNT
+        assert len(models) == len(formatters) == len(set(analyses["formatters"])) == 4
+        assert id(analyzer.model) not in models
+        assert id(analyzer._formatter) not in formatters
@@ -0,0 +1,94 @@
+import dataclasses
+import textwrap
+from source_analyzer.models.local_stub_model import LocalStubModel
+from source_analyzer.source_analyzer_class import SourceCodeAnalyzer
+from source_analyzer.source_chunker import SourceChunker
+
+PREAMBLE = "import os\nLIMIT = 10"
+
+SOURCE = PREAMBLE + textwrap.dedent('''
+
+
+    def first():
+        return os.sep
+
+
+    @decorate
+    class Service:  # the service
+        """The service."""
+
+        def alpha(self):
+            return "alpha" * LIMIT
+
+        def beta(self):
+            return "beta" * LIMIT
+
+        def gamma(self):
+            return "gamma" * LIMIT
+
+
+    def last():
+        return LIMIT
+    ''')
+
+
+def estimate_tokens(text):
+    return len(text.split())
+
+
+class TestSourceChunker:
+
+    def test_fitting_source_is_one_chunk(self):
+        chunks = SourceChunker().chunk(SOURCE, 1000, estimate_tokens)
+
+        assert [chunk.names for chunk in chunks] == [["first", "Service", "last"]]
+
+    def test_oversized_class_is_split_between_methods(self):
+        chunks = SourceChunker().chunk(SOURCE, 21, estimate_tokens)
+
+        assert [chunk.names for chunk in chunks] == [
+            ["first"], ["Service.alpha"], ["Service.beta"], ["Service.gamma"], ["last"],
+        ]
+        for chunk in chunks:
+            assert chunk.source.startswith(PREAMBLE + "\n\n\n")
+        for chunk in chunks[1:4]:
+            assert "@decorate\nclass Service:  # the service\n\n" in chunk.source
+        assert '"""The service."""' in chunks[1].source
+        assert "def beta" in chunks[2].source and "def alpha" not in chunks[2].source
+
+    def test_unparsable_source_is_one_chunk(self):
+        chunks = SourceChunker().chunk("def broken(:\n", 1, estimate_tokens)
+
+        assert [(chunk.source, chunk.names) for chunk in chunks] == [("def broken(:\n", [])]
+
+
+class TestChunkingFallback:
+
+    def test_max_tokens_stop_is_retried_in_chunks(self, tmp_path, configure_stub, monkeypatch):
+        configure_stub(latency_seconds=0)
+        source_path = tmp_path / "service.py"
+        source_path.write_text(SOURCE)
+        generate_text = LocalStubModel.generate_text
+        prompts = []
+
+        def truncate_first_response(self, prompt, on_token=None):
+            prompts.append(prompt)
+            result = generate_text(self, prompt, on_token)
+            return dataclasses.replace(result, stopped_reason="max_tokens") if len(prompts) == 1 else result
+
+        # the chunks are analyzed with a model of their own, so the class is patched
+        monkeypatch.setattr(LocalStubModel, "generate_text", truncate_first_response)
+        analyzer = SourceCodeAnalyzer(isolated=True)
+        output = analyzer.process_file(str(source_path))
+
+        assert analyzer.last_error is None
+        assert len(prompts) > 2
+        assert "def first" in prompts[0] and "def last" in prompts[0]
+        assert not any("def first" in prompt and "def last" in prompt for prompt in prompts[1:])
+        functions = {
+            location["function_name"]
+            for priority in analyzer.last_completion_json["priorities"]
+            for location in priority["critical_locations"]
+        }
+        assert functions == {"first", "Service.alpha", "Service.beta", "Service.gamma", "last"}
+        assert output.startswith("# Source File: service.py")
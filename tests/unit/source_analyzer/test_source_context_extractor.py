@@ -0,0 +1,111 @@
+import ast
+import textwrap
+from source_analyzer.source_context_extractor import SourceContextExtractor, class_header
+
+SOURCE = textwrap.dedent('''\
+    """Module docstring."""
+    import json
+    import os
+    from dataclasses import dataclass
+
+    LIMIT = 10
+    UNUSED = 20
+
+
+    def helper(value):
+        """Convert a value."""
+        return json.dumps(value)
+
+
+    @dataclass
+    class Foo:  # the foo
+        # the fields
+        name: str
+
+        def bar(self):
+            return os.path.join(helper(self.name)[:LIMIT], self.baz())
+
+        def baz(self):
+            """Get the baz."""
+            return "baz"
+
+        def unrelated(self):
+            return 0
+    ''')
+
+
+def header_of(source):
+    module = ast.parse(source)
+    return class_header(source.splitlines(), module.body[0])
+
+
+class TestClassHeader:
+
+    def test_keeps_class_statement_with_trailing_comment(self):
+        assert header_of("@dataclass\nclass Foo:  # the foo\n    # a comment\n    x = 1\n") \
+            == "@dataclass\nclass Foo:  # the foo"
+
+    def test_keeps_multiline_class_statement(self):
+        source = "class Foo(\n    Base,  # the base:\n    metaclass=Meta,\n):\n    x = 1\n"
+
+        assert header_of(source) == "class Foo(\n    Base,  # the base:\n    metaclass=Meta,\n):"
+
+    def test_leaves_out_body_on_colon_line(self):
+        assert header_of("class Foo(Base): x = 1\n") == "class Foo(Base):"
+
+    def test_nested_class(self):
+        source = "class Outer:\n    @decorate\n    class Inner:  # inner\n        x = 1\n"
+        inner = ast.parse(source).body[0].body[0]
+
+        assert class_header(source.splitlines(), inner) == "    @decorate\n    class Inner:  # inner"
+
+
+class TestSourceContextExtractor:
+
+    def test_extracts_method_with_its_context(self):
+        context = SourceContextExtractor().extract(SOURCE, "Foo.bar")
+
+        assert context.splitlines() == [
+            "import os",
+            "",
+            "",
+            "LIMIT = 10",
+            "",
+            "",
+            "def helper(value):",
+            '    """Convert a value."""',
+            "    ...",
+            "",
+            "",
+            "@dataclass",
+            "class Foo:  # the foo",
+            "",
+            "    def baz(self):",
+            '        """Get the baz."""',
+            "        ...",
+            "",
+            "    def bar(self):",
+            "        return os.path.join(helper(self.name)[:LIMIT], self.baz())",
+        ]
+
+    def test_methods_of_a_class_share_one_header(self):
+        context = SourceContextExtractor().extract_functions(SOURCE, ["Foo.unrelated", "self.bar"])
+
+        assert context.count("class Foo:  # the foo") == 1
+        assert context.index("def bar") < context.index("def unrelated")
+
+    def test_module_function(self):
+        context = SourceContextExtractor().extract(SOURCE, "module.helper")
+
+        assert context.splitlines() == [
+            "import json",
+            "",
+            "",
+            "def helper(value):",
+            '    """Convert a value."""',
+            "    return json.dumps(value)",
+        ]
+
+    def test_unknown_function_or_syntax_error_uses_full_source(self):
+        assert SourceContextExtractor().extract(SOURCE, "Foo.missing") is None
+        assert SourceContextExtractor().extract("def broken(:\n", "broken") is None
@@ -0,0 +1,60 @@
+import threading
+import pytest
+from source_analyzer.token_budget import TokenBudget, TokenBudgetExceededException
+
+
+class TestTokenBudget:
+
+    def test_reservations_count_against_remaining(self):
+        budget = TokenBudget(max_tokens=100)
+
+        budget.reserve(60)
+
+        assert budget.remaining == 40
+        assert budget.spent == 0
+        with pytest.raises(TokenBudgetExceededException):
+            budget.reserve(41)
+        budget.reserve(40)
+        assert budget.remaining == 0
+
+    def test_settle_replaces_reservation_with_used_tokens(self):
+        budget = TokenBudget(max_tokens=100)
+        budget.reserve(60)
+
+        budget.settle(60, 25)
+
+        assert budget.spent == 25
+        assert budget.remaining == 75
+
+    def test_failed_prompt_releases_its_reservation(self):
+        budget = TokenBudget(max_tokens=100)
+        budget.reserve(100)
+
+        budget.settle(100, 0)
+
+        assert budget.remaining == 100
+
+    def test_concurrent_reservations_never_exceed_budget(self):
+        budget = TokenBudget(max_tokens=1000)
+        reserved = []
+
+        def reserve():
+            for _ in range(100):
+                try:
+                    budget.reserve(7)
+                    reserved.append(7)
+                except TokenBudgetExceededException:
+                    pass
+
+        threads = [threading.Thread(target=reserve) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sum(reserved) == 994
+        assert budget.remaining == 6
+
+    def test_rejects_non_positive_budget(self):
+        with pytest.raises(ValueError):
+            TokenBudget(max_tokens=0)